@@ -11,8 +11,12 @@ import json
 import time
 from datetime import datetime
 import os
+from concurrent.futures import TimeoutError as FetchTimeout
 from alpha_vantage.timeseries import TimeSeries
 
+from quota_scheduler import QuotaLedger, QuotaExhausted, RequestScheduler, INTERACTIVE, BACKGROUND
+from summary_table import SummaryTable
+
 class AlphaVantageStock:
     """Stock class that mimics StockSimple but uses Alpha Vantage data"""
     
@@ -30,6 +34,17 @@ class AlphaVantageStock:
         else:
             print(f"❌ No API key available for {symbol}")
     
+    @classmethod
+    def unavailable(cls, symbol):
+        """An empty stock (is_valid() is False) for when no request could be made"""
+        stock = cls.__new__(cls)
+        stock.ticker = symbol.upper()
+        stock.api_key = None
+        stock.history = pd.DataFrame()
+        stock.info = {}
+        stock.rate_limit_delay = 12
+        return stock
+    
     def _fetch_data(self):
         """Fetch stock data from Alpha Vantage"""
         try:
@@ -192,30 +207,86 @@ class AlphaVantageStock:
 class AlphaVantageManager:
     """Manager class to handle multiple Alpha Vantage stocks"""
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, ledger=None, daily_limit=500, reserve=50, fetch_timeout=60):
         self.api_key = api_key or os.getenv('ALPHA_VANTAGE_API_KEY')
         self.stocks = {}
-        self.request_count = 0
+        self.fetched_at = {}
         self.rate_limit_delay = 12
+        # Longest a request handler waits for a queued fetch
+        self.fetch_timeout = fetch_timeout
+        
+        # Usage is persisted and shared with other processes using the key;
+        # the scheduler spends it by priority and merges duplicate requests
+        self.ledger = ledger or QuotaLedger(daily_limit=daily_limit)
+        self.scheduler = RequestScheduler(self.ledger, reserve=reserve)
+        
+        # One precomputed summary row per symbol, refreshed on every fetch
+        self.summary_table = SummaryTable()
         
         if not self.api_key:
             print("⚠️  No Alpha Vantage API key found. Please set ALPHA_VANTAGE_API_KEY environment variable.")
     
-    def get_stock(self, symbol):
+    @property
+    def request_count(self):
+        """API calls made today by every process sharing the ledger"""
+        return self.ledger.used_today()
+    
+    def requests_remaining(self):
+        return self.ledger.remaining()
+    
+    def _fetch(self, symbol):
+        stock = AlphaVantageStock(symbol, self.api_key)
+        if not stock.is_valid():
+            # A failed refresh keeps the last good history and its summary row
+            previous = self.stocks.get(symbol)
+            if previous is not None and previous.is_valid():
+                return previous
+            self.stocks[symbol] = stock
+            return stock
+        self.stocks[symbol] = stock
+        self.fetched_at[symbol] = time.time()
+        self.summary_table.update_stock(stock)
+        return stock
+    
+    def get_stock(self, symbol, refresh=False, priority=INTERACTIVE):
         """Get stock data, using cache if available"""
         symbol = symbol.upper()
         
-        if symbol not in self.stocks:
-            # Rate limiting
-            if self.request_count > 0:
-                print(f"⏳ Waiting {self.rate_limit_delay} seconds for rate limit...")
-                time.sleep(self.rate_limit_delay)
-            
-            self.stocks[symbol] = AlphaVantageStock(symbol, self.api_key)
-            self.request_count += 1
+        if refresh or symbol not in self.stocks:
+            if not self.api_key:
+                # No request is made without a key, so nothing to budget
+                return self._fetch(symbol)
+            try:
+                return self.scheduler.run(('TIME_SERIES_DAILY', symbol), lambda: self._fetch(symbol),
+                                          priority, timeout=self.fetch_timeout)
+            except QuotaExhausted:
+                print(f"⚠️  Alpha Vantage daily quota spent; serving cached data for {symbol}")
+            except FetchTimeout:
+                # The fetch stays queued and fills the cache when it completes
+                print(f"⚠️  Alpha Vantage fetch for {symbol} still queued after {self.fetch_timeout}s")
+            return self.stocks.get(symbol) or AlphaVantageStock.unavailable(symbol)
         
         return self.stocks[symbol]
     
+    def refresh_in_background(self, symbols, max_age_hours=6):
+        """
+        Queue low-priority refreshes for symbols whose data is missing or
+        older than max_age_hours. They run off-peak and never touch the
+        budget reserved for interactive requests.
+        
+        Returns:
+            List of symbols queued
+        """
+        queued = []
+        for symbol in symbols:
+            symbol = symbol.upper()
+            age = time.time() - self.fetched_at.get(symbol, 0)
+            if age > max_age_hours * 3600:
+                self.scheduler.submit(('TIME_SERIES_DAILY', symbol),
+                                      lambda s=symbol: self._fetch(s), BACKGROUND)
+                queued.append(symbol)
+        return queued
+    
     def get_stock_summary(self, symbol):
         """Get stock summary similar to our Flask app format"""
         stock = self.get_stock(symbol)
@@ -223,31 +294,9 @@ class AlphaVantageManager:
         if not stock.is_valid():
             return None
         
-        latest = stock.today()
-        
-        # Calculate data freshness
-        last_date = stock.history.index[-1].date()
-        today = datetime.now().date()
-        days_behind = (today - last_date).days
-        
-        return {
-            'symbol': stock.ticker,
-            'current_price': round(float(latest['Close']), 2),
-            'volume': int(latest['Volume']),
-            'high': round(float(latest['High']), 2),
-            'low': round(float(latest['Low']), 2),
-            'rsi': round(float(latest['RSI']), 1) if pd.notna(latest['RSI']) else None,
-            'macd': round(float(latest['MACD']), 3) if pd.notna(latest['MACD']) else None,
-            'ma_50': round(float(latest['50MA']), 2) if pd.notna(latest['50MA']) else None,
-            'ma_200': round(float(latest['200MA']), 2) if pd.notna(latest['200MA']) else None,
-            'growth_percent': round(((stock.history["Close"].iloc[-1] - stock.history["Close"].iloc[0]) / stock.history["Close"].iloc[0]) * 100, 2),
-            'volatility': round(float(stock.history["Daily Return"].std()), 4),
-            'is_bullish': stock.is_bullish(),
-            'is_bearish': stock.is_bearish(),
-            'last_updated': last_date.strftime('%Y-%m-%d'),
-            'days_behind': days_behind,
-            'data_points': len(stock.history)
-        }
+        # No-op unless the history changed since the row was computed
+        self.summary_table.update_stock(stock)
+        return self.summary_table.record(symbol)
     
     def test_connection(self):
         """Test the Alpha Vantage connection"""
@@ -306,8 +355,8 @@ def main():
         except Exception as e:
             print(f"\n❌ {symbol}: Error - {e}")
     
-    print(f"\n🎯 Total API requests made: {manager.request_count}")
-    print(f"📋 Daily limit remaining: {500 - manager.request_count}")
+    print(f"\n🎯 API requests made today: {manager.request_count}")
+    print(f"📋 Daily limit remaining: {manager.requests_remaining()}")
 
 if __name__ == "__main__":
     main()
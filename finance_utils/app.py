@@ -3,12 +3,21 @@
 Flask Dashboard for Stock Data Visualization
 """
 
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, render_template, jsonify, request, send_file, Response, stream_with_context
 from stock_simple import StockSimple
+from correlation_service import MAX_WINDOW, RollingCorrelation, align_closes
+from portfolio_optimizer import PortfolioOptimizer
+from provider_router import default_router
+from streaming import QuoteStream, per_symbol, sse_events
+from chart_cache import ChartCache, bar_arrays, data_version, line_arrays, ohlc_arrays
+from http_cache import conditional, enable_compression
+import serialization
+from summary_table import SummaryTable
+from ttl_cache import TTLCache
+from batch_query import ARROW_MIMETYPE, parse_batch_args, run_batch
+import circuit_breaker
 import pandas as pd
 import plotly.graph_objs as go
-import plotly.utils
-import json
 from datetime import datetime, timedelta
 import os
 import io
@@ -18,65 +27,133 @@ import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 
 app = Flask(__name__)
+enable_compression(app)
+serialization.install(app)
 
 # Global cache for stock data
 stock_cache = {}
 
+# One precomputed summary row per symbol, refreshed when its data changes
+summary_table = SummaryTable()
+
+# Serialized Plotly figures keyed by symbol, chart type, range and data version
+chart_cache = ChartCache()
+
+# Rolling correlation services keyed by (symbols, window), updated with each new bar
+correlation_cache = TTLCache(maxsize=32, default_ttl=3600)
+
+DEFAULT_SYMBOLS = ['AAPL', 'NVDA', 'GOOGL', 'MSFT', 'TSLA', 'AMZN', 'META']
+
+# Fresh data goes through the fastest healthy provider (Yahoo, Alpha Vantage, TwelveData)
+data_router = default_router()
+
+# One shared loop polls quotes for streamed symbols and folds them into today's bar
+quote_stream = QuoteStream(per_symbol(data_router.get_quote), poll_interval=15, bar_seconds=86400)
+
+# Symbols whose stream state has been seeded from daily history
+seeded_symbols = set()
+
+# Most symbols one /api/live or /api/stream request may ask for
+MAX_STREAM_SYMBOLS = 20
+# /api/live symbols stop polling this long after their last read
+LIVE_IDLE_SECONDS = 600
+
+def seed_stream(symbols):
+    """Warm the stream from cached history once per symbol; returns the symbols with history."""
+    valid = []
+    for symbol in symbols:
+        stock = get_stock_data(symbol)
+        if not stock.is_valid():
+            continue
+        if symbol not in seeded_symbols:
+            quote_stream.seed(symbol, stock.history)
+            seeded_symbols.add(symbol)
+        valid.append(symbol)
+    return valid
+
+def ensure_streaming(symbols):
+    """Keep polling symbols with data while /api/live is read; returns them."""
+    valid = seed_stream(symbols)
+    quote_stream.lease(valid, LIVE_IDLE_SECONDS)
+    quote_stream.start()
+    return valid
+
+def parse_symbols(arg='symbols'):
+    """Deduplicated symbols from a query arg; raises ValueError when missing or too many."""
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.args.get(arg, '').split(',') if s.strip()))
+    if not symbols:
+        raise ValueError('At least 1 symbol required')
+    if len(symbols) > MAX_STREAM_SYMBOLS:
+        raise ValueError(f'At most {MAX_STREAM_SYMBOLS} symbols per request')
+    return symbols
+
+# Indicator settings behind get_stock_summary; part of every API ETag
+INDICATOR_CONFIG = ('ma', 50, 200, 'ema', 12, 26, 9, 'rsi', 14, 'bb', 20, 2, 'atr', 14)
+
+def stocks_version(symbols):
+    """Data version of a set of stock summaries (days_behind changes daily)."""
+    versions = []
+    for symbol in symbols:
+        stock = get_stock_data(symbol)
+        versions.append((symbol, data_version(stock.history) if stock.is_valid() else None))
+    return (INDICATOR_CONFIG, datetime.now().date().isoformat(), tuple(versions))
+
+def requested_stocks_version(default=''):
+    return stocks_version(s.strip().upper() for s in request.args.get('symbols', default).split(',') if s.strip())
+
 def get_stock_data(symbol, force_refresh=False):
     """Get stock data with caching."""
     if symbol not in stock_cache or force_refresh:
-        stock_cache[symbol] = StockSimple(symbol)
+        stock_cache[symbol] = StockSimple(symbol, provider=data_router)
+        summary_table.update_stock(stock_cache[symbol])
     return stock_cache[symbol]
 
-def create_candlestick_chart(stock):
-    """Create a candlestick chart using Plotly."""
+def create_candlestick_chart(stock, days=100):
+    """Create a candlestick chart using Plotly (cached per data version)."""
     if not stock.is_valid():
         return None
-    
-    df = stock.history.tail(100)  # Last 100 days
+    return chart_cache.get_or_build(stock.ticker, 'candlestick', data_version(stock.history),
+                                    lambda: build_candlestick_chart(stock, days), days=days)
+
+def build_candlestick_chart(stock, days):
+    df = stock.history.tail(days) if days else stock.history
     
     fig = go.Figure(data=[go.Candlestick(
-        x=df.index,
-        open=df['Open'],
-        high=df['High'],
-        low=df['Low'],
-        close=df['Close'],
+        **ohlc_arrays(df),
         name=f"{stock.ticker} Price"
     )])
     
     # Add moving averages
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['50MA'],
-        mode='lines',
-        name='50-Day MA',
-        line=dict(color='orange', width=2)
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['200MA'],
-        mode='lines',
-        name='200-Day MA',
-        line=dict(color='red', width=2)
-    ))
+    for column, name, color in [('50MA', '50-Day MA', 'orange'), ('200MA', '200-Day MA', 'red')]:
+        x, y = line_arrays(df[column])
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y,
+            mode='lines',
+            name=name,
+            line=dict(color=color, width=2)
+        ))
     
     fig.update_layout(
         title=f'{stock.ticker} Stock Price with Moving Averages',
         xaxis_title='Date',
+        xaxis_type='date',
         yaxis_title='Price ($)',
         template='plotly_white',
         height=500
     )
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig.to_json()
 
-def create_technical_indicators_chart(stock):
-    """Create technical indicators chart."""
+def create_technical_indicators_chart(stock, days=100):
+    """Create technical indicators chart (cached per data version)."""
     if not stock.is_valid():
         return None
-    
-    df = stock.history.tail(100)
+    return chart_cache.get_or_build(stock.ticker, 'technical', data_version(stock.history),
+                                    lambda: build_technical_indicators_chart(stock, days), days=days)
+
+def build_technical_indicators_chart(stock, days):
+    df = stock.history.tail(days) if days else stock.history
     
     # Create subplots
     from plotly.subplots import make_subplots
@@ -90,82 +167,44 @@ def create_technical_indicators_chart(stock):
                [{"secondary_y": False}]]
     )
     
+    def line(column, **kwargs):
+        x, y = line_arrays(df[column])
+        return go.Scatter(x=x, y=y, **kwargs)
+    
     # RSI
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df['RSI'], name='RSI', line=dict(color='purple')),
-        row=1, col=1
-    )
+    fig.add_trace(line('RSI', name='RSI', line=dict(color='purple')), row=1, col=1)
     fig.add_hline(y=70, line_dash="dash", line_color="red", row=1, col=1)
     fig.add_hline(y=30, line_dash="dash", line_color="green", row=1, col=1)
     
     # MACD
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df['MACD'], name='MACD', line=dict(color='blue')),
-        row=2, col=1
-    )
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df['Signal'], name='Signal', line=dict(color='red')),
-        row=2, col=1
-    )
-    fig.add_trace(
-        go.Bar(x=df.index, y=df['Histogram'], name='Histogram', opacity=0.3),
-        row=2, col=1
-    )
+    fig.add_trace(line('MACD', name='MACD', line=dict(color='blue')), row=2, col=1)
+    fig.add_trace(line('Signal', name='Signal', line=dict(color='red')), row=2, col=1)
+    x, y = bar_arrays(df['Histogram'])
+    fig.add_trace(go.Bar(x=x, y=y, name='Histogram', opacity=0.3), row=2, col=1)
     
     # Bollinger Bands
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df['Close'], name='Close', line=dict(color='black')),
-        row=3, col=1
-    )
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df['Upper Band'], name='Upper Band', 
-                  line=dict(color='red', dash='dash')),
-        row=3, col=1
-    )
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df['Lower Band'], name='Lower Band', 
-                  line=dict(color='green', dash='dash')),
-        row=3, col=1
-    )
+    fig.add_trace(line('Close', name='Close', line=dict(color='black')), row=3, col=1)
+    fig.add_trace(line('Upper Band', name='Upper Band', line=dict(color='red', dash='dash')),
+                  row=3, col=1)
+    fig.add_trace(line('Lower Band', name='Lower Band', line=dict(color='green', dash='dash')),
+                  row=3, col=1)
     
+    fig.update_xaxes(type='date')
     fig.update_layout(
         title=f'{stock.ticker} Technical Indicators',
         height=800,
         template='plotly_white'
     )
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig.to_json()
 
 def get_stock_summary(stock):
-    """Get stock summary data."""
+    """Get stock summary data from the summary table."""
     if not stock.is_valid():
         return None
-    
-    latest = stock.today()
-    
-    # Calculate data freshness
-    last_date = stock.history.index[-1].date()
-    today = datetime.now().date()
-    days_behind = (today - last_date).days
-    
-    return {
-        'symbol': stock.ticker,
-        'current_price': round(float(latest['Close']), 2),
-        'volume': int(latest['Volume']),
-        'high': round(float(latest['High']), 2),
-        'low': round(float(latest['Low']), 2),
-        'rsi': round(float(latest['RSI']), 1),
-        'macd': round(float(latest['MACD']), 3),
-        'ma_50': round(float(latest['50MA']), 2),
-        'ma_200': round(float(latest['200MA']), 2),
-        'growth_percent': round(((stock.history["Close"].iloc[-1] - stock.history["Close"].iloc[0]) / stock.history["Close"].iloc[0]) * 100, 2),
-        'volatility': round(float(stock.history["Daily Return"].std()), 4),
-        'is_bullish': bool(stock.is_bullish()),
-        'is_bearish': bool(stock.is_bearish()),
-        'last_updated': last_date.strftime('%Y-%m-%d'),
-        'days_behind': days_behind,
-        'data_points': len(stock.history)
-    }
+    # No-op unless the history changed since the row was computed
+    summary_table.update_stock(stock)
+    return summary_table.record(stock.ticker)
 
 @app.route('/')
 def dashboard():
@@ -182,8 +221,10 @@ def stock_page(symbol):
                              message=f"No data available for {symbol.upper()}")
     
     summary = get_stock_summary(stock)
-    candlestick_chart = create_candlestick_chart(stock)
-    technical_chart = create_technical_indicators_chart(stock)
+    # ?days=0 charts the whole history, downsampled to screen resolution
+    days = max(request.args.get('days', 100, type=int), 0)
+    candlestick_chart = create_candlestick_chart(stock, days)
+    technical_chart = create_technical_indicators_chart(stock, days)
     
     return render_template('stock.html', 
                          symbol=symbol.upper(),
@@ -192,6 +233,7 @@ def stock_page(symbol):
                          technical_chart=technical_chart)
 
 @app.route('/api/stock/<symbol>')
+@conditional(lambda symbol: stocks_version([symbol.upper()]))
 def api_stock_data(symbol):
     """API endpoint for stock data."""
     stock = get_stock_data(symbol.upper())
@@ -203,20 +245,16 @@ def api_stock_data(symbol):
     return jsonify(summary)
 
 @app.route('/api/stocks')
+@conditional(lambda: stocks_version(DEFAULT_SYMBOLS))
 def api_stocks_list():
     """API endpoint for available stocks."""
-    available_stocks = []
-    symbols = ['AAPL', 'NVDA', 'GOOGL', 'MSFT', 'TSLA', 'AMZN', 'META']
-    
-    for symbol in symbols:
-        stock = get_stock_data(symbol)
-        if stock.is_valid():
-            summary = get_stock_summary(stock)
-            available_stocks.append(summary)
+    for symbol in DEFAULT_SYMBOLS:
+        get_stock_data(symbol)
     
-    return jsonify(available_stocks)
+    return jsonify(summary_table.records(DEFAULT_SYMBOLS))
 
 @app.route('/api/compare')
+@conditional(lambda: requested_stocks_version())
 def api_compare():
     """API endpoint for stock comparison."""
     symbols = request.args.get('symbols', '').split(',')
@@ -225,15 +263,121 @@ def api_compare():
     if len(symbols) < 2:
         return jsonify({'error': 'At least 2 symbols required'}), 400
     
-    comparison_data = []
+    for symbol in symbols:
+        get_stock_data(symbol)
+    
+    return jsonify(summary_table.records(symbols))
+
+@app.route('/api/batch')
+def api_batch():
+    """Columnar history and indicators for many symbols (JSON, or Arrow IPC with format=arrow)."""
+    try:
+        query = parse_batch_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def load(symbol):
+        stock = get_stock_data(symbol)
+        return stock.history if stock.is_valid() else None
     
+    mimetype = ARROW_MIMETYPE if query['format'] == 'arrow' else 'application/json'
+    return Response(stream_with_context(run_batch(query, load)), mimetype=mimetype)
+
+@app.route('/api/correlation')
+def api_correlation():
+    """API endpoint for rolling correlation across a set of stocks."""
+    symbols = request.args.get('symbols', ','.join(DEFAULT_SYMBOLS)).split(',')
+    symbols = sorted({s.strip().upper() for s in symbols if s.strip()})
+    window = min(request.args.get('window', 60, type=int), MAX_WINDOW)
+    top_k = request.args.get('top', 5, type=int)
+
+    if len(symbols) < 2:
+        return jsonify({'error': 'At least 2 symbols required'}), 400
+    if window < 2:
+        return jsonify({'error': 'window must be at least 2'}), 400
+
+    frames = {}
     for symbol in symbols:
         stock = get_stock_data(symbol)
         if stock.is_valid():
-            summary = get_stock_summary(stock)
-            comparison_data.append(summary)
-    
-    return jsonify(comparison_data)
+            frames[symbol] = stock.history
+
+    if len(frames) < 2:
+        return jsonify({'error': 'Not enough symbols with data'}), 404
+
+    service = correlation_cache.get_or_compute(
+        (tuple(frames.keys()), window), lambda: RollingCorrelation(list(frames.keys()), window=window))
+    # Only bars newer than the last update are applied
+    service.sync_frames(frames)
+
+    return jsonify(service.to_dict(top_k=top_k))
+
+@app.route('/api/optimize')
+def api_optimize():
+    """API endpoint for the efficient frontier of a set of stocks."""
+    symbols = request.args.get('symbols', ','.join(DEFAULT_SYMBOLS)).split(',')
+    symbols = sorted({s.strip().upper() for s in symbols if s.strip()})
+    max_weight = request.args.get('max_weight', None, type=float)
+    n_points = request.args.get('points', 50, type=int)
+    risk_free_rate = request.args.get('risk_free_rate', 0.0, type=float)
+
+    if len(symbols) < 2:
+        return jsonify({'error': 'At least 2 symbols required'}), 400
+
+    frames = {}
+    for symbol in symbols:
+        stock = get_stock_data(symbol)
+        if stock.is_valid():
+            frames[symbol] = stock.history
+
+    if len(frames) < 2:
+        return jsonify({'error': 'Not enough symbols with data'}), 404
+
+    returns = align_closes(frames).ffill().pct_change().dropna()
+    try:
+        optimizer = PortfolioOptimizer.from_returns(returns, max_weight=max_weight,
+                                                    risk_free_rate=risk_free_rate)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(optimizer.summary(n_points=n_points))
+
+@app.route('/api/providers')
+def api_providers():
+    """API endpoint for data provider health and routing order."""
+    return jsonify(data_router.status())
+
+@app.route('/api/circuits')
+def api_circuits():
+    """API endpoint for per-provider circuit breaker and concurrency limit state."""
+    return jsonify(circuit_breaker.status())
+
+@app.route('/api/live')
+def api_live():
+    """API endpoint for the latest streamed bar and indicators of each symbol."""
+    try:
+        symbols = parse_symbols()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    valid = ensure_streaming(symbols)
+    return jsonify({'quotes': {s: quote_stream.snapshot(s) for s in valid},
+                    'missing': [s for s in symbols if s not in valid],
+                    'stream': quote_stream.status()})
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events push of bar and indicator changes for one or more symbols."""
+    try:
+        symbols = parse_symbols()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    symbols = seed_stream(symbols)
+    if not symbols:
+        return jsonify({'error': 'No data available for the requested symbols'}), 404
+    subscription = quote_stream.subscribe(symbols)
+    quote_stream.start()
+    return Response(stream_with_context(sse_events(subscription)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/compare')
 def compare_page():
@@ -259,36 +403,15 @@ def reports_page():
     return render_template('reports.html')
 
 @app.route('/api/generate_report')
+@conditional(lambda: requested_stocks_version('AAPL,NVDA'))
 def api_generate_report():
     """Generate comprehensive report."""
     symbols = request.args.get('symbols', 'AAPL,NVDA').split(',')
     symbols = [s.strip().upper() for s in symbols if s.strip()]
     
-    report_data = []
-    
     for symbol in symbols:
-        stock = get_stock_data(symbol)
-        if stock.is_valid():
-            summary = get_stock_summary(stock)
-            
-            # Add additional analysis
-            latest = stock.today()
-            summary.update({
-                'technical_signals': {
-                    'price_above_ma50': bool(latest['Close'] > latest['50MA']),
-                    'price_above_ma200': bool(latest['Close'] > latest['200MA']),
-                    'rsi_overbought': bool(latest['RSI'] > 70),
-                    'rsi_oversold': bool(latest['RSI'] < 30),
-                    'macd_bullish': bool(latest['MACD'] > latest['Signal'])
-                },
-                'price_levels': {
-                    'support': round(float(latest['Lower Band']), 2),
-                    'resistance': round(float(latest['Upper Band']), 2),
-                    'atr': round(float(latest['ATR']), 2)
-                }
-            })
-            
-            report_data.append(summary)
+        get_stock_data(symbol)
+    report_data = summary_table.report_records(symbols)
     
     return jsonify({
         'generated_at': datetime.now().isoformat(),
@@ -6,10 +6,11 @@ Flask Dashboard for Stock Data Visualization using Alpha Vantage
 from flask import Flask, render_template, jsonify, request, send_file
 from alpha_vantage_adapter import AlphaVantageManager, AlphaVantageStock
 from latex_report_generator import LatexReportGenerator
+from chart_cache import ChartCache, bar_arrays, data_version, line_arrays, ohlc_arrays
+from http_cache import conditional, enable_compression
+import serialization
 import pandas as pd
 import plotly.graph_objs as go
-import plotly.utils
-import json
 from datetime import datetime, timedelta
 import os
 import io
@@ -19,6 +20,8 @@ import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 
 app = Flask(__name__)
+enable_compression(app)
+serialization.install(app)
 
 # Initialize Alpha Vantage manager
 av_manager = AlphaVantageManager()
@@ -26,63 +29,77 @@ av_manager = AlphaVantageManager()
 # Initialize LaTeX report generator
 latex_generator = LatexReportGenerator()
 
+# Serialized Plotly figures keyed by symbol, chart type, range and data version
+chart_cache = ChartCache()
+
 def get_stock_data(symbol, force_refresh=False):
     """Get stock data using Alpha Vantage"""
-    if force_refresh or symbol not in av_manager.stocks:
-        return av_manager.get_stock(symbol)
-    return av_manager.stocks[symbol]
+    return av_manager.get_stock(symbol, refresh=force_refresh)
+
+# Indicator settings behind get_stock_summary; part of every API ETag
+INDICATOR_CONFIG = ('ma', 50, 200, 'ema', 12, 26, 9, 'rsi', 14, 'bb', 20, 2)
+
+def stocks_version(symbols):
+    """Data version of a set of stock summaries"""
+    versions = []
+    for symbol in symbols:
+        try:
+            stock = get_stock_data(symbol)
+            versions.append((symbol, data_version(stock.history) if stock.is_valid() else None))
+        except Exception:
+            versions.append((symbol, None))
+    return (INDICATOR_CONFIG, datetime.now().date().isoformat(), tuple(versions))
 
-def create_candlestick_chart(stock):
-    """Create a candlestick chart using Plotly"""
+def requested_stocks_version(default=''):
+    return stocks_version(s.strip().upper() for s in request.args.get('symbols', default).split(',') if s.strip())
+
+def create_candlestick_chart(stock, days=100):
+    """Create a candlestick chart using Plotly (cached per data version)"""
     if not stock.is_valid():
         return None
-    
-    df = stock.history.tail(100)  # Last 100 days
+    return chart_cache.get_or_build(stock.ticker, 'candlestick', data_version(stock.history),
+                                    lambda: build_candlestick_chart(stock, days), days=days)
+
+def build_candlestick_chart(stock, days):
+    df = stock.history.tail(days) if days else stock.history
     
     fig = go.Figure(data=[go.Candlestick(
-        x=df.index,
-        open=df['Open'],
-        high=df['High'],
-        low=df['Low'],
-        close=df['Close'],
+        **ohlc_arrays(df),
         name=f"{stock.ticker} Price"
     )])
     
     # Add moving averages
-    if '50MA' in df.columns:
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df['50MA'],
-            mode='lines',
-            name='50-Day MA',
-            line=dict(color='orange', width=2)
-        ))
-    
-    if '200MA' in df.columns:
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df['200MA'],
-            mode='lines',
-            name='200-Day MA',
-            line=dict(color='red', width=2)
-        ))
+    for column, name, color in [('50MA', '50-Day MA', 'orange'), ('200MA', '200-Day MA', 'red')]:
+        if column in df.columns:
+            x, y = line_arrays(df[column])
+            fig.add_trace(go.Scatter(
+                x=x,
+                y=y,
+                mode='lines',
+                name=name,
+                line=dict(color=color, width=2)
+            ))
     
     fig.update_layout(
         title=f'{stock.ticker} Stock Price with Moving Averages',
         xaxis_title='Date',
+        xaxis_type='date',
         yaxis_title='Price ($)',
         template='plotly_white',
         height=500
     )
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig.to_json()
 
-def create_technical_indicators_chart(stock):
-    """Create technical indicators chart"""
+def create_technical_indicators_chart(stock, days=100):
+    """Create technical indicators chart (cached per data version)"""
     if not stock.is_valid():
         return None
-    
-    df = stock.history.tail(100)
+    return chart_cache.get_or_build(stock.ticker, 'technical', data_version(stock.history),
+                                    lambda: build_technical_indicators_chart(stock, days), days=days)
+
+def build_technical_indicators_chart(stock, days):
+    df = stock.history.tail(days) if days else stock.history
     
     # Create subplots
     from plotly.subplots import make_subplots
@@ -96,56 +113,41 @@ def create_technical_indicators_chart(stock):
                [{"secondary_y": False}]]
     )
     
+    def line(column, **kwargs):
+        x, y = line_arrays(df[column])
+        return go.Scatter(x=x, y=y, **kwargs)
+    
     # RSI
     if 'RSI' in df.columns:
-        fig.add_trace(
-            go.Scatter(x=df.index, y=df['RSI'], name='RSI', line=dict(color='purple')),
-            row=1, col=1
-        )
+        fig.add_trace(line('RSI', name='RSI', line=dict(color='purple')), row=1, col=1)
         fig.add_hline(y=70, line_dash="dash", line_color="red", row=1, col=1)
         fig.add_hline(y=30, line_dash="dash", line_color="green", row=1, col=1)
     
     # MACD
     if 'MACD' in df.columns:
-        fig.add_trace(
-            go.Scatter(x=df.index, y=df['MACD'], name='MACD', line=dict(color='blue')),
-            row=2, col=1
-        )
+        fig.add_trace(line('MACD', name='MACD', line=dict(color='blue')), row=2, col=1)
         if 'Signal' in df.columns:
-            fig.add_trace(
-                go.Scatter(x=df.index, y=df['Signal'], name='Signal', line=dict(color='red')),
-                row=2, col=1
-            )
+            fig.add_trace(line('Signal', name='Signal', line=dict(color='red')), row=2, col=1)
         if 'Histogram' in df.columns:
-            fig.add_trace(
-                go.Bar(x=df.index, y=df['Histogram'], name='Histogram', opacity=0.3),
-                row=2, col=1
-            )
+            x, y = bar_arrays(df['Histogram'])
+            fig.add_trace(go.Bar(x=x, y=y, name='Histogram', opacity=0.3), row=2, col=1)
     
     # Bollinger Bands
     if 'Upper Band' in df.columns:
-        fig.add_trace(
-            go.Scatter(x=df.index, y=df['Close'], name='Close', line=dict(color='black')),
-            row=3, col=1
-        )
-        fig.add_trace(
-            go.Scatter(x=df.index, y=df['Upper Band'], name='Upper Band', 
-                      line=dict(color='red', dash='dash')),
-            row=3, col=1
-        )
-        fig.add_trace(
-            go.Scatter(x=df.index, y=df['Lower Band'], name='Lower Band', 
-                      line=dict(color='green', dash='dash')),
-            row=3, col=1
-        )
+        fig.add_trace(line('Close', name='Close', line=dict(color='black')), row=3, col=1)
+        fig.add_trace(line('Upper Band', name='Upper Band', line=dict(color='red', dash='dash')),
+                      row=3, col=1)
+        fig.add_trace(line('Lower Band', name='Lower Band', line=dict(color='green', dash='dash')),
+                      row=3, col=1)
     
+    fig.update_xaxes(type='date')
     fig.update_layout(
         title=f'{stock.ticker} Technical Indicators',
         height=800,
         template='plotly_white'
     )
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return fig.to_json()
 
 def get_stock_summary(stock):
     """Get stock summary data"""
@@ -169,8 +171,10 @@ def stock_page(symbol):
                              message=f"No data available for {symbol.upper()}")
     
     summary = get_stock_summary(stock)
-    candlestick_chart = create_candlestick_chart(stock)
-    technical_chart = create_technical_indicators_chart(stock)
+    # ?days=0 charts the whole history, downsampled to screen resolution
+    days = max(request.args.get('days', 100, type=int), 0)
+    candlestick_chart = create_candlestick_chart(stock, days)
+    technical_chart = create_technical_indicators_chart(stock, days)
     
     return render_template('stock.html', 
                          symbol=symbol.upper(),
@@ -179,6 +183,7 @@ def stock_page(symbol):
                          technical_chart=technical_chart)
 
 @app.route('/api/stock/<symbol>')
+@conditional(lambda symbol: stocks_version([symbol.upper()]))
 def api_stock_data(symbol):
     """API endpoint for stock data"""
     stock = get_stock_data(symbol.upper())
@@ -192,21 +197,21 @@ def api_stock_data(symbol):
 @app.route('/api/stocks')
 def api_stocks_list():
     """API endpoint for available stocks"""
-    available_stocks = []
     symbols = ['AAPL', 'NVDA', 'GOOGL', 'MSFT', 'TSLA', 'AMZN', 'META']
     
     for symbol in symbols:
         try:
-            stock = get_stock_data(symbol)
-            if stock.is_valid():
-                summary = get_stock_summary(stock)
-                available_stocks.append(summary)
+            get_stock_data(symbol)
         except Exception as e:
             print(f"Error getting data for {symbol}: {e}")
     
-    return jsonify(available_stocks)
+    # Keep the landing page symbols fresh off-peak without spending the interactive reserve
+    av_manager.refresh_in_background(symbols)
+    
+    return jsonify(av_manager.summary_table.records(symbols))
 
 @app.route('/api/compare')
+@conditional(lambda: requested_stocks_version())
 def api_compare():
     """API endpoint for stock comparison"""
     symbols = request.args.get('symbols', '').split(',')
@@ -215,18 +220,13 @@ def api_compare():
     if len(symbols) < 2:
         return jsonify({'error': 'At least 2 symbols required'}), 400
     
-    comparison_data = []
-    
     for symbol in symbols:
         try:
-            stock = get_stock_data(symbol)
-            if stock.is_valid():
-                summary = get_stock_summary(stock)
-                comparison_data.append(summary)
+            get_stock_data(symbol)
         except Exception as e:
             print(f"Error getting data for {symbol}: {e}")
     
-    return jsonify(comparison_data)
+    return jsonify(av_manager.summary_table.records(symbols))
 
 @app.route('/api/refresh/<symbol>')
 def api_refresh_stock(symbol):
@@ -247,50 +247,18 @@ def reports_page():
     return render_template('reports.html')
 
 @app.route('/api/generate_report')
+@conditional(lambda: requested_stocks_version('AAPL,NVDA'))
 def api_generate_report():
     """Generate comprehensive report"""
     symbols = request.args.get('symbols', 'AAPL,NVDA').split(',')
     symbols = [s.strip().upper() for s in symbols if s.strip()]
     
-    report_data = []
-    
     for symbol in symbols:
         try:
-            stock = get_stock_data(symbol)
-            if stock.is_valid():
-                summary = get_stock_summary(stock)
-                
-                # Add additional analysis
-                latest = stock.today()
-                
-                # Check for None values before comparisons
-                technical_signals = {}
-                if summary['ma_50'] is not None:
-                    technical_signals['price_above_ma50'] = summary['current_price'] > summary['ma_50']
-                if summary['ma_200'] is not None:
-                    technical_signals['price_above_ma200'] = summary['current_price'] > summary['ma_200']
-                if summary['rsi'] is not None:
-                    technical_signals['rsi_overbought'] = summary['rsi'] > 70
-                    technical_signals['rsi_oversold'] = summary['rsi'] < 30
-                if summary['macd'] is not None and 'Signal' in latest:
-                    technical_signals['macd_bullish'] = float(latest['MACD']) > float(latest['Signal'])
-                
-                price_levels = {}
-                if 'Upper Band' in latest and pd.notna(latest['Upper Band']):
-                    price_levels['resistance'] = round(float(latest['Upper Band']), 2)
-                if 'Lower Band' in latest and pd.notna(latest['Lower Band']):
-                    price_levels['support'] = round(float(latest['Lower Band']), 2)
-                if 'ATR' in latest and pd.notna(latest['ATR']):
-                    price_levels['atr'] = round(float(latest['ATR']), 2)
-                
-                summary.update({
-                    'technical_signals': technical_signals,
-                    'price_levels': price_levels
-                })
-                
-                report_data.append(summary)
+            get_stock_data(symbol)
         except Exception as e:
             print(f"Error generating report for {symbol}: {e}")
+    report_data = av_manager.summary_table.report_records(symbols)
     
     return jsonify({
         'generated_at': datetime.now().isoformat(),
@@ -300,7 +268,7 @@ def api_generate_report():
             'bullish_count': sum(1 for s in report_data if s['is_bullish']),
             'bearish_count': sum(1 for s in report_data if s['is_bearish']),
             'api_requests_used': av_manager.request_count,
-            'api_requests_remaining': 500 - av_manager.request_count
+            'api_requests_remaining': av_manager.requests_remaining()
         }
     })
 
@@ -419,9 +387,10 @@ def api_status():
         'data_source': 'Alpha Vantage',
         'api_key_configured': av_manager.api_key is not None,
         'requests_made': av_manager.request_count,
-        'requests_remaining': 500 - av_manager.request_count,
+        'requests_remaining': av_manager.requests_remaining(),
         'cached_stocks': list(av_manager.stocks.keys()),
-        'rate_limit_delay': av_manager.rate_limit_delay
+        'rate_limit_delay': av_manager.rate_limit_delay,
+        'scheduler': av_manager.scheduler.status()
     })
 
 @app.errorhandler(404)
@@ -441,6 +410,7 @@ if __name__ == '__main__':
     else:
         print(f"✅ Alpha Vantage API key configured: {av_manager.api_key[:8]}...")
         print(f"📊 Rate limit: {av_manager.rate_limit_delay} seconds between requests")
-        print(f"📋 Daily limit: 500 requests")
+        print(f"📋 Daily limit: {av_manager.ledger.daily_limit} requests "
+              f"({av_manager.requests_remaining()} left today)")
     
     app.run(debug=True, host='0.0.0.0', port=5002)
@@ -3,7 +3,7 @@
 Combined Flask Dashboard for Stock and Forex Data Visualization
 """
 
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, render_template, jsonify, request, send_file, Response, stream_with_context
 import pandas as pd
 import plotly.graph_objs as go
 import plotly.utils
@@ -12,6 +12,9 @@ from datetime import datetime, timedelta
 import os
 import io
 import base64
+import zlib
+import threading
+import time
 import matplotlib.pyplot as plt
 import matplotlib
 import numpy as np
@@ -22,85 +25,217 @@ matplotlib.use('Agg')  # Use non-interactive backend
 # https://www.alphavantage.co/documentation/
 # For real-time forex data, exchange rates, and FX intraday data
 from forex.forex_client import ForexClient
+from forex.forex_cache import ForexCache
+from forex.rates_engine import RatesEngine
+from forex.market_state import MarketState
+from forex.currency_strength import CurrencyStrength
 from forex.currency_pairs import (
     get_all_pairs, get_pairs_by_category, get_pair_info,
-    get_most_active_pairs, MAJOR_PAIRS, MINOR_PAIRS, EXOTIC_PAIRS
+    get_most_active_pairs, get_active_sessions, MAJOR_PAIRS, MINOR_PAIRS, EXOTIC_PAIRS,
+    TRADING_SESSIONS
 )
+from correlation_service import MAX_WINDOW, RollingCorrelation
+from synthetic_data import generate_forex_ohlcv
+from ttl_cache import TTLCache
+from streaming import QuoteStream, sse_events
+from chart_cache import data_version
+from http_cache import conditional, enable_compression
+import serialization
 
 app = Flask(__name__)
+enable_compression(app)
+serialization.install(app)
 
 # Initialize forex client (demo mode)
 forex_client = None
 api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
 if api_key:
-    forex_client = ForexClient(api_key)
+    forex_client = ForexClient(api_key, cache=ForexCache())
 
 # Global cache for data
 stock_cache = {}
-forex_cache = {}
+# Mock forex frames, bounded and regenerated every few minutes
+forex_cache = TTLCache(maxsize=64, default_ttl=300)
+
+# Rolling correlation services keyed by (pairs, window), updated with each new bar
+forex_correlation_cache = TTLCache(maxsize=32, default_ttl=3600)
+
+def compute_forex_indicators(close):
+    """
+    SMA/EMA/MACD/RSI/Bollinger columns for a close series, computed on arrays
+
+    Args:
+        close: Close prices (1-D array-like)
+
+    Returns:
+        Dictionary of indicator arrays aligned with close (NaN during warm-up)
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+
+    def rolling(values, window):
+        # (n - window + 1, window) view; rows are the trailing windows
+        if n < window:
+            return None
+        return np.lib.stride_tricks.sliding_window_view(values, window)
+
+    def pad(values, window):
+        out = np.full(n, np.nan)
+        if values is not None:
+            out[window - 1:] = values
+        return out
+
+    def ema(values, span):
+        # Same weights as pandas' ewm(span=span, adjust=True)
+        return pd.Series(values).ewm(span=span).mean().to_numpy()
+
+    windows_20 = rolling(close, 20)
+    windows_50 = rolling(close, 50)
+    sma_20 = pad(None if windows_20 is None else windows_20.mean(axis=1), 20)
+    std_20 = pad(None if windows_20 is None else windows_20.std(axis=1, ddof=1), 20)
+    sma_50 = pad(None if windows_50 is None else windows_50.mean(axis=1), 50)
+
+    ema_12 = ema(close, 12)
+    ema_26 = ema(close, 26)
+    macd = ema_12 - ema_26
+    signal = ema(macd, 9)
+
+    # RSI on simple 14-bar averages of gains and losses
+    delta = np.diff(close, prepend=np.nan)
+    with np.errstate(invalid='ignore'):
+        gains = rolling(np.where(delta > 0, delta, 0.0), 14)
+        losses = rolling(np.where(delta < 0, -delta, 0.0), 14)
+    rsi = np.full(n, np.nan)
+    if gains is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = gains.mean(axis=1) / losses.mean(axis=1)
+        rsi[13:] = 100 - 100 / (1 + rs)
+
+    daily_return = np.full(n, np.nan)
+    daily_return[1:] = close[1:] / close[:-1] - 1
+
+    return {
+        'Daily Return': daily_return,
+        'SMA_20': sma_20,
+        'SMA_50': sma_50,
+        'EMA_12': ema_12,
+        'EMA_26': ema_26,
+        'MACD': macd,
+        'Signal': signal,
+        'Histogram': macd - signal,
+        'RSI': rsi,
+        'BB_Middle': sma_20,
+        'BB_Std': std_20,
+        'BB_Upper': sma_20 + 2 * std_20,
+        'BB_Lower': sma_20 - 2 * std_20,
+    }
+
+# Indicator settings behind compute_forex_indicators; part of the pair ETag
+FOREX_INDICATOR_CONFIG = ('sma', 20, 50, 'ema', 12, 26, 9, 'rsi', 14, 'bb', 20, 2)
 
 def get_mock_forex_data(pair='EUR/USD', days=30):
     """Generate mock forex data for demonstration"""
-    if pair in forex_cache:
-        return forex_cache[pair]
-    
-    # Generate realistic forex data
-    dates = pd.date_range(
-        start=datetime.now() - timedelta(days=days),
-        end=datetime.now(),
-        freq='1h'
-    )
-    
-    base_price = 1.0850 if 'EUR/USD' in pair else 1.2650
-    n_periods = len(dates)
-    
-    # Random walk with drift
-    returns = np.random.normal(0.0001, 0.001, n_periods)
-    prices = base_price * np.exp(np.cumsum(returns))
-    
-    # Generate OHLC data
-    data = []
-    for i, price in enumerate(prices):
-        high = price * (1 + np.random.uniform(0, 0.002))
-        low = price * (1 - np.random.uniform(0, 0.002))
-        open_price = prices[i-1] if i > 0 else price
-        close_price = price
-        
-        data.append({
-            'Open': open_price,
-            'High': high,
-            'Low': low,
-            'Close': close_price,
-            'Volume': np.random.randint(1000, 10000)
-        })
-    
-    df = pd.DataFrame(data, index=dates)
-    
-    # Add technical indicators
-    df['Daily Return'] = df['Close'].pct_change()
-    df['SMA_20'] = df['Close'].rolling(window=20).mean()
-    df['SMA_50'] = df['Close'].rolling(window=50).mean()
-    df['EMA_12'] = df['Close'].ewm(span=12).mean()
-    df['EMA_26'] = df['Close'].ewm(span=26).mean()
-    df['MACD'] = df['EMA_12'] - df['EMA_26']
-    df['Signal'] = df['MACD'].ewm(span=9).mean()
-    df['Histogram'] = df['MACD'] - df['Signal']
-    
-    # RSI
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-    
-    # Bollinger Bands
-    df['BB_Middle'] = df['Close'].rolling(window=20).mean()
-    df['BB_Std'] = df['Close'].rolling(window=20).std()
-    df['BB_Upper'] = df['BB_Middle'] + (df['BB_Std'] * 2)
-    df['BB_Lower'] = df['BB_Middle'] - (df['BB_Std'] * 2)
-    
-    forex_cache[pair] = df
-    return df
+    def generate():
+        # Seeded per pair, so a pair keeps its shape across cache refreshes;
+        # bars end on the hour so every pair shares one index
+        df = generate_forex_ohlcv(pair, days=days, end=pd.Timestamp.now().floor('h'),
+                                  seed=zlib.crc32(pair.encode()))
+        indicators = compute_forex_indicators(df['Close'].to_numpy())
+        return pd.concat([df, pd.DataFrame(indicators, index=df.index)], axis=1)
+
+    return forex_cache.get_or_compute((pair, days), generate)
+
+def get_mock_exchange_rates(pairs):
+    """Mock stand-in for ForexClient.get_multiple_rates"""
+    rates = {}
+    for from_currency, to_currency in pairs:
+        pair = f"{from_currency}/{to_currency}"
+        df = get_mock_forex_data(pair)
+        close = float(df['Close'].iloc[-1])
+        info = get_pair_info(pair) or {}
+        half_spread = info.get('pip_value', 0.0001) * info.get('typical_spread', 2.0) / 2
+        rates[pair] = {
+            'pair': pair,
+            'rate': close,
+            'bid': close - half_spread,
+            'ask': close + half_spread,
+            'timestamp': df.index[-1].strftime('%Y-%m-%d %H:%M:%S')
+        }
+    return rates
+
+# Cross rates are triangulated from one USD leg per currency
+rates_engine = RatesEngine(
+    get_all_pairs(),
+    fetch=forex_client.get_multiple_rates if forex_client else get_mock_exchange_rates,
+    max_age=300
+)
+
+# Per-currency strength solved from the returns of every configured pair
+strength_engine = CurrencyStrength(list(get_all_pairs()))
+
+# Latest rate and return per pair; the overview reads this instead of the pairs
+market_state = MarketState(get_all_pairs())
+
+# rates_engine.version last copied into market_state
+market_state_rates_version = None
+# One refresh at a time, so concurrent callers never duplicate leg fetches
+market_refresh_lock = threading.Lock()
+# Live legs are refreshed off the request path by this thread
+market_refresher = None
+market_refresher_lock = threading.Lock()
+MARKET_REFRESH_INTERVAL = 60
+
+def refresh_market_state():
+    """Fetch due legs and feed new rates into market_state"""
+    global market_state_rates_version
+    with market_refresh_lock:
+        rates_engine.refresh()
+        if forex_client:
+            # Compare versions rather than trusting this refresh's count: legs
+            # may have been recorded outside refresh() since the last sync.
+            # Read both under the engine lock so the version matches the quotes
+            with rates_engine.lock:
+                version = rates_engine.version
+                quotes = rates_engine.quotes() if version != market_state_rates_version else None
+            if quotes is not None:
+                market_state.update_many(quotes)
+                market_state_rates_version = version
+        elif market_state.age() >= forex_cache.default_ttl:
+            for pair in market_state.pairs:
+                df = get_mock_forex_data(pair)
+                latest = df.iloc[-1]
+                market_state.update(pair, float(latest['Close']), float(latest['Daily Return']))
+
+def run_market_refresher():
+    while True:
+        try:
+            refresh_market_state()
+        except Exception as e:
+            print(f"❌ Forex rates refresh failed: {e}")
+        time.sleep(MARKET_REFRESH_INTERVAL)
+
+def current_market_state():
+    """market_state for request handlers; live rates never block the request"""
+    global market_refresher
+    if not forex_client:
+        # Mock rates are generated locally, so refreshing inline is cheap
+        refresh_market_state()
+    elif market_refresher is None or not market_refresher.is_alive():
+        with market_refresher_lock:
+            if market_refresher is None or not market_refresher.is_alive():
+                market_refresher = threading.Thread(target=run_market_refresher,
+                                                    name='forex-market-refresh', daemon=True)
+                market_refresher.start()
+    return market_state
+
+def fetch_forex_quotes(pairs):
+    """Quotes for forex_stream, read from the current market_state"""
+    current_market_state()
+    return {pair: {'price': info['rate']} for pair, info in market_state.get_rates(pairs).items()}
+
+# Pushes hourly bars and indicators to /api/forex/stream connections
+forex_stream = QuoteStream(fetch_forex_quotes, poll_interval=30, bar_seconds=3600)
+seeded_pairs = set()
 
 def create_forex_candlestick_chart(pair):
     """Create a candlestick chart for forex pair"""
@@ -210,6 +345,17 @@ def create_forex_technical_chart(pair):
     
     return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
 
+# Summary field -> (frame column, decimals)
+FOREX_SUMMARY_FIELDS = {
+    'current_price': ('Close', 4),
+    'high': ('High', 4),
+    'low': ('Low', 4),
+    'rsi': ('RSI', 1),
+    'macd': ('MACD', 4),
+    'sma_20': ('SMA_20', 4),
+    'sma_50': ('SMA_50', 4),
+}
+
 def get_forex_summary(pair):
     """Get forex pair summary"""
     df = get_mock_forex_data(pair)
@@ -219,21 +365,16 @@ def get_forex_summary(pair):
     daily_returns = df['Daily Return'].dropna()
     volatility = daily_returns.std() * np.sqrt(252)  # Annualized
     
-    return {
-        'pair': pair,
-        'current_price': round(float(latest['Close']), 4),
+    summary = {'pair': pair}
+    summary.update(serialization.round_fields(latest, FOREX_SUMMARY_FIELDS))
+    summary.update({
         'volume': int(latest['Volume']),
-        'high': round(float(latest['High']), 4),
-        'low': round(float(latest['Low']), 4),
-        'rsi': round(float(latest['RSI']), 1),
-        'macd': round(float(latest['MACD']), 4),
-        'sma_20': round(float(latest['SMA_20']), 4),
-        'sma_50': round(float(latest['SMA_50']), 4),
         'volatility': round(float(volatility), 4),
         'daily_return': round(float(daily_returns.iloc[-1]), 4),
         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'data_points': len(df)
-    }
+    })
+    return summary
 
 # Routes
 @app.route('/')
@@ -317,7 +458,15 @@ def api_forex_pairs():
         'exotic': list(EXOTIC_PAIRS.keys())
     })
 
+def forex_pair_version(base, quote):
+    """Data version of a pair summary; None for unknown pairs"""
+    pair = f"{base}/{quote}"
+    if pair not in get_all_pairs():
+        return None
+    return (FOREX_INDICATOR_CONFIG, data_version(get_mock_forex_data(pair)))
+
 @app.route('/api/forex/pair/<base>/<quote>')
+@conditional(forex_pair_version)
 def api_forex_pair(base, quote):
     """API endpoint for forex pair data"""
     pair = f"{base}/{quote}"
@@ -328,44 +477,107 @@ def api_forex_pair(base, quote):
     summary = get_forex_summary(pair)
     return jsonify(summary)
 
+@app.route('/api/forex/correlation')
+def api_forex_correlation():
+    """API endpoint for rolling correlation between forex pairs"""
+    window = min(request.args.get('window', 100, type=int), MAX_WINDOW)
+    top_k = request.args.get('top', 5, type=int)
+    pairs = request.args.get('pairs')
+    if pairs:
+        pairs = list(dict.fromkeys(p.strip().upper() for p in pairs.split(',') if p.strip()))
+        unknown = [p for p in pairs if p not in get_all_pairs()]
+        if unknown:
+            return jsonify({'error': f'Unknown forex pairs: {", ".join(unknown)}'}), 404
+    if window < 2:
+        return jsonify({'error': 'window must be at least 2'}), 400
+
+    pairs = pairs or list(get_all_pairs())
+    service = forex_correlation_cache.get_or_compute(
+        (tuple(pairs), window), lambda: RollingCorrelation(pairs, window=window))
+    # Only bars newer than the last update are applied
+    service.sync_frames({pair: get_mock_forex_data(pair) for pair in pairs})
+    return jsonify(service.to_dict(top_k=top_k))
+
 @app.route('/api/forex/rates')
 def api_forex_rates():
     """API endpoint for current forex rates"""
     pairs = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF', 'AUD/USD']
-    rates = {}
+    rates = current_market_state().get_rates(pairs)
     
-    for pair in pairs:
-        summary = get_forex_summary(pair)
-        rates[pair] = {
-            'rate': summary['current_price'],
-            'change': summary['daily_return']
-        }
+    return jsonify({pair: {'rate': round(info['rate'], 4), 'change': round(info['change'], 4)}
+                    for pair, info in rates.items()})
+
+@app.route('/api/forex/matrix')
+def api_forex_matrix():
+    """API endpoint for the triangulated cross-rate matrix"""
+    current_market_state()
+    # The refresher may record legs meanwhile; read the matrix and quotes together
+    with rates_engine.lock:
+        matrix = rates_engine.to_dict()
+        matrix['pairs'] = rates_engine.quotes()
+    return jsonify(matrix)
+
+@app.route('/api/forex/strength')
+def api_forex_strength():
+    """API endpoint for the currency strength heatmap"""
+    bars = request.args.get('bars', 48, type=int)
+    if bars < 1:
+        return jsonify({'error': 'bars must be at least 1'}), 400
+    
+    prices = pd.DataFrame({pair: get_mock_forex_data(pair)['Close'] for pair in strength_engine.pairs})
+    # Cumulative strength (in %) since the start of the window
+    strength = strength_engine.from_prices(prices.tail(bars + 1)).fillna(0.0).cumsum() * 100
+    latest = strength.iloc[-1].sort_values(ascending=False)
     
-    return jsonify(rates)
+    return jsonify({
+        'currencies': strength_engine.currencies,
+        'timestamps': [ts.strftime('%Y-%m-%d %H:%M') for ts in strength.index],
+        'strength': strength.round(4).to_numpy().tolist(),
+        'ranking': [{'currency': c, 'strength': round(float(v), 4)} for c, v in latest.items()]
+    })
+
+@app.route('/api/forex/stream')
+def api_forex_stream():
+    """Server-Sent Events push of rate, bar and indicator changes for one or more pairs"""
+    pairs = [p.strip().upper() for p in request.args.get('pairs', 'EUR/USD').split(',') if p.strip()]
+    unknown = [p for p in pairs if p not in market_state.index]
+    if unknown:
+        return jsonify({'error': f"Unknown pairs: {', '.join(unknown)}"}), 404
+    for pair in pairs:
+        if pair not in seeded_pairs:
+            forex_stream.seed(pair, get_mock_forex_data(pair))
+            seeded_pairs.add(pair)
+    subscription = forex_stream.subscribe(pairs)
+    forex_stream.start()
+    return Response(stream_with_context(sse_events(subscription)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/forex/sessions')
 def api_forex_sessions():
     """API endpoint for forex trading sessions"""
+    active = get_active_sessions()
     return jsonify({
-        'sydney': {'open': '22:00', 'close': '07:00', 'active': False},
-        'tokyo': {'open': '00:00', 'close': '09:00', 'active': False},
-        'london': {'open': '08:00', 'close': '17:00', 'active': True},
-        'new_york': {'open': '13:00', 'close': '22:00', 'active': True}
+        name.lower().replace(' ', '_'): {
+            'open': session['start'],
+            'close': session['end'],
+            'active': name in active
+        }
+        for name, session in TRADING_SESSIONS.items()
     })
 
 @app.route('/api/forex/overview')
 def api_forex_overview():
     """API endpoint for forex market overview"""
+    state = current_market_state().overview()
+    last_updated = datetime.fromtimestamp(state['last_updated']) if state['last_updated'] else datetime.now()
+    
     return jsonify({
-        'total_pairs': 28,
-        'active_sessions': 2,
-        'top_movers': [
-            {'pair': 'EUR/USD', 'change': 0.0012},
-            {'pair': 'GBP/USD', 'change': -0.0008},
-            {'pair': 'USD/JPY', 'change': 0.0015}
-        ],
-        'market_sentiment': 'bullish',
-        'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        'total_pairs': state['total_pairs'],
+        'active_sessions': len(get_active_sessions()),
+        'top_movers': [{'pair': m['pair'], 'change': round(m['change'], 6)} for m in state['top_movers']],
+        'market_sentiment': state['market_sentiment'],
+        'api_calls': rates_engine.api_calls,
+        'last_updated': last_updated.strftime('%Y-%m-%d %H:%M:%S')
     })
 
 @app.route('/api/status')
@@ -0,0 +1,462 @@
+"""
+Async HTTP Clients
+
+asyncio-native versions of YahooFinanceClient and ForexClient built on
+aiohttp. Each client keeps one pooled ClientSession, caps in-flight requests
+with a semaphore, spaces requests by reserving time slots instead of sleeping
+after every response, and backs off with asyncio.sleep so other requests keep
+running. Multi-symbol quotes and multi-pair rates are fetched concurrently.
+
+Synchronous code can use the same clients through BlockingClient, which runs
+the coroutines on a shared background event loop:
+
+    forex = BlockingClient(AsyncForexClient(api_key))
+    rates = forex.get_multiple_rates([('EUR', 'USD'), ('GBP', 'USD')])
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from forex.forex_client import check_api_errors, parse_exchange_rate, parse_time_series
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+# Statuses worth retrying after a backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Longest Retry-After honoured before retrying
+MAX_RETRY_AFTER = 60.0
+
+
+class _BackgroundLoop:
+    """Event loop running forever in a daemon thread."""
+
+    _lock = threading.Lock()
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def get(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            if cls._loop is None or cls._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-clients', daemon=True)
+                thread.start()
+                cls._loop = loop
+            return cls._loop
+
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    The coroutine runs on a shared background loop, so it works both from
+    plain scripts and from threads that already have a running loop
+    (Flask dev server, Jupyter). Sessions created there stay open between
+    calls and keep their connection pools.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait for the result (None waits forever)
+
+    Returns:
+        The coroutine's result
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _BackgroundLoop.get())
+    return future.result(timeout)
+
+
+class RequestSpacer:
+    """
+    Enforce a minimum interval between request starts.
+
+    Each caller reserves the next free slot and sleeps only until its own
+    slot, so concurrent callers queue up without a lock and a request that
+    arrives after a quiet period goes out immediately.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+
+    def reserve(self) -> float:
+        """Claim the next slot and return the seconds to wait for it."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.min_interval
+        return slot - now
+
+    async def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AsyncHTTPClient:
+    """
+    Shared plumbing: pooled session, concurrency cap, spacing and retries.
+
+    Args:
+        max_concurrency: Maximum requests in flight (also the pool size)
+        min_interval: Minimum seconds between request starts
+        max_retries: Attempts per request for timeouts, 429 and 5xx
+        base_delay: Base of the exponential backoff in seconds
+        timeout: Total seconds allowed per request
+        headers: Default headers for the session
+    """
+
+    def __init__(self, max_concurrency: int = 8, min_interval: float = 0.0, max_retries: int = 3,
+                 base_delay: float = 1.0, timeout: float = 10.0, headers: Optional[Dict] = None):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.spacer = RequestSpacer(min_interval)
+        self.request_count = 0
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+        return self.base_delay * (2 ** attempt) + random.uniform(0, self.base_delay)
+
+    async def _get(self, url: str, params: Optional[Dict] = None, as_json: bool = True):
+        """
+        GET a URL with spacing, the concurrency cap and non-blocking retries.
+
+        Returns:
+            (status, body) where body is decoded JSON or text; status is None
+            when every attempt failed at the transport level
+        """
+        import aiohttp
+        session = await self._get_session()
+        status, body = None, None
+
+        for attempt in range(self.max_retries):
+            if attempt > 0:
+                delay = self._backoff(attempt - 1, retry_after)
+                logger.info(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    # Reserve the slot only once a connection is free, so
+                    # queued requests don't burn their spacing while waiting
+                    await self.spacer.wait()
+                    async with session.get(url, params=params) as response:
+                        self.request_count += 1
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+                        if status in RETRY_STATUSES:
+                            logger.warning(f"HTTP {status} from {url}")
+                            continue
+                        if as_json and status < 400:
+                            body = await response.json(content_type=None)
+                        else:
+                            body = await response.text()
+                        return status, body
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Request failed (attempt {attempt + 1}): {e}")
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.error(f"Invalid JSON response (attempt {attempt + 1}): {e}")
+
+        logger.error(f"Max retries exceeded for {url}")
+        return status, body
+
+    async def close(self):
+        """Close the pooled session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _yahoo_error(data) -> Optional[Dict]:
+    """The 'finance.error' object of a Yahoo response, if any."""
+    if isinstance(data, dict) and isinstance(data.get('finance'), dict):
+        return data['finance'].get('error') or None
+    return None
+
+
+class AsyncYahooFinanceClient(AsyncHTTPClient):
+    """
+    Async counterpart of yahoo_finance_client.YahooFinanceClient.
+
+    Concurrent requests share a single crumb refresh.
+    """
+
+    HOME_URL = 'https://finance.yahoo.com/'
+    CRUMB_PAGE_URL = 'https://finance.yahoo.com/quote/AAPL/history'
+    QUOTE_URL = 'https://query1.finance.yahoo.com/v7/finance/quote'
+    SUMMARY_URL = 'https://query2.finance.yahoo.com/v10/finance/quoteSummary/'
+    HISTORY_URL = 'https://query1.finance.yahoo.com/v7/finance/download/'
+
+    def __init__(self, max_concurrency: int = 8, min_interval: float = 0.2, **kwargs):
+        kwargs.setdefault('headers', {'User-Agent': USER_AGENT})
+        super().__init__(max_concurrency=max_concurrency, min_interval=min_interval, **kwargs)
+        self.crumb = None
+        self.last_crumb_time = None
+        self.crumb_expires_hours = 6
+        self._crumb_lock: Optional[asyncio.Lock] = None
+
+    def _needs_new_crumb(self) -> bool:
+        if not self.crumb or not self.last_crumb_time:
+            return True
+        return time.monotonic() - self.last_crumb_time > self.crumb_expires_hours * 3600
+
+    async def _fetch_crumb(self, force: bool = False) -> bool:
+        """Fetch a fresh crumb and session cookies (once for all waiters)."""
+        if self._crumb_lock is None:
+            self._crumb_lock = asyncio.Lock()
+        stale = self.crumb
+        async with self._crumb_lock:
+            # Another task refreshed it while we waited
+            if (self.crumb and self.crumb != stale) or (not force and not self._needs_new_crumb()):
+                return True
+
+            logger.info("Fetching new crumb from Yahoo Finance...")
+            status, _ = await self._get(self.HOME_URL, as_json=False)
+            if status is None or status >= 400:
+                logger.error(f"Error fetching Yahoo Finance home page: {status}")
+                return False
+            status, page = await self._get(self.CRUMB_PAGE_URL, as_json=False)
+            if status is None or status >= 400:
+                logger.error(f"Error fetching crumb page: {status}")
+                return False
+
+            crumb_match = re.search(r'"CrumbStore":\{"crumb":"([^"]+)"\}', page or '')
+            if not crumb_match:
+                logger.error("Could not find crumb in response")
+                return False
+
+            self.crumb = crumb_match.group(1)
+            self.last_crumb_time = time.monotonic()
+            return True
+
+    async def _make_request(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Authenticated JSON request; refreshes the crumb once on 401."""
+        if self._needs_new_crumb() and not await self._fetch_crumb():
+            logger.error(f"Failed to fetch crumb for {url}")
+            return None
+
+        for refreshed in (False, True):
+            query = dict(params or {}, crumb=self.crumb)
+            status, data = await self._get(url, query)
+            error = _yahoo_error(data)
+            unauthorized = status == 401 or (error or {}).get('code') == 'Unauthorized'
+            if unauthorized and not refreshed:
+                logger.warning("Unauthorized - fetching new crumb...")
+                if await self._fetch_crumb(force=True):
+                    continue
+                return None
+            break
+
+        if status is None or status >= 400 or not isinstance(data, dict):
+            logger.error(f"Yahoo Finance request failed: HTTP {status}")
+            return None
+        error = _yahoo_error(data)
+        if error:
+            logger.error(f"Yahoo Finance API error: {error.get('code', 'Unknown')} - "
+                         f"{error.get('description', 'Unknown error')}")
+            return None
+        return data
+
+    async def get_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get current quote data for a symbol."""
+        return await self._make_request(self.QUOTE_URL, {'symbols': symbol, 'formatted': 'false'})
+
+    async def get_quotes(self, symbols: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get quotes for several symbols concurrently, keyed by symbol."""
+        results = await asyncio.gather(*(self.get_quote(s) for s in symbols))
+        return dict(zip(symbols, results))
+
+    async def get_quote_summary(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get comprehensive quote summary data for a symbol."""
+        params = {
+            'modules': 'financialData,quoteType,defaultKeyStatistics,assetProfile,summaryDetail',
+            'corsDomain': 'finance.yahoo.com',
+            'formatted': 'false'
+        }
+        return await self._make_request(self.SUMMARY_URL + symbol, params)
+
+    async def get_quote_summaries(self, symbols: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get quote summaries for several symbols concurrently."""
+        results = await asyncio.gather(*(self.get_quote_summary(s) for s in symbols))
+        return dict(zip(symbols, results))
+
+    async def get_historical_data(self, symbol: str, period1: int, period2: int,
+                                  interval: str = '1d') -> Optional[Dict[str, Any]]:
+        """Get historical data for a symbol."""
+        params = {
+            'period1': period1,
+            'period2': period2,
+            'interval': interval,
+            'events': 'history',
+            'includeAdjustedClose': 'true'
+        }
+        return await self._make_request(self.HISTORY_URL + symbol, params)
+
+
+class AsyncForexClient(AsyncHTTPClient):
+    """
+    Async counterpart of forex.forex_client.ForexClient.
+
+    Requests start at least rate_limit_delay seconds apart (Alpha Vantage's
+    free tier allows 5 calls a minute), but their network waits overlap.
+    Premium keys can lower rate_limit_delay.
+    """
+
+    def __init__(self, api_key: str, base_url: str = "https://www.alphavantage.co/query",
+                 rate_limit_delay: float = 12.0, max_concurrency: int = 4, **kwargs):
+        kwargs.setdefault('timeout', 30.0)
+        super().__init__(max_concurrency=max_concurrency, min_interval=rate_limit_delay, **kwargs)
+        self.api_key = api_key
+        self.base_url = base_url
+
+    @property
+    def rate_limit_delay(self) -> float:
+        return self.spacer.min_interval
+
+    @rate_limit_delay.setter
+    def rate_limit_delay(self, value: float):
+        self.spacer.min_interval = value
+
+    async def _make_request(self, params: Dict) -> Optional[Dict]:
+        status, data = await self._get(self.base_url, dict(params, apikey=self.api_key))
+        if status is None or status >= 400 or not isinstance(data, dict):
+            logger.error(f"Request failed: HTTP {status}")
+            return None
+        return check_api_errors(data)
+
+    async def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[Dict]:
+        """Get real-time exchange rate between two currencies."""
+        data = await self._make_request({
+            'function': 'CURRENCY_EXCHANGE_RATE',
+            'from_currency': from_currency,
+            'to_currency': to_currency
+        })
+        if not data:
+            return None
+        return parse_exchange_rate(data, from_currency, to_currency)
+
+    async def get_multiple_rates(self, pairs: List[Tuple[str, str]]) -> Dict[str, Dict]:
+        """
+        Get exchange rates for multiple currency pairs concurrently
+
+        Args:
+            pairs: List of (from_currency, to_currency) tuples
+
+        Returns:
+            Dictionary with pair names as keys and rate data as values
+        """
+        results = await asyncio.gather(*(self.get_exchange_rate(f, t) for f, t in pairs))
+        rates = {}
+        for (from_currency, to_currency), rate_data in zip(pairs, results):
+            pair_name = f"{from_currency}/{to_currency}"
+            if rate_data:
+                rates[pair_name] = rate_data
+            else:
+                logger.warning(f"Failed to get rate for {pair_name}")
+        return rates
+
+    async def _get_series(self, params: Dict, key: str, label: str,
+                          from_currency: str, to_currency: str) -> Optional[pd.DataFrame]:
+        data = await self._make_request(params)
+        if not data:
+            return None
+        df = parse_time_series(data, key)
+        if df is None:
+            logger.error(f"No {label} data found for {from_currency}/{to_currency}")
+        return df
+
+    async def get_intraday_data(self, from_currency: str, to_currency: str,
+                                interval: str = '5min', outputsize: str = 'compact') -> Optional[pd.DataFrame]:
+        """Get intraday forex data."""
+        params = {'function': 'FX_INTRADAY', 'from_symbol': from_currency, 'to_symbol': to_currency,
+                  'interval': interval, 'outputsize': outputsize}
+        return await self._get_series(params, 'Time Series FX', 'time series', from_currency, to_currency)
+
+    async def get_daily_data(self, from_currency: str, to_currency: str,
+                             outputsize: str = 'compact') -> Optional[pd.DataFrame]:
+        """Get daily forex data."""
+        params = {'function': 'FX_DAILY', 'from_symbol': from_currency, 'to_symbol': to_currency,
+                  'outputsize': outputsize}
+        return await self._get_series(params, 'Time Series FX (Daily)', 'daily', from_currency, to_currency)
+
+    async def get_weekly_data(self, from_currency: str, to_currency: str) -> Optional[pd.DataFrame]:
+        """Get weekly forex data."""
+        params = {'function': 'FX_WEEKLY', 'from_symbol': from_currency, 'to_symbol': to_currency}
+        return await self._get_series(params, 'Time Series FX (Weekly)', 'weekly', from_currency, to_currency)
+
+    async def get_monthly_data(self, from_currency: str, to_currency: str) -> Optional[pd.DataFrame]:
+        """Get monthly forex data."""
+        params = {'function': 'FX_MONTHLY', 'from_symbol': from_currency, 'to_symbol': to_currency}
+        return await self._get_series(params, 'Time Series FX (Monthly)', 'monthly', from_currency, to_currency)
+
+    def get_api_status(self) -> Dict:
+        """Get API status and usage information."""
+        return {
+            'request_count': self.request_count,
+            'rate_limit_delay': self.rate_limit_delay,
+            'max_concurrency': self.max_concurrency,
+            'api_key_set': bool(self.api_key)
+        }
+
+
+class BlockingClient:
+    """
+    Synchronous facade over an async client.
+
+    Coroutine methods become blocking calls that run on the shared background
+    loop; everything else is passed through unchanged.
+
+    Args:
+        client: AsyncYahooFinanceClient, AsyncForexClient or similar
+        timeout: Seconds to wait for each call (None waits forever)
+    """
+
+    def __init__(self, client: AsyncHTTPClient, timeout: Optional[float] = None):
+        self._client = client
+        self._timeout = timeout
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return run_sync(attr(*args, **kwargs), self._timeout)
+
+        call.__name__ = name
+        call.__doc__ = attr.__doc__
+        return call
@@ -0,0 +1,241 @@
+"""
+Batch Query
+
+Multi-symbol history and indicator queries for notebooks and BI tools.
+
+One request names the symbols, a date range, the columns and a timeframe.
+Histories are loaded in parallel through the app's cache, trimmed and
+(for coarser timeframes) resampled, and streamed back as they complete in
+a columnar layout: one array per column instead of one object per row.
+Programmatic clients can ask for an Arrow IPC stream instead of JSON when
+pyarrow is installed.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from resampling import EQUITY_SESSION, SessionCalendar, normalize_timeframe
+from serialization import dumps
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+OHLC_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+DEFAULT_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+MAX_SYMBOLS = 50
+FORMATS = ('json', 'arrow')
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+def parse_batch_args(args, max_symbols: int = MAX_SYMBOLS) -> Dict:
+    """
+    Validate batch query parameters.
+
+    Args:
+        args: Mapping with symbols, start, end, columns, timeframe and format
+              (e.g. request.args)
+
+    Returns:
+        Dict with symbols, start, end (UTC Timestamps or None), columns,
+        timeframe and format
+
+    Raises:
+        ValueError: For anything a client needs to fix
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in args.get('symbols', '').split(',') if s.strip()))
+    if not symbols:
+        raise ValueError('At least 1 symbol required')
+    if len(symbols) > max_symbols:
+        raise ValueError(f'At most {max_symbols} symbols per request')
+
+    bounds = []
+    for name in ('start', 'end'):
+        value = args.get(name)
+        try:
+            bounds.append(_utc(pd.Timestamp(value)) if value else None)
+        except ValueError:
+            raise ValueError(f"Invalid {name} date '{value}'")
+    # A bare end date includes that whole day
+    if bounds[1] is not None and bounds[1] == bounds[1].normalize():
+        bounds[1] += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    if bounds[0] is not None and bounds[1] is not None and bounds[0] > bounds[1]:
+        raise ValueError('start must not be after end')
+
+    columns = list(dict.fromkeys(c.strip() for c in args.get('columns', '').split(',') if c.strip())) \
+        or list(DEFAULT_COLUMNS)
+    timeframe = normalize_timeframe(args.get('timeframe', '1d'))
+    if timeframe not in ('1d', '1w'):
+        raise ValueError(f"Timeframe '{timeframe}' is finer than the daily history")
+    fmt = args.get('format', 'json')
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (use one of {', '.join(FORMATS)})")
+    if fmt == 'arrow' and pa is None:
+        raise ValueError('Arrow output needs pyarrow installed on the server; use format=json')
+    return {'symbols': symbols, 'start': bounds[0], 'end': bounds[1], 'columns': columns,
+            'timeframe': timeframe, 'format': fmt}
+
+
+def _utc(ts: pd.Timestamp) -> pd.Timestamp:
+    return ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+
+
+def _utc_index(index) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+
+
+def select_history(history: pd.DataFrame, columns: List[str], start: Optional[pd.Timestamp] = None,
+                   end: Optional[pd.Timestamp] = None, timeframe: str = '1d',
+                   session: SessionCalendar = EQUITY_SESSION) -> pd.DataFrame:
+    """
+    Trim a daily history to a date range and columns, resampling if asked.
+
+    Weekly OHLCV follows resample_ohlc; any other column (an indicator)
+    takes its value at the last session of the week. Unknown columns come
+    back as NaN so every symbol has the same layout.
+    """
+    index = _utc_index(history.index)
+    mask = np.ones(len(index), dtype=bool)
+    if start is not None:
+        mask &= index >= start
+    if end is not None:
+        mask &= index <= end
+    frame = history.loc[mask].copy()
+    frame.index = index[mask]
+
+    if timeframe != '1d' and not frame.empty:
+        buckets = session.bucket_starts(frame.index, timeframe, daily=True)
+        agg = {c: OHLC_AGG.get(c, 'last') for c in columns if c in frame.columns}
+        frame = frame[list(agg)].groupby(buckets).agg(agg)
+        frame.index.name = None
+    return frame.reindex(columns=columns)
+
+
+def load_parallel(symbols: Iterable[str], load: Callable[[str], Optional[pd.DataFrame]],
+                  max_workers: int = 8) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+    """
+    Load histories concurrently, yielding (symbol, history) as each finishes.
+
+    A loader that raises yields None for that symbol.
+    """
+    symbols = list(symbols)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+        futures = {pool.submit(load, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                yield symbol, future.result()
+            except Exception as e:
+                logger.warning(f"Batch load failed for {symbol}: {e}")
+                yield symbol, None
+
+
+def _json_array(values: np.ndarray) -> str:
+    return dumps(np.ascontiguousarray(values)).decode()
+
+
+def columnar_json(frames: Iterable[Tuple[str, Optional[pd.DataFrame]]], query: Dict) -> Iterator[str]:
+    """
+    Stream a columnar JSON document, one symbol per chunk.
+
+    Layout:
+        {"timeframe": ..., "columns": [...],
+         "symbols": {"AAPL": {"index": [epoch ms...], "Close": [...], ...}, ...},
+         "missing": [...]}
+    """
+    head = {'timeframe': query['timeframe'], 'columns': query['columns'],
+            'start': query['start'].isoformat() if query['start'] is not None else None,
+            'end': query['end'].isoformat() if query['end'] is not None else None}
+    yield json.dumps(head, separators=(',', ':'))[:-1] + ',"symbols":{'
+    missing = []
+    first = True
+    for symbol, frame in frames:
+        if frame is None:
+            missing.append(symbol)
+            continue
+        parts = ['"index":' + _json_array(frame.index.as_unit('ms').asi8)]
+        parts += [f'{json.dumps(c)}:{_json_array(frame[c].to_numpy(dtype=float))}' for c in frame.columns]
+        yield ('' if first else ',') + f'{json.dumps(symbol)}:{{' + ','.join(parts) + '}'
+        first = False
+    yield '},"missing":' + json.dumps(missing) + '}'
+
+
+def arrow_ipc(frames: Iterable[Tuple[str, Optional[pd.DataFrame]]], query: Dict) -> Iterator[bytes]:
+    """
+    Stream an Arrow IPC stream: one record batch per symbol in long format
+    (symbol, timestamp, then the requested columns as float64).
+    """
+    if pa is None:
+        raise RuntimeError('pyarrow is not installed')
+    schema = pa.schema([('symbol', pa.string()), ('timestamp', pa.timestamp('ms', tz='UTC'))]
+                       + [(c, pa.float64()) for c in query['columns']])
+
+    class Chunks:
+        """File-like sink handing written bytes back to the generator."""
+        def __init__(self):
+            self.buffer = []
+            self.position = 0
+            self.closed = False
+
+        def write(self, data):
+            data = bytes(data)
+            self.buffer.append(data)
+            self.position += len(data)
+            return len(data)
+
+        def tell(self):
+            return self.position
+
+        def flush(self):
+            pass
+
+        def close(self):
+            self.closed = True
+
+        def take(self) -> bytes:
+            data, self.buffer = b''.join(self.buffer), []
+            return data
+
+    sink = Chunks()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for symbol, frame in frames:
+            if frame is None or frame.empty:
+                continue
+            arrays = [pa.array([symbol] * len(frame)),
+                      pa.array(frame.index.as_unit('ms').asi8, type=pa.timestamp('ms', tz='UTC'))]
+            arrays += [pa.array(frame[c].to_numpy(dtype=float), from_pandas=True) for c in query['columns']]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def run_batch(query: Dict, load: Callable[[str], Optional[pd.DataFrame]],
+              max_workers: int = 8) -> Iterator:
+    """
+    Load, select and serialize a parsed query.
+
+    Args:
+        query: Output of parse_batch_args
+        load: Returns a symbol's daily history (or None/empty without data)
+
+    Returns:
+        Iterator of str (json) or bytes (arrow) chunks
+    """
+    def selected():
+        for symbol, history in load_parallel(query['symbols'], load, max_workers):
+            if history is None or history.empty:
+                yield symbol, None
+            else:
+                yield symbol, select_history(history, query['columns'], query['start'], query['end'],
+                                             query['timeframe'])
+
+    return arrow_ipc(selected(), query) if query['format'] == 'arrow' else columnar_json(selected(), query)
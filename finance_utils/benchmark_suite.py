@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+
+Times the hot paths of the dashboard offline on synthetic data at several
+sizes: indicator enrichment, cache load/save, portfolio valuation, portfolio
+timelines, signal scans, Flask endpoint latency and LaTeX plot generation.
+Results are written as JSON and can be compared against a saved baseline so
+regressions fail the run.
+
+Usage:
+    python benchmark_suite.py --sizes 252,2520 --output bench.json
+    python benchmark_suite.py --baseline bench_baseline.json --threshold 0.25
+    python benchmark_suite.py --save-baseline bench_baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+import matplotlib
+matplotlib.use('Agg')  # Use non-interactive backend
+import numpy as np
+import pandas as pd
+
+import stock
+import stock_simple
+from stock_simple import StockSimple, load_cached_history
+from synthetic_data import generate_market, write_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [252, 2520]
+DEFAULT_TICKERS = 10
+DEFAULT_THRESHOLD = 0.25
+
+
+class OfflineStock(stock.Stock):
+    """Stock backed only by the local cache (no yfinance calls)."""
+
+    def __init__(self, ticker, period="1y"):
+        self.ticker = ticker.upper()
+        self.period = period
+        self._yf = None
+        self.info = {'symbol': self.ticker, 'shortName': self.ticker}
+        self.history = load_cached_history(self.ticker, period)
+        StockSimple._enrich_data(self)
+
+
+def offline_stock_simple(ticker, period="1y"):
+    """StockSimple loaded from the cache without fetching company info."""
+    obj = StockSimple.__new__(StockSimple)
+    obj.ticker = ticker.upper()
+    obj.period = period
+    obj._yf = None
+    obj.history = obj._load_cached_data()
+    obj._enrich_data()
+    obj._create_basic_info()
+    return obj
+
+
+class BenchmarkContext:
+    """Synthetic cache directory plus fixtures shared by the benchmarks of one size."""
+
+    def __init__(self, n_bars: int, n_tickers: int = DEFAULT_TICKERS, seed: int = 42):
+        self.n_bars = n_bars
+        self.tmpdir = Path(tempfile.mkdtemp(prefix='bench_'))
+        self.cache_dir = self.tmpdir / 'cache'
+
+        start = (pd.Timestamp.now().normalize() - pd.offsets.BDay(n_bars)).strftime('%Y-%m-%d')
+        self.frames = generate_market(n_tickers, n_bars, start=start, seed=seed)
+        self.tickers = list(self.frames)
+        write_cache(self.frames, cache_dir=self.cache_dir)
+
+        self._patches = [
+            mock.patch.object(stock_simple, 'CACHE_DIR', self.cache_dir),
+            mock.patch.object(stock, 'CACHE_DIR', self.cache_dir),
+        ]
+
+    def __enter__(self):
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        for patch in reversed(self._patches):
+            patch.stop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def portfolio(self):
+        """Portfolio holding every synthetic ticker since the first bar."""
+        from portfolio import Portfolio
+        from portfolio_stock import PortfolioStock
+
+        portfolio = Portfolio(initial_balance=1_000_000)
+        for ticker in self.tickers:
+            df = self.frames[ticker]
+            # Portfolio.buy records naive local timestamps
+            first_date = df.index[0].tz_localize(None).isoformat()
+            first_price = float(df['Close'].iloc[0])
+            portfolio.holdings[ticker] = PortfolioStock(ticker)
+            portfolio.holdings[ticker].buy(10, first_price, first_date)
+            portfolio.transactions.record_buy(ticker, 10, first_price, 0, first_date)
+        return portfolio
+
+
+# --- Benchmarks -----------------------------------------------------------
+# Each takes a BenchmarkContext and returns a zero-argument callable to time.
+
+def bench_enrich(ctx: BenchmarkContext) -> Callable:
+    """StockSimple._enrich_data on one ticker."""
+    raw = load_cached_history(ctx.tickers[0])
+    obj = StockSimple.__new__(StockSimple)
+    obj.ticker = ctx.tickers[0]
+
+    def run():
+        obj.history = raw.copy()
+        obj._enrich_data()
+    return run
+
+
+def bench_cache_load(ctx: BenchmarkContext) -> Callable:
+    """Reading one cached CSV through StockSimple."""
+    obj = StockSimple.__new__(StockSimple)
+    obj.ticker, obj.period = ctx.tickers[0], '1y'
+    return obj._load_cached_data
+
+
+def bench_cache_save(ctx: BenchmarkContext) -> Callable:
+    """Writing one history into the cache format."""
+    df = ctx.frames[ctx.tickers[0]]
+    path = ctx.tmpdir / 'save_bench.csv'
+    return lambda: df.to_csv(path)
+
+
+def bench_portfolio_valuation(ctx: BenchmarkContext) -> Callable:
+    """Portfolio.summary() over every holding."""
+    import portfolio as portfolio_module
+    pf = ctx.portfolio()
+
+    def run():
+        with mock.patch.object(portfolio_module, 'Stock', OfflineStock), \
+                contextlib.redirect_stdout(io.StringIO()):
+            pf.summary()
+    return run
+
+
+def bench_portfolio_timeline(ctx: BenchmarkContext) -> Callable:
+    """PortfolioVisualizer.plot_portfolio_value() timeline."""
+    import matplotlib.pyplot as plt
+    import visualise_portfolio
+    visualizer = visualise_portfolio.PortfolioVisualizer(ctx.portfolio())
+
+    def run():
+        with mock.patch.object(visualise_portfolio, 'Stock', OfflineStock):
+            visualizer.plot_portfolio_value()
+        plt.close('all')
+    return run
+
+
+def bench_signal_scan(ctx: BenchmarkContext) -> Callable:
+    """SignalDetector.analyze() across every ticker."""
+    import signal_detector
+
+    def run():
+        with mock.patch.object(signal_detector, 'Stock', OfflineStock):
+            for ticker in ctx.tickers:
+                signal_detector.SignalDetector(ticker).analyze()
+    return run
+
+
+def bench_flask_stock_endpoint(ctx: BenchmarkContext) -> Callable:
+    """GET /api/stock/<symbol> and /api/stocks through the test client."""
+    import app as app_module
+    client = app_module.app.test_client()
+    symbols = ctx.tickers[:7]
+    cache = {symbol: offline_stock_simple(symbol) for symbol in symbols}
+
+    def run():
+        with mock.patch.dict(app_module.stock_cache, cache, clear=True), \
+                mock.patch.object(app_module, 'DEFAULT_SYMBOLS', symbols):
+            for symbol in symbols:
+                assert client.get(f'/api/stock/{symbol}').status_code == 200
+            assert client.get('/api/stocks').status_code == 200
+    return run
+
+
+def bench_latex_plots(ctx: BenchmarkContext) -> Callable:
+    """LatexReportGenerator._generate_plots for one ticker."""
+    from latex_report_generator import LatexReportGenerator
+    generator = LatexReportGenerator.__new__(LatexReportGenerator)
+    report_data = [{'symbol': ctx.tickers[0], 'stock': offline_stock_simple(ctx.tickers[0])}]
+    report_dir = ctx.tmpdir / 'latex'
+    report_dir.mkdir(exist_ok=True)
+    return lambda: generator._generate_plots(report_data, report_dir)
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'enrich': bench_enrich,
+    'cache_load': bench_cache_load,
+    'cache_save': bench_cache_save,
+    'portfolio_valuation': bench_portfolio_valuation,
+    'portfolio_timeline': bench_portfolio_timeline,
+    'signal_scan': bench_signal_scan,
+    'flask_stock_endpoint': bench_flask_stock_endpoint,
+    'latex_plots': bench_latex_plots,
+}
+
+
+def time_callable(func: Callable, repeat: int = 5, max_seconds: float = 10.0) -> Dict:
+    """
+    Time a callable; returns min/median/mean in seconds.
+
+    The first call is a warm-up. Slow benchmarks stop repeating once
+    max_seconds is spent (a warm-up slower than that is kept as the sample).
+    """
+    start = time.perf_counter()
+    func()
+    warmup = time.perf_counter() - start
+
+    timings = []
+    if warmup > max_seconds:
+        timings.append(warmup)
+    else:
+        spent = 0.0
+        while len(timings) < repeat and (not timings or spent < max_seconds):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+            spent += timings[-1]
+
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'repeat': len(timings),
+    }
+
+
+def run_benchmarks(sizes: List[int] = DEFAULT_SIZES, names: Optional[List[str]] = None,
+                   repeat: int = 5, n_tickers: int = DEFAULT_TICKERS,
+                   max_seconds: float = 10.0) -> Dict:
+    """
+    Run the selected benchmarks at every size.
+
+    Args:
+        sizes: Number of bars per ticker for each run
+        names: Benchmarks to run (default: all)
+        repeat: Timed repetitions per benchmark
+        n_tickers: Tickers in the synthetic universe
+        max_seconds: Time budget per benchmark before repetitions stop
+
+    Returns:
+        Results document: {'meta': {...}, 'results': {"name[size]": timing}}
+    """
+    names = names or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for size in sizes:
+        with BenchmarkContext(size, n_tickers=n_tickers) as ctx:
+            for name in names:
+                key = f"{name}[{size}]"
+                try:
+                    results[key] = time_callable(BENCHMARKS[name](ctx), repeat=repeat,
+                                                 max_seconds=max_seconds)
+                    logger.info(f"{key}: {results[key]['median'] * 1000:.2f} ms")
+                except Exception as e:
+                    logger.error(f"{key} failed: {e}")
+                    results[key] = {'error': str(e)}
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'benchmarks': names,
+            'tickers': n_tickers,
+        },
+        'results': results,
+    }
+
+
+def compare_to_baseline(current: Dict, baseline: Dict,
+                        threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare median timings with a baseline.
+
+    Args:
+        current: Results document from run_benchmarks
+        baseline: Previously saved results document
+        threshold: Allowed slowdown as a fraction (0.25 = 25% slower)
+
+    Returns:
+        One row per benchmark present in both, with ratio and regression flag
+    """
+    rows = []
+    for key, result in current['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if not base or 'median' not in base or 'median' not in result:
+            continue
+        ratio = result['median'] / base['median'] if base['median'] > 0 else float('inf')
+        rows.append({
+            'benchmark': key,
+            'baseline_ms': base['median'] * 1000,
+            'current_ms': result['median'] * 1000,
+            'ratio': ratio,
+            'regression': ratio > 1.0 + threshold,
+        })
+    return rows
+
+
+def missing_results(current: Dict, baseline: Dict) -> List[str]:
+    """
+    Baseline benchmarks that the current run should have timed but did not.
+
+    Keys outside the current run's selection (--only, --sizes) are ignored;
+    renamed or removed benchmarks and runs that errored are reported.
+
+    Args:
+        current: Results document from run_benchmarks
+        baseline: Previously saved results document
+
+    Returns:
+        Sorted baseline keys without a successful current timing
+    """
+    meta = current.get('meta', {})
+    selected = meta.get('benchmarks')
+    sizes = meta.get('sizes')
+    missing = []
+    for key in baseline.get('results', {}):
+        name, _, size = key.rpartition('[')
+        if selected is not None and name in BENCHMARKS and name not in selected:
+            continue
+        if sizes is not None and size.rstrip(']') not in {str(s) for s in sizes}:
+            continue
+        if 'median' not in current['results'].get(key, {}):
+            missing.append(key)
+    return sorted(missing)
+
+
+def print_report(document: Dict, comparison: Optional[List[Dict]] = None):
+    """Print a results table (with baseline ratios when available)."""
+    ratios = {row['benchmark']: row for row in comparison or []}
+    print(f"{'benchmark':<34}{'median ms':>12}{'min ms':>12}{'vs base':>10}")
+    print("-" * 68)
+    for key, result in document['results'].items():
+        if 'error' in result:
+            print(f"{key:<34}{'ERROR':>12}  {result['error']}")
+            continue
+        row = ratios.get(key)
+        versus = f"{row['ratio']:.2f}x" if row else "-"
+        flag = "  ❌" if row and row['regression'] else ""
+        print(f"{key:<34}{result['median'] * 1000:>12.2f}{result['min'] * 1000:>12.2f}{versus:>10}{flag}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on synthetic data")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated bar counts per ticker")
+    parser.add_argument('--only', default=None, help="Comma-separated benchmark names")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tickers', type=int, default=DEFAULT_TICKERS)
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help="Time budget per benchmark before repetitions stop")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=None, help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown fraction before failing")
+    parser.add_argument('--save-baseline', default=None, help="Also write results here")
+    parser.add_argument('--list', action='store_true', help="List benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, func in BENCHMARKS.items():
+            print(f"{name:<24}{func.__doc__}")
+        return 0
+
+    # Modules under test log every cache hit at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    names = args.only.split(',') if args.only else None
+    document = run_benchmarks(sizes, names, repeat=args.repeat, n_tickers=args.tickers,
+                              max_seconds=args.max_seconds)
+
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+
+    comparison = None
+    missing = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare_to_baseline(document, baseline, args.threshold)
+        missing = missing_results(document, baseline)
+
+    print_report(document, comparison)
+    print(f"\n💾 Results saved to {args.output}")
+
+    failed = False
+    errors = [key for key, result in document['results'].items() if 'error' in result]
+    if errors:
+        print(f"❌ {len(errors)} benchmark(s) failed: {', '.join(errors)}")
+        failed = True
+    if missing:
+        print(f"❌ {len(missing)} baseline benchmark(s) without a result: {', '.join(missing)}")
+        failed = True
+    regressions = [row for row in comparison or [] if row['regression']]
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Chart Cache
+
+Compact, cached Plotly figure payloads:
+
+- Long price histories are reduced before plotting. Candles are merged into
+  buckets (first open, max high, min low, last close) and lines go through
+  Largest-Triangle-Three-Buckets, which keeps the peaks and troughs a chart
+  reader would notice.
+- Trace data is handed to Plotly as numpy arrays (dates as epoch
+  milliseconds), which Plotly serializes as base64 typed arrays instead of
+  per-point JSON lists. Values are float32, plenty for on-screen prices.
+- Serialized figures are cached per (symbol, chart type, options, data
+  version), so a page view of unchanged data skips building and encoding.
+"""
+
+import logging
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Points per trace a chart needs on a typical screen
+MAX_CHART_POINTS = 600
+
+
+def epoch_ms(index) -> np.ndarray:
+    """Datetime index as epoch milliseconds, which Plotly date axes accept."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.as_unit('ms').asi8.astype(np.float64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection.
+
+    Args:
+        x: Increasing x values
+        y: Values; non-finite points are skipped
+        threshold: Number of points to keep (at least 3)
+
+    Returns:
+        Sorted indices into x/y of the points to keep
+    """
+    finite = np.flatnonzero(np.isfinite(y))
+    n = len(finite)
+    if threshold >= n or threshold < 3:
+        return finite
+    xs, ys = np.asarray(x, dtype=float)[finite], np.asarray(y, dtype=float)[finite]
+
+    # Bucket edges over the interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        if i + 2 < len(edges):
+            next_end = edges[i + 2]
+            cx, cy = xs[end:next_end].mean(), ys[end:next_end].mean()
+        else:
+            cx, cy = xs[-1], ys[-1]
+        ax, ay = xs[a], ys[a]
+        area = np.abs((ax - cx) * (ys[start:end] - ay) - (ax - xs[start:end]) * (cy - ay))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return finite[selected]
+
+
+def line_arrays(series: pd.Series, max_points: int = MAX_CHART_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """(x, y) for a line trace, reduced with LTTB."""
+    x = epoch_ms(series.index)
+    y = series.to_numpy(dtype=float)
+    keep = lttb_indices(x, y, max_points)
+    return x[keep], y[keep].astype(np.float32)
+
+
+def bar_arrays(series: pd.Series, max_points: int = MAX_CHART_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """(x, y) for a bar trace; buckets keep the value largest in magnitude."""
+    x = epoch_ms(series.index)
+    y = np.nan_to_num(series.to_numpy(dtype=float))
+    if len(y) <= max_points:
+        return x, y.astype(np.float32)
+    starts = _bucket_starts(len(y), max_points)
+    picks = np.array([s + np.argmax(np.abs(y[s:e])) for s, e in zip(starts, np.r_[starts[1:], len(y)])])
+    return x[picks], y[picks].astype(np.float32)
+
+
+def _bucket_starts(n: int, buckets: int) -> np.ndarray:
+    return np.unique(np.linspace(0, n, buckets, endpoint=False).astype(int))
+
+
+def ohlc_arrays(df: pd.DataFrame, max_points: int = MAX_CHART_POINTS) -> Dict[str, np.ndarray]:
+    """
+    Candlestick trace data, with consecutive rows merged when there are too many.
+
+    Returns:
+        Dict with x, open, high, low and close arrays
+    """
+    x = epoch_ms(df.index)
+    ohlc = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float)
+    if len(df) > max_points:
+        starts = _bucket_starts(len(df), max_points)
+        ends = np.r_[starts[1:], len(df)] - 1
+        x = x[starts]
+        ohlc = np.column_stack([
+            ohlc[starts, 0],
+            np.fmax.reduceat(ohlc[:, 1], starts),
+            np.fmin.reduceat(ohlc[:, 2], starts),
+            ohlc[ends, 3],
+        ])
+    ohlc = ohlc.astype(np.float32)
+    return {'x': x, 'open': ohlc[:, 0], 'high': ohlc[:, 1], 'low': ohlc[:, 2], 'close': ohlc[:, 3]}
+
+
+def data_version(df: pd.DataFrame) -> Hashable:
+    """Cheap fingerprint of a price history: length, last timestamp and last row."""
+    if df is None or df.empty:
+        return None
+    last = df[['Open', 'High', 'Low', 'Close']].iloc[-1].to_numpy(dtype=float)
+    return (len(df), str(df.index[0]), str(df.index[-1]), tuple(np.round(last, 8)))
+
+
+class ChartCache:
+    """
+    Serialized figures keyed by symbol, chart type, options and data version.
+
+    A new data version gets a new key, so stale figures are never served;
+    they age out through the LRU bound or the TTL.
+
+    Args:
+        maxsize: Figures kept
+        ttl: Seconds a figure lives
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600.0):
+        self._cache = TTLCache(maxsize=maxsize, default_ttl=ttl)
+
+    def get_or_build(self, symbol: str, chart: str, version: Hashable,
+                     build: Callable[[], Optional[str]], **options) -> Optional[str]:
+        """
+        Cached payload, building it with build() when missing.
+
+        Args:
+            symbol: Ticker or pair
+            chart: Chart type name
+            version: Data version (see data_version)
+            build: Returns the figure JSON
+            **options: Anything else the figure depends on (range, size)
+        """
+        key = (symbol, chart, tuple(sorted(options.items())), version)
+        return self._cache.get_or_compute(key, build)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
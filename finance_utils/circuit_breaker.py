@@ -0,0 +1,258 @@
+"""
+Circuit Breaker
+
+Shared per-provider protection against rate-limit storms:
+
+- CircuitBreaker watches recent outcomes. When the share of 429 responses
+  (or of failures in general) gets too high it opens, and callers
+  fail fast, typically by falling back to cached data, instead of sleeping
+  in retry loops that prolong the ban. After a cool-off one probe request is
+  let through (half-open); success closes the circuit, failure reopens it
+  for twice as long.
+- AIMDLimiter caps concurrent requests to a provider. Each success raises
+  the cap by about one per round of requests and each throttle halves it, as
+  TCP congestion control does.
+
+Both are shared per provider name through breaker_for() and limiter_for(),
+so every client talking to Yahoo sees the same state.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from providers import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+SUCCESS = 'success'
+RATE_LIMITED = 'rate_limited'
+UNAUTHORIZED = 'unauthorized'
+ERROR = 'error'
+
+
+def classify_exception(exc: BaseException) -> str:
+    """Map an exception from requests/yfinance/twelvedata to an outcome."""
+    if isinstance(exc, RateLimitError):
+        return RATE_LIMITED
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    text = str(exc).lower()
+    if (status == 429 or '429' in text or 'too many requests' in text or 'rate limit' in text
+            or 'api credits' in text):
+        return RATE_LIMITED
+    if status == 401 or '401' in text or 'unauthorized' in text or 'invalid crumb' in text:
+        return UNAUTHORIZED
+    return ERROR
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker driven by recent throttle and error rates.
+
+    Args:
+        name: Provider name used in logs
+        window: Seconds of history considered
+        min_calls: Outcomes needed in the window before the circuit can trip
+        throttle_threshold: Share of 429 outcomes that opens the circuit
+        error_threshold: Share of failures of any kind that opens the circuit
+            (401/invalid crumb counts here only; it is fixed by a new crumb,
+            not by backing off)
+        open_seconds: First cool-off; doubles on every consecutive trip
+        max_open_seconds: Upper bound for the cool-off
+        clock: Time source (injectable for tests)
+    """
+
+    def __init__(self, name: str, window: float = 60.0, min_calls: int = 5,
+                 throttle_threshold: float = 0.2, error_threshold: float = 0.5,
+                 open_seconds: float = 30.0, max_open_seconds: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.throttle_threshold = throttle_threshold
+        self.error_threshold = error_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.trips = 0
+        self._outcomes = deque()
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now: float, retry_after: Optional[float] = None):
+        cool_off = min(self.open_seconds * 2 ** self.trips, self.max_open_seconds)
+        if retry_after:
+            cool_off = max(cool_off, retry_after)
+        self.state = OPEN
+        self.open_until = now + cool_off
+        self.trips += 1
+        self._probe_in_flight = False
+        logger.warning(f"Circuit for {self.name} opened for {cool_off:.0f}s")
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)."""
+        with self._lock:
+            now = self.clock()
+            if self.state == OPEN and now >= self.open_until:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit for {self.name} half-open, probing")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        """True while callers should skip the provider (does not claim the probe)."""
+        with self._lock:
+            if self.state == OPEN:
+                return self.clock() < self.open_until
+            return self.state == HALF_OPEN and self._probe_in_flight
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit will let a probe through."""
+        with self._lock:
+            return max(0.0, self.open_until - self.clock()) if self.state == OPEN else 0.0
+
+    def record(self, outcome: str, retry_after: Optional[float] = None):
+        """Record the outcome of a request sent after allow()."""
+        with self._lock:
+            now = self.clock()
+            if self.state == HALF_OPEN:
+                if outcome == SUCCESS:
+                    logger.info(f"Circuit for {self.name} closed")
+                    self.state = CLOSED
+                    self.trips = 0
+                    self._outcomes.clear()
+                    self._probe_in_flight = False
+                else:
+                    self._open(now, retry_after)
+                return
+            if self.state == OPEN:
+                return
+
+            self._outcomes.append((now, outcome))
+            self._prune(now)
+            total = len(self._outcomes)
+            if total < self.min_calls:
+                return
+            throttled = sum(1 for _, o in self._outcomes if o == RATE_LIMITED)
+            failed = sum(1 for _, o in self._outcomes if o != SUCCESS)
+            if throttled / total >= self.throttle_threshold or failed / total >= self.error_threshold:
+                self._outcomes.clear()
+                self._open(now, retry_after)
+
+    def status(self) -> Dict:
+        with self._lock:
+            now = self.clock()
+            self._prune(now)
+            return {
+                'state': self.state,
+                'retry_in': round(max(0.0, self.open_until - now), 1) if self.state == OPEN else 0.0,
+                'trips': self.trips,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': sum(1 for _, o in self._outcomes if o != SUCCESS),
+            }
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Args:
+        initial: Starting number of concurrent requests
+        min_limit: Floor of the limit
+        max_limit: Ceiling of the limit
+        decrease: Factor applied to the limit on every throttle
+    """
+
+    def __init__(self, initial: float = 4, min_limit: float = 1, max_limit: float = 16,
+                 decrease: float = 0.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, outcome: str = SUCCESS):
+        with self._cond:
+            self.in_flight -= 1
+            if outcome in (RATE_LIMITED, UNAUTHORIZED):
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+            elif outcome == SUCCESS:
+                # Roughly +1 after a full round of successful requests
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one concurrency slot; call the yielded function with the outcome
+        (success is assumed if it is not called and no exception escapes).
+        """
+        self.acquire()
+        outcome = [SUCCESS]
+        try:
+            yield lambda result: outcome.__setitem__(0, result)
+        except BaseException as e:
+            outcome[0] = classify_exception(e)
+            raise
+        finally:
+            self.release(outcome[0])
+
+
+_registry_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+_limiters: Dict[str, AIMDLimiter] = {}
+
+
+def breaker_for(provider: str, **kwargs) -> CircuitBreaker:
+    """Process-wide breaker for a provider (kwargs apply on first use)."""
+    with _registry_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider, **kwargs)
+        return _breakers[provider]
+
+
+def limiter_for(provider: str, **kwargs) -> AIMDLimiter:
+    """Process-wide concurrency limiter for a provider."""
+    with _registry_lock:
+        if provider not in _limiters:
+            _limiters[provider] = AIMDLimiter(**kwargs)
+        return _limiters[provider]
+
+
+def status() -> Dict[str, Dict]:
+    """Breaker and limiter state for every provider seen so far."""
+    with _registry_lock:
+        names = sorted(set(_breakers) | set(_limiters))
+    report = {}
+    for name in names:
+        entry = breaker_for(name).status()
+        limiter = limiter_for(name)
+        entry.update({'concurrency_limit': int(limiter.limit), 'in_flight': limiter.in_flight})
+        report[name] = entry
+    return report
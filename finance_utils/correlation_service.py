@@ -0,0 +1,338 @@
+"""
+Rolling Correlation Service
+
+Maintains rolling N-bar covariance and correlation matrices for a universe of
+symbols (stocks or forex pairs). Running sums over a ring buffer of returns are
+updated with O(N^2) work per new bar instead of recomputing the whole window,
+and missing values are handled pairwise like pandas' DataFrame.corr().
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Longest rolling window accepted (ten years of daily bars); the ring buffer
+# is window x symbols
+MAX_WINDOW = 2520
+
+
+class RollingCorrelation:
+    """
+    Incrementally updated rolling covariance/correlation matrix.
+    """
+
+    def __init__(self, symbols: List[str], window: int = 60,
+                 resync_every: Optional[int] = None):
+        """
+        Initialize the rolling matrices
+
+        Args:
+            symbols: Symbols in the universe (matrix order)
+            window: Number of most recent returns in the rolling window
+            resync_every: Recompute sums from the buffer every N updates to
+                          cancel floating-point drift (default: window)
+        """
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        if window > MAX_WINDOW:
+            raise ValueError(f"window must be at most {MAX_WINDOW}")
+
+        self.symbols = list(symbols)
+        self.window = window
+        self.resync_every = resync_every or window
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        n = len(self.symbols)
+        self._values = np.zeros((window, n))
+        self._mask = np.zeros((window, n))
+        self._pos = 0
+        self._filled = 0
+        self._updates_since_sync = 0
+
+        # Pairwise running sums: count, sum x_i, sum x_i^2, sum x_i*x_j
+        self._n = np.zeros((n, n))
+        self._sx = np.zeros((n, n))
+        self._sxx = np.zeros((n, n))
+        self._sxy = np.zeros((n, n))
+
+        self._last_close = np.full(n, np.nan)
+        self.last_timestamp = None
+
+    def __len__(self):
+        return self._filled
+
+    def _accumulate(self, values: np.ndarray, mask: np.ndarray, sign: float):
+        """Add (sign=1) or remove (sign=-1) one row from the running sums."""
+        self._n += sign * np.outer(mask, mask)
+        self._sx += sign * np.outer(values, mask)
+        self._sxx += sign * np.outer(values * values, mask)
+        self._sxy += sign * np.outer(values, values)
+
+    def _resync(self):
+        """Recompute running sums exactly from the ring buffer."""
+        values = self._values[:self._filled] if self._filled < self.window else self._values
+        mask = self._mask[:self._filled] if self._filled < self.window else self._mask
+        self._n = mask.T @ mask
+        self._sx = values.T @ mask
+        self._sxx = (values * values).T @ mask
+        self._sxy = values.T @ values
+        self._updates_since_sync = 0
+
+    def update(self, returns) -> None:
+        """
+        Push one bar of returns into the window.
+
+        Args:
+            returns: Array in symbol order, or {symbol: return}; NaN/missing = no data
+        """
+        if isinstance(returns, dict):
+            row = np.full(len(self.symbols), np.nan)
+            for symbol, value in returns.items():
+                if symbol in self._index:
+                    row[self._index[symbol]] = value
+        else:
+            row = np.asarray(returns, dtype=float)
+
+        mask = np.isfinite(row).astype(float)
+        values = np.where(mask > 0, row, 0.0)
+
+        if self._filled == self.window:
+            self._accumulate(self._values[self._pos], self._mask[self._pos], -1.0)
+        else:
+            self._filled += 1
+
+        self._values[self._pos] = values
+        self._mask[self._pos] = mask
+        self._accumulate(values, mask, 1.0)
+        self._pos = (self._pos + 1) % self.window
+
+        self._updates_since_sync += 1
+        if self._updates_since_sync >= self.resync_every:
+            self._resync()
+
+    def extend(self, returns: np.ndarray) -> None:
+        """Push many bars of returns (rows in time order)."""
+        returns = np.atleast_2d(np.asarray(returns, dtype=float))
+        if len(returns) >= self.window:
+            # Whole window replaced: load the tail and compute sums in one pass
+            tail = returns[-self.window:]
+            self._mask = np.isfinite(tail).astype(float)
+            self._values = np.where(self._mask > 0, tail, 0.0)
+            self._pos = 0
+            self._filled = self.window
+            self._resync()
+        else:
+            for row in returns:
+                self.update(row)
+
+    def update_prices(self, closes, timestamp=None) -> None:
+        """
+        Push one bar of close prices; returns are derived from the previous bar.
+
+        Args:
+            closes: Close prices in symbol order, or {symbol: close} (symbols
+                left out have no return for this bar)
+            timestamp: Bar timestamp, used to skip bars already seen
+        """
+        if timestamp is not None and self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return
+
+        if isinstance(closes, dict):
+            row = np.full(len(self.symbols), np.nan)
+            for symbol, value in closes.items():
+                if symbol in self._index:
+                    row[self._index[symbol]] = value
+        else:
+            row = np.asarray(closes, dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = row / self._last_close - 1.0
+        if np.isfinite(self._last_close).any():
+            self.update(returns)
+
+        self._last_close = np.where(np.isfinite(row), row, self._last_close)
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+    def sync_prices(self, closes: pd.DataFrame) -> int:
+        """
+        Apply only the bars newer than the last one seen.
+
+        Args:
+            closes: Close prices, one column per symbol, indexed by timestamp
+
+        Returns:
+            Number of new bars applied
+        """
+        if closes.empty:
+            return 0
+        closes = closes.reindex(columns=self.symbols).sort_index()
+        if self.last_timestamp is not None:
+            closes = closes[closes.index > self.last_timestamp]
+        if closes.empty:
+            return 0
+
+        values = closes.to_numpy(dtype=float)
+        if len(values) > self.window:
+            # Large catch-up: vectorize the returns and reload the window
+            filled = pd.DataFrame(np.vstack([self._last_close, values])).ffill().to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.extend(values / filled[:-1] - 1.0)
+            self._last_close = filled[-1]
+            self.last_timestamp = closes.index[-1]
+        else:
+            for timestamp, row in zip(closes.index, values):
+                self.update_prices(row, timestamp)
+        return len(values)
+
+    def sync_frames(self, frames: Dict[str, pd.DataFrame], column: str = 'Close') -> int:
+        """Apply the new bars from {symbol: OHLC DataFrame}; see sync_prices."""
+        return self.sync_prices(align_closes(frames, column))
+
+    def covariance(self) -> pd.DataFrame:
+        """Return the pairwise-complete rolling covariance matrix."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self._sxy - self._sx * self._sx.T / self._n) / (self._n - 1)
+        cov[self._n < 2] = np.nan
+        return pd.DataFrame(cov, index=self.symbols, columns=self.symbols)
+
+    def _correlation_array(self) -> np.ndarray:
+        """Pairwise-complete correlation as a raw array."""
+        n = self._n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self._sxy - self._sx * self._sx.T / n
+            var_i = self._sxx - self._sx * self._sx / n
+            corr = cov / np.sqrt(var_i * var_i.T)
+        corr[n < 2] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def correlation(self) -> pd.DataFrame:
+        """Return the pairwise-complete rolling correlation matrix."""
+        return pd.DataFrame(self._correlation_array(), index=self.symbols, columns=self.symbols)
+
+    def top_correlated(self, symbol: str, k: int = 5, least: bool = False) -> List[Tuple[str, float]]:
+        """
+        Get the k symbols most (or least) correlated with a symbol.
+
+        Args:
+            symbol: Reference symbol
+            k: Number of results
+            least: Return the least correlated symbols instead
+
+        Returns:
+            List of (symbol, correlation) sorted by correlation
+        """
+        if symbol not in self._index:
+            raise KeyError(f"{symbol} is not in the universe")
+
+        i = self._index[symbol]
+        row = self._correlation_array()[i].copy()
+        row[i] = np.nan
+        return self._top_k(row, k, least, lambda j: self.symbols[j])
+
+    def top_pairs(self, k: int = 10, least: bool = False) -> List[Tuple[str, str, float]]:
+        """Get the k most (or least) correlated pairs in the whole universe."""
+        corr = self._correlation_array()
+        rows, cols = np.triu_indices(len(self.symbols), k=1)
+        flat = corr[rows, cols]
+        return self._top_k(flat, k, least,
+                           lambda j: (self.symbols[rows[j]], self.symbols[cols[j]]))
+
+    @staticmethod
+    def _top_k(values: np.ndarray, k: int, least: bool, label: Callable) -> list:
+        """Select the top-k finite values with argpartition."""
+        valid = np.flatnonzero(np.isfinite(values))
+        if valid.size == 0 or k <= 0:
+            return []
+        scores = values[valid] if least else -values[valid]
+        k = min(k, valid.size)
+        part = np.argpartition(scores, k - 1)[:k]
+        order = part[np.argsort(scores[part])]
+        results = []
+        for j in valid[order]:
+            key = label(j)
+            value = round(float(values[j]), 4)
+            results.append((*key, value) if isinstance(key, tuple) else (key, value))
+        return results
+
+    def average_correlation(self, symbols: Optional[Iterable[str]] = None) -> float:
+        """Mean off-diagonal correlation, a quick diversification check."""
+        idx = [self._index[s] for s in symbols] if symbols is not None else list(range(len(self.symbols)))
+        if len(idx) < 2:
+            return float('nan')
+        corr = self._correlation_array()[np.ix_(idx, idx)]
+        off_diag = corr[~np.eye(len(idx), dtype=bool)]
+        off_diag = off_diag[np.isfinite(off_diag)]
+        return float(off_diag.mean()) if off_diag.size else float('nan')
+
+    def to_dict(self, top_k: int = 5) -> Dict:
+        """JSON-ready summary: correlation matrix plus top-k lookups."""
+        corr = self._correlation_array()
+        matrix = [[round(float(v), 4) if np.isfinite(v) else None for v in row] for row in corr]
+        return {
+            'symbols': list(self.symbols),
+            'window': self.window,
+            'observations': self._filled,
+            'last_timestamp': str(self.last_timestamp) if self.last_timestamp is not None else None,
+            'correlation': matrix,
+            'average_correlation': round(self.average_correlation(), 4) if len(self.symbols) > 1 else None,
+            'most_correlated_pairs': [
+                {'pair': [a, b], 'correlation': c} for a, b, c in self.top_pairs(top_k)],
+            'least_correlated_pairs': [
+                {'pair': [a, b], 'correlation': c} for a, b, c in self.top_pairs(top_k, least=True)],
+        }
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], window: int = 60,
+                    column: str = 'Close') -> 'RollingCorrelation':
+        """
+        Build a service from {symbol: OHLC DataFrame}.
+
+        Args:
+            frames: Price histories keyed by symbol
+            window: Rolling window length
+            column: Price column to use
+
+        Returns:
+            RollingCorrelation primed with the most recent window
+        """
+        service = cls(list(frames.keys()), window=window)
+        service.sync_frames(frames, column)
+        return service
+
+
+def align_closes(frames: Dict[str, pd.DataFrame], column: str = 'Close') -> pd.DataFrame:
+    """Align a price column from several histories on a common UTC index."""
+    closes = {}
+    for symbol, df in frames.items():
+        if df is None or df.empty or column not in df.columns:
+            continue
+        series = df[column].copy()
+        series.index = pd.to_datetime(series.index, utc=True)
+        closes[symbol] = series[~series.index.duplicated(keep='last')]
+    return pd.DataFrame(closes).sort_index()
+
+
+def forex_pairs_correlation(loader: Callable[[str], pd.DataFrame], pairs: Optional[List[str]] = None,
+                            window: int = 60) -> RollingCorrelation:
+    """
+    Build a rolling correlation service for forex pairs.
+
+    Args:
+        loader: Function returning an OHLC DataFrame for a pair symbol
+        pairs: Pairs to include (default: every pair in forex.currency_pairs)
+        window: Rolling window length
+
+    Returns:
+        RollingCorrelation over the pairs
+    """
+    if pairs is None:
+        from forex.currency_pairs import get_all_pairs
+        pairs = list(get_all_pairs().keys())
+
+    frames = {pair: loader(pair) for pair in pairs}
+    return RollingCorrelation.from_frames(frames, window=window)
@@ -4,6 +4,7 @@ Script to check data freshness and generate comprehensive reports.
 """
 
 from stock_simple import StockSimple
+from summary_table import SummaryTable
 import pandas as pd
 from datetime import datetime, timedelta
 import json
@@ -15,7 +16,10 @@ def check_data_freshness(stock):
     if not stock.is_valid():
         return None, "No data available"
     
-    last_date = stock.history.index[-1].date()
+    return _freshness(stock.history.index[-1].date(), len(stock.history)), None
+
+def _freshness(last_date, data_points):
+    """Freshness of data ending on last_date."""
     today = datetime.now().date()
     days_behind = (today - last_date).days
     
@@ -40,8 +44,8 @@ def check_data_freshness(stock):
         "days_behind": days_behind,
         "is_fresh": is_fresh,
         "status": status,
-        "data_points": len(stock.history)
-    }, None
+        "data_points": data_points
+    }
 
 def generate_comprehensive_report(symbols=None):
     """Generate comprehensive stock analysis report."""
@@ -62,13 +66,16 @@ def generate_comprehensive_report(symbols=None):
     print("🔍 Analyzing Stock Data Freshness and Generating Report")
     print("=" * 60)
     
+    # Each stock is summarized once into the table; the report reads its rows
+    table = SummaryTable()
+    
     for symbol in symbols:
         print(f"\n📊 Analyzing {symbol}...")
-        stock = StockSimple(symbol)
-        
-        freshness, error = check_data_freshness(stock)
+        table.update_stock(StockSimple(symbol))
+        row = table.row(symbol)
         
-        if error:
+        if row is None:
+            error = "No data available"
             print(f"❌ {symbol}: {error}")
             report["stocks"][symbol] = {
                 "error": error,
@@ -77,6 +84,7 @@ def generate_comprehensive_report(symbols=None):
             report["summary"]["no_data"] += 1
             continue
         
+        freshness = _freshness(row["last_date"], row["data_points"])
         print(f"📅 Data: {freshness['last_date']} ({freshness['days_behind']} days behind)")
         print(f"📈 Status: {freshness['status']}")
         print(f"📊 Data Points: {freshness['data_points']}")
@@ -86,36 +94,32 @@ def generate_comprehensive_report(symbols=None):
             "freshness": freshness,
             "valid": True,
             "basic_info": {
-                "symbol": stock.ticker,
-                "current_price": float(stock.today()["Close"]),
-                "volume": int(stock.today()["Volume"]),
-                "high": float(stock.today()["High"]),
-                "low": float(stock.today()["Low"])
+                "symbol": symbol.upper(),
+                "current_price": row["close"],
+                "volume": int(row["volume"]),
+                "high": row["high"],
+                "low": row["low"]
             },
             "technical_analysis": {
-                "rsi": float(stock.today()["RSI"]),
-                "macd": float(stock.today()["MACD"]),
-                "ma_50": float(stock.today()["50MA"]),
-                "ma_200": float(stock.today()["200MA"]),
-                "upper_band": float(stock.today()["Upper Band"]),
-                "lower_band": float(stock.today()["Lower Band"]),
-                "atr": float(stock.today()["ATR"])
+                "rsi": row["rsi"],
+                "macd": row["macd"],
+                "ma_50": row["ma_50"],
+                "ma_200": row["ma_200"],
+                "upper_band": row["upper_band"],
+                "lower_band": row["lower_band"],
+                "atr": row["atr"]
             },
             "performance": {
-                "period_start": stock.history.index[0].date().strftime("%Y-%m-%d"),
-                "period_end": stock.history.index[-1].date().strftime("%Y-%m-%d"),
-                "growth_percent": ((stock.history["Close"].iloc[-1] - stock.history["Close"].iloc[0]) / stock.history["Close"].iloc[0]) * 100,
-                "volatility": float(stock.history["Daily Return"].std()),
-                "max_price": float(stock.history["Close"].max()),
-                "min_price": float(stock.history["Close"].min())
+                "period_start": row["period_start"].strftime("%Y-%m-%d"),
+                "period_end": row["last_date"].strftime("%Y-%m-%d"),
+                "growth_percent": row["growth_percent"],
+                "volatility": row["volatility"],
+                "max_price": row["max_price"],
+                "min_price": row["min_price"]
             },
             "signals": {
-                "is_bullish": stock.is_bullish(),
-                "is_bearish": stock.is_bearish(),
-                "price_above_ma50": stock.today()["Close"] > stock.today()["50MA"],
-                "price_above_ma200": stock.today()["Close"] > stock.today()["200MA"],
-                "rsi_overbought": stock.today()["RSI"] > 70,
-                "rsi_oversold": stock.today()["RSI"] < 30
+                name: row[name] for name in ("is_bullish", "is_bearish", "price_above_ma50",
+                                             "price_above_ma200", "rsi_overbought", "rsi_oversold")
             }
         }
         
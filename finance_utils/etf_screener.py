@@ -5,6 +5,8 @@ import pandas as pd
 import time
 import logging
 
+from circuit_breaker import breaker_for, limiter_for, classify_exception, SUCCESS
+
 load_dotenv()
 API_KEY = os.getenv("API_KEY")
 
@@ -14,6 +16,7 @@ class ETFScreener:
     def __init__(self, tickers):
         self.tickers = tickers
         self.etf_data = []
+        self.skipped = []
         self.df = pd.DataFrame()
 
     def _wait_if_needed(self, index):
@@ -26,28 +29,44 @@ class ETFScreener:
     def fetch_data(self, max_retries=3):
         client = TDClient(apikey=API_KEY)
         self.etf_data = []
+        self.skipped = []
+        # Shared with every other TwelveData caller in the process
+        breaker = breaker_for('twelvedata')
+        limiter = limiter_for('twelvedata')
 
         for i, ticker in enumerate(self.tickers):
             retries = 0
             while retries < max_retries:
+                if not breaker.allow():
+                    logging.warning(f"TwelveData circuit open, skipping {ticker} "
+                                    f"(retry in {breaker.retry_in():.0f}s)")
+                    self.skipped.append(ticker)
+                    break
                 try:
                     logging.info(f"Fetching data for {ticker}")
-                    response = client.time_series(symbol=ticker, interval="1day", outputsize=1).as_json()
-                    if "values" in response and response["values"]:
-                        price = float(response["values"][0].get("close", "nan"))
-                        self.etf_data.append({"Ticker": ticker, "Price": price})
-                    else:
-                        raise ValueError("Unexpected API response structure")
+                    with limiter.slot():
+                        response = client.time_series(symbol=ticker, interval="1day", outputsize=1).as_json()
+                        if "values" in response and response["values"]:
+                            price = float(response["values"][0].get("close", "nan"))
+                            self.etf_data.append({"Ticker": ticker, "Price": price})
+                        else:
+                            raise ValueError("Unexpected API response structure")
+                    breaker.record(SUCCESS)
                     break
                 except Exception as e:
+                    breaker.record(classify_exception(e))
                     logging.warning(f"Attempt {retries + 1} failed for {ticker}: {e}")
                     retries += 1
+                    # Don't keep backing off into an open circuit
+                    if breaker.is_open():
+                        continue
                     time.sleep(2 ** retries)
 
             if retries == max_retries:
                 logging.error(f"Failed to fetch {ticker} after {max_retries} attempts.")
 
-            self._wait_if_needed(i)
+            if not breaker.is_open():
+                self._wait_if_needed(i)
 
         self.df = pd.DataFrame(self.etf_data)
 
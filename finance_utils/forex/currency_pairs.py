@@ -184,6 +184,22 @@ TRADING_SESSIONS = {
     }
 }
 
+
+def _build_sessions_by_hour(sessions):
+    """Names of the sessions open during each UTC hour, indexed 0-23"""
+    table = [[] for _ in range(24)]
+    for name, session in sessions.items():
+        start_hour = int(session['start'].split(':')[0])
+        end_hour = int(session['end'].split(':')[0])
+        hour = start_hour
+        while hour != end_hour:  # Sessions may cross midnight
+            table[hour].append(name)
+            hour = (hour + 1) % 24
+    return tuple(tuple(names) for names in table)
+
+# Hour -> open sessions, so lookups never parse session times
+SESSIONS_BY_HOUR = _build_sessions_by_hour(TRADING_SESSIONS)
+
 # Economic Indicators that affect currency pairs
 ECONOMIC_INDICATORS = {
     'USD': [
@@ -276,32 +292,19 @@ def get_pair_info(pair_symbol):
     all_pairs = get_all_pairs()
     return all_pairs.get(pair_symbol, None)
 
-def is_market_open(session_name):
-    """Check if a trading session is currently open"""
+def _current_hour():
     from datetime import datetime, timezone
-    
-    if session_name not in TRADING_SESSIONS:
-        return False
-    
-    session = TRADING_SESSIONS[session_name]
-    now = datetime.now(timezone.utc)
-    current_hour = now.hour
-    
-    start_hour = int(session['start'].split(':')[0])
-    end_hour = int(session['end'].split(':')[0])
-    
-    if start_hour <= end_hour:
-        return start_hour <= current_hour < end_hour
-    else:  # Session crosses midnight
-        return current_hour >= start_hour or current_hour < end_hour
+    return datetime.now(timezone.utc).hour
+
+def is_market_open(session_name, hour=None):
+    """Check if a trading session is currently open (or open at the given UTC hour)"""
+    hour = _current_hour() if hour is None else hour
+    return session_name in SESSIONS_BY_HOUR[hour % 24]
 
-def get_active_sessions():
-    """Get all currently active trading sessions"""
-    active_sessions = []
-    for session_name in TRADING_SESSIONS:
-        if is_market_open(session_name):
-            active_sessions.append(session_name)
-    return active_sessions
+def get_active_sessions(hour=None):
+    """Get all currently active trading sessions (or those open at the given UTC hour)"""
+    hour = _current_hour() if hour is None else hour
+    return list(SESSIONS_BY_HOUR[hour % 24])
 
 def get_most_active_pairs():
     """Get the most active currency pairs based on current trading sessions"""
@@ -0,0 +1,154 @@
+"""
+Currency Strength Engine
+
+Per-currency strength scores solved from pair returns. The log return of a
+pair A/B is modelled as the strength move of A minus that of B:
+
+    r(A/B) = s(A) - s(B)
+
+Stacking every pair gives r = M s, where M is the pair x currency incidence
+matrix (+1 for the base, -1 for the quote). The least-squares solution with
+zero-sum strengths is s = pinv(M) r, so strengths for a whole history are
+one matrix product: S = R pinv(M)^T. Bars with missing pairs are solved per
+pattern of missing pairs, which keeps the work batched (a handful of
+distinct patterns) rather than per bar.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def incidence_matrix(pairs: Sequence[str], currencies: Optional[Sequence[str]] = None
+                     ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Pair x currency matrix with +1 for the base and -1 for the quote currency.
+
+    Args:
+        pairs: Pair names, e.g. 'EUR/USD'
+        currencies: Column order (default: sorted currencies of the pairs)
+
+    Returns:
+        (matrix, currencies)
+    """
+    if currencies is None:
+        currencies = sorted({c for pair in pairs for c in pair.split('/')})
+    column = {c: j for j, c in enumerate(currencies)}
+    matrix = np.zeros((len(pairs), len(currencies)))
+    for i, pair in enumerate(pairs):
+        base, quote = pair.split('/')
+        matrix[i, column[base]] = 1.0
+        matrix[i, column[quote]] = -1.0
+    return matrix, list(currencies)
+
+
+class CurrencyStrength:
+    """
+    Least-squares strength solver over a fixed pair graph.
+
+    Args:
+        pairs: Pair names whose returns will be supplied, in column order
+        currencies: Currency order of the output (default: sorted)
+    """
+
+    def __init__(self, pairs: Sequence[str], currencies: Optional[Sequence[str]] = None):
+        self.pairs = list(pairs)
+        self.incidence, self.currencies = incidence_matrix(self.pairs, currencies)
+        # (currencies x pairs); the minimum-norm solution is zero-sum within
+        # each connected group of currencies
+        self.projection = np.linalg.pinv(self.incidence)
+        self._projections: Dict[bytes, Tuple[np.ndarray, np.ndarray]] = {}
+        self.level = np.zeros(len(self.currencies))
+        self.latest = np.full(len(self.currencies), np.nan)
+        self.bars = 0
+
+    def _projection_for(self, observed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """pinv for a subset of observed pairs, and which currencies it covers."""
+        key = np.packbits(observed).tobytes()
+        if key not in self._projections:
+            sub = self.incidence[observed]
+            covered = np.abs(sub).sum(axis=0) > 0
+            self._projections[key] = (np.linalg.pinv(sub), covered)
+        return self._projections[key]
+
+    def solve(self, returns: np.ndarray) -> np.ndarray:
+        """
+        Strength move of each currency for each bar.
+
+        Args:
+            returns: (T, P) log returns in pair order; NaN marks a missing quote
+
+        Returns:
+            (T, C) strengths; NaN for currencies with no observed pair in a bar
+        """
+        returns = np.atleast_2d(np.asarray(returns, dtype=float))
+        if returns.shape[1] != len(self.pairs):
+            raise ValueError(f"Expected {len(self.pairs)} pair columns, got {returns.shape[1]}")
+
+        missing = np.isnan(returns)
+        if not missing.any():
+            return returns @ self.projection.T
+
+        strength = np.full((returns.shape[0], len(self.currencies)), np.nan)
+        # One opaque key per row of the observed mask, so grouping is a 1-D unique
+        packed = np.ascontiguousarray(np.packbits(~missing, axis=1))
+        keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        for k, row in enumerate(first):
+            observed = ~missing[row]
+            if not observed.any():
+                continue
+            rows = inverse == k
+            projection, covered = self._projection_for(observed)
+            solved = returns[np.ix_(rows, observed)] @ projection.T
+            solved[:, ~covered] = np.nan
+            strength[rows] = solved
+        return strength
+
+    def from_prices(self, prices: pd.DataFrame) -> pd.DataFrame:
+        """
+        Per-bar strengths from a price frame with one column per pair.
+
+        Args:
+            prices: Rates indexed by time; columns must include every pair
+
+        Returns:
+            DataFrame of strengths (log-return units), one column per currency
+        """
+        log_prices = np.log(prices[self.pairs].to_numpy(dtype=float))
+        returns = np.diff(log_prices, axis=0)
+        return pd.DataFrame(self.solve(returns), index=prices.index[1:], columns=self.currencies)
+
+    def index(self, prices: pd.DataFrame) -> pd.DataFrame:
+        """Cumulative strength since the first bar (missing bars count as flat)."""
+        return self.from_prices(prices).fillna(0.0).cumsum()
+
+    def update(self, returns: Union[Dict[str, float], Iterable[float]]) -> Dict[str, float]:
+        """
+        Fold one bar of returns into the running strength index.
+
+        Args:
+            returns: {pair: log return} (absent pairs are missing) or a
+                     sequence in pair order
+
+        Returns:
+            {currency: strength move} for this bar
+        """
+        if isinstance(returns, dict):
+            row = np.array([returns.get(pair, np.nan) for pair in self.pairs], dtype=float)
+        else:
+            row = np.asarray(list(returns), dtype=float)
+        self.latest = self.solve(row)[0]
+        self.level += np.nan_to_num(self.latest)
+        self.bars += 1
+        return dict(zip(self.currencies, self.latest.tolist()))
+
+    def ranking(self) -> List[Tuple[str, float]]:
+        """Currencies from strongest to weakest by running index."""
+        order = np.argsort(-self.level)
+        return [(self.currencies[j], float(self.level[j])) for j in order]
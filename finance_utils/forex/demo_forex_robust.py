@@ -13,6 +13,10 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional
 
+# Synthetic data lives in the parent package directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from synthetic_data import generate_forex_ohlcv
+
 # Import forex modules
 from forex_client import ForexClient
 from currency_pairs import (
@@ -358,37 +362,7 @@ class ForexDemo:
     
     def _generate_mock_historical_data(self, pair: str, days: int = 30) -> pd.DataFrame:
         """Generate mock historical data"""
-        dates = pd.date_range(
-            start=datetime.now() - timedelta(days=days),
-            end=datetime.now(),
-            freq='1H'
-        )
-        
-        # Generate realistic price movements
-        n_periods = len(dates)
-        base_price = 1.0850 if 'EUR/USD' in pair else 1.2650
-        
-        # Random walk with drift
-        returns = np.random.normal(0.0001, 0.001, n_periods)
-        prices = base_price * np.exp(np.cumsum(returns))
-        
-        # Generate OHLC data
-        data = []
-        for i, price in enumerate(prices):
-            high = price * (1 + np.random.uniform(0, 0.002))
-            low = price * (1 - np.random.uniform(0, 0.002))
-            open_price = prices[i-1] if i > 0 else price
-            close_price = price
-            
-            data.append({
-                'Open': open_price,
-                'High': high,
-                'Low': low,
-                'Close': close_price,
-                'Volume': np.random.randint(1000, 10000)
-            })
-        
-        return pd.DataFrame(data, index=dates)
+        return generate_forex_ohlcv(pair, days=days)
     
     def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
         """Calculate RSI"""
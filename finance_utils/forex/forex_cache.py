@@ -0,0 +1,188 @@
+"""
+Forex Series Cache
+
+Disk-backed cache for Alpha Vantage FX time series, keyed by function, pair
+and interval. Entries expire on a schedule that follows bar granularity
+(1min bars after a minute, monthly bars after days). A stale series whose
+last bar is recent is topped up with a 'compact' request (last 100 bars)
+instead of downloading the full history again, and full series serve
+'compact' requests and date-range slices directly.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Seconds one bar spans
+BAR_SECONDS = {
+    '1min': 60,
+    '5min': 300,
+    '15min': 900,
+    '30min': 1800,
+    '60min': 3600,
+    'FX_DAILY': 86400,
+    'FX_WEEKLY': 7 * 86400,
+    'FX_MONTHLY': 30 * 86400,
+}
+
+# Seconds a cached series stays fresh
+DEFAULT_TTLS = {
+    '1min': 60,
+    '5min': 300,
+    '15min': 900,
+    '30min': 1800,
+    '60min': 3600,
+    'FX_DAILY': 4 * 3600,
+    'FX_WEEKLY': 24 * 3600,
+    'FX_MONTHLY': 3 * 86400,
+}
+
+# Bars returned by outputsize='compact'
+COMPACT_POINTS = 100
+
+
+class ForexCache:
+    """
+    Pickled OHLC frames with fetch time and whether the full history is held.
+
+    Args:
+        directory: Cache directory
+        ttls: Overrides for DEFAULT_TTLS, keyed by interval or function
+        clock: Time source (injectable for tests)
+    """
+
+    def __init__(self, directory: Union[str, Path] = './.forex_cache', ttls: Optional[Dict] = None,
+                 clock: Callable[[], float] = time.time):
+        self.directory = Path(directory)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.clock = clock
+        self.hits = 0
+        self.top_ups = 0
+        self.fetches = 0
+
+    @staticmethod
+    def _granularity(function: str, interval: Optional[str]) -> str:
+        return interval if function == 'FX_INTRADAY' else function
+
+    def _path(self, function: str, pair: str, interval: Optional[str]) -> Path:
+        name = f"{function}_{pair.replace('/', '')}"
+        if interval:
+            name += f"_{interval}"
+        return self.directory / f"{name}.pkl"
+
+    def load(self, function: str, pair: str, interval: Optional[str] = None) -> Optional[Dict]:
+        """Cached entry {'frame', 'fetched_at', 'full'} or None."""
+        path = self._path(function, pair, interval)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable forex cache {path}: {e}")
+            return None
+
+    def save(self, function: str, pair: str, frame: pd.DataFrame, full: bool,
+             interval: Optional[str] = None):
+        path = self._path(function, pair, interval)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = {'frame': frame, 'fetched_at': self.clock(), 'full': full}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write forex cache {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def ttl(self, function: str, interval: Optional[str] = None) -> float:
+        return self.ttls.get(self._granularity(function, interval), 3600)
+
+    def _tail_recent(self, frame: pd.DataFrame, function: str, interval: Optional[str]) -> bool:
+        """Whether a compact request would overlap the cached tail."""
+        if frame.empty:
+            return False
+        bar = BAR_SECONDS.get(self._granularity(function, interval), 86400)
+        last = pd.Timestamp(frame.index[-1])
+        if last.tzinfo is None:
+            last = last.tz_localize('UTC')
+        # Keep a margin: weekends and holidays leave gaps in the bar count
+        return self.clock() - last.timestamp() < 0.7 * COMPACT_POINTS * bar
+
+    @staticmethod
+    def _trim(frame: pd.DataFrame, outputsize: str) -> pd.DataFrame:
+        return frame.tail(COMPACT_POINTS) if outputsize == 'compact' else frame
+
+    def get_or_fetch(self, function: str, pair: str, fetch: Callable[[str], Optional[pd.DataFrame]],
+                     outputsize: str = 'compact', interval: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        Serve a series from cache, topping it up or refetching as needed
+
+        Args:
+            function: Alpha Vantage function, e.g. 'FX_DAILY'
+            pair: Pair name, e.g. 'EUR/USD'
+            fetch: Callable taking an outputsize and returning a DataFrame or None
+            outputsize: 'compact' or 'full'
+            interval: Intraday interval, e.g. '5min'
+
+        Returns:
+            DataFrame with OHLC data, or None if nothing could be fetched or cached
+        """
+        entry = self.load(function, pair, interval)
+        covers = entry is not None and (outputsize == 'compact' or entry['full'])
+
+        if covers:
+            if self.clock() - entry['fetched_at'] < self.ttl(function, interval):
+                self.hits += 1
+                return self._trim(entry['frame'], outputsize)
+
+            if self._tail_recent(entry['frame'], function, interval):
+                latest = fetch('compact')
+                if latest is None:
+                    logger.warning(f"Serving stale cached {function} data for {pair}")
+                    return self._trim(entry['frame'], outputsize)
+                self.top_ups += 1
+                merged = self._merge(entry['frame'], latest)
+                self.save(function, pair, merged, entry['full'], interval)
+                return self._trim(merged, outputsize)
+
+        frame = fetch(outputsize)
+        if frame is None:
+            if covers:
+                logger.warning(f"Serving stale cached {function} data for {pair}")
+                return self._trim(entry['frame'], outputsize)
+            return None
+
+        self.fetches += 1
+        full = outputsize == 'full'
+        if not full and entry is not None and not entry['frame'].empty:
+            # Keep the older history; it stays 'full' only if the new bars
+            # overlap it, otherwise there is a gap a full request must fill
+            full = entry['full'] and not frame.empty and frame.index.min() <= entry['frame'].index.max()
+            frame = self._merge(entry['frame'], frame)
+            self.save(function, pair, frame, full, interval)
+            return self._trim(frame, outputsize)
+        self.save(function, pair, frame, full, interval)
+        return frame
+
+    @staticmethod
+    def _merge(cached: pd.DataFrame, latest: pd.DataFrame) -> pd.DataFrame:
+        merged = pd.concat([cached, latest])
+        return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+    def clear(self):
+        for path in self.directory.glob('*.pkl'):
+            path.unlink()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'top_ups': self.top_ups, 'fetches': self.fetches}
@@ -14,22 +14,109 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def check_api_errors(data: Dict) -> Optional[Dict]:
+    """
+    Return the payload unless Alpha Vantage reported an error or throttle note
+    
+    Args:
+        data: Decoded JSON response
+        
+    Returns:
+        The payload, or None if it carries 'Error Message' or 'Note'
+    """
+    if 'Error Message' in data:
+        logger.error(f"API Error: {data['Error Message']}")
+        return None
+    
+    if 'Note' in data:
+        logger.warning(f"API Note: {data['Note']}")
+        return None
+    
+    return data
+
+
+def parse_exchange_rate(data: Dict, from_currency: str, to_currency: str) -> Optional[Dict]:
+    """
+    Convert a CURRENCY_EXCHANGE_RATE payload into the client's rate dictionary
+    
+    Args:
+        data: Decoded JSON response
+        from_currency: Base currency code
+        to_currency: Quote currency code
+        
+    Returns:
+        Dictionary with exchange rate data or None if the payload has none
+    """
+    rate_data = data.get('Realtime Currency Exchange Rate', {})
+    
+    if not rate_data:
+        logger.error(f"No exchange rate data found for {from_currency}/{to_currency}")
+        return None
+    
+    return {
+        'pair': f"{from_currency}/{to_currency}",
+        'rate': float(rate_data.get('5. Exchange Rate', 0)),
+        'bid': float(rate_data.get('8. Bid Price', 0)),
+        'ask': float(rate_data.get('9. Ask Price', 0)),
+        'timestamp': rate_data.get('6. Last Refreshed', ''),
+        'timezone': rate_data.get('7. Time Zone', '')
+    }
+
+
+def parse_time_series(data: Dict, key: str) -> Optional[pd.DataFrame]:
+    """
+    Convert an FX time series payload into an OHLC DataFrame
+    
+    Args:
+        data: Decoded JSON response
+        key: Time series key, e.g. 'Time Series FX (Daily)'. Intraday keys
+             embed the interval, so any key containing it is accepted.
+        
+    Returns:
+        DataFrame with OHLC data sorted by date, or None if the key is missing
+    """
+    time_series = data.get(key)
+    if time_series is None:
+        time_series = next((v for k, v in data.items() if key in k), None)
+    if not time_series:
+        return None
+    
+    df = pd.DataFrame.from_dict(time_series, orient='index')
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+    df.columns = OHLC_COLUMNS
+    
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    return df
+
+
 class ForexClient:
     """
     Client for fetching forex data from Alpha Vantage API
     """
     
-    def __init__(self, api_key: str, base_url: str = "https://www.alphavantage.co/query"):
+    def __init__(self, api_key: str, base_url: str = "https://www.alphavantage.co/query",
+                 session: Optional[requests.Session] = None, cache=None, bar_store=None):
         """
         Initialize the forex client
         
         Args:
             api_key: Alpha Vantage API key
             base_url: Base URL for Alpha Vantage API
+            session: HTTP session to use (e.g. providers.ReplaySession for offline runs)
+            cache: Optional forex_cache.ForexCache for time series requests
+            bar_store: Optional resampling.BarStore that get_bars derives timeframes in
         """
         self.api_key = api_key
         self.base_url = base_url
-        self.session = requests.Session()
+        self.session = session or requests.Session()
+        self.cache = cache
+        self.bar_store = bar_store
         self.last_request_time = 0
         self.request_count = 0
         self.rate_limit_delay = 12  # seconds between requests (500 requests per day)
@@ -58,18 +145,7 @@ class ForexClient:
             self.last_request_time = time.time()
             self.request_count += 1
             
-            data = response.json()
-            
-            # Check for API errors
-            if 'Error Message' in data:
-                logger.error(f"API Error: {data['Error Message']}")
-                return None
-            
-            if 'Note' in data:
-                logger.warning(f"API Note: {data['Note']}")
-                return None
-            
-            return data
+            return check_api_errors(response.json())
             
         except requests.RequestException as e:
             logger.error(f"Request failed: {e}")
@@ -78,6 +154,26 @@ class ForexClient:
             logger.error(f"JSON decode error: {e}")
             return None
     
+    def _fetch_series(self, params: Dict, key: str, label: str,
+                      from_currency: str, to_currency: str) -> Optional[pd.DataFrame]:
+        """Request one FX time series and parse it into a DataFrame."""
+        data = self._make_request(params)
+        if not data:
+            return None
+        
+        df = parse_time_series(data, key)
+        if df is None:
+            logger.error(f"No {label} data found for {from_currency}/{to_currency}")
+        return df
+    
+    def _cached_series(self, function: str, from_currency: str, to_currency: str, fetch,
+                       outputsize: str, interval: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Fetch through the cache when one is configured."""
+        if self.cache is None:
+            return fetch(outputsize)
+        return self.cache.get_or_fetch(function, f"{from_currency}/{to_currency}", fetch,
+                                       outputsize=outputsize, interval=interval)
+    
     def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[Dict]:
         """
         Get real-time exchange rate between two currencies
@@ -99,20 +195,7 @@ class ForexClient:
         if not data:
             return None
         
-        rate_data = data.get('Realtime Currency Exchange Rate', {})
-        
-        if not rate_data:
-            logger.error(f"No exchange rate data found for {from_currency}/{to_currency}")
-            return None
-        
-        return {
-            'pair': f"{from_currency}/{to_currency}",
-            'rate': float(rate_data.get('5. Exchange Rate', 0)),
-            'bid': float(rate_data.get('8. Bid Price', 0)),
-            'ask': float(rate_data.get('9. Ask Price', 0)),
-            'timestamp': rate_data.get('6. Last Refreshed', ''),
-            'timezone': rate_data.get('7. Time Zone', '')
-        }
+        return parse_exchange_rate(data, from_currency, to_currency)
     
     def get_intraday_data(self, from_currency: str, to_currency: str, 
                          interval: str = '5min', outputsize: str = 'compact') -> Optional[pd.DataFrame]:
@@ -128,44 +211,17 @@ class ForexClient:
         Returns:
             DataFrame with OHLC data
         """
-        params = {
-            'function': 'FX_INTRADAY',
-            'from_symbol': from_currency,
-            'to_symbol': to_currency,
-            'interval': interval,
-            'outputsize': outputsize
-        }
-        
-        data = self._make_request(params)
-        if not data:
-            return None
-        
-        # Find the time series key
-        time_series_key = None
-        for key in data.keys():
-            if 'Time Series FX' in key:
-                time_series_key = key
-                break
-        
-        if not time_series_key:
-            logger.error(f"No time series data found for {from_currency}/{to_currency}")
-            return None
-        
-        time_series = data[time_series_key]
-        
-        # Convert to DataFrame
-        df = pd.DataFrame.from_dict(time_series, orient='index')
-        df.index = pd.to_datetime(df.index)
-        df = df.sort_index()
-        
-        # Rename columns
-        df.columns = ['Open', 'High', 'Low', 'Close']
-        
-        # Convert to numeric
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        return df
+        def fetch(size):
+            params = {
+                'function': 'FX_INTRADAY',
+                'from_symbol': from_currency,
+                'to_symbol': to_currency,
+                'interval': interval,
+                'outputsize': size
+            }
+            return self._fetch_series(params, 'Time Series FX', 'time series', from_currency, to_currency)
+        
+        return self._cached_series('FX_INTRADAY', from_currency, to_currency, fetch, outputsize, interval)
     
     def get_daily_data(self, from_currency: str, to_currency: str, 
                       outputsize: str = 'compact') -> Optional[pd.DataFrame]:
@@ -180,36 +236,16 @@ class ForexClient:
         Returns:
             DataFrame with daily OHLC data
         """
-        params = {
-            'function': 'FX_DAILY',
-            'from_symbol': from_currency,
-            'to_symbol': to_currency,
-            'outputsize': outputsize
-        }
-        
-        data = self._make_request(params)
-        if not data:
-            return None
-        
-        time_series = data.get('Time Series FX (Daily)', {})
-        
-        if not time_series:
-            logger.error(f"No daily data found for {from_currency}/{to_currency}")
-            return None
-        
-        # Convert to DataFrame
-        df = pd.DataFrame.from_dict(time_series, orient='index')
-        df.index = pd.to_datetime(df.index)
-        df = df.sort_index()
-        
-        # Rename columns
-        df.columns = ['Open', 'High', 'Low', 'Close']
-        
-        # Convert to numeric
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        return df
+        def fetch(size):
+            params = {
+                'function': 'FX_DAILY',
+                'from_symbol': from_currency,
+                'to_symbol': to_currency,
+                'outputsize': size
+            }
+            return self._fetch_series(params, 'Time Series FX (Daily)', 'daily', from_currency, to_currency)
+        
+        return self._cached_series('FX_DAILY', from_currency, to_currency, fetch, outputsize)
     
     def get_weekly_data(self, from_currency: str, to_currency: str) -> Optional[pd.DataFrame]:
         """
@@ -222,34 +258,16 @@ class ForexClient:
         Returns:
             DataFrame with weekly OHLC data
         """
-        params = {
-            'function': 'FX_WEEKLY',
-            'from_symbol': from_currency,
-            'to_symbol': to_currency
-        }
-        
-        data = self._make_request(params)
-        if not data:
-            return None
-        
-        time_series = data.get('Time Series FX (Weekly)', {})
-        if not time_series:
-            logger.error(f"No weekly data found for {from_currency}/{to_currency}")
-            return None
-        
-        # Convert to DataFrame
-        df = pd.DataFrame.from_dict(time_series, orient='index')
-        df.index = pd.to_datetime(df.index)
-        df = df.sort_index()
-        
-        # Rename columns
-        df.columns = ['Open', 'High', 'Low', 'Close']
-        
-        # Convert to numeric
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        return df
+        def fetch(size):
+            params = {
+                'function': 'FX_WEEKLY',
+                'from_symbol': from_currency,
+                'to_symbol': to_currency
+            }
+            return self._fetch_series(params, 'Time Series FX (Weekly)', 'weekly', from_currency, to_currency)
+        
+        # Weekly and monthly requests always return the full history
+        return self._cached_series('FX_WEEKLY', from_currency, to_currency, fetch, 'full')
     
     def get_monthly_data(self, from_currency: str, to_currency: str) -> Optional[pd.DataFrame]:
         """
@@ -262,35 +280,44 @@ class ForexClient:
         Returns:
             DataFrame with monthly OHLC data
         """
-        params = {
-            'function': 'FX_MONTHLY',
-            'from_symbol': from_currency,
-            'to_symbol': to_currency
-        }
-        
-        data = self._make_request(params)
-        if not data:
-            return None
-        
-        time_series = data.get('Time Series FX (Monthly)', {})
-        
-        if not time_series:
-            logger.error(f"No monthly data found for {from_currency}/{to_currency}")
-            return None
-        
-        # Convert to DataFrame
-        df = pd.DataFrame.from_dict(time_series, orient='index')
-        df.index = pd.to_datetime(df.index)
-        df = df.sort_index()
-        
-        # Rename columns
-        df.columns = ['Open', 'High', 'Low', 'Close']
+        def fetch(size):
+            params = {
+                'function': 'FX_MONTHLY',
+                'from_symbol': from_currency,
+                'to_symbol': to_currency
+            }
+            return self._fetch_series(params, 'Time Series FX (Monthly)', 'monthly', from_currency, to_currency)
+        
+        return self._cached_series('FX_MONTHLY', from_currency, to_currency, fetch, 'full')
+    
+    def get_bars(self, from_currency: str, to_currency: str, timeframe: str = '1h',
+                 base_interval: str = '5min') -> Optional[pd.DataFrame]:
+        """
+        Get OHLC bars at any timeframe derived from one intraday series
         
-        # Convert to numeric
-        for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        The base_interval series is requested once (served from the cache
+        while fresh) and ingested into bar_store, which builds 15min/1h/4h/
+        daily/weekly bars locally with the 17:00 New York day roll.
         
-        return df
+        Args:
+            from_currency: Base currency code
+            to_currency: Quote currency code
+            timeframe: Target timeframe, e.g. '4h' or '1d'
+            base_interval: Intraday interval to derive from
+            
+        Returns:
+            DataFrame with OHLC data indexed by bar start (UTC), or None
+        """
+        if self.bar_store is None:
+            raise ValueError("get_bars needs a bar_store (resampling.BarStore)")
+        
+        key = f"forex:{from_currency}/{to_currency}:{base_interval}"
+        data = self.get_intraday_data(from_currency, to_currency, base_interval, outputsize='full')
+        if data is None:
+            logger.warning(f"Serving stored {base_interval} bars for {from_currency}/{to_currency}")
+        else:
+            self.bar_store.ingest(key, data, base_interval, session='forex')
+        return self.bar_store.get(key, timeframe)
     
     def get_multiple_rates(self, pairs: List[Tuple[str, str]]) -> Dict[str, Dict]:
         """
@@ -329,7 +356,7 @@ class ForexClient:
         Returns:
             DataFrame with OHLC data for the specified range
         """
-        # Get full daily data
+        # Get full daily data (sliced from the cached full series when caching)
         df = self.get_daily_data(from_currency, to_currency, outputsize='full')
         
         if df is None:
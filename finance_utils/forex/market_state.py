@@ -0,0 +1,149 @@
+"""
+Forex Market State
+
+Latest rate and return for every configured pair, kept in arrays and updated
+one rate at a time. Everything the market overview reports is maintained as
+rates land, so reading it does not touch the pairs at all:
+
+- the number of priced pairs and the sum of their returns (for sentiment)
+  are running totals;
+- top movers come from a max-heap on |return| with lazy deletion: each
+  update pushes a new entry and entries superseded by a later update are
+  dropped when they surface, so an update costs O(k log n) and a read O(1).
+"""
+
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class MarketState:
+    """
+    Rates, returns and top movers for a fixed set of pairs.
+
+    Args:
+        pairs: Pair names, e.g. 'EUR/USD'
+        top_n: Number of top movers maintained
+        neutral_band: Average return within +/- this band reads as 'neutral'
+        clock: Time source (injectable for tests)
+    """
+
+    def __init__(self, pairs: Iterable[str], top_n: int = 3, neutral_band: float = 1e-5,
+                 clock: Callable[[], float] = time.time):
+        self.pairs: List[str] = list(pairs)
+        self.index = {pair: i for i, pair in enumerate(self.pairs)}
+        self.top_n = top_n
+        self.neutral_band = neutral_band
+        self.clock = clock
+
+        n = len(self.pairs)
+        self.rates = np.full(n, np.nan)
+        self.returns = np.full(n, np.nan)
+        self.updated = np.full(n, np.nan)
+        self._version = np.zeros(n, dtype=np.int64)
+
+        self._heap = []
+        self._top: List[Dict] = []
+        self._priced = 0
+        self._return_sum = 0.0
+        self.last_updated: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, pair: str, rate: float, change: Optional[float] = None,
+               timestamp: Optional[float] = None):
+        """
+        Record a new rate.
+
+        Args:
+            pair: Pair name (must be one of the configured pairs)
+            rate: Latest rate
+            change: Return to report; defaults to the change from the
+                    previously recorded rate (0 for the first one)
+            timestamp: Quote time in epoch seconds (default now)
+        """
+        i = self.index[pair]
+        with self._lock:
+            previous_rate, previous_change = self.rates[i], self.returns[i]
+            if change is None:
+                change = rate / previous_rate - 1.0 if np.isfinite(previous_rate) else 0.0
+
+            if np.isfinite(previous_change):
+                self._return_sum -= previous_change
+            else:
+                self._priced += 1
+            self._return_sum += change
+
+            self.rates[i], self.returns[i] = rate, change
+            self.updated[i] = self.clock() if timestamp is None else timestamp
+            self.last_updated = self.updated[i]
+            self._version[i] += 1
+            heapq.heappush(self._heap, (-abs(change), int(self._version[i]), i))
+            self._refresh_top()
+
+    def update_many(self, rates: Dict[str, Dict]):
+        """Record {pair: {'rate', 'change'?, 'timestamp'?}} for the known pairs."""
+        for pair, data in rates.items():
+            if pair in self.index and data.get('rate'):
+                self.update(pair, data['rate'], data.get('change'), data.get('timestamp'))
+
+    def _live(self, entry) -> bool:
+        _, version, i = entry
+        return version == self._version[i]
+
+    def _refresh_top(self):
+        """Rebuild the cached top movers from the heap (caller holds the lock)."""
+        top = []
+        while self._heap and len(top) < self.top_n:
+            entry = heapq.heappop(self._heap)
+            if self._live(entry):
+                top.append(entry)
+        for entry in top:
+            heapq.heappush(self._heap, entry)
+
+        # Superseded entries only surface when they reach the top; compact
+        # once they dominate the heap
+        if len(self._heap) > 4 * len(self.pairs) + 16:
+            self._heap = [entry for entry in self._heap if self._live(entry)]
+            heapq.heapify(self._heap)
+
+        self._top = [{'pair': self.pairs[i], 'change': float(self.returns[i])} for _, _, i in top]
+
+    def top_movers(self) -> List[Dict]:
+        return list(self._top)
+
+    def sentiment(self) -> str:
+        if not self._priced:
+            return 'neutral'
+        average = self._return_sum / self._priced
+        if average > self.neutral_band:
+            return 'bullish'
+        if average < -self.neutral_band:
+            return 'bearish'
+        return 'neutral'
+
+    def age(self) -> float:
+        """Seconds since the last update (inf before the first)."""
+        return float('inf') if self.last_updated is None else self.clock() - self.last_updated
+
+    def overview(self) -> Dict:
+        """Maintained summary: priced pairs, top movers, sentiment and last update."""
+        with self._lock:
+            return {
+                'total_pairs': self._priced,
+                'top_movers': list(self._top),
+                'market_sentiment': self.sentiment(),
+                'average_change': self._return_sum / self._priced if self._priced else 0.0,
+                'last_updated': self.last_updated,
+            }
+
+    def get_rates(self, pairs: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """{pair: {'rate', 'change'}} for priced pairs (default: all)."""
+        result = {}
+        for pair in self.pairs if pairs is None else pairs:
+            i = self.index.get(pair)
+            if i is not None and np.isfinite(self.rates[i]):
+                result[pair] = {'rate': float(self.rates[i]), 'change': float(self.returns[i])}
+        return result
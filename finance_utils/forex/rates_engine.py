@@ -0,0 +1,307 @@
+"""
+Forex Rates Engine
+
+Derives a full cross-rate matrix from one quote per currency. Alpha Vantage
+allows five calls a minute, so fetching every configured pair directly takes
+minutes. The engine instead fetches one leg against a pivot currency (USD)
+for each currency and triangulates every other pair from those legs:
+
+    bid(A/B) = bid(A/USD) * bid(USD/B)
+    ask(A/B) = ask(A/USD) * ask(USD/B)
+
+Both bid and ask widen on the way through the pivot, as they would for a
+trader crossing two real markets. Rates live in N x N NumPy arrays (bid, ask
+and quote time per cell) together with a mask of the cells that came from a
+direct quote rather than triangulation.
+
+The engine is safe to share between a refresher thread and request threads:
+quotes are recorded under a lock, and readers that need several values from
+the same state (e.g. the matrix and the per-pair quotes) can hold it too.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PIVOT = 'USD'
+
+
+def split_pair(pair: str) -> Tuple[str, str]:
+    base, quote = pair.upper().split('/')
+    return base, quote
+
+
+def parse_quote_time(value, default: float) -> float:
+    """Epoch seconds for an Alpha Vantage 'Last Refreshed' string (UTC)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+class RatesEngine:
+    """
+    Cross-rate matrix built from pivot legs.
+
+    Args:
+        pairs: Pair names the engine must be able to quote, e.g. 'EUR/GBP';
+               they define the currencies and the market convention of each leg
+        fetch: Callable taking a list of (from, to) tuples and returning
+               {pair: rate dict} with 'rate', 'bid', 'ask' and 'timestamp', as
+               ForexClient.get_multiple_rates does
+        pivot: Currency every leg is quoted against
+        max_age: Seconds before a leg is fetched again
+        clock: Time source (injectable for tests)
+    """
+
+    def __init__(self, pairs: Iterable[str], fetch: Optional[Callable] = None, pivot: str = PIVOT,
+                 max_age: float = 60.0, clock: Callable[[], float] = time.time):
+        self.pairs = list(pairs)
+        self.fetch = fetch
+        self.pivot = pivot
+        self.max_age = max_age
+        self.clock = clock
+
+        currencies = {pivot}
+        for pair in self.pairs:
+            currencies.update(split_pair(pair))
+        self.currencies: List[str] = sorted(currencies)
+        self.index = {c: i for i, c in enumerate(self.currencies)}
+        n = len(self.currencies)
+
+        # Value of one unit of each currency in the pivot
+        self._leg_bid = np.full(n, np.nan)
+        self._leg_ask = np.full(n, np.nan)
+        self._leg_time = np.full(n, np.nan)
+        self._leg_fetched = np.full(n, -np.inf)
+        p = self.index[pivot]
+        self._leg_bid[p] = self._leg_ask[p] = 1.0
+        self._leg_time[p] = np.inf
+        self._leg_fetched[p] = np.inf
+
+        # Quotes for pairs without the pivot, fetched directly
+        self._overrides: Dict[Tuple[int, int], Tuple[float, float, float]] = {}
+
+        self._bid = np.full((n, n), np.nan)
+        self._ask = np.full((n, n), np.nan)
+        self._timestamps = np.full((n, n), np.nan)
+        self._direct = np.zeros((n, n), dtype=bool)
+        self._previous_mid: Optional[np.ndarray] = None
+        self._dirty = True
+        self.api_calls = 0
+        # Bumped on every recorded quote, so readers can tell new data from old
+        self.version = 0
+        # Guards legs, overrides and the rebuilt matrices
+        self.lock = threading.RLock()
+
+    def leg_pairs(self) -> List[Tuple[str, str]]:
+        """One (from, to) pair per non-pivot currency, in market convention where known."""
+        known = set(self.pairs)
+        legs = []
+        for currency in self.currencies:
+            if currency == self.pivot:
+                continue
+            if f"{self.pivot}/{currency}" in known:
+                legs.append((self.pivot, currency))
+            else:
+                legs.append((currency, self.pivot))
+        return legs
+
+    def set_quote(self, base: str, quote: str, bid: float, ask: Optional[float] = None,
+                  timestamp: Optional[float] = None):
+        """
+        Record a direct quote.
+
+        Legs against the pivot feed the triangulation; any other pair
+        overrides its triangulated cell (and the inverse cell).
+        """
+        ask = bid if ask is None else ask
+        if not (bid > 0 and ask > 0):
+            raise ValueError(f"Invalid quote for {base}/{quote}: bid={bid} ask={ask}")
+        bid, ask = min(bid, ask), max(bid, ask)
+        with self.lock:
+            now = self.clock()
+            timestamp = now if timestamp is None else timestamp
+            i, j = self.index[base], self.index[quote]
+
+            if quote == self.pivot:
+                self._leg_bid[i], self._leg_ask[i] = bid, ask
+                self._leg_time[i], self._leg_fetched[i] = timestamp, now
+            elif base == self.pivot:
+                self._leg_bid[j], self._leg_ask[j] = 1.0 / ask, 1.0 / bid
+                self._leg_time[j], self._leg_fetched[j] = timestamp, now
+            else:
+                self._overrides[(i, j)] = (bid, ask, timestamp)
+                self._overrides.pop((j, i), None)
+            self._dirty = True
+            self.version += 1
+
+    def _apply(self, rates: Dict[str, Dict]):
+        for pair, data in rates.items():
+            rate = float(data.get('rate') or 0)
+            # Alpha Vantage leaves bid/ask empty for some currencies
+            bid = float(data.get('bid') or 0) or rate
+            ask = float(data.get('ask') or 0) or rate
+            if rate <= 0 and bid <= 0:
+                logger.warning(f"Ignoring empty quote for {pair}")
+                continue
+            base, quote = split_pair(data.get('pair', pair))
+            self.set_quote(base, quote, bid, ask, parse_quote_time(data.get('timestamp'), self.clock()))
+
+    def stale_legs(self) -> List[Tuple[str, str]]:
+        now = self.clock()
+        stale = []
+        with self.lock:
+            for base, quote in self.leg_pairs():
+                currency = quote if base == self.pivot else base
+                if now - self._leg_fetched[self.index[currency]] >= self.max_age:
+                    stale.append((base, quote))
+        return stale
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Fetch the legs that are missing or older than max_age.
+
+        Returns:
+            Number of legs requested
+        """
+        legs = self.leg_pairs() if force else self.stale_legs()
+        if not legs or self.fetch is None:
+            return 0
+        self.api_calls += len(legs)
+        rates = self.fetch(legs) or {}
+        missing = [f"{b}/{q}" for b, q in legs if f"{b}/{q}" not in rates]
+        if missing:
+            logger.warning(f"No quote for legs: {', '.join(missing)}")
+        # The fetch can take minutes, so the lock is only held to apply it
+        with self.lock:
+            if np.isfinite(self._leg_bid).sum() > 1:
+                self._previous_mid = self.mid()
+            self._apply(rates)
+        return len(legs)
+
+    def _rebuild(self):
+        with self.lock:
+            if not self._dirty:
+                return
+            leg_bid, leg_ask, leg_time = self._leg_bid, self._leg_ask, self._leg_time
+
+            # bid[i, j] = bid(i/pivot) * bid(pivot/j) = bid(i/pivot) / ask(j/pivot)
+            bid = np.outer(leg_bid, 1.0 / leg_ask)
+            ask = np.outer(leg_ask, 1.0 / leg_bid)
+            # A derived rate is only as fresh as its older leg
+            timestamps = np.minimum.outer(leg_time, leg_time)
+
+            p = self.index[self.pivot]
+            direct = np.zeros_like(self._direct)
+            direct[p, :] = direct[:, p] = np.isfinite(leg_bid)
+
+            for (i, j), (o_bid, o_ask, o_time) in self._overrides.items():
+                bid[i, j], ask[i, j] = o_bid, o_ask
+                bid[j, i], ask[j, i] = 1.0 / o_ask, 1.0 / o_bid
+                timestamps[i, j] = timestamps[j, i] = o_time
+                direct[i, j] = direct[j, i] = True
+
+            np.fill_diagonal(bid, 1.0)
+            np.fill_diagonal(ask, 1.0)
+            np.fill_diagonal(timestamps, np.inf)
+            np.fill_diagonal(direct, False)
+            timestamps[~np.isfinite(timestamps)] = np.nan
+            self._bid, self._ask, self._timestamps, self._direct = bid, ask, timestamps, direct
+            self._dirty = False
+
+    @property
+    def bid(self) -> np.ndarray:
+        """bid[i, j]: units of currencies[j] received for selling one unit of currencies[i]."""
+        self._rebuild()
+        return self._bid
+
+    @property
+    def ask(self) -> np.ndarray:
+        """ask[i, j]: units of currencies[j] paid for buying one unit of currencies[i]."""
+        self._rebuild()
+        return self._ask
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Quote time (epoch seconds) of each cell; the older leg's time for derived cells."""
+        self._rebuild()
+        return self._timestamps
+
+    @property
+    def direct(self) -> np.ndarray:
+        """True where the cell came from a direct quote rather than triangulation."""
+        self._rebuild()
+        return self._direct
+
+    def mid(self) -> np.ndarray:
+        """N x N matrix of mid rates; mid[i, j] is the price of currencies[i] in currencies[j]."""
+        with self.lock:
+            self._rebuild()
+            return (self.bid + self.ask) / 2.0
+
+    def changes(self) -> np.ndarray:
+        """Relative change of each mid rate since the previous refresh (NaN before that)."""
+        with self.lock:
+            mid = self.mid()
+            if self._previous_mid is None:
+                return np.full_like(mid, np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return mid / self._previous_mid - 1.0
+
+    def quote(self, base: str, quote: str) -> Optional[Dict]:
+        """Bid, ask, mid, quote time and provenance for one pair, or None if unknown."""
+        with self.lock:
+            if base not in self.index or quote not in self.index:
+                return None
+            i, j = self.index[base], self.index[quote]
+            mid = self.mid()
+            if not np.isfinite(mid[i, j]):
+                return None
+            change = self.changes()[i, j]
+            timestamp = self.timestamps[i, j]
+            return {
+                'pair': f"{base}/{quote}",
+                'bid': float(self.bid[i, j]),
+                'ask': float(self.ask[i, j]),
+                'rate': float(mid[i, j]),
+                'change': float(change) if np.isfinite(change) else None,
+                'timestamp': float(timestamp) if np.isfinite(timestamp) else None,
+                'direct': bool(self.direct[i, j]),
+            }
+
+    def quotes(self, pairs: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Quotes for the given pairs (default: every configured pair) that can be priced."""
+        with self.lock:
+            result = {}
+            for pair in self.pairs if pairs is None else pairs:
+                data = self.quote(*split_pair(pair))
+                if data is not None:
+                    result[pair] = data
+            return result
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly matrix dump (NaN becomes None)."""
+
+        def clean(matrix, digits=6):
+            return [[round(float(v), digits) if np.isfinite(v) else None for v in row] for row in matrix]
+
+        with self.lock:
+            return {
+                'currencies': self.currencies,
+                'pivot': self.pivot,
+                'mid': clean(self.mid()),
+                'bid': clean(self.bid),
+                'ask': clean(self.ask),
+                'timestamps': clean(self.timestamps, 0),
+                'direct': self.direct.tolist(),
+                'api_calls': self.api_calls,
+            }
@@ -0,0 +1,91 @@
+"""
+HTTP Cache
+
+Conditional GET and compression for the Flask JSON APIs:
+
+- conditional() tags a view's responses with a weak ETag derived from a
+  cheap data version (last bar, indicator settings) instead of the body.
+  A request whose If-None-Match matches gets 304 before the view runs, so
+  unchanged summaries are neither recomputed nor resent.
+- enable_compression() gzips large text responses for clients that accept
+  it. Streamed responses (Server-Sent Events) are left alone.
+"""
+
+import functools
+import gzip
+import hashlib
+import logging
+from typing import Callable, Hashable, Optional
+
+from flask import Flask, Response, make_response, request
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = {'application/json', 'text/html', 'text/csv', 'text/plain', 'text/css',
+                      'application/javascript', 'image/svg+xml'}
+
+
+def make_etag(*parts: Hashable) -> str:
+    """Short, stable hash of the parts' reprs."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+
+def conditional(version: Callable[..., Optional[Hashable]]):
+    """
+    Decorate a view so unchanged data is answered with 304 Not Modified.
+
+    Args:
+        version: Called with the view's arguments (and free to read the
+                 request); returns something that changes whenever the
+                 response would, or None to skip caching for the request
+
+    The ETag also covers the path and query string, so different parameter
+    sets never share a tag. Only 200 responses are tagged.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            data_version = version(*args, **kwargs)
+            if data_version is None:
+                return view(*args, **kwargs)
+
+            etag = make_etag(request.path, request.query_string, data_version)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Clients may keep the body but must revalidate before using it
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def enable_compression(app: Flask, min_size: int = 1024, level: int = 6):
+    """
+    Gzip text responses of at least min_size bytes when the client accepts gzip.
+
+    Args:
+        app: Flask application
+        min_size: Smaller bodies are sent as they are
+        level: gzip compression level (6 balances speed and size for JSON)
+    """
+    @app.after_request
+    def compress(response: Response) -> Response:
+        if (response.status_code < 200 or response.status_code >= 300
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES
+                or not request.accept_encodings['gzip']):
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(gzip.compress(data, compresslevel=level))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
+    return compress
@@ -67,6 +67,20 @@ class Portfolio:
             gain = position.unrealized_gain(latest_price)
             print(f"{ticker}: {position.total_shares} shares | Avg: €{position.avg_price:.2f} | Now: €{latest_price:.2f} | PnL: €{gain:.2f}")
 
+    def risk_report(self, n_paths=100_000, horizon_days=10, confidence=0.95, seed=None):
+        """Monte Carlo VaR/CVaR and drawdown report for the current holdings."""
+        from portfolio_risk import PortfolioRisk
+        risk = PortfolioRisk(self, seed=seed)
+        return risk.report(n_paths=n_paths, horizon_days=horizon_days,
+                           confidence=confidence)
+
+    def optimize(self, max_weight=None, n_points=50, risk_free_rate=0.0):
+        """Efficient frontier, min-variance and max-Sharpe weights for the holdings."""
+        from portfolio_optimizer import PortfolioOptimizer
+        optimizer = PortfolioOptimizer.from_portfolio(self, max_weight=max_weight,
+                                                      risk_free_rate=risk_free_rate)
+        return optimizer.summary(n_points=n_points)
+
     def save_to_json(self, filepath='portfolio.json'):
         data = {
             "balance": self.balance,
@@ -0,0 +1,314 @@
+"""
+Mean-Variance Portfolio Optimizer
+
+Efficient frontier, minimum-variance and maximum-Sharpe weights under
+long-only and position-size constraints, computed with Markowitz's critical
+line algorithm. The frontier is piecewise linear in the weights between
+"turning points" where a position enters or leaves its bounds; each turning
+point is solved from the previous one's active set, so one covariance estimate
+and a single sweep serve every frontier point, the minimum-variance portfolio
+and the maximum-Sharpe portfolio.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from stock_simple import load_cached_history
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+
+class PortfolioOptimizer:
+    """
+    Box-constrained mean-variance optimizer (fully invested, long-only by default).
+    """
+
+    def __init__(self, expected_returns, covariance, symbols: Optional[List] = None,
+                 max_weight: Optional[float] = None, long_only: bool = True,
+                 risk_free_rate: float = 0.0):
+        """
+        Initialize the optimizer
+
+        Args:
+            expected_returns: Annualized expected returns (length N)
+            covariance: Annualized covariance matrix (N x N)
+            symbols: Asset names (default: index of expected_returns or 0..N-1)
+            max_weight: Maximum weight per position (None = no cap)
+            long_only: Forbid short positions (otherwise weights >= -max_weight)
+            risk_free_rate: Annual risk-free rate used for Sharpe ratios
+        """
+        if symbols is None:
+            symbols = list(expected_returns.index) if hasattr(expected_returns, 'index') \
+                else list(range(len(expected_returns)))
+
+        self.symbols = list(symbols)
+        self.mu = np.asarray(expected_returns, dtype=float)
+        self.cov = np.asarray(covariance, dtype=float)
+        n = len(self.mu)
+
+        if self.cov.shape != (n, n):
+            raise ValueError("covariance must be an N x N matrix matching expected_returns")
+
+        cap = 1.0 if max_weight is None else float(max_weight)
+        if cap * n < 1.0:
+            raise ValueError(f"max_weight {cap} is infeasible for {n} assets")
+
+        self.upper = np.full(n, cap)
+        self.lower = np.zeros(n) if long_only else np.full(n, -cap)
+        self.risk_free_rate = risk_free_rate
+
+        self._lambdas = None
+        self._weights = None
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, shrinkage: float = 0.0,
+                     periods_per_year: int = TRADING_DAYS, **kwargs) -> 'PortfolioOptimizer':
+        """
+        Build an optimizer from a DataFrame of periodic returns.
+
+        Args:
+            returns: Returns, one column per asset
+            shrinkage: Weight in [0, 1] to shrink the covariance towards its diagonal
+            periods_per_year: Annualization factor
+        """
+        returns = returns.dropna(how='all')
+        mu = returns.mean() * periods_per_year
+        cov = returns.cov().to_numpy() * periods_per_year
+        if shrinkage:
+            cov = (1 - shrinkage) * cov + shrinkage * np.diag(np.diag(cov))
+        return cls(mu, cov, symbols=list(returns.columns), **kwargs)
+
+    @classmethod
+    def from_portfolio(cls, portfolio, histories: Optional[Dict[str, pd.DataFrame]] = None,
+                       period: str = "1y", **kwargs) -> 'PortfolioOptimizer':
+        """Build an optimizer over a Portfolio's open holdings from cached histories."""
+        closes = {}
+        # Fully sold positions stay in holdings with zero shares
+        for ticker in [t for t, pos in portfolio.holdings.items() if pos.total_shares > 0]:
+            df = histories[ticker] if histories and ticker in histories \
+                else load_cached_history(ticker, period)
+            if df.empty:
+                raise ValueError(f"No cached history available for {ticker}")
+            close = df['Close'].copy()
+            close.index = pd.to_datetime(close.index, utc=True).normalize()
+            closes[ticker] = close[~close.index.duplicated(keep='last')]
+
+        returns = pd.DataFrame(closes).sort_index().ffill().pct_change().dropna()
+        return cls.from_returns(returns, **kwargs)
+
+    def _tie_broken_returns(self) -> np.ndarray:
+        """
+        Expected returns with exact ties broken by a tiny amount in index order.
+
+        Tied assets share one KKT multiplier slope at the maximum-return end,
+        so neither would ever enter the free set; the offsets (far below any
+        reported precision) give each its own event without changing the
+        greedy order or the minimum-variance end, which does not depend on mu.
+        """
+        mu = self.mu.copy()
+        scale = 1e-9 * max(1.0, float(np.abs(mu).max()))
+        order = np.argsort(-mu, kind='stable')
+        ranks = np.empty(len(mu))
+        ranks[order] = np.arange(len(mu))
+        _, group, counts = np.unique(mu, return_inverse=True, return_counts=True)
+        tied = counts[group] > 1
+        mu[tied] -= scale * ranks[tied] / len(mu)
+        return mu
+
+    def _max_return_weights(self, mu: np.ndarray) -> np.ndarray:
+        """Highest-return portfolio under the bounds (greedy fill), plus its free asset."""
+        w = self.lower.copy()
+        remaining = 1.0 - w.sum()
+        free = None
+        for i in np.argsort(-mu, kind='stable'):
+            take = min(self.upper[i] - w[i], remaining)
+            w[i] += take
+            remaining -= take
+            free = i
+            if remaining <= 1e-15:
+                break
+        return w, free
+
+    def _solve_turning_points(self):
+        """
+        Trace the frontier from maximum return (lambda = inf) down to minimum
+        variance (lambda = 0), where lambda is the return/risk trade-off in
+        min 1/2 w'Cw - lambda mu'w.
+        """
+        if self._lambdas is not None:
+            return
+
+        cov, mu, lower, upper = self.cov, self._tie_broken_returns(), self.lower, self.upper
+        n = len(mu)
+        w, first_free = self._max_return_weights(mu)
+        free = np.zeros(n, dtype=bool)
+        free[first_free] = True
+
+        lambdas, weights = [np.inf], [w.copy()]
+        lam, last = np.inf, None
+        for _ in range(4 * n + 10):
+            F, B = np.flatnonzero(free), np.flatnonzero(~free)
+            w_b = w[B]
+
+            # Weights of free assets are affine in lambda: w_F = lambda * alpha + beta
+            rhs = np.column_stack([mu[F], np.ones(len(F)), cov[np.ix_(F, B)] @ w_b])
+            sol = np.linalg.solve(cov[np.ix_(F, F)], rhs)
+            c_ones, c_mu, c_b = sol[:, 1].sum(), sol[:, 0].sum(), sol[:, 2].sum()
+            budget = c_b + 1.0 - w_b.sum()
+            alpha = sol[:, 0] - (c_mu / c_ones) * sol[:, 1]
+            # Project the rounding back out of sum(alpha) = 0: lambda reaches ~1e9
+            # around broken ties, where it would otherwise leak into the budget
+            alpha -= (alpha.sum() / c_ones) * sol[:, 1]
+            beta = -sol[:, 2] + (budget / c_ones) * sol[:, 1]
+            gamma1, gamma0 = c_mu / c_ones, -budget / c_ones
+
+            # Events computed at or above the current lambda are violations
+            # already present here (ties, or a start sitting on a bound), so
+            # they happen now; the asset that just changed may only move again
+            # further down, so rounding cannot undo its event at the same lambda
+            tol = 0.0 if np.isinf(lam) else 1e-10 * max(1.0, abs(lam))
+            candidates = []
+
+            def add(lam_event, i, enters, violated):
+                if i == last:
+                    if lam_event < lam - tol:
+                        candidates.append((lam_event, i, enters))
+                elif lam_event < lam:
+                    candidates.append((lam_event, i, enters))
+                elif violated:
+                    candidates.append((lam, i, enters))
+
+            # Free asset reaching a bound
+            for i, a, b in zip(F, alpha, beta):
+                if a > 1e-12:
+                    add((lower[i] - b) / a, i, False, w[i] <= lower[i] + 1e-9)
+                elif a < -1e-12:
+                    add((upper[i] - b) / a, i, False, w[i] >= upper[i] - 1e-9)
+
+            # Bounded asset whose KKT multiplier changes sign: gradient = lambda * p + q
+            if len(B):
+                cov_bf = cov[np.ix_(B, F)]
+                p = cov_bf @ alpha - mu[B] + gamma1
+                q = cov_bf @ beta + cov[np.ix_(B, B)] @ w_b + gamma0
+                at_upper = w_b >= upper[B] - 1e-12
+                entering = np.where(at_upper, p < -1e-12, p > 1e-12)
+                for j, pj, qj in zip(B[entering], p[entering], q[entering]):
+                    add(-qj / pj, j, True, True)
+
+            lam_next, idx, enters = max(candidates, default=(0.0, None, False))
+            lam_next = min(max(lam_next, 0.0), lam)
+
+            w[F] = lam_next * alpha + beta
+            if idx is not None and lam_next > 0:
+                if enters:
+                    free[idx] = True
+                else:
+                    w[idx] = lower[idx] if alpha[F == idx][0] > 0 else upper[idx]
+                    free[idx] = False
+
+            lambdas.append(lam_next)
+            weights.append(w.copy())
+            lam, last = lam_next, idx
+            if lam_next <= 0:
+                break
+        else:
+            logger.warning("Critical line algorithm did not reach the minimum-variance point")
+
+        self._lambdas = np.array(lambdas)
+        self._weights = np.array(weights)
+
+    def _describe(self, w: np.ndarray) -> Dict:
+        """Summarize a weight vector."""
+        ret = float(self.mu @ w)
+        vol = float(np.sqrt(max(w @ self.cov @ w, 0.0)))
+        sharpe = (ret - self.risk_free_rate) / vol if vol > 0 else float('nan')
+        weights = {s: round(float(x), 6) for s, x in zip(self.symbols, w) if abs(x) > 1e-8}
+        return {
+            'expected_return': round(ret, 6),
+            'volatility': round(vol, 6),
+            'sharpe_ratio': round(sharpe, 4),
+            'weights': weights,
+        }
+
+    def min_variance(self) -> Dict:
+        """Global minimum-variance portfolio."""
+        self._solve_turning_points()
+        return self._describe(self._weights[-1])
+
+    def frontier_weights(self, n_points: int = 50) -> np.ndarray:
+        """
+        Weights of n_points frontier portfolios evenly spaced in expected return,
+        from minimum variance to maximum return (rows in ascending return).
+        """
+        self._solve_turning_points()
+        # Turning points run from max return to min variance; flip to ascending
+        weights = self._weights[::-1]
+        returns = weights @ self.mu
+        returns = np.maximum.accumulate(returns)
+
+        targets = np.linspace(returns[0], returns[-1], n_points)
+        seg = np.clip(np.searchsorted(returns, targets, side='right') - 1, 0, len(returns) - 2)
+        span = returns[seg + 1] - returns[seg]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(span > 0, (targets - returns[seg]) / span, 0.0)
+        t = np.clip(t, 0.0, 1.0)[:, None]
+        return (1 - t) * weights[seg] + t * weights[seg + 1]
+
+    def efficient_frontier(self, n_points: int = 50) -> List[Dict]:
+        """
+        Compute the efficient frontier.
+
+        Args:
+            n_points: Number of frontier points
+
+        Returns:
+            List of portfolios ordered by expected return
+        """
+        return [self._describe(w) for w in self.frontier_weights(n_points)]
+
+    def max_sharpe(self) -> Dict:
+        """
+        Maximum-Sharpe (tangency) portfolio.
+
+        Weights are linear between turning points, so the Sharpe ratio is
+        maximized in closed form on each segment.
+        """
+        self._solve_turning_points()
+        rf = self.risk_free_rate
+        best_w, best_score = self._weights[-1], -np.inf
+
+        for w0, w1 in zip(self._weights[:-1], self._weights[1:]):
+            d = w1 - w0
+            a, b = self.mu @ w0 - rf, self.mu @ d
+            c, e = w0 @ self.cov @ w0, d @ self.cov @ d
+            cd = w0 @ self.cov @ d
+            # d/dt of (a + bt) / sqrt(c + 2 cd t + e t^2) = 0
+            denom = b * cd - a * e
+            ts = [0.0, 1.0]
+            if abs(denom) > 1e-18:
+                ts.append(min(max((a * cd - b * c) / denom, 0.0), 1.0))
+            for t in ts:
+                var = c + 2 * cd * t + e * t * t
+                if var > 0:
+                    score = (a + b * t) / np.sqrt(var)
+                    if score > best_score:
+                        best_w, best_score = w0 + t * d, score
+
+        return self._describe(best_w)
+
+    def summary(self, n_points: int = 50) -> Dict:
+        """JSON-ready frontier plus the minimum-variance and maximum-Sharpe portfolios."""
+        frontier = self.efficient_frontier(n_points)
+        return {
+            'symbols': list(self.symbols),
+            'frontier': [{'expected_return': p['expected_return'], 'volatility': p['volatility'],
+                          'sharpe_ratio': p['sharpe_ratio']} for p in frontier],
+            'min_variance': self.min_variance(),
+            'max_sharpe': self.max_sharpe(),
+            'turning_points': len(self._lambdas),
+        }
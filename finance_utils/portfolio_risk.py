@@ -0,0 +1,204 @@
+"""
+Portfolio Risk Engine
+
+Monte Carlo Value-at-Risk, Conditional VaR and drawdown estimates for the
+current holdings of a Portfolio. Returns are estimated from the cached price
+histories and simulated as correlated multivariate-normal daily returns in
+fixed-size chunks, so memory stays bounded even for 10^6 paths.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from stock_simple import load_cached_history
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+
+class PortfolioRisk:
+    """
+    Monte Carlo risk engine for a Portfolio's current holdings.
+    """
+
+    def __init__(self, portfolio, histories: Optional[Dict[str, pd.DataFrame]] = None,
+                 period: str = "1y", seed: Optional[int] = None,
+                 max_chunk_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the risk engine
+
+        Args:
+            portfolio: Portfolio whose holdings are evaluated
+            histories: Optional {ticker: OHLCV DataFrame}; defaults to the local cache
+            period: Cache period to load when histories are not supplied
+            seed: Fixed seed for reproducible simulations (None = random)
+            max_chunk_bytes: Upper bound on the random draw buffer per chunk
+        """
+        self.portfolio = portfolio
+        self.period = period
+        self.seed = seed
+        self.max_chunk_bytes = max_chunk_bytes
+
+        self.tickers = [t for t, pos in portfolio.holdings.items() if pos.total_shares > 0]
+        self.shares = np.array(
+            [portfolio.holdings[t].total_shares for t in self.tickers], dtype=float)
+
+        self._histories = histories
+        self._returns = None
+        self._mean = None
+        self._cov = None
+        self._prices = None
+
+    def _load_closes(self) -> pd.DataFrame:
+        """Collect aligned close prices for all held tickers."""
+        closes = {}
+        for ticker in self.tickers:
+            if self._histories is not None and ticker in self._histories:
+                df = self._histories[ticker]
+            else:
+                df = load_cached_history(ticker, self.period)
+
+            if df.empty or 'Close' not in df.columns:
+                raise ValueError(f"No cached history available for {ticker}")
+            close = df['Close'].copy()
+            close.index = pd.to_datetime(close.index, utc=True).normalize()
+            closes[ticker] = close[~close.index.duplicated(keep='last')]
+
+        return pd.DataFrame(closes).sort_index().ffill().dropna()
+
+    def _estimate(self):
+        """Estimate the mean vector and covariance matrix of daily returns once."""
+        if self._cov is not None:
+            return
+
+        closes = self._load_closes()
+        if len(closes) < 3:
+            raise ValueError("Not enough overlapping history to estimate covariance")
+
+        returns = closes.pct_change().dropna()
+        self._returns = returns
+        self._prices = closes.iloc[-1].to_numpy(dtype=float)
+        self._mean = returns.mean().to_numpy()
+        self._cov = np.atleast_2d(returns.cov().to_numpy())
+
+        logger.info(f"Estimated covariance for {len(self.tickers)} holdings "
+                    f"from {len(returns)} daily returns")
+
+    def covariance(self) -> pd.DataFrame:
+        """Return the daily return covariance matrix of the holdings."""
+        self._estimate()
+        return pd.DataFrame(self._cov, index=self.tickers, columns=self.tickers)
+
+    def _cholesky(self) -> np.ndarray:
+        """Cholesky factor of the covariance, with a small ridge if it is singular."""
+        cov = self._cov
+        ridge = 0.0
+        for _ in range(6):
+            try:
+                return np.linalg.cholesky(cov + ridge * np.eye(len(cov)))
+            except np.linalg.LinAlgError:
+                ridge = max(ridge * 10, 1e-12 * max(np.trace(cov), 1e-12))
+        raise ValueError("Covariance matrix is not positive semi-definite")
+
+    def simulate(self, n_paths: int = 100_000, horizon_days: int = 10) -> Dict[str, np.ndarray]:
+        """
+        Simulate correlated return paths for the current holdings.
+
+        Paths are drawn chunk by chunk; only the terminal P&L and the maximum
+        drawdown of each path are kept.
+
+        Args:
+            n_paths: Number of Monte Carlo paths
+            horizon_days: Number of trading days per path
+
+        Returns:
+            Dictionary with 'pnl' and 'max_drawdown' arrays of length n_paths
+        """
+        if not self.tickers:
+            raise ValueError("Portfolio has no holdings to evaluate")
+        if n_paths <= 0 or horizon_days <= 0:
+            raise ValueError("n_paths and horizon_days must be positive")
+
+        self._estimate()
+        chol_t = self._cholesky().T
+        position_values = self.shares * self._prices
+        initial_value = position_values.sum()
+        n_assets = len(self.tickers)
+
+        bytes_per_path = horizon_days * n_assets * 8
+        chunk_size = int(max(1, min(n_paths, self.max_chunk_bytes // bytes_per_path)))
+
+        rng = np.random.default_rng(self.seed)
+        pnl = np.empty(n_paths)
+        max_drawdown = np.empty(n_paths)
+
+        for start in range(0, n_paths, chunk_size):
+            stop = min(start + chunk_size, n_paths)
+            z = rng.standard_normal((stop - start, horizon_days, n_assets))
+            asset_returns = z @ chol_t
+            asset_returns += self._mean
+
+            # Value of each position over the horizon, then of the whole book
+            np.log1p(np.maximum(asset_returns, -0.999999), out=asset_returns)
+            np.cumsum(asset_returns, axis=1, out=asset_returns)
+            np.exp(asset_returns, out=asset_returns)
+            values = asset_returns @ position_values
+
+            pnl[start:stop] = values[:, -1] - initial_value
+            peaks = np.maximum.accumulate(np.maximum(values, initial_value), axis=1)
+            max_drawdown[start:stop] = ((peaks - values) / peaks).max(axis=1)
+
+        return {'pnl': pnl, 'max_drawdown': max_drawdown}
+
+    def report(self, n_paths: int = 100_000, horizon_days: int = 10,
+               confidence: float = 0.95) -> Dict:
+        """
+        Compute VaR, CVaR and the drawdown distribution for the holdings.
+
+        Args:
+            n_paths: Number of Monte Carlo paths
+            horizon_days: Risk horizon in trading days
+            confidence: Confidence level for VaR/CVaR (e.g. 0.95 or 0.99)
+
+        Returns:
+            Dictionary with risk figures in portfolio currency and fractions
+        """
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+
+        results = self.simulate(n_paths=n_paths, horizon_days=horizon_days)
+        losses = -results['pnl']
+        drawdowns = results['max_drawdown']
+        position_values = self.shares * self._prices
+        initial_value = float(position_values.sum())
+
+        var = float(np.quantile(losses, confidence))
+        tail = losses[losses >= var]
+        cvar = float(tail.mean()) if tail.size else var
+
+        daily_vol = float(np.sqrt(position_values @ self._cov @ position_values)) / initial_value
+
+        return {
+            'tickers': list(self.tickers),
+            'portfolio_value': round(initial_value, 2),
+            'horizon_days': horizon_days,
+            'confidence': confidence,
+            'n_paths': n_paths,
+            'var': round(var, 2),
+            'cvar': round(cvar, 2),
+            'var_percent': round(var / initial_value * 100, 4),
+            'cvar_percent': round(cvar / initial_value * 100, 4),
+            'annualized_volatility': round(daily_vol * np.sqrt(TRADING_DAYS), 4),
+            'expected_pnl': round(float(results['pnl'].mean()), 2),
+            'max_drawdown': {
+                'mean': round(float(drawdowns.mean()), 4),
+                'median': round(float(np.median(drawdowns)), 4),
+                'p95': round(float(np.quantile(drawdowns, 0.95)), 4),
+                'p99': round(float(np.quantile(drawdowns, 0.99)), 4),
+            },
+            'seed': self.seed,
+        }
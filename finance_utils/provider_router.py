@@ -0,0 +1,250 @@
+"""
+Provider Router
+
+Registry of market data providers behind the normalized DataProvider
+interface. For every request the router ranks providers by recent latency
+(EWMA), error rate and remaining quota, fails over on errors, backs off from
+providers that returned 429, and hedges a slow request to the next provider
+once the primary exceeds its p95 latency.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from providers import (DataProvider, ProviderError, RateLimitError, YFinanceProvider,
+                       AlphaVantageProvider, TwelveDataProvider)
+
+logger = logging.getLogger(__name__)
+
+# Methods whose DataProvider default is a placeholder rather than real data;
+# they are only routed to providers that override them
+STUB_METHODS = {'get_info'}
+
+
+class ProviderStats:
+    """Rolling health figures for one provider."""
+
+    def __init__(self, alpha: float = 0.2, window: int = 100):
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.latency_ewma = latency if self.latency_ewma is None else \
+                self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+            self.error_ewma *= (1 - self.alpha)
+
+    def record_failure(self, latency: float, cooldown: float = 0.0):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.error_ewma = self.alpha + (1 - self.alpha) * self.error_ewma
+            if cooldown > 0:
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < 5:
+                return None
+            return float(np.percentile(self.latencies, 95))
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+
+class ProviderRouter(DataProvider):
+    """
+    Latency-aware failover across registered providers.
+
+    Args:
+        providers: Providers in preference order (ties are broken by order)
+        hedge: Send a duplicate request to the next provider when the primary
+               is slower than its p95 latency
+        default_deadline: Hedge deadline (seconds) before enough latency samples exist
+        rate_limit_cooldown: Seconds to skip a provider after a 429 without Retry-After
+        error_penalty: How strongly the error rate inflates a provider's cost
+        max_workers: Threads used for hedged requests
+    """
+
+    name = 'router'
+
+    def __init__(self, providers: Optional[List[DataProvider]] = None, hedge: bool = True,
+                 default_deadline: float = 2.0, rate_limit_cooldown: float = 60.0,
+                 error_penalty: float = 4.0, max_workers: int = 8):
+        self.hedge = hedge
+        self.default_deadline = default_deadline
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.error_penalty = error_penalty
+        self.providers: Dict[str, DataProvider] = {}
+        self.stats: Dict[str, ProviderStats] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='provider-hedge')
+        for provider in providers or []:
+            self.register(provider)
+
+    def register(self, provider: DataProvider):
+        """Add a provider (later registrations rank lower on ties)."""
+        self.providers[provider.name] = provider
+        self.stats[provider.name] = ProviderStats()
+
+    def remaining_quota(self) -> Optional[int]:
+        quotas = [p.remaining_quota() for p in self.providers.values()]
+        if any(q is None for q in quotas):
+            return None
+        return sum(quotas)
+
+    def _cost(self, name: str) -> float:
+        """Expected cost of a request; lower is better."""
+        stats = self.stats[name]
+        known = [s.latency_ewma for s in self.stats.values() if s.latency_ewma is not None]
+        # Untried providers are assumed as fast as the best known one
+        latency = stats.latency_ewma if stats.latency_ewma is not None else min(known, default=0.0)
+        return latency * (1.0 + self.error_penalty * stats.error_ewma)
+
+    def ranked(self) -> List[str]:
+        """Available providers, best first."""
+        order = {name: i for i, name in enumerate(self.providers)}
+        available = []
+        for name, provider in self.providers.items():
+            if self.stats[name].cooling_down():
+                continue
+            quota = provider.remaining_quota()
+            if quota is not None and quota <= 0:
+                continue
+            available.append(name)
+        return sorted(available, key=lambda n: (self._cost(n), order[n]))
+
+    def _timed_call(self, name: str, method: str, args: tuple, kwargs: dict):
+        """Call one provider and record its latency/outcome."""
+        start = time.perf_counter()
+        try:
+            result = getattr(self.providers[name], method)(*args, **kwargs)
+        except RateLimitError as e:
+            cooldown = e.retry_after if e.retry_after else self.rate_limit_cooldown
+            self.stats[name].record_failure(time.perf_counter() - start, cooldown=cooldown)
+            raise
+        except Exception:
+            self.stats[name].record_failure(time.perf_counter() - start)
+            raise
+
+        if isinstance(result, pd.DataFrame) and result.empty:
+            self.stats[name].record_failure(time.perf_counter() - start)
+            raise ProviderError(f"{name} returned no data")
+        self.stats[name].record_success(time.perf_counter() - start)
+        return result
+
+    def _route(self, method: str, *args, **kwargs):
+        """Run a request on the best provider with failover and hedging."""
+        candidates = self.ranked()
+        if method in STUB_METHODS:
+            candidates = [n for n in candidates if self.providers[n].implements(method)]
+        if not candidates:
+            raise ProviderError("No data provider available (all rate limited or out of quota)")
+
+        errors = []
+        pending = {}
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name = candidates[next_index]
+            next_index += 1
+            future = self._executor.submit(self._timed_call, name, method, args, kwargs)
+            pending[future] = name
+
+        launch()
+        while pending:
+            primary = candidates[next_index - 1]
+            deadline = self.stats[primary].p95() or self.default_deadline
+            can_hedge = self.hedge and next_index < len(candidates)
+            done, _ = wait(pending, timeout=deadline if can_hedge else None,
+                           return_when=FIRST_COMPLETED)
+
+            if not done:
+                logger.info(f"Hedging {method} to {candidates[next_index]} "
+                            f"after {deadline:.2f}s on {primary}")
+                launch()
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+                    logger.warning(f"Provider {name} failed for {method}: {e}")
+                    continue
+                for other in pending:
+                    other.cancel()
+                if isinstance(result, dict):
+                    result = {**result, 'provider': name}
+                return result
+
+            # Everything in flight failed: fail over to the next provider
+            if not pending and next_index < len(candidates):
+                launch()
+
+        raise ProviderError(f"All providers failed for {method}: " + "; ".join(errors))
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        return self._route('get_history', symbol, period=period, interval=interval)
+
+    def get_quote(self, symbol: str) -> Dict:
+        return self._route('get_quote', symbol)
+
+    def get_info(self, symbol: str) -> Dict:
+        if not self.implements('get_info'):
+            return super().get_info(symbol)
+        return self._route('get_info', symbol)
+
+    def implements(self, method: str) -> bool:
+        return any(p.implements(method) for p in self.providers.values())
+
+    def status(self) -> Dict:
+        """JSON-ready health table for the dashboard."""
+        ranking = self.ranked()
+        report = {}
+        for name, provider in self.providers.items():
+            stats = self.stats[name]
+            p95 = stats.p95()
+            report[name] = {
+                'rank': ranking.index(name) + 1 if name in ranking else None,
+                'latency_ms': round(stats.latency_ewma * 1000, 1) if stats.latency_ewma is not None else None,
+                'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+                'error_rate': round(stats.error_ewma, 3),
+                'requests': stats.requests,
+                'failures': stats.failures,
+                'remaining_quota': provider.remaining_quota(),
+                'cooling_down': stats.cooling_down(),
+            }
+        return report
+
+
+def default_router(**kwargs) -> ProviderRouter:
+    """
+    Router over every configured provider: Yahoo always, Alpha Vantage and
+    TwelveData when their API keys are set.
+    """
+    providers = [YFinanceProvider()]
+    alpha_vantage = AlphaVantageProvider()
+    if alpha_vantage.api_key:
+        providers.append(alpha_vantage)
+    twelvedata = TwelveDataProvider()
+    if twelvedata.api_key:
+        providers.append(twelvedata)
+    return ProviderRouter(providers, **kwargs)
@@ -0,0 +1,549 @@
+"""
+Market Data Providers
+
+A small pluggable interface over the market data sources used in this repo,
+plus record/replay support for offline load testing:
+
+- DataProvider: normalized history/quote/info interface
+- YFinanceProvider, AlphaVantageProvider, TwelveDataProvider: live sources
+- FixtureStore: on-disk store of recorded responses
+- RecordingProvider / ReplayProvider: record provider calls once, replay them
+  with configurable latency, error rate and 429 injection
+- RecordingSession / ReplaySession: the same at the HTTP level, drop-in
+  replacements for requests.Session in YahooFinanceClient and ForexClient
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Query parameters that must never end up in fixture keys or files
+SECRET_PARAMS = {'apikey', 'api_key', 'crumb', 'token'}
+
+
+class ProviderError(Exception):
+    """A provider failed to return data."""
+
+
+class RateLimitError(ProviderError):
+    """The provider rejected the request with HTTP 429."""
+
+    def __init__(self, message: str = "Rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FixtureNotFound(ProviderError):
+    """No recorded response exists for a replayed request."""
+
+
+def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize a price frame to OHLCV columns on a sorted UTC DatetimeIndex."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+    df = df.rename(columns=lambda c: str(c).strip().title())
+    keep = [c for c in OHLCV_COLUMNS if c in df.columns]
+    df = df[keep].copy()
+    df.index = pd.to_datetime(df.index, utc=True)
+    df.index.name = 'Date'
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366,
+               '2y': 731, '5y': 1827, '10y': 3653}
+
+
+def period_to_days(period: str) -> Optional[int]:
+    """Calendar days covered by a yfinance-style period ('max' -> None)."""
+    if period in PERIOD_DAYS:
+        return PERIOD_DAYS[period]
+    if period == 'ytd':
+        now = pd.Timestamp.now()
+        return (now - pd.Timestamp(year=now.year, month=1, day=1)).days + 1
+    return None
+
+
+def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Keep the bars covered by period (frames must have a UTC index)."""
+    days = period_to_days(period)
+    if days is None or df.empty:
+        return df
+    return df[df.index >= pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)]
+
+
+class CallQuota:
+    """
+    Sliding-window request quota, e.g. [(8, 60), (800, 86400)] for 8/minute
+    and 800/day.
+    """
+
+    def __init__(self, limits: Sequence[Tuple[int, float]]):
+        self.limits = list(limits)
+        horizon = max((seconds for _, seconds in self.limits), default=0)
+        self._horizon = horizon
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._calls and now - self._calls[0] >= self._horizon:
+            self._calls.popleft()
+
+    def record(self):
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            self._calls.append(now)
+
+    def remaining(self) -> Optional[int]:
+        """Requests left in the tightest window (None if unlimited)."""
+        if not self.limits:
+            return None
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            left = []
+            for limit, seconds in self.limits:
+                used = sum(1 for t in self._calls if now - t < seconds)
+                left.append(limit - used)
+            return max(min(left), 0)
+
+
+class DataProvider:
+    """
+    Base class for market data providers.
+
+    Subclasses implement get_history and may override get_quote/get_info;
+    the default quote is derived from the last two daily bars.
+    """
+
+    name = 'base'
+    quota: Optional[CallQuota] = None
+
+    def remaining_quota(self) -> Optional[int]:
+        """Requests left before the provider's rate limit (None if unknown)."""
+        return self.quota.remaining() if self.quota is not None else None
+
+    def implements(self, method: str) -> bool:
+        """Whether the provider overrides a method instead of using the base default."""
+        return getattr(type(self), method) is not getattr(DataProvider, method)
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        """Return normalized OHLCV history (see normalize_ohlcv)."""
+        raise NotImplementedError
+
+    def get_quote(self, symbol: str) -> Dict:
+        """Return the latest quote for a symbol."""
+        history = self.get_history(symbol, period='5d')
+        if history.empty:
+            raise ProviderError(f"No quote data for {symbol}")
+        last = history.iloc[-1]
+        previous = history['Close'].iloc[-2] if len(history) > 1 else last['Close']
+        change = float(last['Close'] - previous)
+        return {
+            'symbol': symbol.upper(),
+            'price': float(last['Close']),
+            'previous_close': float(previous),
+            'change': change,
+            'change_percent': change / float(previous) * 100 if previous else 0.0,
+            'volume': int(last.get('Volume', 0) or 0),
+            'timestamp': history.index[-1].isoformat(),
+            'provider': self.name,
+        }
+
+    def get_info(self, symbol: str) -> Dict:
+        """Return company/instrument metadata (may be minimal)."""
+        return {'symbol': symbol.upper(), 'shortName': symbol.upper()}
+
+
+class YFinanceProvider(DataProvider):
+    """Live data from yfinance."""
+
+    name = 'yahoo'
+
+    def _ticker(self, symbol: str):
+        import yfinance as yf
+        return yf.Ticker(symbol.upper())
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        try:
+            df = self._ticker(symbol).history(period=period, interval=interval)
+        except Exception as e:
+            if '429' in str(e) or 'Too Many Requests' in str(e):
+                raise RateLimitError(str(e)) from e
+            raise ProviderError(f"yfinance history failed for {symbol}: {e}") from e
+        if df.empty:
+            raise ProviderError(f"No history returned for {symbol}")
+        return normalize_ohlcv(df)
+
+    def get_info(self, symbol: str) -> Dict:
+        try:
+            info = self._ticker(symbol).info
+        except Exception as e:
+            raise ProviderError(f"yfinance info failed for {symbol}: {e}") from e
+        return info or super().get_info(symbol)
+
+
+class AlphaVantageProvider(DataProvider):
+    """Daily stock data from Alpha Vantage (TIME_SERIES_DAILY / GLOBAL_QUOTE)."""
+
+    name = 'alpha_vantage'
+
+    def __init__(self, api_key: Optional[str] = None, limits=((5, 60), (500, 86400))):
+        self.api_key = api_key or os.getenv('ALPHA_VANTAGE_API_KEY')
+        self.quota = CallQuota(limits)
+        self._ts = None
+
+    def _time_series(self):
+        if not self.api_key:
+            raise ProviderError("No Alpha Vantage API key configured")
+        if self._ts is None:
+            from alpha_vantage.timeseries import TimeSeries
+            self._ts = TimeSeries(key=self.api_key, output_format='pandas')
+        return self._ts
+
+    def _call(self, method: str, **kwargs):
+        ts = self._time_series()
+        self.quota.record()
+        try:
+            return getattr(ts, method)(**kwargs)
+        except ValueError as e:
+            # alpha_vantage raises ValueError for API notes/limit messages
+            if 'call frequency' in str(e) or 'rate limit' in str(e).lower():
+                raise RateLimitError(str(e), retry_after=60) from e
+            raise ProviderError(f"Alpha Vantage error: {e}") from e
+        except Exception as e:
+            raise ProviderError(f"Alpha Vantage request failed: {e}") from e
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        if interval != '1d':
+            raise ProviderError(f"Alpha Vantage provider only serves daily bars, not {interval}")
+        days = period_to_days(period)
+        outputsize = 'compact' if days is not None and days <= 140 else 'full'
+        data, _ = self._call('get_daily', symbol=symbol.upper(), outputsize=outputsize)
+        data.columns = [c.split('. ', 1)[-1] for c in data.columns]
+        return slice_period(normalize_ohlcv(data), period)
+
+    def get_quote(self, symbol: str) -> Dict:
+        data, _ = self._call('get_quote_endpoint', symbol=symbol.upper())
+        # Columns look like '05. price', '08. previous close'
+        row = {c.split('. ', 1)[-1]: v for c, v in data.iloc[0].items()}
+        price, previous = float(row['price']), float(row['previous close'])
+        return {
+            'symbol': symbol.upper(),
+            'price': price,
+            'previous_close': previous,
+            'change': price - previous,
+            'change_percent': (price - previous) / previous * 100 if previous else 0.0,
+            'volume': int(float(row['volume'])),
+            'timestamp': str(row['latest trading day']),
+            'provider': self.name,
+        }
+
+
+class TwelveDataProvider(DataProvider):
+    """Stock/ETF data from TwelveData (free tier: 8 requests/minute, 800/day)."""
+
+    name = 'twelvedata'
+
+    INTERVALS = {'1d': '1day', '1h': '1h', '5m': '5min', '1wk': '1week'}
+
+    def __init__(self, api_key: Optional[str] = None, limits=((8, 60), (800, 86400))):
+        self.api_key = api_key or os.getenv('TWELVEDATA_API_KEY') or os.getenv('API_KEY')
+        self.quota = CallQuota(limits)
+        self._client = None
+
+    def _td(self):
+        if not self.api_key:
+            raise ProviderError("No TwelveData API key configured")
+        if self._client is None:
+            from twelvedata import TDClient
+            self._client = TDClient(apikey=self.api_key)
+        return self._client
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        td_interval = self.INTERVALS.get(interval)
+        if td_interval is None:
+            raise ProviderError(f"Unsupported TwelveData interval {interval}")
+        days = period_to_days(period) or 5000
+        outputsize = min(5000, days if interval == '1d' else days * 24)
+
+        client = self._td()
+        self.quota.record()
+        try:
+            df = client.time_series(symbol=symbol.upper(), interval=td_interval,
+                                    outputsize=outputsize).as_pandas()
+        except Exception as e:
+            if '429' in str(e) or 'run out of API credits' in str(e):
+                raise RateLimitError(str(e), retry_after=60) from e
+            raise ProviderError(f"TwelveData request failed: {e}") from e
+        return slice_period(normalize_ohlcv(df), period)
+
+
+class FixtureStore:
+    """
+    Recorded responses on disk, one JSON file per request.
+
+    Keys are hashed from (namespace, method, arguments); secrets are stripped
+    from arguments before hashing so fixtures can be committed.
+    """
+
+    def __init__(self, directory: Union[str, Path] = 'fixtures'):
+        self.directory = Path(directory)
+        self._memory: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(namespace: str, method: str, **kwargs) -> str:
+        clean = {k: v for k, v in kwargs.items() if k not in SECRET_PARAMS}
+        raw = json.dumps([namespace, method, clean], sort_keys=True, default=str)
+        return f"{namespace}/{hashlib.sha1(raw.encode()).hexdigest()[:16]}"
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def put(self, key: str, payload: Any, description: str = ''):
+        """Store a payload (DataFrame, dict/list or HTTP response record)."""
+        if isinstance(payload, pd.DataFrame):
+            record = {'kind': 'frame',
+                      'data': payload.to_json(orient='split', date_format='iso', date_unit='us')}
+        else:
+            record = {'kind': 'json', 'data': payload}
+        record['request'] = description
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(record, f, indent=1, default=str)
+        with self._lock:
+            self._memory[key] = payload
+
+    def get(self, key: str) -> Any:
+        """Load a payload, raising FixtureNotFound if it was never recorded."""
+        with self._lock:
+            if key in self._memory:
+                payload = self._memory[key]
+                return payload.copy() if isinstance(payload, pd.DataFrame) else payload
+
+        path = self._path(key)
+        if not path.exists():
+            raise FixtureNotFound(f"No fixture recorded for {key}")
+        with open(path) as f:
+            record = json.load(f)
+
+        if record['kind'] == 'frame':
+            payload = pd.read_json(io.StringIO(record['data']), orient='split')
+            payload.index = pd.to_datetime(payload.index, utc=True)
+            payload.index.name = 'Date'
+        else:
+            payload = record['data']
+        with self._lock:
+            self._memory[key] = payload
+        return payload.copy() if isinstance(payload, pd.DataFrame) else payload
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or self._path(key).exists()
+
+
+class FaultInjector:
+    """
+    Configurable latency, error rate and 429 injection.
+
+    Args:
+        latency: Mean added latency in seconds
+        jitter: Uniform jitter (+/-) around the latency
+        error_rate: Probability of a generic failure
+        rate_limit_rate: Probability of a 429 response
+        rate_limit_after: Inject 429s deterministically once this many calls
+                          were made within rate_limit_window seconds
+        rate_limit_window: Window for rate_limit_after
+        retry_after: Retry-After seconds reported on 429
+        seed: Random seed for reproducible runs
+        sleep: Sleep function (swap for a fake clock in tests)
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, rate_limit_after: Optional[int] = None,
+                 rate_limit_window: float = 60.0, retry_after: float = 1.0,
+                 seed: Optional[int] = None, sleep: Callable[[float], None] = time.sleep):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rate_limit_after = rate_limit_after
+        self.rate_limit_window = rate_limit_window
+        self.retry_after = retry_after
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = []
+        self.stats = {'calls': 0, 'errors': 0, 'rate_limited': 0}
+
+    def inject(self) -> Optional[str]:
+        """Apply latency, then return 'rate_limit', 'error' or None."""
+        with self._lock:
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter) if self.latency else 0.0
+            roll = self._rng.random()
+            now = time.monotonic()
+            self._recent = [t for t in self._recent if now - t < self.rate_limit_window]
+            self._recent.append(now)
+            burst = self.rate_limit_after is not None and len(self._recent) > self.rate_limit_after
+            self.stats['calls'] += 1
+
+            if burst or roll < self.rate_limit_rate:
+                outcome = 'rate_limit'
+                self.stats['rate_limited'] += 1
+            elif roll < self.rate_limit_rate + self.error_rate:
+                outcome = 'error'
+                self.stats['errors'] += 1
+            else:
+                outcome = None
+
+        if delay > 0:
+            self.sleep(delay)
+        return outcome
+
+
+class RecordingProvider(DataProvider):
+    """Wraps a live provider and records every successful response."""
+
+    def __init__(self, inner: DataProvider, store: FixtureStore):
+        self.inner = inner
+        self.store = store
+        self.name = inner.name
+
+    def implements(self, method: str) -> bool:
+        return self.inner.implements(method)
+
+    def _record(self, method: str, call: Callable, **kwargs):
+        result = call(**kwargs)
+        key = FixtureStore.make_key(self.name, method, **kwargs)
+        self.store.put(key, result, description=f"{self.name}.{method}({kwargs})")
+        return result
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        return self._record('get_history', self.inner.get_history,
+                            symbol=symbol, period=period, interval=interval)
+
+    def get_quote(self, symbol: str) -> Dict:
+        return self._record('get_quote', self.inner.get_quote, symbol=symbol)
+
+    def get_info(self, symbol: str) -> Dict:
+        return self._record('get_info', self.inner.get_info, symbol=symbol)
+
+
+class ReplayProvider(DataProvider):
+    """
+    Serves recorded provider responses with injected faults.
+
+    Args:
+        store: Fixture store with recorded responses
+        name: Name of the recorded provider (fixture namespace)
+        **fault_options: See FaultInjector
+    """
+
+    def __init__(self, store: FixtureStore, name: str = 'yahoo', **fault_options):
+        self.store = store
+        self.name = name
+        self.faults = FaultInjector(**fault_options)
+
+    @property
+    def stats(self) -> Dict:
+        return self.faults.stats
+
+    def _replay(self, method: str, **kwargs):
+        outcome = self.faults.inject()
+        if outcome == 'rate_limit':
+            raise RateLimitError(f"{self.name} rate limited (injected)",
+                                 retry_after=self.faults.retry_after)
+        if outcome == 'error':
+            raise ProviderError(f"{self.name} {method} failed (injected)")
+        return self.store.get(FixtureStore.make_key(self.name, method, **kwargs))
+
+    def get_history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        return self._replay('get_history', symbol=symbol, period=period, interval=interval)
+
+    def get_quote(self, symbol: str) -> Dict:
+        return self._replay('get_quote', symbol=symbol)
+
+    def get_info(self, symbol: str) -> Dict:
+        return self._replay('get_info', symbol=symbol)
+
+
+def _response_key(method: str, url: str, params: Optional[Dict]) -> str:
+    clean = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+    return FixtureStore.make_key('http', method.upper(), url=url, params=clean)
+
+
+class RecordingSession(requests.Session):
+    """requests.Session that records every response into a FixtureStore."""
+
+    def __init__(self, store: FixtureStore):
+        super().__init__()
+        self.store = store
+
+    def request(self, method, url, params=None, **kwargs):
+        response = super().request(method, url, params=params, **kwargs)
+        record = {
+            'status_code': response.status_code,
+            'headers': {k: v for k, v in response.headers.items()
+                        if k.lower() in ('content-type', 'retry-after')},
+            'text': response.text,
+        }
+        self.store.put(_response_key(method, url, params), record,
+                       description=f"{method.upper()} {url}")
+        return response
+
+
+class ReplaySession(requests.Session):
+    """
+    requests.Session that serves recorded responses without network access.
+
+    Unrecorded requests get a 404; injected failures become 429 (with
+    Retry-After) or 503 responses, so client retry logic is exercised as-is.
+    """
+
+    def __init__(self, store: FixtureStore, **fault_options):
+        super().__init__()
+        self.store = store
+        self.faults = FaultInjector(**fault_options)
+
+    @property
+    def stats(self) -> Dict:
+        return self.faults.stats
+
+    def request(self, method, url, params=None, **kwargs):
+        outcome = self.faults.inject()
+        if outcome == 'rate_limit':
+            record = {'status_code': 429, 'text': 'Too Many Requests',
+                      'headers': {'Retry-After': str(self.faults.retry_after)}}
+        elif outcome == 'error':
+            record = {'status_code': 503, 'text': 'Service Unavailable', 'headers': {}}
+        else:
+            try:
+                record = self.store.get(_response_key(method, url, params))
+            except FixtureNotFound:
+                record = {'status_code': 404, 'text': 'No fixture recorded', 'headers': {}}
+
+        response = requests.Response()
+        response.status_code = record['status_code']
+        response._content = record['text'].encode('utf-8')
+        response.headers.update(record.get('headers', {}))
+        response.encoding = 'utf-8'
+        response.url = url
+        response.request = requests.Request(method, url, params=params).prepare()
+        return response
@@ -0,0 +1,324 @@
+"""
+Quota Scheduler
+
+Spend a daily API budget (Alpha Vantage's free tier: 500 calls a day, 5 a
+minute) where it matters most:
+
+- QuotaLedger keeps the day's usage and the last minute's call times in a
+  JSON file, so the count survives restarts and is shared by every process
+  using the same key.
+- RequestScheduler runs queued calls one at a time in priority order.
+  Interactive requests jump ahead of background refreshes, background work
+  waits for off-peak hours and never eats into a reserve kept for
+  interactive use, and a request queued twice for the same key is merged
+  into one call whose result every caller receives.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from session_store import file_lock, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEDGER_PATH = Path(os.getenv('ALPHA_VANTAGE_LEDGER', './.stock_cache/alpha_vantage_quota.json'))
+
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', NORMAL: 'normal', BACKGROUND: 'background'}
+
+
+class QuotaExhausted(Exception):
+    """The daily budget is spent; the request was not sent."""
+
+
+class QuotaLedger:
+    """
+    Persistent daily and per-minute call counter.
+
+    Args:
+        path: JSON file holding the counters (a '.lock' sibling guards it)
+        daily_limit: Calls allowed per UTC day
+        per_minute: Calls allowed in any 60 second window
+        clock: Wall-clock time source (injectable for tests)
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_LEDGER_PATH, daily_limit: int = 500,
+                 per_minute: int = 5, clock: Callable[[], float] = time.time):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.daily_limit = daily_limit
+        self.per_minute = per_minute
+        self.clock = clock
+
+    def _today(self, now: float) -> str:
+        return datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%d')
+
+    def _read(self, now: float) -> Dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Resetting unreadable quota ledger {self.path}: {e}")
+            data = {}
+        if data.get('date') != self._today(now):
+            data = {'date': self._today(now), 'used': 0, 'recent': []}
+        data['recent'] = [t for t in data.get('recent', []) if t > now - 60]
+        return data
+
+    def used_today(self) -> int:
+        with file_lock(self.lock_path):
+            return self._read(self.clock())['used']
+
+    def remaining(self) -> int:
+        return max(0, self.daily_limit - self.used_today())
+
+    def seconds_until_reset(self) -> float:
+        now = self.clock()
+        tomorrow = datetime.fromtimestamp(now, timezone.utc).date() + timedelta(days=1)
+        midnight = datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=timezone.utc)
+        return midnight.timestamp() - now
+
+    def wait_time(self) -> float:
+        """Seconds until a call may be made (inf when the day's budget is spent)."""
+        with file_lock(self.lock_path):
+            now = self.clock()
+            data = self._read(now)
+        if data['used'] >= self.daily_limit:
+            return float('inf')
+        if len(data['recent']) >= self.per_minute:
+            return max(0.0, min(data['recent']) + 60 - now)
+        return 0.0
+
+    def try_acquire(self) -> bool:
+        """Record one call if both limits allow it right now."""
+        with file_lock(self.lock_path):
+            now = self.clock()
+            data = self._read(now)
+            if data['used'] >= self.daily_limit or len(data['recent']) >= self.per_minute:
+                return False
+            data['used'] += 1
+            data['recent'].append(now)
+            write_json_atomic(self.path, data)
+            return True
+
+    def status(self) -> Dict:
+        with file_lock(self.lock_path):
+            data = self._read(self.clock())
+        return {
+            'date': data['date'],
+            'used': data['used'],
+            'remaining': max(0, self.daily_limit - data['used']),
+            'daily_limit': self.daily_limit,
+            'last_minute': len(data['recent']),
+            'per_minute': self.per_minute,
+        }
+
+
+class _Job:
+    __slots__ = ('key', 'func', 'priority', 'seq', 'future', 'submitted')
+
+    def __init__(self, key, func, priority, seq, submitted):
+        self.key = key
+        self.func = func
+        self.priority = priority
+        self.seq = seq
+        self.future = Future()
+        self.submitted = submitted
+
+
+class RequestScheduler:
+    """
+    Priority queue in front of a QuotaLedger.
+
+    Args:
+        ledger: Budget to spend
+        reserve: Calls per day kept for interactive/normal requests;
+                 background work stops when only this many remain
+        peak_hours: UTC hour range [start, end) during which background work
+                    is deferred (default covers the US trading session)
+        clock: Wall-clock time source (injectable for tests)
+        autostart: Start the worker thread on first submit
+    """
+
+    def __init__(self, ledger: QuotaLedger, reserve: int = 50, peak_hours: Tuple[int, int] = (13, 21),
+                 clock: Callable[[], float] = time.time, autostart: bool = True):
+        self.ledger = ledger
+        self.reserve = reserve
+        self.peak_hours = peak_hours
+        self.clock = clock
+        self.autostart = autostart
+        self._heap = []
+        self._jobs: Dict[Hashable, _Job] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._stopped = False
+        self.completed = 0
+        self.merged = 0
+
+    def is_off_peak(self) -> bool:
+        hour = datetime.fromtimestamp(self.clock(), timezone.utc).hour
+        start, end = self.peak_hours
+        return not (start <= hour < end)
+
+    def seconds_until_off_peak(self) -> float:
+        now = datetime.fromtimestamp(self.clock(), timezone.utc)
+        end = now.replace(hour=self.peak_hours[1] % 24, minute=0, second=0, microsecond=0)
+        if end <= now:
+            end += timedelta(days=1)
+        return (end - now).total_seconds()
+
+    def submit(self, key: Hashable, func: Callable[[], Any], priority: int = NORMAL) -> Future:
+        """
+        Queue a call, merging it with an identical queued one.
+
+        Args:
+            key: Identity of the request, e.g. ('TIME_SERIES_DAILY', 'AAPL')
+            func: Zero-argument callable that makes exactly one API call
+            priority: INTERACTIVE, NORMAL or BACKGROUND
+
+        Returns:
+            Future resolved with func's result
+        """
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is not None:
+                self.merged += 1
+                if priority < job.priority:
+                    # Re-push with the better priority; the old heap entry goes stale
+                    job.priority = priority
+                    job.seq = next(self._seq)
+                    heapq.heappush(self._heap, (job.priority, job.seq, key))
+                    self._cond.notify_all()
+                return job.future
+
+            job = _Job(key, func, priority, next(self._seq), self.clock())
+            self._jobs[key] = job
+            heapq.heappush(self._heap, (priority, job.seq, key))
+            self._cond.notify_all()
+            if self.autostart:
+                self._ensure_worker()
+            return job.future
+
+    def run(self, key: Hashable, func: Callable[[], Any], priority: int = INTERACTIVE,
+            timeout: Optional[float] = None) -> Any:
+        """Submit and wait for the result."""
+        return self.submit(key, func, priority).result(timeout)
+
+    def _live_entries(self):
+        """Heap entries still matching a queued job, best first (caller holds the lock)."""
+        entries = []
+        for priority, seq, key in sorted(self._heap):
+            job = self._jobs.get(key)
+            if job is not None and job.seq == seq:
+                entries.append(job)
+        self._heap = [(job.priority, job.seq, job.key) for job in entries]
+        return entries
+
+    def _select(self) -> Tuple[Optional[_Job], Optional[float]]:
+        """Pick the next runnable job, or return how long to wait (caller holds the lock)."""
+        jobs = self._live_entries()
+        if not jobs:
+            return None, None
+
+        wait = self.ledger.wait_time()
+        if wait == float('inf'):
+            # Nothing left today: fail callers who are waiting, keep background work
+            for job in jobs:
+                if job.priority != BACKGROUND:
+                    del self._jobs[job.key]
+                    job.future.set_exception(QuotaExhausted("Daily API budget exhausted"))
+            return None, min(self.ledger.seconds_until_reset(), 3600)
+        if wait > 0:
+            return None, wait
+
+        remaining = self.ledger.remaining()
+        for job in jobs:
+            if job.priority == BACKGROUND and (remaining <= self.reserve or not self.is_off_peak()):
+                continue
+            return job, 0.0
+        # Only deferred background work is queued
+        return None, min(self.seconds_until_off_peak(), 300)
+
+    def step(self) -> Optional[float]:
+        """
+        Run at most one job.
+
+        Returns:
+            None if a job ran (or the queue is empty), else seconds to wait
+        """
+        with self._cond:
+            job, wait = self._select()
+            if job is None:
+                return wait
+            if not self.ledger.try_acquire():
+                # Another process took the slot first
+                return 1.0
+            del self._jobs[job.key]
+
+        logger.info(f"Running {PRIORITY_NAMES.get(job.priority, job.priority)} request {job.key}")
+        try:
+            result = job.func()
+        except Exception as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        self.completed += 1
+        return None
+
+    def _run_worker(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+            wait = self.step()
+            if wait is None and not self.pending():
+                with self._cond:
+                    if not self._jobs and not self._stopped:
+                        self._cond.wait()
+            elif wait:
+                with self._cond:
+                    self._cond.wait(timeout=wait)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._stopped = False
+            self._worker = threading.Thread(target=self._run_worker, name='quota-scheduler', daemon=True)
+            self._worker.start()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    def status(self) -> Dict:
+        with self._cond:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for job in self._jobs.values():
+                queued[PRIORITY_NAMES.get(job.priority, str(job.priority))] += 1
+        return {
+            'quota': self.ledger.status(),
+            'queued': queued,
+            'completed': self.completed,
+            'merged': self.merged,
+            'off_peak': self.is_off_peak(),
+            'reserve': self.reserve,
+        }
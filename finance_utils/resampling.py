@@ -0,0 +1,346 @@
+"""
+Multi-Timeframe Resampling
+
+Build 5min/1h/4h/1d/1w OHLC bars from the finest bars already held locally,
+instead of asking a provider for every timeframe.
+
+- SessionCalendar places bucket boundaries where the market's trading day
+  starts: forex days roll at 17:00 New York time (4h bars fall at 17:00,
+  21:00, 01:00...), equity bars are anchored at the 09:30 open, and weekly
+  bars start at the first session of the week. Boundaries follow DST because
+  they are computed in the session's own time zone.
+- BarStore keeps the base bars per symbol on disk together with every
+  derived timeframe. Ingesting new base bars only recomputes the buckets they
+  touch (usually just the still-open last bucket) and appends the rest.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DAY = pd.Timedelta(days=1)
+WEEK = pd.Timedelta(days=7)
+
+# Timeframe name -> bar length; aliases map provider spellings onto these
+TIMEFRAMES = {
+    '1min': pd.Timedelta(minutes=1),
+    '5min': pd.Timedelta(minutes=5),
+    '15min': pd.Timedelta(minutes=15),
+    '30min': pd.Timedelta(minutes=30),
+    '1h': pd.Timedelta(hours=1),
+    '4h': pd.Timedelta(hours=4),
+    '1d': DAY,
+    '1w': WEEK,
+}
+ALIASES = {'1m': '1min', '5m': '5min', '15m': '15min', '30m': '30min', '60min': '1h',
+           '60m': '1h', '1wk': '1w', 'daily': '1d', 'weekly': '1w'}
+
+DEFAULT_TIMEFRAMES = ('5min', '15min', '1h', '4h', '1d', '1w')
+
+
+def normalize_timeframe(timeframe: str) -> str:
+    name = ALIASES.get(timeframe, timeframe)
+    if name not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe '{timeframe}' (use one of {', '.join(TIMEFRAMES)})")
+    return name
+
+
+class SessionCalendar:
+    """
+    Where trading days start and end for a market.
+
+    Args:
+        tz: Time zone the session times are given in
+        open_time: Wall-clock start of the trading day, 'HH:MM'
+        close_time: Wall-clock end of regular trading; intraday bars outside
+                    [open, close) are dropped (None for 24h markets)
+        opens_previous_day: True when the day named D starts on D-1
+                            (forex: Monday's session opens Sunday 17:00)
+    """
+
+    def __init__(self, tz: str, open_time: str = '00:00', close_time: Optional[str] = None,
+                 opens_previous_day: bool = False):
+        self.tz = tz
+        self.open = pd.Timedelta(f"{open_time}:00")
+        self.close = pd.Timedelta(f"{close_time}:00") if close_time else None
+        self.opens_previous_day = opens_previous_day
+
+    def _wall(self, index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        return index.tz_convert(self.tz).tz_localize(None)
+
+    def session_dates(self, index: pd.DatetimeIndex, daily: bool = False) -> pd.DatetimeIndex:
+        """
+        Trading date of each bar (midnight, naive).
+
+        Args:
+            index: Bar timestamps
+            daily: Bars are already one per session, dated by their timestamp's
+                   calendar date
+        """
+        if daily:
+            # Daily bars are stamped with their date in their own time zone
+            return (index.tz_localize(None) if index.tz is not None else index).normalize()
+        wall = self._wall(index)
+        dates = (wall - self.open).normalize()
+        return dates + DAY if self.opens_previous_day else dates
+
+    def session_open(self, dates: pd.DatetimeIndex) -> pd.DatetimeIndex:
+        """UTC start of the sessions with the given trading dates."""
+        wall = dates + self.open - (DAY if self.opens_previous_day else pd.Timedelta(0))
+        local = wall.tz_localize(self.tz, ambiguous='NaT', nonexistent='shift_forward')
+        return local.tz_convert('UTC')
+
+    def in_session(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """Mask of bars inside regular trading hours."""
+        if self.close is None:
+            return np.ones(len(index), dtype=bool)
+        wall = self._wall(index)
+        time_of_day = wall - wall.normalize()
+        return np.asarray((time_of_day >= self.open) & (time_of_day < self.close))
+
+    def bucket_starts(self, index: pd.DatetimeIndex, timeframe: str, daily: bool = False) -> pd.DatetimeIndex:
+        """
+        UTC start of the timeframe bucket each bar falls into.
+
+        Intraday buckets restart at every session open, so a 4h forex bar
+        never straddles the 17:00 New York roll.
+        """
+        timeframe = normalize_timeframe(timeframe)
+        dates = self.session_dates(index, daily)
+        if timeframe == '1w':
+            return self.session_open(dates - pd.to_timedelta(dates.weekday, unit='D'))
+        opens = self.session_open(dates)
+        if timeframe == '1d':
+            return opens
+
+        utc = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+        step = TIMEFRAMES[timeframe]
+        return opens + ((utc - opens) // step) * step
+
+
+FOREX_SESSION = SessionCalendar('America/New_York', '17:00', opens_previous_day=True)
+EQUITY_SESSION = SessionCalendar('America/New_York', '09:30', '16:00')
+SESSIONS = {'forex': FOREX_SESSION, 'equity': EQUITY_SESSION}
+
+
+def resample_ohlc(bars: pd.DataFrame, timeframe: str, session: SessionCalendar = FOREX_SESSION,
+                  daily: bool = False) -> pd.DataFrame:
+    """
+    Aggregate OHLC(V) bars into a coarser timeframe.
+
+    Args:
+        bars: DataFrame with Open/High/Low/Close (and optionally Volume)
+        timeframe: Target timeframe, e.g. '4h'
+        session: Calendar giving bucket boundaries
+        daily: Input bars are one per session
+
+    Returns:
+        DataFrame indexed by bucket start (UTC)
+    """
+    if bars.empty:
+        return bars.iloc[:0]
+    if not daily:
+        bars = bars[session.in_session(bars.index)]
+    buckets = session.bucket_starts(bars.index, timeframe, daily)
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+    if 'Volume' in bars.columns:
+        agg['Volume'] = 'sum'
+    result = bars[list(agg)].groupby(buckets).agg(agg)
+    result.index.name = None
+    return result
+
+
+# Bumped when derived bars could have been stored wrong; older entries keep
+# their base bars and re-derive every timeframe on load
+BAR_STORE_VERSION = 2
+
+
+class BarStore:
+    """
+    Base bars plus derived timeframes per symbol, persisted as pickles.
+
+    Args:
+        directory: Where to keep one file per symbol (None for memory only)
+        timeframes: Timeframes derived on every ingest
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = './.bar_cache',
+                 timeframes: Iterable[str] = DEFAULT_TIMEFRAMES):
+        self.directory = Path(directory) if directory is not None else None
+        self.timeframes = [normalize_timeframe(tf) for tf in timeframes]
+        self._entries: Dict[str, Dict] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key.replace('/', '').replace(':', '_')}.pkl"
+
+    def _load(self, key: str) -> Optional[Dict]:
+        if key in self._entries:
+            return self._entries[key]
+        if self.directory is None or not self._path(key).exists():
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable bar cache for {key}: {e}")
+            return None
+        if entry.get('version') != BAR_STORE_VERSION:
+            entry['derived'] = {}
+        self._entries[key] = entry
+        return entry
+
+    def _save(self, key: str, entry: Dict):
+        entry['version'] = BAR_STORE_VERSION
+        self._entries[key] = entry
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write bar cache for {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _derivable(self, entry: Dict, timeframe: str) -> bool:
+        return TIMEFRAMES[timeframe] > TIMEFRAMES[entry['base_timeframe']]
+
+    def _derive(self, entry: Dict, timeframe: str, since: Optional[pd.Timestamp] = None):
+        """(Re)compute a derived timeframe from `since` on, keeping earlier buckets."""
+        session = SESSIONS[entry['session']]
+        daily = entry['base_timeframe'] in ('1d', '1w')
+        base = entry['base']
+        derived = entry['derived'].get(timeframe)
+        if derived is None or since is None:
+            entry['derived'][timeframe] = resample_ohlc(base, timeframe, session, daily)
+            return
+
+        # First bucket touched by the new bars; everything before it is final
+        first = session.bucket_starts(pd.DatetimeIndex([since]), timeframe, daily)[0]
+        kept = derived[derived.index < first]
+        # Select rows by bucket, not timestamp: daily bars are stamped at
+        # midnight UTC, before the session open their bucket starts at
+        recent = base[base.index >= first - pd.Timedelta(days=2)]
+        fresh = resample_ohlc(recent[session.bucket_starts(recent.index, timeframe, daily) >= first],
+                              timeframe, session, daily)
+        entry['derived'][timeframe] = pd.concat([kept, fresh])
+
+    def ingest(self, key: str, bars: Optional[pd.DataFrame], base_timeframe: str,
+               session: str = 'forex') -> int:
+        """
+        Add base bars for a symbol and bring every derived timeframe up to date.
+
+        Args:
+            key: Symbol key, e.g. 'forex:EUR/USD' or 'stock:AAPL'
+            bars: OHLC(V) bars at base_timeframe (naive timestamps are UTC)
+            base_timeframe: Granularity of bars, e.g. '5min' or '1d'
+            session: Name in SESSIONS
+
+        Returns:
+            Number of new base bars
+        """
+        base_timeframe = normalize_timeframe(base_timeframe)
+        if bars is None or bars.empty:
+            return 0
+        bars = bars.copy()
+        if base_timeframe in ('1d', '1w'):
+            # Keep each bar's own calendar date, stamped at midnight UTC
+            index = bars.index.tz_localize(None) if bars.index.tz is not None else bars.index
+            bars.index = index.normalize().tz_localize('UTC')
+        else:
+            bars.index = (bars.index.tz_localize('UTC') if bars.index.tz is None
+                          else bars.index.tz_convert('UTC'))
+        bars = bars.sort_index()
+
+        entry = self._load(key)
+        if entry is None or entry['base_timeframe'] != base_timeframe or entry['session'] != session:
+            entry = {'base': bars[~bars.index.duplicated(keep='last')], 'base_timeframe': base_timeframe,
+                     'session': session, 'derived': {}}
+            new_rows, since = len(entry['base']), None
+        elif bars.index[0] < entry['base'].index[0]:
+            # Older history arrived: merge and rebuild every timeframe
+            stored = len(entry['base'])
+            merged = pd.concat([entry['base'], bars])
+            entry['base'] = merged[~merged.index.duplicated(keep='last')].sort_index()
+            entry['derived'] = {}
+            new_rows, since = len(entry['base']) - stored, None
+        else:
+            base = entry['base']
+            tail = base.index[-1]
+            incoming = bars[bars.index >= tail]
+            incoming = incoming[~incoming.index.duplicated(keep='last')]
+            appended = incoming[incoming.index > tail]
+            # The last stored bar may have been re-sent with later values
+            revised = tail in incoming.index and not np.array_equal(
+                incoming.loc[tail].reindex(base.columns).to_numpy(dtype=float),
+                base.loc[tail].to_numpy(dtype=float), equal_nan=True)
+            if appended.empty and not revised:
+                return 0
+            if revised:
+                entry['base'] = pd.concat([base[base.index < tail], incoming])
+                since = tail
+            else:
+                entry['base'] = pd.concat([base, appended])
+                since = appended.index[0]
+            new_rows = len(appended)
+
+        for timeframe in self.timeframes:
+            if self._derivable(entry, timeframe):
+                self._derive(entry, timeframe, since)
+        self._save(key, entry)
+        return new_rows
+
+    def get(self, key: str, timeframe: str) -> Optional[pd.DataFrame]:
+        """
+        Bars for a symbol at any timeframe at or above its base granularity.
+
+        Returns:
+            DataFrame indexed by bucket start (UTC), or None if nothing is stored
+        """
+        timeframe = normalize_timeframe(timeframe)
+        entry = self._load(key)
+        if entry is None:
+            return None
+        if timeframe == entry['base_timeframe']:
+            return entry['base'].copy()
+        if not self._derivable(entry, timeframe):
+            raise ValueError(f"{key} is stored at {entry['base_timeframe']}; "
+                             f"{timeframe} bars cannot be derived from it")
+        if timeframe not in entry['derived']:
+            self._derive(entry, timeframe)
+            self._save(key, entry)
+        return entry['derived'][timeframe].copy()
+
+    def base_timeframe(self, key: str) -> Optional[str]:
+        entry = self._load(key)
+        return entry['base_timeframe'] if entry else None
+
+    def clear(self):
+        self._entries.clear()
+        if self.directory is not None:
+            for path in self.directory.glob('*.pkl'):
+                path.unlink()
+
+
+_default_store: Optional[BarStore] = None
+
+
+def default_store() -> BarStore:
+    """Process-wide BarStore in ./.bar_cache."""
+    global _default_store
+    if _default_store is None:
+        _default_store = BarStore()
+    return _default_store
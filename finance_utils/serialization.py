@@ -0,0 +1,212 @@
+"""
+Serialization
+
+Fast JSON for API responses:
+
+- dumps() encodes with orjson when it is installed (numpy arrays natively,
+  NaN as null) and falls back to the standard library otherwise, with the
+  same output rules: NaN/inf become null, numpy scalars become numbers,
+  pandas Timestamps and dates become ISO strings.
+- array_list(), frame_columns() and frame_records() convert pandas/numpy
+  blocks a column at a time (vectorized rounding, NaN -> null,
+  datetime64 -> ISO strings or epoch milliseconds) instead of a
+  round(float(...)) per field.
+- install() makes a Flask app's jsonify() use dumps().
+"""
+
+import json
+import logging
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Standard library fallback
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+Decimals = Optional[Union[int, Mapping[str, int]]]
+
+
+def _datetimes(values) -> Optional[pd.DatetimeIndex]:
+    """Values as a UTC-naive DatetimeIndex if they are datetimes, else None."""
+    if isinstance(values, pd.DatetimeIndex):
+        index = values
+    elif isinstance(getattr(values, 'dtype', None), pd.DatetimeTZDtype) or np.asarray(values).dtype.kind == 'M':
+        index = pd.DatetimeIndex(values)
+    else:
+        return None
+    return index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index
+
+
+def array_list(values, decimals: Optional[int] = None, dates: str = 'iso') -> List:
+    """
+    JSON-ready list from a 1-D array, Series or Index.
+
+    Args:
+        values: Numbers, booleans, strings or datetimes
+        decimals: Round floats to this many places
+        dates: 'iso' for ISO strings or 'epoch' for epoch milliseconds
+
+    Returns:
+        List of Python scalars, with None for NaN/inf/NaT
+    """
+    stamps = _datetimes(values)
+    if stamps is not None:
+        missing = np.asarray(stamps.isna())
+        if dates == 'epoch':
+            out = stamps.as_unit('ms').asi8.astype(object)
+        else:
+            out = np.datetime_as_string(stamps.to_numpy(), unit='s').astype(object)
+        out[missing] = None
+        return out.tolist()
+
+    array = np.asarray(values)
+    if array.dtype.kind == 'f':
+        if decimals is not None:
+            array = np.round(array, decimals)
+        bad = ~np.isfinite(array)
+        if bad.any():
+            out = array.astype(object)
+            out[bad] = None
+            return out.tolist()
+        return array.tolist()
+    if array.dtype.kind == 'O':
+        return [_scalar(v) for v in array.tolist()]
+    return array.tolist()
+
+
+def _decimals_for(decimals: Decimals, column) -> Optional[int]:
+    if decimals is None or isinstance(decimals, int):
+        return decimals
+    return decimals.get(column)
+
+
+def frame_columns(df: pd.DataFrame, decimals: Decimals = None, index: Optional[str] = 'index',
+                  dates: str = 'iso') -> Dict[str, List]:
+    """
+    Columnar dict {index: [...], column: [...]} from a DataFrame.
+
+    Args:
+        df: Frame to convert
+        decimals: Places for every float column, or {column: places}
+        index: Key for the index values (None to leave the index out)
+        dates: 'iso' or 'epoch' for datetime values
+    """
+    out = {index: array_list(df.index, dates=dates)} if index else {}
+    for column in df.columns:
+        out[str(column)] = array_list(df[column].to_numpy(), _decimals_for(decimals, column), dates)
+    return out
+
+
+def frame_records(df: pd.DataFrame, decimals: Decimals = None, dates: str = 'iso') -> List[Dict]:
+    """Row dicts from a DataFrame, converted column-wise (the index is dropped)."""
+    columns = frame_columns(df, decimals, index=None, dates=dates)
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def round_fields(values: Mapping, spec: Mapping[str, Tuple[str, int]]) -> Dict[str, Optional[float]]:
+    """
+    Pick and round fields from a row (Series or dict) in one pass.
+
+    Args:
+        values: Source row
+        spec: {output name: (source key, decimal places)}
+    """
+    keys = [key for key, _ in spec.values()]
+    numbers = np.array([values[key] if key in values else np.nan for key in keys], dtype=float)
+    rounded = [np.round(v, d) for v, (_, d) in zip(numbers, spec.values())]
+    return {name: (float(v) if math.isfinite(v) else None) for name, v in zip(spec, rounded)}
+
+
+def _scalar(value):
+    """Python scalar for numpy/pandas scalars; NaN and NaT become None."""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _default(obj):
+    """Encoder hook for types neither encoder handles natively."""
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        if obj.ndim > 1:
+            return [_default(row) for row in obj]
+        return array_list(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return array_list(obj)
+    if isinstance(obj, pd.DataFrame):
+        return frame_records(obj)
+    if isinstance(obj, np.generic):
+        return _scalar(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _clean(obj):
+    """Replace non-finite floats with None for the standard library encoder."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _clean(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_clean(v) for v in obj]
+    return obj
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        option = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, default=_default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. non C-contiguous numpy arrays; the portable path handles them
+            pass
+    return json.dumps(_clean(obj), default=_default, separators=(',', ':'), sort_keys=sort_keys,
+                      ensure_ascii=False, allow_nan=False).encode()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps()/loads()."""
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs) -> Any:
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys) + b'\n', mimetype=self.mimetype)
+
+
+def install(app) -> FastJSONProvider:
+    """Serve every jsonify() of a Flask app through dumps()."""
+    app.json = FastJSONProvider(app)
+    return app.json
@@ -0,0 +1,136 @@
+"""
+Session Store
+
+Small JSON store for an authenticated HTTP session (Yahoo's crumb plus its
+cookie jar) shared between processes. Reads and refreshes happen under an
+exclusive file lock so that, when the crumb goes stale, one process fetches
+a new one and every other process picks it up from disk instead of
+repeating the two page loads.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(os.getenv('YAHOO_SESSION_FILE', './.stock_cache/yahoo_session.json'))
+
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(lock_path: Union[str, Path]):
+    """
+    Exclusive lock held across processes (flock) and threads of this process.
+
+    Args:
+        lock_path: Lock file to use; created along with its directory if needed
+    """
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(str(lock_path.resolve()), threading.Lock())
+    with thread_lock, open(lock_path, 'a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def write_json_atomic(path: Union[str, Path], data, mode: int = 0o644):
+    """Write JSON through a temp file and os.replace so readers never see a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def cookies_to_list(jar: requests.cookies.RequestsCookieJar) -> List[Dict]:
+    """Serialize a cookie jar to JSON-friendly dicts."""
+    return [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path,
+             'expires': c.expires, 'secure': c.secure} for c in jar]
+
+
+def cookies_from_list(jar: requests.cookies.RequestsCookieJar, cookies: List[Dict]):
+    """Load cookies produced by cookies_to_list into a jar."""
+    for cookie in cookies:
+        jar.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                path=cookie.get('path', '/'), expires=cookie.get('expires'),
+                secure=cookie.get('secure', False))
+
+
+class SessionStore:
+    """
+    Crumb and cookies persisted to a JSON file with an expiry.
+
+    Args:
+        path: JSON file to use; a sibling '.lock' file is created for locking
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_PATH):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+
+    def lock(self):
+        """Exclusive lock across processes (and threads of this process)."""
+        return file_lock(self.lock_path)
+
+    def load(self) -> Optional[Dict]:
+        """
+        Read the stored session.
+
+        Returns:
+            Dict with crumb, cookies, fetched_at and expires_at, or None when
+            the file is missing, unreadable or expired
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable session file {self.path}: {e}")
+            return None
+
+        if not data.get('crumb') or data.get('expires_at', 0) <= time.time():
+            return None
+        return data
+
+    def save(self, crumb: str, cookies: List[Dict], ttl: float):
+        """Atomically write a session that stays valid for ttl seconds."""
+        now = time.time()
+        data = {'crumb': crumb, 'cookies': cookies, 'fetched_at': now, 'expires_at': now + ttl}
+        write_json_atomic(self.path, data, mode=0o600)
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
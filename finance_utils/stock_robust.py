@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import logging
 from yahoo_finance_client import yahoo_client
+from circuit_breaker import breaker_for, limiter_for, classify_exception, SUCCESS, ERROR
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -30,10 +31,12 @@ class StockRobust:
     and implements proper rate limiting and error handling.
     """
     
-    def __init__(self, ticker, period="1y", use_fallback=True):
+    def __init__(self, ticker, period="1y", use_fallback=True, provider=None):
         self.ticker = ticker.upper()
         self.period = period
         self.use_fallback = use_fallback
+        # Optional providers.DataProvider (e.g. a ProviderRouter) for fresh data
+        self.provider = provider
         self._yf = None
         self.info = {}
         self.history = pd.DataFrame()
@@ -113,6 +116,16 @@ class StockRobust:
     
     def _fallback_to_yfinance(self):
         """Fallback to using yfinance directly."""
+        if self.provider is not None:
+            try:
+                self.info = self.provider.get_info(self.ticker)
+            except Exception as e:
+                logger.warning(f"Could not get info for {self.ticker}: {str(e)}")
+            self.history = self._load_cached_history_robust(period=self.period)
+            if not self.history.empty:
+                self._enrich_historical_data()
+            return
+
         try:
             logger.info(f"Using yfinance fallback for {self.ticker}")
             self._yf = yf.Ticker(self.ticker)
@@ -148,20 +161,47 @@ class StockRobust:
                 logger.warning(f"Failed to load cache for {self.ticker}: {str(e)}")
         
         logger.info(f"🌐 Fetching fresh data for {self.ticker}")
+
+        if self.provider is not None:
+            # The provider handles failover across sources itself
+            try:
+                df = self.provider.get_history(self.ticker, period=period)
+                df.to_csv(cache_file)
+                return df
+            except Exception as e:
+                logger.error(f"Provider fetch failed for {self.ticker}: {str(e)}")
+                return pd.DataFrame()
         
-        # Try using yfinance with retry logic
+        # Try using yfinance with retry logic, sharing Yahoo's circuit breaker
+        # and concurrency limit with every other Yahoo caller in the process
+        breaker = breaker_for('yahoo')
+        limiter = limiter_for('yahoo')
         for attempt in range(3):
             try:
                 if not self._yf:
                     self._yf = yf.Ticker(self.ticker)
                 
-                # Add delay between attempts
+                # Add delay between attempts, unless Yahoo is already throttling us
                 if attempt > 0:
+                    if breaker.is_open():
+                        break
                     delay = 2 ** attempt
                     logger.info(f"Retrying in {delay} seconds...")
                     time.sleep(delay)
                 
-                df = self._yf.history(period=period)
+                if not breaker.allow():
+                    break
+                
+                with limiter.slot() as report:
+                    try:
+                        df = self._yf.history(period=period)
+                    except Exception as e:
+                        breaker.record(classify_exception(e))
+                        raise
+                    # yfinance returns an empty frame when it is throttled
+                    outcome = ERROR if df.empty else SUCCESS
+                    report(outcome)
+                breaker.record(outcome)
                 
                 if not df.empty:
                     df.to_csv(cache_file)
@@ -171,11 +211,25 @@ class StockRobust:
                     
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1} failed for {self.ticker}: {str(e)}")
-                if attempt == 2:  # Last attempt
-                    logger.error(f"All attempts failed for {self.ticker}")
-                    return pd.DataFrame()
         
-        return pd.DataFrame()
+        if breaker.is_open():
+            logger.warning(f"Yahoo circuit open, using cached data for {self.ticker}")
+        else:
+            logger.error(f"All attempts failed for {self.ticker}")
+        return self._load_stale_cache(cache_file)
+    
+    def _load_stale_cache(self, cache_file):
+        """Last cached history regardless of age, or an empty DataFrame."""
+        if not cache_file.exists():
+            return pd.DataFrame()
+        try:
+            df = pd.read_csv(cache_file, index_col=0)
+            # Offsets change with DST, so normalize to UTC for a DatetimeIndex
+            df.index = pd.to_datetime(df.index, utc=True)
+            return df
+        except Exception as e:
+            logger.warning(f"Failed to load stale cache for {self.ticker}: {str(e)}")
+            return pd.DataFrame()
     
     def _load_cached_history(self, period="1y", refresh=False):
         """Original cached history loading method."""
@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 import logging
 import warnings
 
+import resampling
+
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
@@ -27,17 +29,43 @@ def is_cache_valid(filepath, max_age_days=90):
     return datetime.now() - mod_time < timedelta(days=max_age_days)
 
 
+def load_cached_history(ticker, period="1y", max_age_days=None):
+    """
+    Load a cached price history CSV without touching the network.
+
+    Dates are normalised to a UTC DatetimeIndex so histories from different
+    tickers (and different DST offsets) line up. Returns an empty DataFrame
+    when there is no usable cache file.
+    """
+    cache_file = CACHE_DIR / f"{ticker.upper()}_{period}.csv"
+    if max_age_days is not None:
+        if not is_cache_valid(cache_file, max_age_days=max_age_days):
+            return pd.DataFrame()
+    elif not cache_file.exists():
+        return pd.DataFrame()
+
+    try:
+        df = pd.read_csv(cache_file, index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True)
+        return df.sort_index()
+    except Exception as e:
+        logger.error(f"Failed to load cached data for {ticker}: {str(e)}")
+        return pd.DataFrame()
+
+
 class StockSimple:
     """
     A simple and robust Stock class that prioritizes cached data and handles API failures gracefully.
     """
     
-    def __init__(self, ticker, period="1y"):
+    def __init__(self, ticker, period="1y", provider=None):
         self.ticker = ticker.upper()
         self.period = period
         self.info = {}
         self.history = pd.DataFrame()
         self._yf = None
+        # Optional providers.DataProvider used instead of yfinance (e.g. replay)
+        self.provider = provider
         
         # Initialize data
         self._initialize_data()
@@ -65,7 +93,10 @@ class StockSimple:
         if is_cache_valid(cache_file):
             try:
                 logger.info(f"📁 Loading cached data for {self.ticker}")
-                return pd.read_csv(cache_file, index_col=0, parse_dates=True)
+                df = pd.read_csv(cache_file, index_col=0)
+                # Offsets change with DST, so normalize to UTC for a DatetimeIndex
+                df.index = pd.to_datetime(df.index, utc=True)
+                return df
             except Exception as e:
                 logger.error(f"Failed to load cached data for {self.ticker}: {str(e)}")
                 return pd.DataFrame()
@@ -78,11 +109,14 @@ class StockSimple:
         logger.info(f"Attempting to fetch fresh data for {self.ticker}")
         
         try:
-            # Create yfinance ticker
-            self._yf = yf.Ticker(self.ticker)
-            
-            # Try to get historical data with timeout
-            df = self._yf.history(period=self.period)
+            if self.provider is not None:
+                df = self.provider.get_history(self.ticker, period=self.period)
+            else:
+                # Create yfinance ticker
+                self._yf = yf.Ticker(self.ticker)
+
+                # Try to get historical data with timeout
+                df = self._yf.history(period=self.period)
             
             if not df.empty:
                 logger.info(f"✅ Successfully fetched fresh data for {self.ticker}")
@@ -104,11 +138,14 @@ class StockSimple:
     def _try_get_info(self):
         """Try to get stock info, with fallback to basic info."""
         try:
-            if self._yf is None:
-                self._yf = yf.Ticker(self.ticker)
-            
-            # Try to get info
-            info = self._yf.info
+            if self.provider is not None:
+                info = self.provider.get_info(self.ticker)
+            else:
+                if self._yf is None:
+                    self._yf = yf.Ticker(self.ticker)
+
+                # Try to get info
+                info = self._yf.info
             if info:
                 self.info = info
                 logger.info(f"✅ Successfully retrieved info for {self.ticker}")
@@ -191,6 +228,21 @@ class StockSimple:
         except Exception as e:
             logger.error(f"Error enriching data for {self.ticker}: {str(e)}")
     
+    def bars(self, timeframe='1w', store=None):
+        """
+        OHLCV bars at a coarser timeframe, derived locally from the daily history.
+        
+        Weekly bars start at the first session of each week. Intraday
+        timeframes cannot be derived from daily bars and raise ValueError.
+        """
+        if self.history.empty:
+            return pd.DataFrame()
+        store = store or resampling.default_store()
+        key = f"stock:{self.ticker}:1d"
+        columns = [c for c in ['Open', 'High', 'Low', 'Close', 'Volume'] if c in self.history.columns]
+        store.ingest(key, self.history[columns], '1d', session='equity')
+        return store.get(key, timeframe)
+    
     def is_valid(self):
         """Check if the stock has valid data."""
         return not self.history.empty
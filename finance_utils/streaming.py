@@ -0,0 +1,623 @@
+"""
+Streaming Quotes
+
+Push-based market data for the dashboards:
+
+- PubSub fans messages out to in-process subscribers. Each subscriber has a
+  bounded queue; a slow reader loses its oldest messages rather than
+  blocking the publisher.
+- IncrementalIndicators keeps SMA/EMA/MACD/RSI state so that a new price
+  costs O(1) instead of recomputing over the whole history. Closed bars are
+  committed; the open bar is previewed against the committed state.
+- QuoteStream polls quotes for every subscribed symbol on one shared
+  background loop (or receives them through ingest()), folds them into the
+  current bar, updates the indicators and publishes one message per symbol
+  and tick.
+- DeltaEncoder and sse_events turn a subscription into a Server-Sent Events
+  body that only carries fields that changed since the last event, plus
+  RSI/MACD signals, for any number of symbols on one connection.
+"""
+
+import logging
+import math
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+ALL = '*'
+
+
+class Subscription:
+    """
+    A subscriber's bounded message queue.
+
+    Args:
+        pubsub: Hub the subscription belongs to
+        topics: Topics received ('*' for every topic)
+        maxsize: Messages buffered before the oldest are dropped
+    """
+
+    def __init__(self, pubsub: 'PubSub', topics: Iterable[str], maxsize: int = 256):
+        self.pubsub = pubsub
+        self.topics = set(topics)
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, message: Dict):
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next message, or None after timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[Dict]:
+        messages = []
+        while True:
+            try:
+                messages.append(self.queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pubsub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PubSub:
+    """Topic-based in-process publish/subscribe."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, topics: Iterable[str] = (ALL,), maxsize: int = 256) -> Subscription:
+        return self.attach(Subscription(self, topics, maxsize))
+
+    def attach(self, subscription: Subscription) -> Subscription:
+        """Register an existing subscription on its topics."""
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic, [])
+                if subscription in subscribers:
+                    subscribers.remove(subscription)
+                if not subscribers:
+                    self._subscribers.pop(topic, None)
+
+    def publish(self, topic: str, message: Dict) -> int:
+        """Deliver a message to the topic's and wildcard subscribers; returns how many."""
+        with self._lock:
+            targets = list(self._subscribers.get(topic, ())) + list(self._subscribers.get(ALL, ()))
+            self.published += 1
+        for subscription in targets:
+            subscription.put(message)
+        return len(targets)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is None:
+                return len({id(s) for subs in self._subscribers.values() for s in subs})
+            return len(self._subscribers.get(topic, ()))
+
+
+class IncrementalIndicators:
+    """
+    O(1) per-price SMA 20/50/200, EMA 12/26, MACD signal and 14-bar RSI.
+
+    Definitions match StockSimple.calculate_metrics: pandas ewm(span,
+    adjust=False) EMAs seeded with the first close, and RSI from simple
+    14-bar averages of gains and losses.
+    """
+
+    SMA_WINDOWS = (20, 50, 200)
+    RSI_WINDOW = 14
+
+    def __init__(self):
+        self._closes = {n: deque(maxlen=n - 1) for n in self.SMA_WINDOWS}
+        self._sums = {n: 0.0 for n in self.SMA_WINDOWS}
+        self._ema = {12: None, 26: None}
+        self._signal = None
+        self._gains = deque(maxlen=self.RSI_WINDOW - 1)
+        self._losses = deque(maxlen=self.RSI_WINDOW - 1)
+        self._last_close: Optional[float] = None
+        self.count = 0
+
+    @staticmethod
+    def _ema_step(previous: Optional[float], value: float, span: int) -> float:
+        if previous is None:
+            return value
+        alpha = 2.0 / (span + 1)
+        return previous + alpha * (value - previous)
+
+    def _compute(self, close: float) -> Dict[str, Optional[float]]:
+        values: Dict[str, Optional[float]] = {}
+        for n in self.SMA_WINDOWS:
+            window = self._closes[n]
+            values[f'sma_{n}'] = (self._sums[n] + close) / n if len(window) == n - 1 else None
+
+        ema_12 = self._ema_step(self._ema[12], close, 12)
+        ema_26 = self._ema_step(self._ema[26], close, 26)
+        macd = ema_12 - ema_26
+        signal = self._ema_step(self._signal, macd, 9)
+        values.update({'ema_12': ema_12, 'ema_26': ema_26, 'macd': macd, 'signal': signal,
+                       'histogram': macd - signal})
+
+        rsi = None
+        if len(self._gains) == self.RSI_WINDOW - 1:
+            change = close - self._last_close
+            gain = (sum(self._gains) + max(change, 0.0)) / self.RSI_WINDOW
+            loss = (sum(self._losses) + max(-change, 0.0)) / self.RSI_WINDOW
+            rsi = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+        values['rsi'] = rsi
+        return values
+
+    def preview(self, close: float) -> Dict[str, Optional[float]]:
+        """Indicator values if the open bar closed at this price (state unchanged)."""
+        return self._compute(close)
+
+    def commit(self, close: float) -> Dict[str, Optional[float]]:
+        """Fold a closed bar into the state."""
+        values = self._compute(close)
+        for n in self.SMA_WINDOWS:
+            window = self._closes[n]
+            if len(window) == window.maxlen:
+                self._sums[n] -= window[0]
+            window.append(close)
+            self._sums[n] += close
+        self._ema[12], self._ema[26] = values['ema_12'], values['ema_26']
+        self._signal = values['signal']
+        # The first bar counts as an unchanged one, as in the batch RSI
+        change = 0.0 if self._last_close is None else close - self._last_close
+        self._gains.append(max(change, 0.0))
+        self._losses.append(max(-change, 0.0))
+        self._last_close = close
+        self.count += 1
+        return values
+
+
+def _epoch(value) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return pd.Timestamp(value).timestamp()
+
+
+def normalize_quote(quote: Optional[Dict]) -> Optional[Dict]:
+    """
+    Price/volume/timestamp from a provider quote or a raw Yahoo quote.
+
+    Returns:
+        {'price', 'volume', 'timestamp'} or None without a usable price
+    """
+    if not quote:
+        return None
+    price = quote.get('price', quote.get('regularMarketPrice'))
+    if price is None or not math.isfinite(float(price)):
+        return None
+    volume = quote.get('volume', quote.get('regularMarketVolume'))
+    timestamp = quote.get('timestamp', quote.get('regularMarketTime'))
+    return {'price': float(price), 'volume': None if volume is None else float(volume),
+            'timestamp': _epoch(timestamp)}
+
+
+def per_symbol(get_quote: Callable[[str], Dict]) -> Callable[[List[str]], Dict[str, Optional[Dict]]]:
+    """Adapt a single-symbol get_quote (e.g. ProviderRouter.get_quote) to a batch fetch."""
+    def fetch(symbols):
+        quotes = {}
+        for symbol in symbols:
+            try:
+                quotes[symbol] = get_quote(symbol)
+            except Exception as e:
+                logger.warning(f"Quote for {symbol} failed: {e}")
+                quotes[symbol] = None
+        return quotes
+    return fetch
+
+
+class _SymbolState:
+    __slots__ = ('bar', 'indicators', 'last_volume', 'last_message', 'ticks')
+
+    def __init__(self):
+        self.bar: Optional[Dict] = None
+        self.indicators = IncrementalIndicators()
+        self.last_volume: Optional[float] = None
+        self.last_message: Optional[Dict] = None
+        self.ticks = 0
+
+
+class QuoteStream:
+    """
+    Shared polling loop that turns quotes into bars, indicators and messages.
+
+    Args:
+        fetch: Callable taking a list of symbols and returning {symbol: quote}
+               (e.g. YahooFinanceClient.get_quotes, or per_symbol(router.get_quote));
+               None for push-only streams fed through ingest()
+        pubsub: Hub to publish on (a new one by default)
+        poll_interval: Seconds between polls
+        bar_seconds: Bar length; 86400 aggregates quotes into today's daily bar
+        clock: Time source (injectable for tests)
+    """
+
+    def __init__(self, fetch: Optional[Callable[[List[str]], Dict]] = None, pubsub: Optional[PubSub] = None,
+                 poll_interval: float = 15.0, bar_seconds: int = 60, clock: Callable[[], float] = time.time):
+        self.fetch = fetch
+        self.pubsub = pubsub or PubSub()
+        self.poll_interval = poll_interval
+        self.bar_seconds = bar_seconds
+        self.clock = clock
+        self._states: Dict[str, _SymbolState] = {}
+        self._watchers: Dict[str, int] = {}
+        self._leases: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+
+    def _bucket(self, timestamp: float) -> float:
+        return math.floor(timestamp / self.bar_seconds) * self.bar_seconds
+
+    def _state(self, symbol: str) -> _SymbolState:
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = _SymbolState()
+        return state
+
+    def seed(self, symbol: str, history: pd.DataFrame):
+        """
+        Warm a symbol's indicators from OHLCV history with bar_seconds bars.
+
+        A last row in the current bucket becomes the open bar, so live quotes
+        extend it instead of starting a duplicate.
+        """
+        symbol = symbol.upper()
+        if history is None or history.empty:
+            return
+        with self._lock:
+            state = self._states[symbol] = _SymbolState()
+            rows = history[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float)
+            stamps = [ts.timestamp() for ts in pd.DatetimeIndex(history.index)]
+            current = self._bucket(self.clock())
+            last_open = self._bucket(stamps[-1]) == current
+            for close in rows[:-1, 3] if last_open else rows[:, 3]:
+                state.indicators.commit(float(close))
+            if last_open:
+                open_, high, low, close = rows[-1]
+                volume = float(history['Volume'].iloc[-1]) if 'Volume' in history else 0.0
+                state.bar = {'start': current, 'open': open_, 'high': high, 'low': low,
+                             'close': close, 'volume': volume}
+
+    def watch(self, symbols: Iterable[str]):
+        """Start polling symbols (reference-counted)."""
+        with self._lock:
+            for symbol in symbols:
+                symbol = symbol.upper()
+                self._watchers[symbol] = self._watchers.get(symbol, 0) + 1
+        self._wake.set()
+
+    def unwatch(self, symbols: Iterable[str]):
+        with self._lock:
+            for symbol in symbols:
+                symbol = symbol.upper()
+                remaining = self._watchers.get(symbol, 0) - 1
+                if remaining > 0:
+                    self._watchers[symbol] = remaining
+                else:
+                    self._watchers.pop(symbol, None)
+
+    def lease(self, symbols: Iterable[str], ttl: float):
+        """
+        Poll symbols until ttl seconds after the last lease call for them.
+
+        For readers that poll snapshots instead of holding a subscription;
+        each call renews the lease, and expired symbols are unwatched.
+        """
+        expires = self.clock() + ttl
+        new = []
+        with self._lock:
+            for symbol in symbols:
+                symbol = symbol.upper()
+                if symbol not in self._leases:
+                    new.append(symbol)
+                self._leases[symbol] = expires
+        if new:
+            self.watch(new)
+
+    def expire_leases(self) -> List[str]:
+        """Unwatch symbols whose lease ran out; returns them."""
+        now = self.clock()
+        with self._lock:
+            expired = [symbol for symbol, expires in self._leases.items() if expires <= now]
+            for symbol in expired:
+                del self._leases[symbol]
+        if expired:
+            self.unwatch(expired)
+        return expired
+
+    def watched(self) -> List[str]:
+        with self._lock:
+            return sorted(self._watchers)
+
+    def subscribe(self, symbols: Iterable[str], maxsize: int = 256) -> Subscription:
+        """
+        Receive updates for symbols; they are polled while the subscription lives.
+
+        The latest known state of each symbol is queued first, so a new
+        subscriber does not wait for the next tick.
+        """
+        symbols = [s.upper() for s in symbols]
+        stream = self
+
+        class StreamSubscription(Subscription):
+            def close(self):
+                if not self.closed:
+                    super().close()
+                    stream.unwatch(symbols)
+
+        subscription = self.pubsub.attach(StreamSubscription(self.pubsub, symbols, maxsize))
+        self.watch(symbols)
+        for symbol in symbols:
+            message = self.snapshot(symbol)
+            if message is not None:
+                subscription.put(message)
+        return subscription
+
+    def ingest(self, symbol: str, price: float, volume: Optional[float] = None,
+               timestamp: Optional[float] = None) -> Dict:
+        """
+        Fold one quote into the symbol's bar and publish the update.
+
+        Args:
+            symbol: Ticker
+            price: Last price
+            volume: Cumulative session volume as quoted (the bar gets the increase)
+            timestamp: Quote time in epoch seconds (default now)
+
+        Returns:
+            The published message
+        """
+        symbol = symbol.upper()
+        timestamp = self.clock() if timestamp is None else timestamp
+        bucket = self._bucket(timestamp)
+        closed_bar = None
+        with self._lock:
+            state = self._state(symbol)
+            bar = state.bar
+            if bar is not None and bucket > bar['start']:
+                closed_bar = dict(bar, indicators=state.indicators.commit(bar['close']))
+                bar = None
+            if bar is not None and bucket < bar['start']:
+                # Late quote for a bar already closed
+                return state.last_message
+
+            added = 0.0
+            if volume is not None:
+                if state.last_volume is not None and volume >= state.last_volume:
+                    added = volume - state.last_volume
+                state.last_volume = volume
+            if bar is None:
+                bar = state.bar = {'start': bucket, 'open': price, 'high': price, 'low': price,
+                                   'close': price, 'volume': added}
+            else:
+                bar['high'] = max(bar['high'], price)
+                bar['low'] = min(bar['low'], price)
+                bar['close'] = price
+                bar['volume'] += added
+            state.ticks += 1
+
+            message = {
+                'type': 'tick',
+                'symbol': symbol,
+                'price': price,
+                'timestamp': timestamp,
+                'bar': dict(bar),
+                'indicators': state.indicators.preview(price),
+            }
+            state.last_message = message
+
+        if closed_bar is not None:
+            self.pubsub.publish(symbol, {'type': 'bar', 'symbol': symbol, 'bar': closed_bar})
+        self.pubsub.publish(symbol, message)
+        return message
+
+    def poll_once(self) -> int:
+        """Fetch quotes for every watched symbol in one call; returns quotes ingested."""
+        self.expire_leases()
+        symbols = self.watched()
+        if not symbols or self.fetch is None:
+            return 0
+        try:
+            quotes = self.fetch(symbols) or {}
+        except Exception as e:
+            logger.warning(f"Quote poll failed: {e}")
+            return 0
+        self.polls += 1
+        ingested = 0
+        for symbol in symbols:
+            quote = normalize_quote(quotes.get(symbol))
+            if quote is not None:
+                self.ingest(symbol, quote['price'], quote['volume'], quote['timestamp'])
+                ingested += 1
+        return ingested
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self.watched():
+                self.poll_once()
+                self._stopped.wait(self.poll_interval)
+            else:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self):
+        """Start the shared polling thread (idempotent)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='quote-stream', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def snapshot(self, symbol: str) -> Optional[Dict]:
+        """Latest message for a symbol (None before its first quote)."""
+        with self._lock:
+            state = self._states.get(symbol.upper())
+            return None if state is None else state.last_message
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'watched': sorted(self._watchers),
+                'leased': sorted(self._leases),
+                'polls': self.polls,
+                'subscribers': self.pubsub.subscriber_count(),
+                'published': self.pubsub.published,
+                'running': self._thread is not None and self._thread.is_alive(),
+                'last_tick': {s: datetime.fromtimestamp(st.last_message['timestamp'], timezone.utc).isoformat()
+                              for s, st in self._states.items() if st.last_message},
+            }
+
+
+class DeltaEncoder:
+    """
+    Per-connection encoder that sends only what changed.
+
+    Tick and bar messages are flattened to one level (bar fields and
+    indicator names do not collide), rounded, and compared with what was
+    last sent for the symbol.
+
+    Args:
+        precision: Significant digits kept, so noise below it is not sent
+    """
+
+    RSI_LEVELS = (30.0, 70.0)
+
+    def __init__(self, precision: int = 8):
+        self.precision = precision
+        self._sent: Dict[str, Dict[str, Any]] = {}
+
+    def _round(self, value):
+        if isinstance(value, float):
+            return float(f"{value:.{self.precision}g}") if math.isfinite(value) else None
+        return value
+
+    def _flatten(self, message: Dict) -> Dict[str, Any]:
+        flat = {'price': message.get('price')} if 'price' in message else {}
+        flat.update((k, v) for k, v in message.get('bar', {}).items() if k != 'indicators')
+        flat.update(message.get('indicators') or message.get('bar', {}).get('indicators') or {})
+        return {k: self._round(v) for k, v in flat.items() if v is not None}
+
+    def _signals(self, previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+        signals = []
+        if 'rsi' in previous and 'rsi' in current:
+            low, high = self.RSI_LEVELS
+            if previous['rsi'] <= high < current['rsi']:
+                signals.append('rsi_overbought')
+            elif previous['rsi'] >= low > current['rsi']:
+                signals.append('rsi_oversold')
+        if all(k in previous and k in current for k in ('macd', 'signal')):
+            before = previous['macd'] - previous['signal']
+            after = current['macd'] - current['signal']
+            if before <= 0 < after:
+                signals.append('macd_bullish_cross')
+            elif before >= 0 > after:
+                signals.append('macd_bearish_cross')
+        return signals
+
+    def encode(self, message: Optional[Dict]) -> Optional[Dict]:
+        """
+        Delta for a stream message, or None when nothing changed.
+
+        The first event for a symbol carries every field.
+        """
+        if not message:
+            return None
+        symbol = message['symbol']
+        current = self._flatten(message)
+        previous = self._sent.get(symbol, {})
+        changed = {k: v for k, v in current.items() if previous.get(k) != v}
+        if not changed and message['type'] == 'tick':
+            return None
+        delta = {'symbol': symbol, 'type': message['type'], **changed}
+        signals = self._signals(previous, current)
+        if signals:
+            delta['signals'] = signals
+        self._sent[symbol] = {**previous, **current}
+        return delta
+
+
+def format_sse(data: Any, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """One Server-Sent Events frame with compact JSON data."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append("data: " + dumps(data).decode())
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_events(subscription: Subscription, heartbeat: float = 15.0, retry_ms: int = 5000,
+               encoder: Optional[DeltaEncoder] = None) -> Iterator[str]:
+    """
+    Server-Sent Events body for a subscription.
+
+    Yields delta frames as messages arrive and a comment line every heartbeat
+    seconds of silence so proxies keep the connection open. The subscription
+    is closed when the client goes away and the generator is closed.
+    """
+    encoder = encoder or DeltaEncoder()
+    event_id = 0
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        while True:
+            message = subscription.get(timeout=heartbeat)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            delta = encoder.encode(message)
+            if delta is not None:
+                event_id += 1
+                yield format_sse(delta, event=delta.pop('type'), event_id=event_id)
+    finally:
+        subscription.close()
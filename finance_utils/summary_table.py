@@ -0,0 +1,209 @@
+"""
+Summary Table
+
+Materialized one-row-per-symbol summary of each price history. A row is
+computed once when a symbol's data changes (latest bar, indicators,
+growth, volatility, signals) instead of on every request, and every
+summary-style endpoint reads it: a listing is one slice of the table plus
+vectorized rounding. Only freshness (days behind today) is derived at read
+time, since it changes with the calendar rather than the data.
+"""
+
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from chart_cache import data_version
+from serialization import frame_records
+
+logger = logging.getLogger(__name__)
+
+# History column -> table column for the latest bar
+LATEST_COLUMNS = {
+    'Close': 'close', 'Volume': 'volume', 'High': 'high', 'Low': 'low',
+    'RSI': 'rsi', 'MACD': 'macd', 'Signal': 'signal', '50MA': 'ma_50', '200MA': 'ma_200',
+    'Upper Band': 'upper_band', 'Lower Band': 'lower_band', 'ATR': 'atr',
+}
+
+# API field -> (table column, decimals) as served by get_stock_summary
+SUMMARY_FIELDS = {
+    'current_price': ('close', 2),
+    'high': ('high', 2),
+    'low': ('low', 2),
+    'rsi': ('rsi', 1),
+    'macd': ('macd', 3),
+    'ma_50': ('ma_50', 2),
+    'ma_200': ('ma_200', 2),
+    'growth_percent': ('growth_percent', 2),
+    'volatility': ('volatility', 4),
+}
+
+# Report signal -> table columns it needs; signals with missing inputs are left out
+SIGNAL_INPUTS = {
+    'price_above_ma50': ('ma_50',),
+    'price_above_ma200': ('ma_200',),
+    'rsi_overbought': ('rsi',),
+    'rsi_oversold': ('rsi',),
+    'macd_bullish': ('macd', 'signal'),
+}
+
+# Report price level -> table column
+PRICE_LEVELS = {'support': 'lower_band', 'resistance': 'upper_band', 'atr': 'atr'}
+
+
+def summarize(history: pd.DataFrame) -> Dict:
+    """
+    One table row for a price history with indicator columns.
+
+    Signals follow StockSimple.is_bullish/is_bearish; comparisons with a
+    missing indicator are False.
+    """
+    latest = history.iloc[-1]
+    row = {column: float(latest[name]) if name in history.columns else np.nan
+           for name, column in LATEST_COLUMNS.items()}
+    close = history['Close']
+    returns = history['Daily Return'] if 'Daily Return' in history.columns else close.pct_change()
+    row.update({
+        'growth_percent': float((close.iloc[-1] - close.iloc[0]) / close.iloc[0] * 100),
+        'volatility': float(returns.std()),
+        'max_price': float(close.max()),
+        'min_price': float(close.min()),
+        'period_start': pd.Timestamp(history.index[0]).date(),
+        'last_date': pd.Timestamp(history.index[-1]).date(),
+        'data_points': len(history),
+    })
+    price = row['close']
+    with np.errstate(invalid='ignore'):
+        row.update({
+            'price_above_ma50': bool(price > row['ma_50']),
+            'price_above_ma200': bool(price > row['ma_200']),
+            'rsi_overbought': bool(row['rsi'] > 70),
+            'rsi_oversold': bool(row['rsi'] < 30),
+            'macd_bullish': bool(row['macd'] > row['signal']),
+        })
+        row['is_bullish'] = bool(row['price_above_ma50'] and row['price_above_ma200'] and row['rsi'] < 70)
+        row['is_bearish'] = bool(price < row['ma_50'] and price < row['ma_200'] and row['rsi'] > 30)
+    return row
+
+
+class SummaryTable:
+    """
+    Summary rows keyed by symbol, recomputed only when the data version changes.
+
+    Thread-safe; the DataFrame view is rebuilt lazily after updates.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, Dict] = {}
+        self._versions: Dict[str, object] = {}
+        self._frame: Optional[pd.DataFrame] = None
+        self._lock = threading.Lock()
+        self.updates = 0
+
+    def update(self, symbol: str, history: Optional[pd.DataFrame]) -> bool:
+        """
+        Refresh a symbol's row from its history.
+
+        Returns:
+            True if the row was recomputed, False if it was already current
+        """
+        symbol = symbol.upper()
+        if history is None or history.empty:
+            self.remove(symbol)
+            return False
+        version = data_version(history)
+        with self._lock:
+            if self._versions.get(symbol) == version:
+                return False
+        row = summarize(history)
+        with self._lock:
+            self._rows[symbol] = row
+            self._versions[symbol] = version
+            self._frame = None
+            self.updates += 1
+        return True
+
+    def update_stock(self, stock) -> bool:
+        """Refresh from a StockSimple-like object (ticker, history, is_valid)."""
+        return self.update(stock.ticker, stock.history if stock.is_valid() else None)
+
+    def remove(self, symbol: str):
+        with self._lock:
+            if self._rows.pop(symbol.upper(), None) is not None:
+                self._versions.pop(symbol.upper(), None)
+                self._frame = None
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The whole table, one row per symbol."""
+        with self._lock:
+            if self._frame is None:
+                self._frame = pd.DataFrame.from_dict(self._rows, orient='index')
+            return self._frame
+
+    def rows(self, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Table slice for symbols (in the given order, missing ones skipped)."""
+        frame = self.frame
+        if symbols is None:
+            return frame
+        wanted = [s.upper() for s in symbols]
+        return frame.loc[[s for s in wanted if s in frame.index]]
+
+    def row(self, symbol: str) -> Optional[Dict]:
+        """Unrounded row for one symbol."""
+        row = self._rows.get(symbol.upper())
+        return None if row is None else dict(row)
+
+    def records(self, symbols: Optional[Iterable[str]] = None, today: Optional[date] = None) -> List[Dict]:
+        """
+        get_stock_summary-style dicts for symbols, rounded and JSON-safe.
+
+        Args:
+            symbols: Symbols to list (all when None)
+            today: Reference date for days_behind (default today)
+        """
+        rows = self.rows(symbols)
+        if rows.empty:
+            return []
+        today = today or datetime.now().date()
+        out = pd.DataFrame({'symbol': rows.index}, index=rows.index)
+        out['current_price'] = rows['close']
+        out['volume'] = rows['volume'].fillna(0).astype(int)
+        for field, (column, _) in SUMMARY_FIELDS.items():
+            out[field] = rows[column]
+        out['is_bullish'] = rows['is_bullish'].astype(bool)
+        out['is_bearish'] = rows['is_bearish'].astype(bool)
+        out['last_updated'] = [d.strftime('%Y-%m-%d') for d in rows['last_date']]
+        out['days_behind'] = [(today - d).days for d in rows['last_date']]
+        out['data_points'] = rows['data_points'].astype(int)
+        return frame_records(out, {field: decimals for field, (_, decimals) in SUMMARY_FIELDS.items()})
+
+    def record(self, symbol: str, today: Optional[date] = None) -> Optional[Dict]:
+        records = self.records([symbol], today)
+        return records[0] if records else None
+
+    def report_records(self, symbols: Optional[Iterable[str]] = None,
+                       today: Optional[date] = None) -> List[Dict]:
+        """records() plus the technical signals and price levels of /api/generate_report."""
+        records = self.records(symbols, today)
+        for record in records:
+            row = self._rows[record['symbol']]
+            record['technical_signals'] = {
+                name: row[name] for name, inputs in SIGNAL_INPUTS.items()
+                if not any(np.isnan(row[column]) for column in inputs)
+            }
+            record['price_levels'] = {
+                name: round(row[column], 2) for name, column in PRICE_LEVELS.items()
+                if not np.isnan(row[column])
+            }
+        return records
@@ -0,0 +1,254 @@
+"""
+Synthetic Market Data Generator
+
+Seeded, fully vectorized OHLCV generation for benchmarks and offline tests.
+Prices follow geometric Brownian motion or a two-state (calm/turbulent)
+regime-switching model for N tickers x T bars at once. Market holidays and
+per-ticker gaps can be injected, and the result can be written straight into
+the StockSimple cache format so code under test never touches the network.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+# (drift, volatility) per regime, annualized; calm first, turbulent second
+DEFAULT_REGIMES = ((0.10, 0.15), (-0.15, 0.45))
+
+
+def _regime_states(rng: np.random.Generator, n_tickers: int, n_bars: int,
+                   switch_probs=(0.02, 0.08)) -> np.ndarray:
+    """
+    Two-state Markov regime path per ticker, shape (T, N), values 0/1.
+
+    Run lengths are geometric with the leaving probability of each state, so
+    the chain is drawn as alternating runs and laid out with one cumsum.
+    """
+    p_calm, p_turb = switch_probs
+    # Enough runs to cover T bars even if every run is short
+    n_runs = 2 * int(n_bars * max(p_calm, p_turb)) + 16
+    while True:
+        runs = np.empty((n_tickers, n_runs), dtype=np.int64)
+        runs[:, 0::2] = rng.geometric(p_calm, (n_tickers, (n_runs + 1) // 2))
+        runs[:, 1::2] = rng.geometric(p_turb, (n_tickers, n_runs // 2))
+        boundaries = np.cumsum(runs, axis=1)
+        if (boundaries[:, -1] >= n_bars).all():
+            break
+        n_runs *= 2
+
+    marks = np.zeros((n_tickers, n_bars + 1), dtype=np.int64)
+    rows = np.repeat(np.arange(n_tickers), n_runs)
+    np.add.at(marks, (rows, np.minimum(boundaries.ravel(), n_bars)), 1)
+    return (np.cumsum(marks[:, :n_bars], axis=1) % 2).T
+
+
+def generate_ohlcv_arrays(n_tickers: int, n_bars: int, model: str = 'gbm',
+                          start_price: Union[float, np.ndarray] = 100.0,
+                          drift: Union[float, np.ndarray] = 0.08,
+                          volatility: Union[float, np.ndarray] = 0.25,
+                          periods_per_year: float = TRADING_DAYS,
+                          regimes=DEFAULT_REGIMES, switch_probs=(0.02, 0.08),
+                          intrabar_range: float = 0.5, base_volume: float = 1_000_000,
+                          seed: Optional[int] = None, dtype=np.float64) -> Dict[str, np.ndarray]:
+    """
+    Generate OHLCV arrays for many tickers at once.
+
+    Args:
+        n_tickers: Number of tickers (columns)
+        n_bars: Number of bars (rows)
+        model: 'gbm' or 'regime' (two-state regime switching)
+        start_price: Initial price, scalar or per ticker
+        drift: Annualized drift for 'gbm', scalar or per ticker
+        volatility: Annualized volatility for 'gbm', scalar or per ticker
+        periods_per_year: Bars per year (252 daily, 252 * 24 hourly forex...)
+        regimes: ((drift, vol), (drift, vol)) for the calm and turbulent states
+        switch_probs: Per-bar probability of leaving the calm / turbulent state
+        intrabar_range: High/low excursion as a multiple of the bar volatility
+        base_volume: Average volume per bar
+        seed: Random seed for reproducible output
+        dtype: Float dtype of the price arrays
+
+    Returns:
+        Dictionary of (T, N) arrays: Open, High, Low, Close, Volume
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / periods_per_year
+
+    if model == 'gbm':
+        mu = np.broadcast_to(np.asarray(drift, dtype=float), (n_tickers,))
+        sigma = np.broadcast_to(np.asarray(volatility, dtype=float), (n_tickers,))
+    elif model == 'regime':
+        states = _regime_states(rng, n_tickers, n_bars, switch_probs)
+        regime_mu = np.array([r[0] for r in regimes])
+        regime_sigma = np.array([r[1] for r in regimes])
+        mu, sigma = regime_mu[states], regime_sigma[states]
+    else:
+        raise ValueError(f"Unknown model '{model}' (use 'gbm' or 'regime')")
+
+    bar_sigma = sigma * np.sqrt(dt)
+    shocks = rng.standard_normal((n_bars, n_tickers))
+    log_returns = (mu - 0.5 * sigma ** 2) * dt + bar_sigma * shocks
+
+    start = np.broadcast_to(np.asarray(start_price, dtype=float), (n_tickers,))
+    close = start * np.exp(np.cumsum(log_returns, axis=0))
+
+    # Opens gap slightly away from the previous close
+    prev_close = np.vstack([start[None, :], close[:-1]])
+    open_ = prev_close * np.exp(0.1 * bar_sigma * rng.standard_normal((n_bars, n_tickers)))
+
+    # Highs/lows extend beyond the open-close body, so the bar is always consistent
+    excursion = intrabar_range * bar_sigma * np.abs(rng.standard_normal((2, n_bars, n_tickers)))
+    high = np.maximum(open_, close) * np.exp(excursion[0])
+    low = np.minimum(open_, close) * np.exp(-excursion[1])
+
+    # Volume rises with the size of the move
+    move = np.abs(log_returns) / np.maximum(bar_sigma, 1e-12)
+    volume = np.round(base_volume * rng.lognormal(0.0, 0.3, (n_bars, n_tickers)) * (0.5 + 0.5 * move))
+
+    return {
+        'Open': open_.astype(dtype, copy=False),
+        'High': high.astype(dtype, copy=False),
+        'Low': low.astype(dtype, copy=False),
+        'Close': close.astype(dtype, copy=False),
+        'Volume': volume.astype(np.int64),
+    }
+
+
+def trading_index(n_bars: int, start: str = '2000-01-03', freq: str = 'B',
+                  holiday_rate: float = 0.0, tz: Optional[str] = 'America/New_York',
+                  seed: Optional[int] = None) -> pd.DatetimeIndex:
+    """
+    Build a bar index with n_bars entries, skipping random market holidays.
+
+    Args:
+        n_bars: Number of bars wanted
+        start: First candidate timestamp
+        freq: Pandas frequency ('B' business days, '1h', ...)
+        holiday_rate: Fraction of candidate bars closed for every ticker
+        tz: Time zone to localize to (None for naive)
+        seed: Random seed
+    """
+    rng = np.random.default_rng(seed)
+    n_candidates = int(np.ceil(n_bars / max(1.0 - holiday_rate, 1e-3) * 1.05)) + 10
+    candidates = pd.date_range(start=start, periods=n_candidates, freq=freq)
+    if holiday_rate > 0:
+        candidates = candidates[rng.random(n_candidates) >= holiday_rate]
+    index = candidates[:n_bars]
+    if tz is not None:
+        index = index.tz_localize(tz)
+    return index
+
+
+def generate_market(tickers: Union[int, List[str]], n_bars: int, start: str = '2000-01-03',
+                    freq: str = 'B', holiday_rate: float = 0.0, gap_rate: float = 0.0,
+                    tz: Optional[str] = 'America/New_York', seed: Optional[int] = None,
+                    **kwargs) -> Dict[str, pd.DataFrame]:
+    """
+    Generate per-ticker OHLCV DataFrames.
+
+    Args:
+        tickers: Ticker names, or a count (names become SYN0000, SYN0001, ...)
+        n_bars: Number of bars per ticker before gaps are removed
+        start: First bar timestamp
+        freq: Bar frequency
+        holiday_rate: Fraction of bars missing for every ticker
+        gap_rate: Fraction of bars missing independently per ticker
+        tz: Index time zone
+        seed: Random seed
+        **kwargs: Passed to generate_ohlcv_arrays (model, drift, volatility, ...)
+
+    Returns:
+        Dictionary of ticker -> OHLCV DataFrame in the yfinance layout
+    """
+    if isinstance(tickers, int):
+        width = max(4, len(str(tickers - 1)))
+        tickers = [f"SYN{i:0{width}d}" for i in range(tickers)]
+
+    arrays = generate_ohlcv_arrays(len(tickers), n_bars, seed=seed, **kwargs)
+    index = trading_index(n_bars, start=start, freq=freq, holiday_rate=holiday_rate,
+                          tz=tz, seed=None if seed is None else seed + 1)
+    index.name = 'Date'
+
+    keep = None
+    if gap_rate > 0:
+        gap_rng = np.random.default_rng(None if seed is None else seed + 2)
+        keep = gap_rng.random((n_bars, len(tickers))) >= gap_rate
+
+    frames = {}
+    columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    for j, ticker in enumerate(tickers):
+        df = pd.DataFrame({col: arrays[col][:, j] for col in columns}, index=index)
+        df['Dividends'] = 0.0
+        df['Stock Splits'] = 0.0
+        if keep is not None:
+            df = df[keep[:, j]]
+        frames[ticker] = df
+    return frames
+
+
+def generate_forex_ohlcv(pair: str = 'EUR/USD', days: int = 30, freq: str = '1h',
+                         base_price: Optional[float] = None, end=None,
+                         seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    Hourly-style forex bars matching the dashboard mock data.
+
+    Args:
+        pair: Currency pair (only used for the default base price)
+        days: Number of days of history ending at `end`
+        freq: Bar frequency
+        base_price: Starting rate (default 1.0850 for EUR/USD, 1.2650 otherwise)
+        end: Last bar timestamp (default now)
+        seed: Random seed
+    """
+    if base_price is None:
+        base_price = 1.0850 if 'EUR/USD' in pair else 1.2650
+    end = pd.Timestamp.now() if end is None else pd.Timestamp(end)
+    index = pd.date_range(start=end - pd.Timedelta(days=days), end=end, freq=freq)
+    n_bars = len(index)
+    bars_per_year = pd.Timedelta(days=365) / pd.Timedelta(freq)
+
+    # Same scale as the original mock: ~0.1% per bar with a slight upward drift
+    per_bar_vol = 0.001
+    arrays = generate_ohlcv_arrays(1, n_bars, start_price=base_price,
+                                   drift=0.0001 * bars_per_year,
+                                   volatility=per_bar_vol * np.sqrt(bars_per_year),
+                                   periods_per_year=bars_per_year, base_volume=5_000,
+                                   seed=seed)
+    df = pd.DataFrame({col: values[:, 0] for col, values in arrays.items()}, index=index)
+    df['Volume'] = df['Volume'].clip(lower=1000)
+    return df
+
+
+def write_cache(frames: Dict[str, pd.DataFrame], period: str = '1y',
+                cache_dir: Optional[Union[str, Path]] = None) -> List[Path]:
+    """
+    Write frames in the StockSimple cache format ({TICKER}_{period}.csv).
+
+    Args:
+        frames: Ticker -> OHLCV DataFrame
+        period: Period suffix used in the cache file name
+        cache_dir: Target directory (default: stock_simple.CACHE_DIR)
+
+    Returns:
+        List of written file paths
+    """
+    if cache_dir is None:
+        from stock_simple import CACHE_DIR
+        cache_dir = CACHE_DIR
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for ticker, df in frames.items():
+        path = cache_dir / f"{ticker.upper()}_{period}.csv"
+        df.to_csv(path, index_label='Date')
+        paths.append(path)
+    logger.info(f"Wrote {len(paths)} synthetic histories to {cache_dir}")
+    return paths
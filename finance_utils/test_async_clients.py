@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for the async Yahoo Finance and Alpha Vantage forex clients.
+"""
+
+import asyncio
+import time
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from async_clients import MAX_RETRY_AFTER, AsyncForexClient, AsyncYahooFinanceClient, BlockingClient, run_sync
+
+LATENCY = 0.2
+
+
+def make_app(calls):
+    """Fake Yahoo + Alpha Vantage endpoints with fixed latency."""
+
+    async def home(request):
+        calls.append(('home', time.monotonic()))
+        return web.Response(text='<html></html>')
+
+    async def crumb_page(request):
+        calls.append(('crumb', time.monotonic()))
+        return web.Response(text='... "CrumbStore":{"crumb":"abc123"} ...')
+
+    async def quote(request):
+        calls.append(('quote', time.monotonic()))
+        await asyncio.sleep(LATENCY)
+        symbol = request.query['symbols']
+        if symbol == 'FLAKY' and sum(1 for c in calls if c[0] == 'quote') == 1:
+            return web.Response(status=429, headers={'Retry-After': '0.01'})
+        assert request.query['crumb'] == 'abc123'
+        return web.json_response({'quoteResponse': {'result': [{'symbol': symbol}], 'error': None}})
+
+    async def alpha_vantage(request):
+        calls.append(('av', time.monotonic()))
+        await asyncio.sleep(LATENCY)
+        if request.query['from_currency'] == 'XXX':
+            return web.json_response({'Error Message': 'Invalid API call.'})
+        return web.json_response({'Realtime Currency Exchange Rate': {
+            '5. Exchange Rate': '1.0850', '6. Last Refreshed': '2024-01-01 00:00:00',
+            '8. Bid Price': '1.0849', '9. Ask Price': '1.0851'}})
+
+    app = web.Application()
+    app.router.add_get('/', home)
+    app.router.add_get('/quote/AAPL/history', crumb_page)
+    app.router.add_get('/v7/finance/quote', quote)
+    app.router.add_get('/query', alpha_vantage)
+    return app
+
+
+class TestAsyncClients(unittest.IsolatedAsyncioTestCase):
+    """Test concurrency, spacing and retries against a local server"""
+
+    async def asyncSetUp(self):
+        self.calls = []
+        self.server = TestServer(make_app(self.calls))
+        await self.server.start_server()
+        self.base = str(self.server.make_url(''))
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    def yahoo_client(self, **kwargs):
+        client = AsyncYahooFinanceClient(min_interval=0, base_delay=0.01, **kwargs)
+        client.HOME_URL = self.base + '/'
+        client.CRUMB_PAGE_URL = self.base + '/quote/AAPL/history'
+        client.QUOTE_URL = self.base + '/v7/finance/quote'
+        return client
+
+    async def test_quotes_overlap(self):
+        """Test that multi-symbol quotes share one crumb and run concurrently"""
+        async with self.yahoo_client() as client:
+            start = time.monotonic()
+            quotes = await client.get_quotes(['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOG'])
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(quotes['NVDA']['quoteResponse']['result'][0]['symbol'], 'NVDA')
+        self.assertLess(elapsed, 3 * LATENCY)
+        self.assertEqual(sum(1 for c in self.calls if c[0] == 'crumb'), 1)
+
+    async def test_concurrency_cap(self):
+        """Test that max_concurrency bounds requests in flight"""
+        async with self.yahoo_client(max_concurrency=2) as client:
+            await client._fetch_crumb()
+            start = time.monotonic()
+            await client.get_quotes(['A', 'B', 'C', 'D'])
+            self.assertGreaterEqual(time.monotonic() - start, 2 * LATENCY)
+
+    async def test_retry_after_429(self):
+        """Test that a 429 is retried after a non-blocking backoff"""
+        async with self.yahoo_client() as client:
+            quotes = await client.get_quotes(['FLAKY'])
+        self.assertIsNotNone(quotes['FLAKY'])
+        self.assertEqual(sum(1 for c in self.calls if c[0] == 'quote'), 2)
+
+    async def test_retry_after_is_clamped(self):
+        """Test that huge or negative Retry-After values are bounded"""
+        client = self.yahoo_client()
+        self.assertEqual(client._backoff(0, '86400'), MAX_RETRY_AFTER)
+        self.assertEqual(client._backoff(0, '-5'), 0.0)
+        self.assertEqual(client._backoff(0, '0.5'), 0.5)
+
+    async def test_forex_spacing_and_overlap(self):
+        """Test that forex requests start rate_limit_delay apart but overlap"""
+        delay = 0.05
+        async with AsyncForexClient('key', base_url=self.base + '/query', rate_limit_delay=delay) as client:
+            start = time.monotonic()
+            rates = await client.get_multiple_rates([('EUR', 'USD'), ('GBP', 'USD'), ('XXX', 'USD')])
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(sorted(rates), ['EUR/USD', 'GBP/USD'])
+        self.assertAlmostEqual(rates['EUR/USD']['rate'], 1.085)
+        starts = [t for name, t in self.calls if name == 'av']
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        self.assertEqual(len(starts), 3)
+        self.assertTrue(all(gap >= delay * 0.9 for gap in gaps), gaps)
+        # Serial requests would need at least 3 * LATENCY
+        self.assertLess(elapsed, 3 * LATENCY, elapsed)
+
+
+class TestBlockingClient(unittest.TestCase):
+    """Test the synchronous facade"""
+
+    def test_sync_wrapper(self):
+        """Test calling async client methods from synchronous code"""
+        calls = []
+        server = TestServer(make_app(calls))
+        run_sync(server.start_server())
+        try:
+            client = AsyncForexClient('key', base_url=str(server.make_url('/query')), rate_limit_delay=0)
+            forex = BlockingClient(client, timeout=5)
+            rate = forex.get_exchange_rate('EUR', 'USD')
+            self.assertAlmostEqual(rate['bid'], 1.0849)
+            self.assertEqual(forex.get_api_status()['request_count'], 1)
+            forex.close()
+        finally:
+            run_sync(server.close())
+
+
+if __name__ == '__main__':
+    unittest.main()
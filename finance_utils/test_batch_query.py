@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for batch multi-symbol history queries.
+"""
+
+import io
+import json
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from batch_query import columnar_json, load_parallel, parse_batch_args, pa, run_batch, select_history
+
+
+def daily_history(seed=0, start='2024-06-03', periods=15):
+    index = pd.bdate_range(start, periods=periods, tz='America/New_York')
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, periods))
+    return pd.DataFrame({'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(periods, 10.0), 'RSI': np.linspace(40, 60, periods)}, index=index)
+
+
+class TestParseBatchArgs(unittest.TestCase):
+    """Test parameter validation"""
+
+    def test_defaults_and_dedup(self):
+        query = parse_batch_args({'symbols': 'aapl, msft,AAPL', 'end': '2024-06-07'})
+        self.assertEqual(query['symbols'], ['AAPL', 'MSFT'])
+        self.assertEqual(query['columns'], ['Open', 'High', 'Low', 'Close', 'Volume'])
+        self.assertEqual((query['timeframe'], query['format']), ('1d', 'json'))
+        self.assertIsNone(query['start'])
+        # A bare end date covers the whole day
+        self.assertEqual(query['end'], pd.Timestamp('2024-06-08', tz='UTC') - pd.Timedelta(1, 'ns'))
+        query = parse_batch_args({'symbols': 'AAPL', 'columns': 'Close, RSI,Close'})
+        self.assertEqual(query['columns'], ['Close', 'RSI'])
+
+    def test_rejects_bad_input(self):
+        for args in [{}, {'symbols': 'A', 'start': 'nope'}, {'symbols': 'A', 'timeframe': '1h'},
+                     {'symbols': 'A', 'timeframe': '2y'}, {'symbols': 'A', 'format': 'xml'},
+                     {'symbols': 'A', 'start': '2024-02-01', 'end': '2024-01-01'},
+                     {'symbols': ','.join(f'S{i}' for i in range(51))}]:
+            with self.assertRaises(ValueError, msg=args):
+                parse_batch_args(args)
+
+
+class TestSelectHistory(unittest.TestCase):
+    """Test range trimming, column selection and weekly bars"""
+
+    def test_weekly_with_indicator(self):
+        history = daily_history()
+        weekly = select_history(history, ['Open', 'High', 'Close', 'Volume', 'RSI', 'Missing'],
+                                start=pd.Timestamp('2024-06-04', tz='UTC'), timeframe='1w')
+        self.assertEqual(len(weekly), 3)
+        first_week = history.iloc[1:5]
+        self.assertEqual(weekly['Open'].iloc[0], first_week['Open'].iloc[0])
+        self.assertEqual(weekly['High'].iloc[0], first_week['High'].max())
+        self.assertEqual(weekly['Volume'].iloc[0], 40)
+        self.assertEqual(weekly['RSI'].iloc[0], first_week['RSI'].iloc[-1])
+        self.assertTrue(weekly['Missing'].isna().all())
+
+
+class TestBatchOutput(unittest.TestCase):
+    """Test parallel loading and the columnar payload"""
+
+    def test_columnar_json(self):
+        histories = {'AAPL': daily_history(1), 'MSFT': daily_history(2)}
+        histories['MSFT'].iloc[0, histories['MSFT'].columns.get_loc('RSI')] = np.nan
+        query = parse_batch_args({'symbols': 'AAPL,MSFT,NONE', 'columns': 'Close,RSI',
+                                  'start': '2024-06-03', 'end': '2024-06-07'})
+        payload = json.loads(''.join(run_batch(query, histories.get)))
+        self.assertEqual(payload['missing'], ['NONE'])
+        self.assertEqual(set(payload['symbols']), {'AAPL', 'MSFT'})
+        msft = payload['symbols']['MSFT']
+        self.assertEqual(set(msft), {'index', 'Close', 'RSI'})
+        self.assertEqual(len(msft['index']), 5)
+        self.assertIsNone(msft['RSI'][0])
+        self.assertEqual(msft['index'][0], pd.Timestamp('2024-06-03', tz='America/New_York').value // 10**6)
+
+    def test_empty_document_is_valid(self):
+        query = parse_batch_args({'symbols': 'X'})
+        self.assertEqual(json.loads(''.join(columnar_json([], query)))['symbols'], {})
+
+    def test_loads_run_concurrently_and_failures_are_missing(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def load(symbol):
+            barrier.wait()
+            if symbol == 'BAD':
+                raise RuntimeError('provider down')
+            return daily_history()
+
+        results = dict(load_parallel(['A', 'B', 'BAD'], load))
+        self.assertIsNone(results['BAD'])
+        self.assertEqual(len(results['A']), 15)
+
+    @unittest.skipIf(pa is None, 'pyarrow not installed')
+    def test_arrow_stream(self):
+        query = parse_batch_args({'symbols': 'AAPL,MSFT', 'columns': 'Close', 'format': 'arrow'})
+        data = b''.join(run_batch(query, lambda s: daily_history()))
+        table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+        self.assertEqual(table.column_names, ['symbol', 'timestamp', 'Close'])
+        self.assertEqual(table.num_rows, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline benchmark suite.
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import benchmark_suite
+from benchmark_suite import main, missing_results, run_benchmarks, compare_to_baseline, time_callable
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """Test benchmark runs and baseline comparison"""
+
+    def test_small_run(self):
+        """Test that a quick offline run produces timings for every size"""
+        document = run_benchmarks(sizes=[60, 120], names=['enrich', 'cache_load'],
+                                  repeat=2, n_tickers=2)
+        self.assertEqual(set(document['results']),
+                         {'enrich[60]', 'cache_load[60]', 'enrich[120]', 'cache_load[120]'})
+        for result in document['results'].values():
+            self.assertNotIn('error', result)
+            self.assertGreater(result['median'], 0)
+
+    def test_unknown_benchmark_rejected(self):
+        """Test that typos in benchmark names fail loudly"""
+        with self.assertRaises(ValueError):
+            run_benchmarks(sizes=[60], names=['enrichh'])
+
+    def test_regression_threshold(self):
+        """Test that only slowdowns beyond the threshold are flagged"""
+        baseline = {'results': {'a[1]': {'median': 1.0}, 'b[1]': {'median': 1.0}}}
+        current = {'results': {'a[1]': {'median': 1.2}, 'b[1]': {'median': 1.5},
+                               'c[1]': {'median': 9.0}}}
+        rows = {r['benchmark']: r for r in compare_to_baseline(current, baseline, threshold=0.25)}
+        self.assertFalse(rows['a[1]']['regression'])
+        self.assertTrue(rows['b[1]']['regression'])
+        self.assertNotIn('c[1]', rows)
+
+    def test_time_budget(self):
+        """Test that repetitions stop once the time budget is spent"""
+        result = time_callable(lambda: sum(range(1000)), repeat=7, max_seconds=10.0)
+        self.assertEqual(result['repeat'], 7)
+        result = time_callable(lambda: sum(range(1000)), repeat=7, max_seconds=0.0)
+        self.assertEqual(result['repeat'], 1)
+
+
+    def test_missing_results(self):
+        """Test that baseline keys without a timing are reported within the selection"""
+        current = {'meta': {'benchmarks': ['enrich'], 'sizes': [60]},
+                   'results': {'enrich[60]': {'error': 'boom'}}}
+        baseline = {'results': {'enrich[60]': {'median': 1.0}, 'enrich[120]': {'median': 1.0},
+                                'cache_load[60]': {'median': 1.0}, 'renamed[60]': {'median': 1.0}}}
+        self.assertEqual(missing_results(current, baseline), ['enrich[60]', 'renamed[60]'])
+
+    def test_main_fails_on_error_or_missing(self):
+        """Test that the exit code is non-zero for errored or missing benchmarks"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        output = os.path.join(tmpdir, 'results.json')
+        baseline = os.path.join(tmpdir, 'baseline.json')
+        args = ['--sizes', '60', '--only', 'cache_load', '--repeat', '1', '--tickers', '2',
+                '--output', output]
+
+        def run(*extra):
+            with contextlib.redirect_stdout(io.StringIO()):
+                return main(args + list(extra))
+
+        self.assertEqual(run('--save-baseline', baseline), 0)
+        self.assertEqual(run('--baseline', baseline, '--threshold', '100'), 0)
+
+        with open(baseline) as f:
+            document = json.load(f)
+        document['results']['gone[60]'] = {'median': 1.0}
+        with open(baseline, 'w') as f:
+            json.dump(document, f)
+        self.assertEqual(run('--baseline', baseline, '--threshold', '100'), 1)
+
+        def broken(ctx):
+            raise RuntimeError('boom')
+
+        with patch.dict(benchmark_suite.BENCHMARKS, {'cache_load': broken}):
+            self.assertEqual(run(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
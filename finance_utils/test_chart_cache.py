@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for downsampled, typed-array chart payloads and the figure cache.
+"""
+
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from chart_cache import ChartCache, data_version, line_arrays, lttb_indices, ohlc_arrays
+
+
+def price_history(n, seed=0):
+    index = pd.bdate_range('2015-01-01', periods=n)
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n)))
+    return pd.DataFrame({'Open': close * 0.999, 'High': close * 1.01, 'Low': close * 0.99,
+                         'Close': close, 'Volume': np.ones(n)}, index=index)
+
+
+class TestDownsampling(unittest.TestCase):
+    """Test that reduced series keep their shape"""
+
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        x = np.arange(10_000, dtype=float)
+        y = np.sin(x / 500)
+        y[4321] = 5.0
+        y[7000] = -5.0
+        keep = lttb_indices(x, y, 300)
+        self.assertEqual(len(keep), 300)
+        self.assertEqual((keep[0], keep[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(4321, keep)
+        self.assertIn(7000, keep)
+
+    def test_lttb_skips_nan_and_short_series(self):
+        y = np.r_[np.full(50, np.nan), np.arange(10.0)]
+        np.testing.assert_array_equal(lttb_indices(np.arange(60.0), y, 100), np.arange(50, 60))
+
+    def test_ohlc_buckets_preserve_range(self):
+        df = price_history(2500)
+        candles = ohlc_arrays(df, max_points=500)
+        self.assertLessEqual(len(candles['x']), 500)
+        self.assertAlmostEqual(candles['high'].max(), df['High'].max(), delta=1e-3)
+        self.assertAlmostEqual(candles['low'].min(), df['Low'].min(), delta=1e-3)
+        self.assertAlmostEqual(candles['open'][0], df['Open'].iloc[0], places=4)
+        self.assertAlmostEqual(candles['close'][-1], df['Close'].iloc[-1], places=4)
+
+    def test_dates_are_epoch_milliseconds(self):
+        x, y = line_arrays(price_history(3)['Close'])
+        self.assertEqual(x[0], pd.Timestamp('2015-01-01').value / 1e6)
+        self.assertEqual(y.dtype, np.float32)
+
+
+class TestChartCache(unittest.TestCase):
+    """Test that figures are rebuilt only when the data changes"""
+
+    def test_rebuilds_on_new_version(self):
+        cache = ChartCache()
+        df = price_history(300)
+        builds = []
+
+        def build():
+            builds.append(1)
+            return json.dumps({'n': len(builds)})
+
+        first = cache.get_or_build('AAPL', 'candlestick', data_version(df), build, days=100)
+        self.assertEqual(cache.get_or_build('AAPL', 'candlestick', data_version(df), build, days=100), first)
+        cache.get_or_build('AAPL', 'candlestick', data_version(df), build, days=0)
+        df.iloc[-1, df.columns.get_loc('Close')] += 1
+        cache.get_or_build('AAPL', 'candlestick', data_version(df), build, days=100)
+        self.assertEqual(len(builds), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
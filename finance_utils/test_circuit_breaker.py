@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for the circuit breaker, the AIMD limiter and their use by Yahoo callers.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import requests
+
+import circuit_breaker
+import stock_robust
+from circuit_breaker import (AIMDLimiter, CircuitBreaker, CLOSED, HALF_OPEN, OPEN,
+                             ERROR, RATE_LIMITED, SUCCESS, UNAUTHORIZED, classify_exception)
+from synthetic_data import generate_market
+from yahoo_finance_client import YahooFinanceClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test tripping, half-open probes and cool-off growth"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('test', min_calls=5, open_seconds=10, clock=self.clock)
+
+    def test_trips_on_throttle_rate(self):
+        """Test that a 429 share above the threshold opens the circuit"""
+        for outcome in [SUCCESS] * 4 + [RATE_LIMITED]:
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(outcome)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_in(), 10)
+
+    def test_occasional_errors_tolerated(self):
+        """Test that sparse generic errors keep the circuit closed"""
+        for outcome in [SUCCESS, SUCCESS, ERROR] * 5:
+            self.breaker.record(outcome)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_auth_failures_not_throttling(self):
+        """Test that an expired crumb counts as an error, not as a throttle"""
+        for outcome in [SUCCESS] * 4 + [UNAUTHORIZED]:
+            self.breaker.record(outcome)
+        self.assertEqual(self.breaker.state, CLOSED)
+        for _ in range(5):
+            self.breaker.record(UNAUTHORIZED)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_probe(self):
+        """Test one probe after the cool-off; failure doubles the next cool-off"""
+        for _ in range(5):
+            self.breaker.record(RATE_LIMITED)
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record(RATE_LIMITED)
+        self.assertEqual(self.breaker.retry_in(), 20)
+
+        self.clock.now += 20
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(SUCCESS)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.trips, 0)
+
+    def test_retry_after_extends_cool_off(self):
+        """Test that Retry-After longer than the cool-off is honoured"""
+        for _ in range(5):
+            self.breaker.record(RATE_LIMITED, retry_after=120)
+        self.assertEqual(self.breaker.retry_in(), 120)
+
+    def test_classify_exception(self):
+        """Test outcome classification of provider errors"""
+        self.assertEqual(classify_exception(Exception('Too Many Requests. Rate limited.')), RATE_LIMITED)
+        self.assertEqual(classify_exception(ValueError('bad json')), ERROR)
+
+
+class TestAIMDLimiter(unittest.TestCase):
+    """Test additive increase and multiplicative decrease"""
+
+    def test_aimd(self):
+        limiter = AIMDLimiter(initial=8, max_limit=10)
+        with limiter.slot() as report:
+            report(RATE_LIMITED)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(8):
+            with limiter.slot():
+                pass
+        self.assertGreater(limiter.limit, 5.5)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_blocks_at_limit(self):
+        limiter = AIMDLimiter(initial=1)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(timeout=0.05))
+        limiter.release()
+        self.assertTrue(limiter.acquire(timeout=0.05))
+
+
+class RateLimitedSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def get(self, url, params=None, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 429
+        return response
+
+
+class TestYahooCallers(unittest.TestCase):
+    """Test that Yahoo callers fail fast to cache while the circuit is open"""
+
+    def setUp(self):
+        self.breaker = CircuitBreaker('yahoo', min_calls=1, open_seconds=300)
+        self.patches = [patch.dict(circuit_breaker._breakers, {'yahoo': self.breaker}),
+                        patch.object(stock_robust.yahoo_client, 'breaker', self.breaker)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_client_stops_retrying(self):
+        """Test that a 429 opening the circuit ends the retry loop without sleeping"""
+        session = RateLimitedSession()
+        client = YahooFinanceClient(session=session, persist_session=False)
+        client.min_interval = 0
+        start = time.time()
+        self.assertIsNone(client._make_request('https://example.invalid/quote', {}))
+        self.assertIsNone(client._make_request('https://example.invalid/quote', {}))
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(session.calls, 1)
+        self.assertEqual(client.limiter.in_flight, 0)
+
+    def test_stock_robust_uses_stale_cache(self):
+        """Test that StockRobust serves old cached history while Yahoo is open-circuited"""
+        for _ in range(3):
+            self.breaker.record(RATE_LIMITED)
+        tmpdir = Path(tempfile.mkdtemp())
+        try:
+            # Spans the April DST change, so the cached offsets are mixed
+            frame = generate_market(['STALE'], 90, seed=4)['STALE']
+            cache_file = tmpdir / 'STALE_1y.csv'
+            frame.to_csv(cache_file)
+            old = time.time() - 3 * 86400
+            os.utime(cache_file, (old, old))
+
+            with patch.object(stock_robust, 'CACHE_DIR', tmpdir), \
+                    patch.object(stock_robust.yf, 'Ticker') as ticker:
+                stock = stock_robust.StockRobust('STALE')
+            ticker.return_value.history.assert_not_called()
+            self.assertEqual(len(stock.history), 90)
+            self.assertIsInstance(stock.history.index, pd.DatetimeIndex)
+            self.assertEqual(str(stock.history.index.tz), 'UTC')
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the rolling correlation service.
+"""
+
+import unittest
+import time
+
+import numpy as np
+import pandas as pd
+
+from correlation_service import MAX_WINDOW, RollingCorrelation, align_closes
+
+
+class TestRollingCorrelation(unittest.TestCase):
+    """Test incremental covariance/correlation"""
+
+    def setUp(self):
+        """Create correlated random returns with a few gaps"""
+        rng = np.random.default_rng(0)
+        base = rng.normal(0, 0.01, (300, 1))
+        self.returns = base + rng.normal(0, 0.01, (300, 6)) * np.linspace(0.2, 3, 6)
+        self.returns[rng.random(self.returns.shape) < 0.05] = np.nan
+        self.symbols = [f"S{i}" for i in range(6)]
+
+    def test_incremental_matches_pandas(self):
+        """Test that bar-by-bar updates match a full recomputation"""
+        service = RollingCorrelation(self.symbols, window=50, resync_every=10_000)
+        for row in self.returns:
+            service.update(row)
+
+        expected = pd.DataFrame(self.returns[-50:], columns=self.symbols)
+        np.testing.assert_allclose(service.correlation().to_numpy(),
+                                   expected.corr().to_numpy(), atol=1e-8)
+        np.testing.assert_allclose(service.covariance().to_numpy(),
+                                   expected.cov().to_numpy(), atol=1e-10)
+
+    def test_extend_matches_update(self):
+        """Test that batch loading equals bar-by-bar updates"""
+        batch = RollingCorrelation(self.symbols, window=40)
+        batch.extend(self.returns)
+        stepwise = RollingCorrelation(self.symbols, window=40)
+        for row in self.returns:
+            stepwise.update(row)
+
+        np.testing.assert_allclose(batch.correlation().to_numpy(),
+                                   stepwise.correlation().to_numpy(), atol=1e-8)
+
+    def test_top_k_lookups(self):
+        """Test most and least correlated lookups"""
+        service = RollingCorrelation(self.symbols, window=100)
+        service.extend(self.returns)
+        corr = service.correlation()
+
+        most = service.top_correlated('S0', k=2)
+        least = service.top_correlated('S0', k=1, least=True)
+        expected = corr['S0'].drop('S0').sort_values(ascending=False)
+
+        self.assertEqual([s for s, _ in most], list(expected.index[:2]))
+        self.assertEqual(least[0][0], expected.index[-1])
+        self.assertEqual(len(service.top_pairs(3)), 3)
+
+    def test_sync_prices_only_applies_new_bars(self):
+        """Test that re-syncing the same prices is a no-op"""
+        index = pd.date_range('2024-01-01', periods=120, freq='D', tz='UTC')
+        prices = np.exp(np.nancumsum(np.nan_to_num(self.returns[:120]), axis=0)) * 100
+        frames = {s: pd.DataFrame({'Close': prices[:, i]}, index=index)
+                  for i, s in enumerate(self.symbols)}
+
+        service = RollingCorrelation.from_frames(frames, window=30)
+        closes = align_closes(frames)
+        self.assertEqual(service.sync_prices(closes), 0)
+
+        expected = closes.pct_change().iloc[-30:].corr()
+        np.testing.assert_allclose(service.correlation().to_numpy(),
+                                   expected.to_numpy(), atol=1e-8)
+
+    def test_update_prices_missing_symbol(self):
+        """Test that a symbol left out of a dict bar gets no return for that bar"""
+        prices = np.exp(np.nancumsum(np.nan_to_num(self.returns[:40]), axis=0)) * 100
+        service = RollingCorrelation(self.symbols, window=30)
+        for row in prices[:-1]:
+            service.update_prices(dict(zip(self.symbols, row)))
+        service.update_prices(dict(zip(self.symbols[1:], prices[-1, 1:])))
+
+        expected = pd.DataFrame(prices, columns=self.symbols).pct_change()
+        expected.iloc[-1, 0] = np.nan
+        np.testing.assert_allclose(service.covariance().to_numpy(),
+                                   expected.iloc[-30:].cov().to_numpy(), atol=1e-10)
+        # The missing close doesn't replace the previous one
+        self.assertEqual(service._last_close[0], prices[-2, 0])
+
+    def test_large_universe_update_speed(self):
+        """Test that a 500-symbol universe updates at interactive speed"""
+        rng = np.random.default_rng(1)
+        service = RollingCorrelation([f"T{i}" for i in range(500)], window=60)
+        service.extend(rng.normal(0, 0.01, (60, 500)))
+
+        start_time = time.time()
+        for row in rng.normal(0, 0.01, (20, 500)):
+            service.update(row)
+        service.top_correlated('T0', k=10)
+        self.assertLess(time.time() - start_time, 2.0)
+
+
+class TestCorrelationEndpoint(unittest.TestCase):
+    """Test the forex correlation API"""
+
+    def setUp(self):
+        """Set up test client"""
+        from app_combined import app
+        self.app = app.test_client()
+
+    def test_forex_correlation(self):
+        """Test the forex correlation endpoint"""
+        response = self.app.get('/api/forex/correlation?pairs=EUR/USD,GBP/USD,USD/JPY&window=50')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['symbols'], ['EUR/USD', 'GBP/USD', 'USD/JPY'])
+        self.assertEqual(len(data['correlation']), 3)
+        self.assertAlmostEqual(data['correlation'][0][0], 1.0)
+
+    def test_forex_correlation_service_is_reused(self):
+        """Test that repeat requests update one cached service and the window is clamped"""
+        from app_combined import forex_correlation_cache
+        forex_correlation_cache.clear()
+        url = '/api/forex/correlation?pairs=EUR/USD,GBP/USD&window=1000000000'
+        first = self.app.get(url).get_json()
+        self.assertEqual(first['window'], MAX_WINDOW)
+        service = forex_correlation_cache.get((('EUR/USD', 'GBP/USD'), MAX_WINDOW))
+        self.assertIsNotNone(service)
+        self.assertEqual(self.app.get(url).get_json(), first)
+        self.assertEqual(len(forex_correlation_cache), 1)
+        self.assertEqual(service.sync_frames({}), 0)
+
+    def test_forex_correlation_unknown_pair(self):
+        """Test unknown pairs are rejected"""
+        response = self.app.get('/api/forex/correlation?pairs=XXX/YYY')
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
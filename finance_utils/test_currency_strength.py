@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for the least-squares currency strength engine.
+"""
+
+import itertools
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from forex.currency_strength import CurrencyStrength, incidence_matrix
+
+CURRENCIES = ['AUD', 'CAD', 'CHF', 'EUR', 'GBP', 'JPY', 'NZD', 'USD']
+PAIRS = [f"{a}/{b}" for a, b in itertools.combinations(CURRENCIES, 2)]
+
+
+def synthetic_returns(n_bars, noise=0.0, seed=0):
+    """Zero-sum currency moves and the pair returns they imply."""
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(0, 1e-3, (n_bars, len(CURRENCIES)))
+    strength -= strength.mean(axis=1, keepdims=True)
+    matrix, _ = incidence_matrix(PAIRS, CURRENCIES)
+    returns = strength @ matrix.T + rng.normal(0, noise, (n_bars, len(PAIRS)))
+    return strength, returns
+
+
+class TestCurrencyStrength(unittest.TestCase):
+    """Test recovery, missing data and incremental updates"""
+
+    def setUp(self):
+        self.engine = CurrencyStrength(PAIRS)
+
+    def test_recovers_strengths(self):
+        """Test that exact pair returns give back the currency moves"""
+        strength, returns = synthetic_returns(500)
+        np.testing.assert_allclose(self.engine.solve(returns), strength, atol=1e-12)
+
+    def test_missing_pairs(self):
+        """Test bars with missing quotes, including a currency with no quotes at all"""
+        strength, returns = synthetic_returns(200)
+        returns[::3, PAIRS.index('EUR/USD')] = np.nan
+        usd_pairs = [i for i, pair in enumerate(PAIRS) if 'USD' in pair]
+        returns[np.ix_(np.arange(1, 200, 5), usd_pairs)] = np.nan
+
+        solved = self.engine.solve(returns)
+        usd = CURRENCIES.index('USD')
+        self.assertTrue(np.isnan(solved[1::5, usd]).all())
+        # Other currencies stay consistent with each other when USD drops out
+        others = [j for j in range(len(CURRENCIES)) if j != usd]
+        np.testing.assert_allclose(np.diff(solved[1::5][:, others], axis=1),
+                                   np.diff(strength[1::5][:, others], axis=1), atol=1e-12)
+        full = np.setdiff1d(np.arange(200), np.r_[0:200:3, 1:200:5])
+        np.testing.assert_allclose(solved[full], strength[full], atol=1e-12)
+
+    def test_incremental_matches_batch(self):
+        """Test that bar-by-bar updates add up to the batched index"""
+        _, returns = synthetic_returns(50, noise=1e-4)
+        prices = pd.DataFrame(np.exp(np.cumsum(np.vstack([np.zeros(len(PAIRS)), returns]), axis=0)),
+                              columns=PAIRS)
+        for row in returns:
+            self.engine.update(dict(zip(PAIRS, row)))
+        np.testing.assert_allclose(self.engine.level, self.engine.index(prices).iloc[-1].to_numpy(),
+                                   atol=1e-12)
+        self.assertEqual(self.engine.bars, 50)
+        self.assertEqual(len(self.engine.ranking()), len(CURRENCIES))
+
+    def test_disconnected_groups_sum_to_zero(self):
+        """Test that each connected group of currencies is zero-sum"""
+        engine = CurrencyStrength(['EUR/USD', 'USD/JPY', 'AUD/NZD'])
+        solved = engine.solve(np.array([[0.01, -0.02, 0.004]]))[0]
+        column = dict(zip(engine.currencies, solved))
+        self.assertAlmostEqual(column['AUD'] + column['NZD'], 0)
+        self.assertAlmostEqual(column['EUR'] + column['USD'] + column['JPY'], 0)
+        self.assertAlmostEqual(column['EUR'] - column['USD'], 0.01)
+
+    def test_rejects_wrong_width(self):
+        with self.assertRaises(ValueError):
+            self.engine.solve(np.zeros((3, 5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -357,6 +357,125 @@ class TestForexAPIDocumentation(unittest.TestCase):
         self.assertIn('sma_50', data)
 
 
+class TestMockForexData(unittest.TestCase):
+    """Test the vectorized mock data source behind the demo endpoints"""
+
+    def test_indicators_match_pandas(self):
+        """Test that array indicators match the rolling/ewm definitions"""
+        import numpy as np
+        import pandas as pd
+        from app_combined import compute_forex_indicators
+
+        close = pd.Series(1.1 + np.cumsum(np.random.default_rng(1).normal(0, 0.001, 200)))
+        indicators = compute_forex_indicators(close.to_numpy())
+
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        expected = {
+            'SMA_50': close.rolling(50).mean(),
+            'BB_Std': close.rolling(20).std(),
+            'Signal': (close.ewm(span=12).mean() - close.ewm(span=26).mean()).ewm(span=9).mean(),
+            'RSI': 100 - 100 / (1 + gain / loss),
+        }
+        for column, values in expected.items():
+            np.testing.assert_allclose(indicators[column], values.to_numpy(), rtol=1e-9,
+                                       equal_nan=True, err_msg=column)
+
+    def test_cache_is_bounded_and_seeded(self):
+        """Test that the mock cache evicts and that a pair regenerates identically"""
+        from app_combined import forex_cache, get_mock_forex_data
+
+        first = get_mock_forex_data('EUR/GBP')
+        self.assertIs(get_mock_forex_data('EUR/GBP'), first)
+        forex_cache.pop(('EUR/GBP', 30))
+        again = get_mock_forex_data('EUR/GBP')
+        self.assertIsNot(again, first)
+        self.assertEqual(list(again['Close'].round(10)), list(first['Close'].round(10)))
+
+        for days in range(1, forex_cache.maxsize + 2):
+            get_mock_forex_data('EUR/USD', days=days)
+        self.assertLessEqual(len(forex_cache), forex_cache.maxsize)
+
+    def test_strength_heatmap(self):
+        """Test the currency strength endpoint shape and zero-sum scores"""
+        client = app.test_client()
+        response = client.get('/api/forex/strength?bars=12')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(len(data['strength']), 12)
+        self.assertEqual(len(data['strength'][0]), len(data['currencies']))
+        self.assertAlmostEqual(sum(item['strength'] for item in data['ranking']), 0, places=3)
+        self.assertEqual(client.get('/api/forex/strength?bars=0').status_code, 400)
+
+    def test_pair_revalidates_with_etag(self):
+        """Test that an unchanged pair is answered with 304"""
+        client = app.test_client()
+        first = client.get('/api/forex/pair/EUR/USD')
+        self.assertEqual(first.status_code, 200)
+        again = client.get('/api/forex/pair/EUR/USD', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertNotIn('ETag', client.get('/api/forex/pair/XXX/YYY').headers)
+
+    def test_market_state_follows_legs_fetched_elsewhere(self):
+        """Test that legs refreshed by another reader still reach market_state"""
+        import app_combined
+        from app_combined import get_mock_forex_data, market_state, rates_engine, refresh_market_state
+
+        rate = float(get_mock_forex_data('EUR/USD')['Close'].iloc[-1]) * 1.001
+        with patch('app_combined.forex_client', Mock()):
+            refresh_market_state()
+            # A leg recorded outside refresh(), e.g. from a direct quote
+            rates_engine.set_quote('EUR', 'USD', rate, rate)
+            refresh_market_state()
+        self.assertAlmostEqual(market_state.get_rates(['EUR/USD'])['EUR/USD']['rate'], rate)
+        self.assertEqual(app_combined.market_state_rates_version, rates_engine.version)
+
+    def test_live_rates_refresh_off_the_request_path(self):
+        """Test that a slow live leg fetch runs in the background, once"""
+        import threading
+        import time
+        import app_combined
+
+        release = threading.Event()
+        fetches = []
+
+        def slow_fetch(legs):
+            fetches.append(legs)
+            release.wait(5)
+            return {}
+
+        client = app.test_client()
+        with patch('app_combined.forex_client', Mock()), patch('app_combined.market_refresher', None), \
+                patch.object(app_combined.rates_engine, 'fetch', slow_fetch), \
+                patch.object(app_combined.rates_engine, 'max_age', 0):
+            start = time.time()
+            for url in ['/api/forex/overview', '/api/forex/rates', '/api/forex/overview']:
+                self.assertEqual(client.get(url).status_code, 200)
+            self.assertLess(time.time() - start, 2)
+            for _ in range(100):
+                if fetches:
+                    break
+                time.sleep(0.01)
+            release.set()
+        self.assertEqual(len(fetches), 1)
+
+    def test_stream_pushes_first_tick(self):
+        """Test that the SSE endpoint sends a full first update for each pair"""
+        client = app.test_client()
+        response = client.get('/api/forex/stream?pairs=EUR/USD', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = response.iter_encoded()
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        frame = next(chunks).decode()
+        response.close()
+        self.assertIn('event: tick', frame)
+        data = json.loads(frame.split('data: ', 1)[1])
+        self.assertEqual(data['symbol'], 'EUR/USD')
+        self.assertIn('rsi', data)
+        self.assertEqual(client.get('/api/forex/stream?pairs=XXX/YYY').status_code, 404)
+
+
 if __name__ == '__main__':
     print("🧪 Running Comprehensive Forex API Tests")
     print("=" * 50)
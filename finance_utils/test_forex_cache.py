@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the disk-backed forex series cache and its use by ForexClient.
+"""
+
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from forex.forex_cache import ForexCache
+from forex.forex_client import ForexClient
+
+
+def daily_payload(end, days, label='Daily'):
+    """Alpha Vantage FX_DAILY-style response with `days` bars ending at `end`."""
+    dates = pd.bdate_range(end=end, periods=days)
+    series = {d.strftime('%Y-%m-%d'): {'1. open': '1.08', '2. high': '1.09', '3. low': '1.07',
+                                       '4. close': f'{1.08 + i * 1e-4:.4f}'}
+              for i, d in enumerate(dates)}
+    return {'Meta Data': {}, f'Time Series FX ({label})': series}
+
+
+class FakeClock:
+    def __init__(self, when):
+        self.now = pd.Timestamp(when, tz='UTC').timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+class TestForexCache(unittest.TestCase):
+    """Test TTLs, compact top-ups and range slicing"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.clock = FakeClock('2024-06-03 12:00')
+        self.cache = ForexCache(self.tmpdir, clock=self.clock)
+        self.client = ForexClient('key', cache=self.cache)
+        self.requests = []
+
+        def fake_request(params):
+            self.requests.append(dict(params))
+            end = pd.Timestamp(self.clock.now, unit='s').normalize()
+            if params['function'] == 'FX_WEEKLY':
+                return daily_payload(end, 50, label='Weekly')
+            return daily_payload(end, 400 if params['outputsize'] == 'full' else 100)
+
+        self.client._make_request = fake_request
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fresh_entry_served_from_disk(self):
+        """Test that a second call inside the TTL makes no request, even from a new client"""
+        first = self.client.get_daily_data('EUR', 'USD')
+        other = ForexClient('key', cache=ForexCache(self.tmpdir, clock=self.clock))
+        other._make_request = lambda params: self.fail('unexpected request')
+        pd.testing.assert_frame_equal(other.get_daily_data('EUR', 'USD'), first)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_full_series_serves_compact_and_ranges(self):
+        """Test that one full download answers compact and date-range queries"""
+        full = self.client.get_daily_data('EUR', 'USD', outputsize='full')
+        compact = self.client.get_daily_data('EUR', 'USD')
+        window = self.client.get_pair_data_range('EUR', 'USD', datetime(2024, 1, 1), datetime(2024, 3, 31))
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(len(full), 400)
+        pd.testing.assert_frame_equal(compact, full.tail(100))
+        self.assertEqual(window.index.min(), pd.Timestamp('2024-01-01'))
+        self.assertEqual(window.index.max(), pd.Timestamp('2024-03-29'))
+
+    def test_stale_full_series_topped_up_with_compact(self):
+        """Test that an expired full series is refreshed with a compact request"""
+        self.client.get_daily_data('EUR', 'USD', outputsize='full')
+        self.clock.now += 2 * 86400
+        df = self.client.get_daily_data('EUR', 'USD', outputsize='full')
+
+        self.assertEqual([r['outputsize'] for r in self.requests], ['full', 'compact'])
+        self.assertEqual(df.index.max(), pd.Timestamp('2024-06-05'))
+        self.assertTrue(df.index.is_unique)
+        self.assertEqual(self.cache.stats()['top_ups'], 1)
+
+    def test_old_series_refetched_in_full(self):
+        """Test that a tail too old for a compact top-up triggers a full download"""
+        self.client.get_daily_data('EUR', 'USD', outputsize='full')
+        self.clock.now += 200 * 86400
+        self.client.get_daily_data('EUR', 'USD', outputsize='full')
+        self.assertEqual([r['outputsize'] for r in self.requests], ['full', 'full'])
+
+    def test_granularity_ttls(self):
+        """Test that TTLs follow bar size"""
+        self.assertEqual(self.cache.ttl('FX_INTRADAY', '5min'), 300)
+        self.assertGreater(self.cache.ttl('FX_MONTHLY'), self.cache.ttl('FX_DAILY'))
+
+    def test_stale_served_when_fetch_fails(self):
+        """Test that an expired entry is still served when the API fails"""
+        first = self.client.get_weekly_data('EUR', 'USD')
+        self.client._make_request = lambda params: None
+        self.clock.now += 30 * 86400
+        pd.testing.assert_frame_equal(self.client.get_weekly_data('EUR', 'USD'), first)
+
+
+    def test_failed_top_up_serves_stale_without_refetch(self):
+        """Test that a failed compact top-up falls back to cache after one request"""
+        first = self.client.get_daily_data('EUR', 'USD', outputsize='full')
+        self.clock.now += 2 * 86400
+        failed = []
+        self.client._make_request = lambda params: failed.append(params['outputsize'])
+
+        pd.testing.assert_frame_equal(self.client.get_daily_data('EUR', 'USD', outputsize='full'), first)
+        self.assertEqual(failed, ['compact'])
+
+    def test_compact_refetch_keeps_full_history(self):
+        """Test that a compact refetch merges into a cached full series"""
+        full = self.client.get_daily_data('EUR', 'USD', outputsize='full')
+        self.clock.now += 200 * 86400
+        compact = self.client.get_daily_data('EUR', 'USD')
+
+        self.assertEqual([r['outputsize'] for r in self.requests], ['full', 'compact'])
+        self.assertEqual(len(compact), 100)
+        entry = self.cache.load('FX_DAILY', 'EUR/USD')
+        self.assertEqual(len(entry['frame']), 500)
+        self.assertEqual(entry['frame'].index.min(), full.index.min())
+        # The new bars don't reach the old tail, so a full request must refetch
+        self.assertFalse(entry['full'])
+        self.client.get_daily_data('EUR', 'USD', outputsize='full')
+        self.assertEqual(self.requests[-1]['outputsize'], 'full')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for ETag revalidation and response compression.
+"""
+
+import gzip
+import json
+import unittest
+
+from flask import Flask, Response, jsonify
+
+from http_cache import conditional, enable_compression
+
+
+def make_app():
+    app = Flask(__name__)
+    enable_compression(app)
+    state = {'version': 1, 'calls': 0}
+
+    @app.route('/api/item/<name>')
+    @conditional(lambda name: None if name == 'uncached' else state['version'])
+    def item(name):
+        state['calls'] += 1
+        if name == 'missing':
+            return jsonify({'error': 'not found'}), 404
+        return jsonify({'name': name, 'values': list(range(500))})
+
+    @app.route('/api/stream')
+    def stream():
+        return Response(iter(['data: x\n\n'] * 200), mimetype='text/event-stream')
+
+    return app, state
+
+
+class TestConditional(unittest.TestCase):
+    """Test that matching ETags skip the view"""
+
+    def setUp(self):
+        app, self.state = make_app()
+        self.client = app.test_client()
+
+    def test_not_modified_until_version_changes(self):
+        first = self.client.get('/api/item/a')
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(first.headers['Cache-Control'], 'no-cache')
+
+        again = self.client.get('/api/item/a', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b'')
+        self.assertEqual(self.state['calls'], 1)
+
+        self.assertNotEqual(self.client.get('/api/item/b').headers['ETag'], etag)
+        self.state['version'] = 2
+        self.assertEqual(self.client.get('/api/item/a', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_errors_and_opt_out_are_untagged(self):
+        self.assertNotIn('ETag', self.client.get('/api/item/missing').headers)
+        self.assertNotIn('ETag', self.client.get('/api/item/uncached').headers)
+
+
+class TestCompression(unittest.TestCase):
+    """Test gzip for large bodies only"""
+
+    def setUp(self):
+        app, _ = make_app()
+        self.client = app.test_client()
+
+    def test_large_json_is_gzipped(self):
+        response = self.client.get('/api/item/a', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.data))['name'], 'a')
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+
+    def test_skipped_without_accept_or_when_small_or_streamed(self):
+        self.assertNotIn('Content-Encoding', self.client.get('/api/item/a').headers)
+        small = self.client.get('/api/item/missing', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+        stream = self.client.get('/api/stream', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', stream.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
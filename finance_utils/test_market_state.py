@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental forex market state and the session lookup table.
+"""
+
+import random
+import unittest
+
+from forex.currency_pairs import TRADING_SESSIONS, get_active_sessions, is_market_open
+from forex.market_state import MarketState
+
+PAIRS = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF', 'AUD/USD']
+
+
+class TestMarketState(unittest.TestCase):
+    """Test running totals and the top-movers heap"""
+
+    def test_top_movers_follow_updates(self):
+        """Test that a pair drops out of the top movers once its move fades"""
+        state = MarketState(PAIRS, top_n=2)
+        for pair, change in zip(PAIRS, [0.001, -0.004, 0.002, 0.0005, 0.003]):
+            state.update(pair, 1.0, change)
+        self.assertEqual([m['pair'] for m in state.top_movers()], ['GBP/USD', 'AUD/USD'])
+
+        state.update('GBP/USD', 1.0, 0.0)
+        self.assertEqual([m['pair'] for m in state.top_movers()], ['AUD/USD', 'USD/JPY'])
+
+    def test_matches_full_recompute(self):
+        """Test that maintained state equals a from-scratch computation"""
+        state = MarketState(PAIRS, top_n=3)
+        rng = random.Random(7)
+        latest = {}
+        for _ in range(500):
+            pair = rng.choice(PAIRS)
+            latest[pair] = rng.gauss(0, 0.002)
+            state.update(pair, 1.1, latest[pair])
+
+            expected = sorted(latest, key=lambda p: abs(latest[p]), reverse=True)[:3]
+            self.assertEqual([abs(m['change']) for m in state.top_movers()],
+                             [abs(latest[p]) for p in expected])
+        overview = state.overview()
+        self.assertEqual(overview['total_pairs'], len(latest))
+        self.assertAlmostEqual(overview['average_change'], sum(latest.values()) / len(latest))
+        # Superseded heap entries are compacted away
+        self.assertLessEqual(len(state._heap), 4 * len(PAIRS) + 16)
+
+    def test_change_defaults_to_rate_move(self):
+        """Test that returns are derived from successive rates when not given"""
+        state = MarketState(PAIRS)
+        state.update('EUR/USD', 1.0)
+        state.update('EUR/USD', 1.01)
+        self.assertAlmostEqual(state.get_rates()['EUR/USD']['change'], 0.01)
+        self.assertEqual(state.overview()['market_sentiment'], 'bullish')
+        self.assertNotIn('GBP/USD', state.get_rates())
+
+
+class TestSessionTable(unittest.TestCase):
+    """Test the hour -> sessions lookup against the session definitions"""
+
+    def test_matches_session_hours(self):
+        """Test every hour, including sessions that cross midnight"""
+        for hour in range(24):
+            for name, session in TRADING_SESSIONS.items():
+                start = int(session['start'].split(':')[0])
+                end = int(session['end'].split(':')[0])
+                expected = start <= hour < end if start <= end else hour >= start or hour < end
+                self.assertEqual(is_market_open(name, hour), expected, (name, hour))
+        self.assertEqual(get_active_sessions(14), ['London', 'New York'])
+        self.assertFalse(is_market_open('Frankfurt', 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
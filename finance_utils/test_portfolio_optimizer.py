@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the mean-variance portfolio optimizer.
+"""
+
+import itertools
+import unittest
+import time
+
+import numpy as np
+import pandas as pd
+
+from portfolio import Portfolio
+from portfolio_stock import PortfolioStock
+from portfolio_optimizer import PortfolioOptimizer
+from test_portfolio_risk import make_history
+
+
+def factor_returns(n_assets, n_days=750, seed=0):
+    """Daily returns driven by a few common factors."""
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, (n_days, 5))
+    loadings = rng.normal(0, 1, (5, n_assets))
+    drift = rng.normal(0.0004, 0.0003, n_assets)
+    return pd.DataFrame(factors @ loadings + rng.normal(0, 0.015, (n_days, n_assets)) + drift,
+                        columns=[f"A{i}" for i in range(n_assets)])
+
+
+def brute_force_min_variance(cov, lower, upper):
+    """Exact box-constrained minimum variance by trying every lower/upper/free assignment."""
+    n = len(cov)
+    best = np.inf
+    for states in itertools.product((0, 1, 2), repeat=n):
+        states = np.array(states)
+        F = np.flatnonzero(states == 2)
+        if not len(F):
+            continue
+        w = np.where(states == 0, lower, upper).astype(float)
+        B = np.flatnonzero(states != 2)
+        # Stationary point on this face: C_FF w_F + gamma = -C_FB w_B, sum(w_F) = 1 - sum(w_B)
+        kkt = np.block([[cov[np.ix_(F, F)], np.ones((len(F), 1))], [np.ones((1, len(F))), np.zeros((1, 1))]])
+        rhs = np.append(-cov[np.ix_(F, B)] @ w[B], 1.0 - w[B].sum())
+        try:
+            w[F] = np.linalg.solve(kkt, rhs)[:-1]
+        except np.linalg.LinAlgError:
+            continue
+        if (w >= lower - 1e-10).all() and (w <= upper + 1e-10).all():
+            best = min(best, w @ cov @ w)
+    return best
+
+
+class TestPortfolioOptimizer(unittest.TestCase):
+    """Test frontier, minimum-variance and maximum-Sharpe weights"""
+
+    def setUp(self):
+        """Three-asset problem with a known unconstrained solution"""
+        self.mu = np.array([0.10, 0.20, 0.15])
+        self.cov = np.array([[0.04, 0.01, 0.00],
+                             [0.01, 0.09, 0.02],
+                             [0.00, 0.02, 0.06]])
+
+    def test_matches_closed_form(self):
+        """Test min-variance and tangency weights when no bound is active"""
+        optimizer = PortfolioOptimizer(self.mu, self.cov, symbols=['A', 'B', 'C'])
+
+        inv_ones = np.linalg.solve(self.cov, np.ones(3))
+        inv_mu = np.linalg.solve(self.cov, self.mu)
+        min_var = optimizer.min_variance()['weights']
+        max_sharpe = optimizer.max_sharpe()['weights']
+
+        np.testing.assert_allclose([min_var[s] for s in 'ABC'], inv_ones / inv_ones.sum(), atol=1e-6)
+        np.testing.assert_allclose([max_sharpe[s] for s in 'ABC'], inv_mu / inv_mu.sum(), atol=1e-6)
+
+    def test_constraints_and_frontier_shape(self):
+        """Test bounds, full investment and a monotone frontier"""
+        optimizer = PortfolioOptimizer.from_returns(factor_returns(40), max_weight=0.1)
+        weights = optimizer.frontier_weights(20)
+
+        self.assertTrue((weights >= -1e-9).all())
+        self.assertTrue((weights <= 0.1 + 1e-9).all())
+        np.testing.assert_allclose(weights.sum(axis=1), 1.0, atol=1e-9)
+
+        frontier = optimizer.efficient_frontier(20)
+        returns = [p['expected_return'] for p in frontier]
+        vols = [p['volatility'] for p in frontier]
+        self.assertTrue(np.all(np.diff(returns) > 0))
+        self.assertTrue(np.all(np.diff(vols) >= -1e-9))
+        self.assertAlmostEqual(vols[0], optimizer.min_variance()['volatility'])
+
+        best = optimizer.max_sharpe()['sharpe_ratio']
+        self.assertGreaterEqual(best + 1e-4, max(p['sharpe_ratio'] for p in frontier))
+
+    def test_turning_points_respect_bounds(self):
+        """Test random problems against the box, the budget and an exact minimum variance"""
+        for seed in range(40):
+            rng = np.random.default_rng(seed)
+            n = int(rng.integers(3, 7))
+            factors = rng.normal(size=(n, n))
+            cov = factors @ factors.T / n + 0.01 * np.eye(n)
+            # Rounded returns produce ties between entering and leaving events
+            mu = np.round(rng.normal(0.1, 0.05, n), 1 + seed % 2)
+            cap = float(rng.choice([0.25, 0.4, 0.6])) if n >= 4 else 0.6
+            optimizer = PortfolioOptimizer(mu, cov, max_weight=cap, long_only=bool(seed % 2))
+            optimizer.min_variance()
+
+            weights = optimizer._weights
+            self.assertTrue((weights >= optimizer.lower - 1e-9).all(), seed)
+            self.assertTrue((weights <= optimizer.upper + 1e-9).all(), seed)
+            np.testing.assert_allclose(weights.sum(axis=1), 1.0, atol=1e-9, err_msg=str(seed))
+
+            expected = brute_force_min_variance(cov, optimizer.lower, optimizer.upper)
+            self.assertAlmostEqual(optimizer.min_variance()['volatility'], np.sqrt(expected), places=5, msg=seed)
+            max_sharpe = np.array(list(optimizer.max_sharpe()['weights'].values()))
+            self.assertTrue((max_sharpe <= cap + 1e-6).all(), seed)
+
+    def test_cap_holds_for_late_entering_asset(self):
+        """Test an asset that enters the free set and later reaches the cap"""
+        rng = np.random.default_rng(5)
+        n = int(rng.integers(3, 12))
+        factors = rng.normal(size=(n, n))
+        cov = factors @ factors.T / n + 0.01 * np.eye(n)
+        optimizer = PortfolioOptimizer(rng.normal(0.1, 0.05, n), cov, max_weight=0.25)
+        for portfolio in (optimizer.min_variance(), optimizer.max_sharpe()):
+            self.assertLessEqual(max(portfolio['weights'].values()), 0.25 + 1e-6)
+        self.assertTrue((optimizer._weights <= 0.25 + 1e-9).all())
+
+    def test_infeasible_cap_raises(self):
+        """Test that a cap too small to be fully invested is rejected"""
+        with self.assertRaises(ValueError):
+            PortfolioOptimizer(self.mu, self.cov, max_weight=0.3)
+
+    def test_portfolio_holdings(self):
+        """Test optimizing a Portfolio from supplied histories"""
+        portfolio = Portfolio(initial_balance=10_000)
+        histories = {}
+        for seed, ticker in enumerate(['AAA', 'BBB', 'CCC'], start=1):
+            position = PortfolioStock(ticker)
+            position.buy(10, 100.0, '2024-01-01')
+            portfolio.holdings[ticker] = position
+            histories[ticker] = make_history(seed)
+
+        closed = PortfolioStock('DDD')
+        closed.buy(5, 50.0, '2024-01-01')
+        closed.sell(5, 55.0, '2024-02-01')
+        portfolio.holdings['DDD'] = closed
+
+        optimizer = PortfolioOptimizer.from_portfolio(portfolio, histories, max_weight=0.5)
+        summary = optimizer.summary(n_points=10)
+        self.assertEqual(summary['symbols'], ['AAA', 'BBB', 'CCC'])
+        self.assertEqual(len(summary['frontier']), 10)
+        self.assertAlmostEqual(sum(summary['max_sharpe']['weights'].values()), 1.0, places=4)
+
+    def test_large_frontier_performance(self):
+        """Test that a 200-asset, 50-point frontier fits a dashboard request"""
+        optimizer = PortfolioOptimizer.from_returns(factor_returns(200), max_weight=0.05)
+        start_time = time.time()
+        optimizer.efficient_frontier(50)
+        optimizer.min_variance()
+        optimizer.max_sharpe()
+        self.assertLess(time.time() - start_time, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
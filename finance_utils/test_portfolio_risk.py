@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the Monte Carlo portfolio risk engine.
+"""
+
+import unittest
+import time
+
+import numpy as np
+import pandas as pd
+
+from portfolio import Portfolio
+from portfolio_stock import PortfolioStock
+from portfolio_risk import PortfolioRisk
+
+
+def make_history(seed, n_days=250, start_price=100.0, vol=0.02):
+    """Build a simple random-walk OHLCV history."""
+    rng = np.random.default_rng(seed)
+    closes = start_price * np.exp(np.cumsum(rng.normal(0.0005, vol, n_days)))
+    index = pd.bdate_range('2024-01-01', periods=n_days, tz='UTC')
+    return pd.DataFrame({
+        'Open': closes, 'High': closes * 1.01, 'Low': closes * 0.99,
+        'Close': closes, 'Volume': 1_000_000
+    }, index=index)
+
+
+class TestPortfolioRisk(unittest.TestCase):
+    """Test VaR/CVaR estimation"""
+
+    def setUp(self):
+        """Build a two-stock portfolio without touching the network"""
+        self.portfolio = Portfolio(initial_balance=10_000)
+        for ticker, shares in [('AAA', 10), ('BBB', 20)]:
+            position = PortfolioStock(ticker)
+            position.buy(shares, 100.0, '2024-01-01')
+            self.portfolio.holdings[ticker] = position
+
+        self.histories = {'AAA': make_history(1), 'BBB': make_history(2, vol=0.03)}
+
+    def test_fixed_seed_is_reproducible(self):
+        """Test that a fixed seed gives identical reports"""
+        first = PortfolioRisk(self.portfolio, self.histories, seed=42).report(n_paths=20_000)
+        second = PortfolioRisk(self.portfolio, self.histories, seed=42).report(n_paths=20_000)
+        self.assertEqual(first, second)
+
+    def test_chunking_does_not_change_results(self):
+        """Test that the chunk size only bounds memory"""
+        small = PortfolioRisk(self.portfolio, self.histories, seed=7, max_chunk_bytes=4096)
+        large = PortfolioRisk(self.portfolio, self.histories, seed=7)
+        np.testing.assert_allclose(small.simulate(5_000, 5)['pnl'],
+                                   large.simulate(5_000, 5)['pnl'])
+
+    def test_risk_figures_are_consistent(self):
+        """Test basic VaR/CVaR/drawdown relationships"""
+        report = PortfolioRisk(self.portfolio, self.histories, seed=1).report(
+            n_paths=50_000, horizon_days=10, confidence=0.99)
+
+        self.assertGreater(report['var'], 0)
+        self.assertGreaterEqual(report['cvar'], report['var'])
+        self.assertLessEqual(report['max_drawdown']['median'], report['max_drawdown']['p95'])
+        self.assertLessEqual(report['max_drawdown']['p95'], report['max_drawdown']['p99'])
+        self.assertEqual(report['tickers'], ['AAA', 'BBB'])
+
+    def test_missing_history_raises(self):
+        """Test that holdings without history are reported"""
+        risk = PortfolioRisk(self.portfolio, {'AAA': make_history(1)}, period='missing')
+        with self.assertRaises(ValueError):
+            risk.report(n_paths=100)
+
+    def test_large_simulation_performance(self):
+        """Test that 10^6 paths fit in a dashboard request budget"""
+        risk = PortfolioRisk(self.portfolio, self.histories, seed=3)
+        start_time = time.time()
+        risk.report(n_paths=1_000_000, horizon_days=1)
+        self.assertLess(time.time() - start_time, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the latency-aware provider router.
+"""
+
+import time
+import unittest
+
+import pandas as pd
+
+from providers import DataProvider, ProviderError, RateLimitError, CallQuota
+from provider_router import ProviderRouter
+
+
+class FakeProvider(DataProvider):
+    """Provider with scripted latency and failures."""
+
+    def __init__(self, name, latency=0.0, fail=False, rate_limit=False, quota=None):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.rate_limit = rate_limit
+        self.quota = CallQuota(quota) if quota else None
+        self.calls = 0
+
+    def get_history(self, symbol, period='1y', interval='1d'):
+        self.calls += 1
+        if self.quota:
+            self.quota.record()
+        time.sleep(self.latency)
+        if self.rate_limit:
+            raise RateLimitError("slow down", retry_after=30)
+        if self.fail:
+            raise ProviderError("boom")
+        index = pd.date_range('2024-01-01', periods=3, tz='UTC')
+        return pd.DataFrame({'Close': [1.0, 2.0, 3.0], 'Source': self.name}, index=index)
+
+
+class TestProviderRouter(unittest.TestCase):
+    """Test ranking, failover, backoff and hedging"""
+
+    def test_failover_on_error(self):
+        """Test that a failing provider falls through to the next one"""
+        broken, healthy = FakeProvider('a', fail=True), FakeProvider('b')
+        router = ProviderRouter([broken, healthy], hedge=False)
+        df = router.get_history('AAPL')
+        self.assertEqual(df['Source'].iloc[0], 'b')
+        self.assertGreater(router.stats['a'].error_ewma, 0)
+
+    def test_prefers_faster_provider(self):
+        """Test that recent latency drives the ranking"""
+        slow, fast = FakeProvider('slow', latency=0.03), FakeProvider('fast', latency=0.0)
+        router = ProviderRouter([slow, fast], hedge=False)
+        router._timed_call('slow', 'get_history', ('X',), {})
+        router._timed_call('fast', 'get_history', ('X',), {})
+        self.assertEqual(router.ranked(), ['fast', 'slow'])
+        self.assertEqual(router.get_history('X')['Source'].iloc[0], 'fast')
+
+    def test_rate_limited_provider_cools_down(self):
+        """Test that a 429 takes a provider out of rotation"""
+        limited, backup = FakeProvider('limited', rate_limit=True), FakeProvider('backup')
+        router = ProviderRouter([limited, backup], hedge=False)
+        router.get_history('X')
+        self.assertNotIn('limited', router.ranked())
+        router.get_history('X')
+        self.assertEqual(limited.calls, 1)
+
+    def test_exhausted_quota_skipped(self):
+        """Test that providers out of quota are not called"""
+        metered = FakeProvider('metered', quota=[(1, 60)])
+        other = FakeProvider('other')
+        router = ProviderRouter([metered, other], hedge=False)
+        router.get_history('X')
+        router.get_history('X')
+        self.assertEqual(metered.calls, 1)
+        self.assertEqual(router.status()['metered']['remaining_quota'], 0)
+
+    def test_hedges_slow_primary(self):
+        """Test that a stalled primary is hedged to the next provider"""
+        stalled, quick = FakeProvider('stalled', latency=1.0), FakeProvider('quick', latency=0.0)
+        router = ProviderRouter([stalled, quick], default_deadline=0.05)
+        start = time.time()
+        df = router.get_history('X')
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(df['Source'].iloc[0], 'quick')
+
+    def test_all_failed(self):
+        """Test that the error lists every provider"""
+        router = ProviderRouter([FakeProvider('a', fail=True), FakeProvider('b', fail=True)])
+        with self.assertRaises(ProviderError) as ctx:
+            router.get_history('X')
+        self.assertIn('a:', str(ctx.exception))
+        self.assertIn('b:', str(ctx.exception))
+
+
+    def test_info_only_from_implementing_providers(self):
+        """Test that get_info skips providers that only have the placeholder"""
+
+        class InfoProvider(FakeProvider):
+            def get_info(self, symbol):
+                return {'symbol': symbol, 'longName': 'Example Corp'}
+
+        bare, described = FakeProvider('bare'), InfoProvider('described', latency=0.01)
+        router = ProviderRouter([bare, described], hedge=False)
+        router._timed_call('described', 'get_history', ('X',), {})
+        self.assertEqual(router.ranked()[0], 'bare')
+        info = router.get_info('X')
+        self.assertEqual(info['longName'], 'Example Corp')
+        self.assertEqual(info['provider'], 'described')
+
+        self.assertEqual(ProviderRouter([bare], hedge=False).get_info('X'),
+                         {'symbol': 'X', 'shortName': 'X'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the provider interface and record/replay support.
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+import requests
+
+import stock_simple
+from forex.forex_client import ForexClient
+from providers import (DataProvider, FixtureStore, RecordingProvider, ReplayProvider,
+                       ReplaySession, RateLimitError, ProviderError, FixtureNotFound)
+from synthetic_data import generate_market
+
+
+class SyntheticProvider(DataProvider):
+    """Stands in for a live provider while recording."""
+
+    name = 'yahoo'
+
+    def __init__(self):
+        self.frames = generate_market(['AAA', 'BBB'], 300, tz='UTC', seed=9)
+        self.calls = 0
+
+    def get_history(self, symbol, period='1y', interval='1d'):
+        self.calls += 1
+        return self.frames[symbol][['Open', 'High', 'Low', 'Close', 'Volume']]
+
+
+class TestRecordReplay(unittest.TestCase):
+    """Test recording once and replaying offline"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = FixtureStore(self.tmpdir)
+        self.live = SyntheticProvider()
+        recorder = RecordingProvider(self.live, self.store)
+        recorder.get_history('AAA')
+        recorder.get_info('AAA')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_replay_matches_recording(self):
+        """Test that replayed history equals the recorded frame"""
+        replay = ReplayProvider(FixtureStore(self.tmpdir))
+        history = replay.get_history('AAA')
+        pd.testing.assert_frame_equal(history, self.live.get_history('AAA'),
+                                      check_freq=False, check_index_type=False)
+        self.assertEqual(replay.get_info('AAA')['symbol'], 'AAA')
+
+    def test_unrecorded_request(self):
+        """Test that missing fixtures raise instead of hitting the network"""
+        with self.assertRaises(FixtureNotFound):
+            ReplayProvider(self.store).get_history('BBB')
+        # Quotes are not derived from recorded history either
+        RecordingProvider(self.live, self.store).get_history('AAA', period='5d')
+        with self.assertRaises(FixtureNotFound):
+            ReplayProvider(self.store).get_quote('AAA')
+
+    def test_fault_injection_rates(self):
+        """Test seeded error and 429 injection"""
+        replay = ReplayProvider(self.store, error_rate=0.2, rate_limit_rate=0.1, seed=1)
+        outcomes = {'ok': 0, 'error': 0, 'rate_limited': 0}
+        for _ in range(2000):
+            try:
+                replay.get_history('AAA')
+                outcomes['ok'] += 1
+            except RateLimitError as e:
+                self.assertEqual(e.retry_after, 1.0)
+                outcomes['rate_limited'] += 1
+            except ProviderError:
+                outcomes['error'] += 1
+
+        self.assertAlmostEqual(outcomes['rate_limited'] / 2000, 0.1, delta=0.03)
+        self.assertAlmostEqual(outcomes['error'] / 2000, 0.2, delta=0.03)
+        self.assertEqual(replay.stats['calls'], 2000)
+
+    def test_burst_rate_limit_and_latency(self):
+        """Test deterministic 429s after a burst and simulated latency"""
+        slept = []
+        replay = ReplayProvider(self.store, rate_limit_after=3, latency=0.05, sleep=slept.append)
+        for _ in range(3):
+            replay.get_history('AAA')
+        with self.assertRaises(RateLimitError):
+            replay.get_history('AAA')
+        self.assertEqual(slept, [0.05] * 4)
+
+    def test_stock_simple_uses_provider(self):
+        """Test StockSimple fetching through a replay provider"""
+        with patch.object(stock_simple, 'CACHE_DIR', type(stock_simple.CACHE_DIR)(self.tmpdir)):
+            stock = stock_simple.StockSimple('AAA', provider=ReplayProvider(self.store))
+        self.assertTrue(stock.is_valid())
+        self.assertIn('RSI', stock.history.columns)
+        self.assertEqual(stock.info['symbol'], 'AAA')
+
+
+class TestReplaySession(unittest.TestCase):
+    """Test HTTP-level replay through ForexClient"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = FixtureStore(self.tmpdir)
+        body = {'Realtime Currency Exchange Rate': {
+            '1. From_Currency Code': 'EUR', '3. To_Currency Code': 'USD',
+            '5. Exchange Rate': '1.0850', '6. Last Refreshed': '2024-01-01 00:00:00',
+            '8. Bid Price': '1.0849', '9. Ask Price': '1.0851'}}
+        params = {'function': 'CURRENCY_EXCHANGE_RATE', 'from_currency': 'EUR',
+                  'to_currency': 'USD', 'apikey': 'secret'}
+
+        # Record through a RecordingSession-compatible path without network
+        from providers import _response_key
+        self.store.put(_response_key('GET', 'https://www.alphavantage.co/query', params),
+                       {'status_code': 200, 'headers': {'Content-Type': 'application/json'},
+                        'text': json.dumps(body)})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_forex_client_offline(self):
+        """Test that the unmodified client parses replayed responses"""
+        client = ForexClient('other-key', session=ReplaySession(self.store))
+        client.rate_limit_delay = 0
+        rate = client.get_exchange_rate('EUR', 'USD')
+        self.assertAlmostEqual(rate['rate'], 1.085)
+
+    def test_injected_429(self):
+        """Test that injected 429s surface as HTTP errors"""
+        session = ReplaySession(self.store, rate_limit_rate=1.0)
+        response = session.get('https://www.alphavantage.co/query', params={})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '1.0')
+        with self.assertRaises(requests.HTTPError):
+            response.raise_for_status()
+
+    def test_secrets_not_written(self):
+        """Test that API keys never reach fixture files"""
+        for path in list(self.store.directory.rglob('*.json')):
+            self.assertNotIn('secret', path.read_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent quota ledger and the priority request scheduler.
+"""
+
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from alpha_vantage_adapter import AlphaVantageManager, AlphaVantageStock
+from quota_scheduler import (QuotaLedger, RequestScheduler, QuotaExhausted,
+                             INTERACTIVE, NORMAL, BACKGROUND)
+
+
+class FakeClock:
+    def __init__(self, hour=22):
+        self.now = datetime(2024, 3, 4, hour, 0, tzinfo=timezone.utc).timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+class TestQuotaLedger(unittest.TestCase):
+    """Test persistence and the daily/minute limits"""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def ledger(self, **kwargs):
+        return QuotaLedger(self.tmpdir / 'quota.json', clock=self.clock, **kwargs)
+
+    def test_persists_across_instances(self):
+        """Test that usage survives a restart and resets at UTC midnight"""
+        self.assertTrue(self.ledger().try_acquire())
+        self.assertTrue(self.ledger().try_acquire())
+        self.assertEqual(self.ledger().used_today(), 2)
+
+        self.clock.now += 3 * 3600
+        self.assertEqual(self.ledger().used_today(), 0)
+
+    def test_limits(self):
+        """Test the per-minute window and the daily cap"""
+        ledger = self.ledger(daily_limit=3, per_minute=2)
+        self.assertTrue(ledger.try_acquire())
+        self.assertTrue(ledger.try_acquire())
+        self.assertFalse(ledger.try_acquire())
+        self.assertEqual(ledger.wait_time(), 60)
+
+        self.clock.now += 61
+        self.assertTrue(ledger.try_acquire())
+        self.assertEqual(ledger.wait_time(), float('inf'))
+        self.assertEqual(ledger.remaining(), 0)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """Test priority order, merging, deferral and exhaustion"""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.clock = FakeClock(hour=22)
+        self.ledger = QuotaLedger(self.tmpdir / 'quota.json', daily_limit=10,
+                                  per_minute=100, clock=self.clock)
+        self.scheduler = RequestScheduler(self.ledger, reserve=3, clock=self.clock, autostart=False)
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def job(self, name):
+        def call():
+            self.calls.append(name)
+            return name
+        return call
+
+    def drain(self):
+        while self.scheduler.pending() and self.scheduler.step() is None:
+            pass
+
+    def test_priority_and_merge(self):
+        """Test that interactive requests run first and duplicates share one call"""
+        background = self.scheduler.submit(('daily', 'MSFT'), self.job('MSFT'), BACKGROUND)
+        normal = self.scheduler.submit(('daily', 'AAPL'), self.job('AAPL'), NORMAL)
+        duplicate = self.scheduler.submit(('daily', 'AAPL'), self.job('AAPL-again'), NORMAL)
+        urgent = self.scheduler.submit(('daily', 'NVDA'), self.job('NVDA'), INTERACTIVE)
+        self.drain()
+
+        self.assertEqual(self.calls, ['NVDA', 'AAPL', 'MSFT'])
+        self.assertIs(normal, duplicate)
+        self.assertEqual(duplicate.result(), 'AAPL')
+        self.assertEqual(urgent.result(), 'NVDA')
+        self.assertEqual(background.result(), 'MSFT')
+        self.assertEqual(self.ledger.used_today(), 3)
+
+    def test_merge_upgrades_priority(self):
+        """Test that an interactive duplicate promotes a queued background request"""
+        self.scheduler.submit('A', self.job('A'), NORMAL)
+        self.scheduler.submit('B', self.job('B'), BACKGROUND)
+        self.scheduler.submit('B', self.job('B'), INTERACTIVE)
+        self.drain()
+        self.assertEqual(self.calls, ['B', 'A'])
+
+    def test_background_deferred_during_peak(self):
+        """Test that background work waits for off-peak hours"""
+        self.clock.now = datetime(2024, 3, 4, 15, 0, tzinfo=timezone.utc).timestamp()
+        self.scheduler.submit('bg', self.job('bg'), BACKGROUND)
+        wait = self.scheduler.step()
+        self.assertEqual(self.calls, [])
+        self.assertEqual(wait, 300)
+
+        self.clock.now = datetime(2024, 3, 4, 21, 0, tzinfo=timezone.utc).timestamp()
+        self.drain()
+        self.assertEqual(self.calls, ['bg'])
+
+    def test_reserve_and_exhaustion(self):
+        """Test the interactive reserve and failing fast once the budget is gone"""
+        for i in range(7):
+            self.assertTrue(self.ledger.try_acquire())
+        background = self.scheduler.submit('bg', self.job('bg'), BACKGROUND)
+        self.assertIsNotNone(self.scheduler.step())
+        self.assertFalse(background.done())
+
+        for name in 'xyz':
+            self.scheduler.submit(name, self.job(name), INTERACTIVE)
+        self.drain()
+        late = self.scheduler.submit('late', self.job('late'), INTERACTIVE)
+        self.scheduler.step()
+        with self.assertRaises(QuotaExhausted):
+            late.result(0)
+        self.assertFalse(background.done())
+        self.assertEqual(self.calls, ['x', 'y', 'z'])
+
+    def test_worker_thread(self):
+        """Test blocking run() through the background worker"""
+        scheduler = RequestScheduler(self.ledger, clock=self.clock)
+        try:
+            self.assertEqual(scheduler.run('k', self.job('k'), timeout=5), 'k')
+        finally:
+            scheduler.shutdown()
+
+
+class TestAlphaVantageManager(unittest.TestCase):
+    """Test that quota exhaustion and failed refreshes fall back to cached data"""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.clock = FakeClock()
+        self.ledger = QuotaLedger(self.tmpdir / 'quota.json', daily_limit=2, per_minute=100, clock=self.clock)
+        self.manager = AlphaVantageManager(api_key='demo', ledger=self.ledger, reserve=0, fetch_timeout=5)
+        self.manager.scheduler.clock = self.clock
+        self.available = True
+
+        def init(stock, symbol, api_key=None):
+            stock.ticker = symbol.upper()
+            stock.info = {}
+            index = pd.bdate_range(end='2024-03-01', periods=60)
+            close = np.linspace(100, 110, 60)
+            stock.history = (pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                                           'Volume': 1000.0}, index=index)
+                             if self.available else pd.DataFrame())
+            stock._calculate_indicators()
+
+        patcher = patch.object(AlphaVantageStock, '__init__', init)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.manager.scheduler.shutdown()
+        shutil.rmtree(self.tmpdir)
+
+    def test_failed_refresh_keeps_cached_stock(self):
+        """Test that a refresh that fetches nothing keeps the cached stock"""
+        stock = self.manager.get_stock('AAPL')
+        self.assertTrue(stock.is_valid())
+        self.available = False
+        self.assertIs(self.manager.get_stock('AAPL', refresh=True), stock)
+        self.assertIn('AAPL', self.manager.summary_table)
+
+    def test_exhausted_quota_serves_cache_or_empty_stock(self):
+        """Test that an exhausted quota serves cached stocks and empty placeholders"""
+        stock = self.manager.get_stock('AAPL')
+        self.manager.get_stock('MSFT')
+        self.assertEqual(self.ledger.remaining(), 0)
+        self.assertIs(self.manager.get_stock('AAPL', refresh=True), stock)
+        missing = self.manager.get_stock('NVDA')
+        self.assertFalse(missing.is_valid())
+        self.assertEqual(missing.ticker, 'NVDA')
+        self.assertNotIn('NVDA', self.manager.stocks)
+
+
+if __name__ == '__main__':
+    unittest.main()
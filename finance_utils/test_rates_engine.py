@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for the cross-rate triangulation engine.
+"""
+
+import threading
+import unittest
+
+import numpy as np
+
+from forex.rates_engine import RatesEngine
+
+PAIRS = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'EUR/GBP', 'EUR/JPY', 'GBP/JPY']
+
+QUOTES = {
+    'EUR/USD': (1.0850, 1.0852),
+    'GBP/USD': (1.2650, 1.2653),
+    'USD/JPY': (150.10, 150.13),
+}
+
+
+class FakeFetch:
+    """Stand-in for ForexClient.get_multiple_rates that records requests."""
+
+    def __init__(self, quotes=QUOTES):
+        self.quotes = dict(quotes)
+        self.requests = []
+
+    def __call__(self, pairs):
+        self.requests.append(list(pairs))
+        rates = {}
+        for base, quote in pairs:
+            pair = f"{base}/{quote}"
+            if pair in self.quotes:
+                bid, ask = self.quotes[pair]
+                rates[pair] = {'pair': pair, 'rate': (bid + ask) / 2, 'bid': bid, 'ask': ask,
+                               'timestamp': '2024-01-02 10:00:00'}
+        return rates
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRatesEngine(unittest.TestCase):
+    """Test leg selection, triangulation and refresh behaviour"""
+
+    def setUp(self):
+        self.fetch = FakeFetch()
+        self.clock = FakeClock()
+        self.engine = RatesEngine(PAIRS, fetch=self.fetch, max_age=60, clock=self.clock)
+
+    def test_fetches_one_leg_per_currency(self):
+        """Test that six pairs cost three calls, in market convention"""
+        self.assertEqual(self.engine.refresh(), 3)
+        self.assertEqual(sorted(self.fetch.requests[0]),
+                         [('EUR', 'USD'), ('GBP', 'USD'), ('USD', 'JPY')])
+        self.assertEqual(sorted(self.engine.quotes()), sorted(PAIRS))
+
+    def test_cross_bid_ask(self):
+        """Test that crosses take the worse side of each leg"""
+        self.engine.refresh()
+        eur_gbp = self.engine.quote('EUR', 'GBP')
+        self.assertAlmostEqual(eur_gbp['bid'], 1.0850 / 1.2653)
+        self.assertAlmostEqual(eur_gbp['ask'], 1.0852 / 1.2650)
+        eur_jpy = self.engine.quote('EUR', 'JPY')
+        self.assertAlmostEqual(eur_jpy['bid'], 1.0850 * 150.10)
+        self.assertAlmostEqual(eur_jpy['ask'], 1.0852 * 150.13)
+        self.assertFalse(eur_gbp['direct'])
+        self.assertTrue(self.engine.quote('USD', 'JPY')['direct'])
+
+    def test_matrix_has_no_arbitrage(self):
+        """Test inverse consistency and that no round trip makes money"""
+        self.engine.refresh()
+        bid, ask = self.engine.bid, self.engine.ask
+        np.testing.assert_allclose(bid * ask.T, np.ones_like(bid))
+        self.assertTrue(np.all(bid <= ask + 1e-12))
+        # Selling A for B and B back for A loses the spread
+        self.assertTrue(np.all(bid * bid.T <= 1 + 1e-12))
+
+    def test_direct_cross_overrides_triangulation(self):
+        """Test that a directly quoted cross replaces the derived cell"""
+        self.engine.refresh()
+        self.engine.set_quote('EUR', 'GBP', 0.8570, 0.8572)
+        quote = self.engine.quote('GBP', 'EUR')
+        self.assertTrue(quote['direct'])
+        self.assertAlmostEqual(quote['bid'], 1 / 0.8572)
+
+    def test_refresh_respects_max_age(self):
+        """Test that fresh legs are not fetched again and changes are tracked"""
+        self.engine.refresh()
+        version = self.engine.version
+        self.assertEqual(self.engine.refresh(), 0)
+        self.assertEqual(self.engine.version, version)
+        self.assertIsNone(self.engine.quote('EUR', 'GBP')['change'])
+
+        self.clock.now += 61
+        self.fetch.quotes['EUR/USD'] = (1.0950, 1.0952)
+        self.assertEqual(self.engine.refresh(), 3)
+        self.assertGreater(self.engine.version, version)
+        self.assertEqual(self.engine.api_calls, 6)
+        self.assertGreater(self.engine.quote('EUR', 'GBP')['change'], 0)
+        self.assertAlmostEqual(self.engine.quote('GBP', 'JPY')['change'], 0)
+
+    def test_missing_leg_leaves_gaps(self):
+        """Test that pairs depending on an unquoted leg are omitted"""
+        engine = RatesEngine(PAIRS, fetch=FakeFetch({'EUR/USD': QUOTES['EUR/USD']}), clock=self.clock)
+        engine.refresh()
+        self.assertEqual(sorted(engine.quotes()), ['EUR/USD'])
+        self.assertIsNone(engine.to_dict()['mid'][engine.index['GBP']][engine.index['JPY']])
+
+    def test_timestamps_use_older_leg(self):
+        """Test that a derived rate carries its older leg's quote time"""
+        self.engine.refresh()
+        self.engine.set_quote('GBP', 'USD', 1.2650, 1.2653, timestamp=5.0)
+        self.assertEqual(self.engine.quote('EUR', 'GBP')['timestamp'], 5.0)
+
+
+    def test_readers_see_whole_refreshes(self):
+        """Test that a reader thread never sees legs from two different refreshes"""
+        states = [{'EUR/USD': (1.10, 1.10), 'GBP/USD': (1.30, 1.30), 'USD/JPY': (150.0, 150.0)},
+                  {'EUR/USD': (1.20, 1.20), 'GBP/USD': (1.40, 1.40), 'USD/JPY': (140.0, 140.0)}]
+        expected = [1.10 / 1.30, 1.20 / 1.40]
+        fetches = [FakeFetch(quotes) for quotes in states]
+        engine = RatesEngine(PAIRS, fetch=fetches[0], max_age=0)
+        engine.refresh()
+        done = threading.Event()
+
+        def writer():
+            for k in range(300):
+                engine.fetch = fetches[k % 2]
+                engine.refresh()
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        seen = []
+        while not done.is_set():
+            seen.append(engine.quote('EUR', 'GBP')['rate'])
+        thread.join()
+
+        self.assertTrue(all(min(abs(rate - e) for e in expected) < 1e-12 for rate in seen))
+        # No rebuild is lost: the final matrix matches the last refresh
+        self.assertAlmostEqual(engine.quote('EUR', 'GBP')['rate'], expected[1])
+
+    def test_fetch_does_not_block_readers(self):
+        """Test that quotes stay readable while a slow fetch is in flight"""
+        self.engine.refresh()
+        started, release = threading.Event(), threading.Event()
+
+        def slow_fetch(legs):
+            started.set()
+            release.wait(5)
+            return {}
+
+        self.engine.fetch = slow_fetch
+        self.clock.now += 61
+        thread = threading.Thread(target=self.engine.refresh)
+        thread.start()
+        self.assertTrue(started.wait(5))
+        self.assertIsNotNone(self.engine.quote('EUR', 'GBP'))
+        release.set()
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for session-aware multi-timeframe resampling and the bar store.
+"""
+
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from forex.forex_cache import ForexCache
+from forex.forex_client import ForexClient
+from resampling import EQUITY_SESSION, BarStore, resample_ohlc
+
+
+def make_bars(start, end, freq='5min', tz='UTC', seed=0):
+    index = pd.date_range(start, end, freq=freq, tz=tz)
+    close = 1.08 + np.cumsum(np.random.default_rng(seed).normal(0, 1e-4, len(index)))
+    return pd.DataFrame({'Open': close - 5e-5, 'High': close + 1e-4, 'Low': close - 1e-4,
+                         'Close': close, 'Volume': np.ones(len(index))}, index=index)
+
+
+def new_york(index):
+    return [ts.strftime('%a %H:%M') for ts in index.tz_convert('America/New_York')]
+
+
+class TestSessionBoundaries(unittest.TestCase):
+    """Test where buckets start for forex and equity sessions"""
+
+    def test_forex_day_rolls_at_five_pm_new_york(self):
+        """Test 4h and daily forex bars across the March DST change"""
+        bars = make_bars('2024-03-08 12:00', '2024-03-12 12:00')
+        four_hour = resample_ohlc(bars, '4h')
+        self.assertEqual(new_york(four_hour.index[2:6]), ['Fri 13:00', 'Fri 17:00', 'Fri 21:00', 'Sat 01:00'])
+
+        daily = resample_ohlc(bars, '1d')
+        self.assertEqual(set(ts[-5:] for ts in new_york(daily.index)), {'17:00'})
+        # 17:00 New York is 22:00 UTC before the change and 21:00 UTC after it
+        self.assertEqual(daily.index[1].hour, 22)
+        self.assertEqual(daily.index[-1].hour, 21)
+
+        friday = bars[(bars.index >= daily.index[1]) & (bars.index < daily.index[2])]
+        self.assertEqual(daily['Open'].iloc[1], friday['Open'].iloc[0])
+        self.assertEqual(daily['High'].iloc[1], friday['High'].max())
+        self.assertEqual(daily['Volume'].iloc[1], len(friday))
+
+    def test_equity_hours_anchor_at_open(self):
+        """Test that hourly stock bars start at 09:30 and skip extended hours"""
+        bars = make_bars('2024-06-03 07:00', '2024-06-03 20:00', tz='America/New_York')
+        hourly = resample_ohlc(bars, '1h', EQUITY_SESSION)
+        self.assertEqual(new_york(hourly.index)[0], 'Mon 09:30')
+        self.assertEqual(new_york(hourly.index)[-1], 'Mon 15:30')
+        self.assertEqual(len(hourly), 7)
+
+    def test_daily_bars_to_weekly(self):
+        """Test that daily stock bars group into Monday-anchored weeks"""
+        daily = make_bars('2024-06-03', '2024-06-21', freq='B', tz='America/New_York')
+        weekly = resample_ohlc(daily, '1w', EQUITY_SESSION, daily=True)
+        self.assertEqual(new_york(weekly.index), ['Mon 09:30'] * 3)
+        self.assertEqual(weekly['Volume'].tolist(), [5, 5, 5])
+
+
+class TestBarStore(unittest.TestCase):
+    """Test incremental derivation and persistence"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = BarStore(self.tmpdir)
+        self.bars = make_bars('2024-06-03', '2024-06-07', freq='1min')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_incremental_matches_full_resample(self):
+        """Test that ingesting in chunks gives the same bars as one resample"""
+        for chunk in np.array_split(np.arange(len(self.bars)), 7):
+            self.store.ingest('fx', self.bars.iloc[chunk[0]:chunk[-1] + 1], '1min')
+        for timeframe in ['5min', '1h', '4h', '1d', '1w']:
+            pd.testing.assert_frame_equal(self.store.get('fx', timeframe),
+                                          resample_ohlc(self.bars, timeframe), check_freq=False)
+
+    def test_incremental_daily_to_weekly_equity(self):
+        """Test that a mid-week daily bar keeps the week's Monday in the equity weekly bar"""
+        daily = make_bars('2026-01-05', '2026-01-16', freq='B')
+        self.store.ingest('stock:AAPL', daily.iloc[:7], '1d', session='equity')
+        for day in range(7, len(daily)):
+            self.store.ingest('stock:AAPL', daily.iloc[day:day + 1], '1d', session='equity')
+        full = BarStore(None)
+        full.ingest('stock:AAPL', daily, '1d', session='equity')
+        pd.testing.assert_frame_equal(self.store.get('stock:AAPL', '1w'), full.get('stock:AAPL', '1w'))
+        self.assertEqual(self.store.get('stock:AAPL', '1w')['Volume'].tolist(), [5, 5])
+
+        # Weekly bars derived before the fix are rebuilt from the stored base bars
+        entry = self.store._entries['stock:AAPL']
+        entry['derived']['1w'] = entry['derived']['1w'].iloc[:1] * 0
+        entry.pop('version')
+        with open(self.store._path('stock:AAPL'), 'wb') as f:
+            pickle.dump(entry, f)
+        pd.testing.assert_frame_equal(BarStore(self.tmpdir).get('stock:AAPL', '1w'), full.get('stock:AAPL', '1w'))
+
+    def test_revised_tail_and_duplicates(self):
+        """Test that a re-sent last bar updates its bucket and repeats are ignored"""
+        self.assertEqual(self.store.ingest('fx', self.bars.iloc[:100], '1min'), 100)
+        self.assertEqual(self.store.ingest('fx', self.bars.iloc[50:100], '1min'), 0)
+
+        revised = self.bars.iloc[99:101].copy()
+        revised.iloc[0, revised.columns.get_loc('High')] = 2.0
+        self.assertEqual(self.store.ingest('fx', revised, '1min'), 1)
+        self.assertEqual(self.store.get('fx', '1h')['High'].max(), 2.0)
+
+    def test_persisted_and_no_finer_timeframes(self):
+        """Test that a new store reads bars from disk and refuses finer timeframes"""
+        self.store.ingest('fx', self.bars, '5min')
+        other = BarStore(self.tmpdir)
+        pd.testing.assert_frame_equal(other.get('fx', '4h'), self.store.get('fx', '4h'))
+        with self.assertRaises(ValueError):
+            other.get('fx', '1min')
+        self.assertIsNone(other.get('missing', '1h'))
+
+
+class TestForexClientBars(unittest.TestCase):
+    """Test that every timeframe comes from a single intraday request"""
+
+    def test_get_bars_reuses_one_series(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        bars = make_bars('2024-06-03', '2024-06-05', tz=None)
+        series = {ts.strftime('%Y-%m-%d %H:%M:%S'): {'1. open': str(row.Open), '2. high': str(row.High),
+                                                     '3. low': str(row.Low), '4. close': str(row.Close)}
+                  for ts, row in bars.iterrows()}
+        requests = []
+
+        def fake_request(params):
+            requests.append(params['function'])
+            return {'Time Series FX (5min)': series}
+
+        client = ForexClient('key', cache=ForexCache(f"{tmpdir}/series"), bar_store=BarStore(f"{tmpdir}/bars"))
+        client._make_request = fake_request
+
+        four_hour = client.get_bars('EUR', 'USD', '4h')
+        daily = client.get_bars('EUR', 'USD', '1d')
+        self.assertEqual(requests, ['FX_INTRADAY'])
+        self.assertEqual(four_hour['High'].max(), daily['High'].max())
+        self.assertEqual(new_york(daily.index)[0], 'Sun 17:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
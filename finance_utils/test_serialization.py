@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the JSON serialization layer, with and without orjson.
+"""
+
+import json
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+import serialization
+from serialization import array_list, dumps, frame_columns, frame_records, round_fields
+
+PAYLOAD = {
+    'nan': float('nan'),
+    'np_float': np.float64(1.25),
+    'np_int': np.int64(7),
+    'np_bool': np.bool_(True),
+    'array': np.array([1.0, np.nan, np.inf]),
+    'when': pd.Timestamp('2024-06-03 14:30', tz='UTC'),
+    'day': date(2024, 6, 3),
+    'missing': pd.NaT,
+    'nested': [{'x': float('-inf')}],
+}
+EXPECTED = {
+    'nan': None, 'np_float': 1.25, 'np_int': 7, 'np_bool': True, 'array': [1.0, None, None],
+    'when': '2024-06-03T14:30:00+00:00', 'day': '2024-06-03', 'missing': None, 'nested': [{'x': None}],
+}
+
+
+class TestDumps(unittest.TestCase):
+    """Test that both encoders follow the same rules"""
+
+    def test_orjson_and_fallback_agree(self):
+        encoders = [patch.object(serialization, 'orjson', None)]
+        if serialization.orjson is not None:
+            encoders.append(patch.object(serialization, 'orjson', serialization.orjson))
+        for encoder in encoders:
+            with encoder:
+                self.assertEqual(json.loads(dumps(PAYLOAD)), EXPECTED)
+                self.assertEqual(dumps({'b': 1, 'a': 2}, sort_keys=True), b'{"a":2,"b":1}')
+
+    def test_unknown_type_raises(self):
+        with self.assertRaises(TypeError):
+            dumps({'x': object()})
+
+
+class TestFrameConversion(unittest.TestCase):
+    """Test column-wise conversion of pandas blocks"""
+
+    def setUp(self):
+        index = pd.date_range('2024-06-03', periods=3, tz='America/New_York')
+        self.df = pd.DataFrame({'Close': [1.23456, np.nan, 3.0], 'Volume': [1, 2, 3],
+                                'Flag': [True, False, True]}, index=index)
+
+    def test_columns_with_rounding_and_dates(self):
+        columns = frame_columns(self.df, decimals={'Close': 2}, dates='epoch')
+        self.assertEqual(columns['Close'], [1.23, None, 3.0])
+        self.assertEqual(columns['Volume'], [1, 2, 3])
+        self.assertEqual(columns['index'][0], pd.Timestamp('2024-06-03', tz='America/New_York').value // 10**6)
+        self.assertEqual(frame_columns(self.df)['index'][0], '2024-06-03T04:00:00')
+
+    def test_records(self):
+        records = frame_records(self.df, decimals=1)
+        self.assertEqual(records[0], {'Close': 1.2, 'Volume': 1, 'Flag': True})
+        self.assertIsNone(records[1]['Close'])
+        self.assertEqual(type(records[0]['Volume']), int)
+
+    def test_array_list_nat_and_objects(self):
+        self.assertEqual(array_list(pd.DatetimeIndex(['2024-01-01', None])), ['2024-01-01T00:00:00', None])
+        self.assertEqual(array_list(np.array([np.float64(np.nan), 'a'], dtype=object)), [None, 'a'])
+
+    def test_round_fields(self):
+        row = pd.Series({'Close': 1.234567, 'RSI': np.nan})
+        self.assertEqual(round_fields(row, {'price': ('Close', 3), 'rsi': ('RSI', 1), 'gone': ('X', 2)}),
+                         {'price': 1.235, 'rsi': None, 'gone': None})
+
+
+class TestFlaskProvider(unittest.TestCase):
+    """Test that jsonify goes through the fast encoder"""
+
+    def test_jsonify_numpy_and_pandas(self):
+        app = Flask(__name__)
+        serialization.install(app)
+
+        @app.route('/data')
+        def data():
+            return jsonify({'values': np.arange(3.0), 'rsi': np.float64(np.nan), 'when': pd.Timestamp('2024-01-01')})
+
+        response = app.test_client().get('/data')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.get_json(), {'rsi': None, 'values': [0.0, 1.0, 2.0], 'when': '2024-01-01T00:00:00'})
+
+
+if __name__ == '__main__':
+    unittest.main()
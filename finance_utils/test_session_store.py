@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared Yahoo crumb/cookie store.
+"""
+
+import multiprocessing
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import requests
+
+from session_store import SessionStore
+from yahoo_finance_client import YahooFinanceClient
+
+CRUMB_PAGE = '<script>"CrumbStore":{"crumb":"fresh-crumb"}</script>'
+
+
+class CrumbSession(requests.Session):
+    """Serves the two crumb pages and logs each crumb fetch to a file."""
+
+    def __init__(self, log_path):
+        super().__init__()
+        self.log_path = log_path
+
+    def get(self, url, params=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        if url.endswith('/history'):
+            with open(self.log_path, 'a') as f:
+                f.write('fetch\n')
+            time.sleep(0.2)
+            response._content = CRUMB_PAGE.encode()
+        else:
+            self.cookies.set('A3', 'cookie-value', domain='.yahoo.com')
+            response._content = b'<html></html>'
+        return response
+
+
+def refresh_in_process(store_path, log_path):
+    client = YahooFinanceClient(session=CrumbSession(log_path), session_store=SessionStore(store_path))
+    client._ensure_crumb('test')
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test persistence, expiry and cross-process refresh"""
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.store_path = self.tmpdir / 'yahoo_session.json'
+        self.log_path = self.tmpdir / 'fetches.log'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def fetch_count(self):
+        return len(self.log_path.read_text().splitlines()) if self.log_path.exists() else 0
+
+    def test_expiry(self):
+        """Test that expired sessions are ignored"""
+        store = SessionStore(self.store_path)
+        store.save('abc', [], ttl=-1)
+        self.assertIsNone(store.load())
+        store.save('abc', [], ttl=60)
+        self.assertEqual(store.load()['crumb'], 'abc')
+
+    def test_cold_start_reuses_stored_session(self):
+        """Test that a second client adopts the crumb and cookies without page loads"""
+        refresh_in_process(self.store_path, self.log_path)
+        self.assertEqual(self.fetch_count(), 1)
+
+        session = CrumbSession(self.log_path)
+        client = YahooFinanceClient(session=session, session_store=SessionStore(self.store_path))
+        self.assertTrue(client._ensure_crumb('test'))
+        self.assertEqual(client.crumb, 'fresh-crumb')
+        self.assertEqual(session.cookies.get('A3'), 'cookie-value')
+        self.assertEqual(self.fetch_count(), 1)
+
+    def test_stale_crumb_refreshed_once(self):
+        """Test that a 401 refresh skips a crumb another process already replaced"""
+        SessionStore(self.store_path).save('newer-crumb', [], ttl=60)
+        client = YahooFinanceClient(session=CrumbSession(self.log_path),
+                                    session_store=SessionStore(self.store_path))
+        client.crumb = 'rejected-crumb'
+        self.assertTrue(client._fetch_crumb())
+        self.assertEqual(client.crumb, 'newer-crumb')
+        self.assertEqual(self.fetch_count(), 0)
+
+        # The stored crumb itself was rejected: this time we fetch
+        self.assertTrue(client._fetch_crumb())
+        self.assertEqual(client.crumb, 'fresh-crumb')
+        self.assertEqual(self.fetch_count(), 1)
+
+    def test_one_process_refreshes(self):
+        """Test that concurrent cold starts in separate processes fetch the crumb once"""
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=refresh_in_process, args=(self.store_path, self.log_path))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+        self.assertTrue(all(p.exitcode == 0 for p in processes))
+        self.assertEqual(self.fetch_count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming quote ingestion, incremental indicators and pub/sub.
+"""
+
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from streaming import DeltaEncoder, IncrementalIndicators, PubSub, QuoteStream, normalize_quote, sse_events
+
+
+def batch_indicators(close):
+    """The StockSimple.calculate_metrics definitions."""
+    close = pd.Series(close)
+    ema_12 = close.ewm(span=12, adjust=False).mean()
+    ema_26 = close.ewm(span=26, adjust=False).mean()
+    macd = ema_12 - ema_26
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    return pd.DataFrame({
+        'sma_20': close.rolling(20).mean(), 'sma_50': close.rolling(50).mean(),
+        'ema_12': ema_12, 'ema_26': ema_26, 'macd': macd,
+        'signal': macd.ewm(span=9, adjust=False).mean(),
+        'rsi': 100 - 100 / (1 + gain / loss),
+    })
+
+
+class TestIncrementalIndicators(unittest.TestCase):
+    """Test that O(1) updates match the batch definitions"""
+
+    def test_matches_batch(self):
+        close = 100 + np.cumsum(np.random.default_rng(1).normal(0, 1, 120))
+        expected = batch_indicators(close)
+        indicators = IncrementalIndicators()
+        for i, price in enumerate(close):
+            preview = indicators.preview(price)
+            committed = indicators.commit(price)
+            self.assertEqual(preview, committed)
+            for column in expected:
+                if np.isnan(expected[column].iloc[i]):
+                    self.assertIsNone(committed[column], (column, i))
+                else:
+                    self.assertAlmostEqual(committed[column], expected[column].iloc[i], places=9)
+        self.assertEqual(indicators.count, 120)
+
+
+class TestPubSub(unittest.TestCase):
+    """Test topic delivery and bounded queues"""
+
+    def test_topics_and_wildcard(self):
+        hub = PubSub()
+        aapl = hub.subscribe(['AAPL'])
+        everything = hub.subscribe()
+        self.assertEqual(hub.publish('MSFT', {'n': 1}), 1)
+        self.assertEqual(hub.publish('AAPL', {'n': 2}), 2)
+        self.assertEqual(aapl.drain(), [{'n': 2}])
+        self.assertEqual(len(everything.drain()), 2)
+        aapl.close()
+        self.assertEqual(hub.subscriber_count('AAPL'), 0)
+
+    def test_slow_subscriber_drops_oldest(self):
+        hub = PubSub()
+        slow = hub.subscribe(['X'], maxsize=3)
+        for n in range(5):
+            hub.publish('X', {'n': n})
+        self.assertEqual([m['n'] for m in slow.drain()], [2, 3, 4])
+        self.assertEqual(slow.dropped, 2)
+
+
+class TestQuoteStream(unittest.TestCase):
+    """Test bar aggregation and fan-out from one polling loop"""
+
+    def setUp(self):
+        self.now = 1_700_000_000.0
+        self.quotes = {}
+        self.fetches = []
+
+        def fetch(symbols):
+            self.fetches.append(list(symbols))
+            return {s: self.quotes.get(s) for s in symbols}
+
+        self.stream = QuoteStream(fetch, bar_seconds=60, clock=lambda: self.now)
+
+    def test_ticks_build_bar_and_close_it(self):
+        sub = self.stream.subscribe(['AAPL'])
+        start = self.now - self.now % 60
+        for offset, price, volume in [(1, 10.0, 1000), (20, 12.0, 1500), (40, 9.0, 1600), (61, 11.0, 1700)]:
+            self.stream.ingest('aapl', price, volume, start + offset)
+
+        messages = sub.drain()
+        self.assertEqual([m['type'] for m in messages], ['tick', 'tick', 'tick', 'bar', 'tick'])
+        closed = messages[3]['bar']
+        self.assertEqual((closed['open'], closed['high'], closed['low'], closed['close']), (10.0, 12.0, 9.0, 9.0))
+        self.assertEqual(closed['volume'], 600)
+        self.assertEqual(messages[4]['bar']['volume'], 100)
+        self.assertEqual(messages[4]['indicators']['ema_12'],
+                         IncrementalIndicators._ema_step(9.0, 11.0, 12))
+        self.assertEqual(self.stream.snapshot('AAPL'), messages[4])
+
+    def test_one_fetch_for_all_subscribers(self):
+        self.quotes = {'AAPL': {'price': 10.0, 'volume': 5, 'timestamp': self.now},
+                       'MSFT': {'regularMarketPrice': 20.0, 'regularMarketTime': int(self.now)}}
+        first = self.stream.subscribe(['AAPL', 'MSFT'])
+        second = self.stream.subscribe(['AAPL'])
+        self.assertEqual(self.stream.poll_once(), 2)
+        self.assertEqual(self.fetches, [['AAPL', 'MSFT']])
+        self.assertEqual(len(first.drain()), 2)
+        self.assertEqual(second.drain()[0]['price'], 10.0)
+
+        first.close()
+        self.assertEqual(self.stream.watched(), ['AAPL'])
+        second.close()
+        self.assertEqual(self.stream.poll_once(), 0)
+
+    def test_leases_expire_when_not_renewed(self):
+        sub = self.stream.subscribe(['AAPL'])
+        self.stream.lease(['aapl', 'MSFT'], ttl=600)
+        self.now += 300
+        self.stream.lease(['MSFT'], ttl=600)
+        self.assertEqual(self.stream.watched(), ['AAPL', 'MSFT'])
+
+        self.now += 400
+        self.stream.poll_once()
+        self.assertEqual(self.fetches[-1], ['AAPL', 'MSFT'])
+        self.assertEqual(self.stream.status()['leased'], ['MSFT'])
+
+        self.now += 300
+        sub.close()
+        self.assertEqual(self.stream.poll_once(), 0)
+        self.assertEqual(self.stream.watched(), [])
+
+    def test_seed_continues_open_bar(self):
+        index = pd.to_datetime([self.now - 120, self.now - 60, self.now], unit='s', utc=True)
+        history = pd.DataFrame({'Open': [1.0, 2.0, 3.0], 'High': [1.0, 2.0, 5.0], 'Low': [1.0, 2.0, 3.0],
+                                'Close': [1.0, 2.0, 4.0], 'Volume': [1, 1, 7]}, index=index)
+        self.stream.seed('AAPL', history)
+        message = self.stream.ingest('AAPL', 6.0)
+        self.assertEqual(message['bar']['open'], 3.0)
+        self.assertEqual(message['bar']['high'], 6.0)
+        self.assertEqual(message['bar']['volume'], 7)
+        self.assertEqual(self.stream._states['AAPL'].indicators.count, 2)
+
+    def test_normalize_quote(self):
+        self.assertIsNone(normalize_quote(None))
+        self.assertIsNone(normalize_quote({'price': float('nan')}))
+        self.assertEqual(normalize_quote({'regularMarketPrice': 5, 'regularMarketTime': 100}),
+                         {'price': 5.0, 'volume': None, 'timestamp': 100.0})
+
+
+def tick(price, **indicators):
+    return {'type': 'tick', 'symbol': 'AAPL', 'price': price,
+            'bar': {'start': 0, 'open': 10.0, 'high': max(price, 10.0), 'low': min(price, 10.0),
+                    'close': price, 'volume': 0.0},
+            'indicators': indicators}
+
+
+class TestDeltaEncoder(unittest.TestCase):
+    """Test that connections receive only changed fields and crossings"""
+
+    def test_only_changes_are_sent(self):
+        encoder = DeltaEncoder()
+        first = encoder.encode(tick(10.0, rsi=50.0, macd=-0.1, signal=0.0))
+        self.assertEqual(first['price'], 10.0)
+        self.assertEqual(first['open'], 10.0)
+        self.assertIsNone(encoder.encode(tick(10.0, rsi=50.0, macd=-0.1, signal=0.0)))
+
+        delta = encoder.encode(tick(11.0, rsi=75.0, macd=0.1, signal=0.0))
+        self.assertEqual(set(delta), {'symbol', 'type', 'price', 'high', 'close', 'rsi', 'macd', 'signals'})
+        self.assertEqual(delta['signals'], ['rsi_overbought', 'macd_bullish_cross'])
+
+    def test_sse_frames_and_close(self):
+        stream = QuoteStream(clock=lambda: 120.0)
+        subscription = stream.subscribe(['AAPL', 'MSFT'])
+        stream.ingest('AAPL', 10.0)
+        stream.ingest('AAPL', 10.0)
+        stream.ingest('MSFT', 20.0)
+        events = sse_events(subscription, heartbeat=0.01)
+        self.assertEqual(next(events), 'retry: 5000\n\n')
+        first, second = next(events), next(events)
+        self.assertTrue(first.startswith('id: 1\nevent: tick\ndata: {'))
+        self.assertEqual(json.loads(second.split('data: ')[1])['symbol'], 'MSFT')
+        self.assertEqual(next(events), ': keepalive\n\n')
+        events.close()
+        self.assertTrue(subscription.closed)
+        self.assertEqual(stream.watched(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the materialized per-symbol summary table.
+"""
+
+import json
+import unittest
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from summary_table import SummaryTable
+
+
+def history(n=260, seed=0, end='2024-06-28'):
+    """Daily bars with the StockSimple indicator columns."""
+    index = pd.bdate_range(end=end, periods=n)
+    close = pd.Series(100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n))), index=index)
+    df = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                       'Volume': np.full(n, 1000)}, index=index)
+    df['Daily Return'] = close.pct_change()
+    df['50MA'] = close.rolling(50).mean()
+    df['200MA'] = close.rolling(200).mean()
+    df['MACD'] = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    delta = close.diff()
+    df['RSI'] = 100 - 100 / (1 + delta.clip(lower=0).rolling(14).mean() / (-delta.clip(upper=0)).rolling(14).mean())
+    df['Upper Band'] = close.rolling(20).mean() + 2 * close.rolling(20).std()
+    df['Lower Band'] = close.rolling(20).mean() - 2 * close.rolling(20).std()
+    df['ATR'] = (df['High'] - df['Low']).rolling(14).mean()
+    return df
+
+
+class FakeStock:
+    def __init__(self, ticker, df):
+        self.ticker = ticker
+        self.history = df
+
+    def is_valid(self):
+        return not self.history.empty
+
+
+class TestSummaryTable(unittest.TestCase):
+    """Test row computation, change detection and listings"""
+
+    def setUp(self):
+        self.table = SummaryTable()
+        self.aapl = history(seed=1)
+        self.table.update_stock(FakeStock('AAPL', self.aapl))
+        self.table.update_stock(FakeStock('MSFT', history(seed=2)))
+
+    def test_record_matches_history(self):
+        record = self.table.record('aapl', today=date(2024, 7, 1))
+        latest = self.aapl.iloc[-1]
+        close = self.aapl['Close']
+        self.assertEqual(record['symbol'], 'AAPL')
+        self.assertEqual(record['current_price'], round(latest['Close'], 2))
+        self.assertEqual(record['rsi'], round(latest['RSI'], 1))
+        self.assertEqual(record['growth_percent'], round((close.iloc[-1] / close.iloc[0] - 1) * 100, 2))
+        self.assertEqual(record['volatility'], round(self.aapl['Daily Return'].std(), 4))
+        self.assertEqual(record['is_bullish'], bool(latest['Close'] > latest['50MA'] and
+                                                    latest['Close'] > latest['200MA'] and latest['RSI'] < 70))
+        self.assertEqual(record['last_updated'], '2024-06-28')
+        self.assertEqual(record['days_behind'], 3)
+        self.assertEqual(record['data_points'], 260)
+        json.dumps(record)
+
+    def test_unchanged_data_is_not_recomputed(self):
+        updates = self.table.updates
+        self.assertFalse(self.table.update_stock(FakeStock('AAPL', self.aapl)))
+        extended = history(261, seed=1, end='2024-07-01')
+        self.assertTrue(self.table.update_stock(FakeStock('AAPL', extended)))
+        self.assertEqual(self.table.updates, updates + 1)
+        self.assertEqual(self.table.record('AAPL')['data_points'], 261)
+
+    def test_listing_is_one_slice(self):
+        records = self.table.records(['MSFT', 'NOPE', 'AAPL'])
+        self.assertEqual([r['symbol'] for r in records], ['MSFT', 'AAPL'])
+        self.assertEqual(len(self.table.rows()), 2)
+        self.table.update_stock(FakeStock('MSFT', pd.DataFrame()))
+        self.assertNotIn('MSFT', self.table)
+
+    def test_short_history_reports_missing_values(self):
+        self.table.update_stock(FakeStock('NEW', history(60, seed=3)))
+        record = self.table.report_records(['NEW'])[0]
+        self.assertIsNone(record['ma_200'])
+        self.assertFalse(record['is_bullish'])
+        self.assertNotIn('price_above_ma200', record['technical_signals'])
+        self.assertIn('price_above_ma50', record['technical_signals'])
+        self.assertEqual(set(record['price_levels']), {'support', 'resistance', 'atr'})
+        json.dumps(record)
+
+
+if __name__ == '__main__':
+    unittest.main()
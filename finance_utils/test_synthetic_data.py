@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic market data generator.
+"""
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import stock_simple
+from synthetic_data import generate_ohlcv_arrays, generate_market, generate_forex_ohlcv, write_cache
+
+
+class TestSyntheticData(unittest.TestCase):
+    """Test generated OHLCV data"""
+
+    def test_seeded_and_consistent(self):
+        """Test reproducibility and OHLC consistency for both models"""
+        for model in ('gbm', 'regime'):
+            first = generate_ohlcv_arrays(50, 500, model=model, seed=11)
+            second = generate_ohlcv_arrays(50, 500, model=model, seed=11)
+            np.testing.assert_array_equal(first['Close'], second['Close'])
+
+            body_high = np.maximum(first['Open'], first['Close'])
+            body_low = np.minimum(first['Open'], first['Close'])
+            self.assertTrue((first['High'] >= body_high).all())
+            self.assertTrue((first['Low'] <= body_low).all())
+            self.assertTrue((first['Low'] > 0).all())
+            self.assertTrue((first['Volume'] >= 0).all())
+
+    def test_volatility_matches_parameters(self):
+        """Test that GBM returns have the requested annualized volatility"""
+        closes = generate_ohlcv_arrays(200, 1000, volatility=0.3, seed=5)['Close']
+        realized = np.diff(np.log(closes), axis=0).std() * np.sqrt(252)
+        self.assertAlmostEqual(realized, 0.3, delta=0.01)
+
+    def test_holidays_and_gaps(self):
+        """Test shared holidays and per-ticker gaps"""
+        frames = generate_market(['AAA', 'BBB'], 1000, holiday_rate=0.05, gap_rate=0.1, seed=2)
+        self.assertLess(len(frames['AAA']), 1000)
+        self.assertNotEqual(list(frames['AAA'].index), list(frames['BBB'].index))
+        self.assertTrue(frames['AAA'].index.is_monotonic_increasing)
+
+    def test_write_cache_roundtrip(self):
+        """Test that written histories load through the StockSimple cache"""
+        cache_dir = tempfile.mkdtemp()
+        original = stock_simple.CACHE_DIR
+        try:
+            frames = generate_market(['zzz'], 300, seed=4)
+            write_cache(frames, cache_dir=cache_dir)
+            stock_simple.CACHE_DIR = type(original)(cache_dir)
+            loaded = stock_simple.load_cached_history('ZZZ')
+            np.testing.assert_allclose(loaded['Close'].to_numpy(), frames['zzz']['Close'].to_numpy())
+            self.assertEqual(list(loaded.columns), list(frames['zzz'].columns))
+        finally:
+            stock_simple.CACHE_DIR = original
+            shutil.rmtree(cache_dir)
+
+    def test_forex_mock_scale(self):
+        """Test the forex helper keeps the dashboard's price scale"""
+        df = generate_forex_ohlcv('EUR/USD', days=30, seed=1)
+        self.assertEqual(len(df), 721)
+        self.assertAlmostEqual(df['Close'].iloc[0], 1.085, delta=0.01)
+        self.assertLess(df['Close'].pct_change().std(), 0.002)
+
+
+if __name__ == '__main__':
+    unittest.main()
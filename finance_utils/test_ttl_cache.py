@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the TTL cache and the cached, batched YahooFinanceClient.
+"""
+
+import threading
+import time
+import unittest
+from datetime import datetime
+
+import requests
+
+from ttl_cache import TTLCache
+from yahoo_finance_client import YahooFinanceClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test expiry, eviction and single-flight loading"""
+
+    def test_expiry_and_eviction(self):
+        """Test that entries expire and the LRU entry is evicted"""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=2, default_ttl=10, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=100)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+
+        clock.now = 11
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c', 'gone'), 'gone')
+
+    def test_single_flight(self):
+        """Test that concurrent misses compute the value once"""
+        cache = TTLCache()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return 42
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()['coalesced'], 7)
+
+    def test_failures_not_cached(self):
+        """Test that None results and exceptions are not stored"""
+        cache = TTLCache()
+        self.assertIsNone(cache.get_or_compute('k', lambda: None))
+        with self.assertRaises(ValueError):
+            cache.get_or_compute('k', lambda: (_ for _ in ()).throw(ValueError('x')))
+        self.assertEqual(cache.get_or_compute('k', lambda: 5), 5)
+
+
+class FakeYahooSession(requests.Session):
+    """Records requests and answers quote/summary calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.urls.append((url, dict(params or {})))
+        time.sleep(0.05)
+        response = requests.Response()
+        response.status_code = 200
+        if 'quoteSummary' in url:
+            body = '{"quoteSummary": {"result": [{"price": {}}], "error": null}}'
+        else:
+            symbols = params['symbols'].split(',')
+            results = ','.join(f'{{"symbol": "{s}", "regularMarketPrice": 1.0}}'
+                               for s in symbols if s != 'NOPE')
+            body = f'{{"quoteResponse": {{"result": [{results}], "error": null}}}}'
+        response._content = body.encode()
+        return response
+
+
+class TestYahooClientCaching(unittest.TestCase):
+    """Test response caching, coalescing and quote batching"""
+
+    def setUp(self):
+        self.session = FakeYahooSession()
+        self.client = YahooFinanceClient(session=self.session)
+        self.client.min_interval = 0
+        self.client.quote_batcher.batch_window = 0.1
+        self.client.crumb = 'crumb'
+        self.client.last_crumb_time = datetime.now()
+
+    def test_concurrent_quotes_batched(self):
+        """Test that concurrent get_quote calls share one multi-symbol request"""
+        symbols = ['AAPL', 'MSFT', 'NVDA', 'AAPL', 'NOPE']
+        results = {}
+
+        def fetch(i, symbol):
+            results[i] = self.client.get_quote(symbol)
+
+        threads = [threading.Thread(target=fetch, args=(i, s)) for i, s in enumerate(symbols)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.session.urls), 1)
+        self.assertEqual(self.session.urls[0][1]['symbols'].count('AAPL'), 1)
+        self.assertEqual(results[2]['quoteResponse']['result'][0]['symbol'], 'NVDA')
+        self.assertIsNone(results[4])
+
+        # Served from cache afterwards
+        self.assertEqual(set(self.client.get_quotes(['AAPL', 'MSFT'])), {'AAPL', 'MSFT'})
+        self.assertEqual(len(self.session.urls), 1)
+
+    def test_summary_cached(self):
+        """Test that repeated summaries hit the network once and the crumb is not in the key"""
+        first = self.client.get_quote_summary('AAPL')
+        self.client.crumb = 'rotated'
+        second = self.client.get_quote_summary('AAPL')
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.session.urls), 1)
+
+    def test_history_ttl_by_range_end(self):
+        """Test that closed ranges are cached longer than open ones"""
+        self.client.ttls['history_open'] = 0
+        now = int(time.time())
+        self.client._make_request = lambda url, params: {'rows': []}
+
+        self.client.get_historical_data('AAPL', now - 86400 * 30, now)
+        self.client.get_historical_data('AAPL', now - 86400 * 60, now - 86400 * 30)
+        stats = self.client.cache_stats()
+        self.assertEqual(stats['size'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+TTL Cache
+
+Thread-safe in-process cache with per-entry expiry, an LRU size bound and
+single-flight loading: when several threads ask for the same missing key,
+one of them computes it and the rest wait for that result instead of
+repeating the work.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded mapping whose entries expire.
+
+    Args:
+        maxsize: Maximum number of entries; least recently used entries are
+                 evicted first
+        default_ttl: Seconds an entry lives when no ttl is given
+        clock: Time source (monotonic by default, injectable for tests)
+    """
+
+    def __init__(self, maxsize: int = 1024, default_ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key: Hashable):
+        """Fresh value or _MISSING; caller holds the lock."""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires <= self.clock():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]):
+        """Insert and evict; caller holds the lock."""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup(key) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       ttl: Optional[float] = None,
+                       cache_if: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        """
+        Return the cached value for key, computing it at most once at a time.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            ttl: Lifetime of the computed value (default_ttl if None)
+            cache_if: Predicate deciding whether a result is stored; by
+                      default failures reported as None are not cached
+
+        Returns:
+            The cached or freshly computed value. Exceptions from compute are
+            raised in every waiting caller and nothing is cached.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if cache_if(value):
+                self._store(key, value, ttl)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced}
@@ -2,43 +2,193 @@ import requests
 import time
 import json
 import re
+import threading
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence
 import random
 import logging
 
+from circuit_breaker import (breaker_for, limiter_for, classify_exception,
+                             SUCCESS, RATE_LIMITED, UNAUTHORIZED, ERROR)
+from session_store import SessionStore, cookies_from_list, cookies_to_list
+from ttl_cache import TTLCache
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+QUOTE_URL = 'https://query1.finance.yahoo.com/v7/finance/quote'
+SUMMARY_URL = 'https://query2.finance.yahoo.com/v10/finance/quoteSummary/'
+HISTORY_URL = 'https://query1.finance.yahoo.com/v7/finance/download/'
+
+# Seconds each kind of response stays cached. Historical ranges that ended
+# more than a day ago are final, so they live much longer than open ones.
+DEFAULT_TTLS = {
+    'quote': 15,
+    'summary': 6 * 3600,
+    'history_open': 300,
+    'history_closed': 7 * 86400,
+}
+
+
+def _status_outcome(status_code: int) -> str:
+    """Circuit breaker outcome for an HTTP status."""
+    if status_code == 429:
+        return RATE_LIMITED
+    if status_code == 401:
+        return UNAUTHORIZED
+    return SUCCESS if status_code < 500 else ERROR
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class QuoteBatcher:
+    """
+    Merge concurrent quote lookups into multi-symbol requests.
+    
+    The first caller waits batch_window seconds for others to join, then
+    fetches every pending symbol in one request (split into chunks of
+    max_symbols). A symbol already pending is shared, not requested twice.
+    
+    Args:
+        fetch: Callable taking a list of symbols and returning {symbol: quote}
+        batch_window: Seconds the leading caller waits for more symbols
+        max_symbols: Maximum symbols per request
+    """
+    
+    def __init__(self, fetch, batch_window: float = 0.02, max_symbols: int = 50):
+        self.fetch = fetch
+        self.batch_window = batch_window
+        self.max_symbols = max_symbols
+        self._pending: Dict[str, Future] = {}
+        self._leader_active = False
+        self._lock = threading.Lock()
+    
+    def get_many(self, symbols: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        with self._lock:
+            futures = {}
+            for symbol in symbols:
+                if symbol not in self._pending:
+                    self._pending[symbol] = Future()
+                futures[symbol] = self._pending[symbol]
+            leader = not self._leader_active
+            self._leader_active = True
+        
+        if leader:
+            if self.batch_window > 0:
+                time.sleep(self.batch_window)
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._leader_active = False
+            self._run(batch)
+        
+        return {symbol: future.result() for symbol, future in futures.items()}
+    
+    def _run(self, batch: Dict[str, Future]):
+        symbols = list(batch)
+        for start in range(0, len(symbols), self.max_symbols):
+            chunk = symbols[start:start + self.max_symbols]
+            try:
+                quotes = self.fetch(chunk) or {}
+            except Exception as e:
+                logger.error(f"Batched quote request failed: {e}")
+                quotes = {}
+            for symbol in chunk:
+                batch[symbol].set_result(quotes.get(symbol))
+
+
 class YahooFinanceClient:
     """
     A robust Yahoo Finance client that handles rate limiting, authentication, and retries.
     """
     
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, session: Optional[requests.Session] = None,
+                 session_store: Optional[SessionStore] = None, persist_session: bool = True):
+        # Any requests.Session works, e.g. providers.ReplaySession for offline runs
+        self.session = session or requests.Session()
+        # Crumb and cookies shared with other processes (Flask workers, CLI runs)
+        self.session_store = session_store or (SessionStore() if persist_session else None)
         self.crumb = None
         self.last_crumb_time = None
         self.crumb_expires_hours = 6  # Refresh crumb every 6 hours
-        self.base_delay = 1  # Base delay between requests in seconds
+        self.base_delay = 1  # Base delay for retry backoff in seconds
+        self.min_interval = 1  # Minimum seconds between request starts
         self.max_retries = 3
+        self._last_request_time = 0.0
+        self._throttle_lock = threading.Lock()
+        self._crumb_lock = threading.Lock()
+        
+        # Response cache with per-endpoint TTLs, shared by concurrent callers
+        self.ttls = dict(DEFAULT_TTLS)
+        self.cache = TTLCache(maxsize=2048)
+        self.quote_batcher = QuoteBatcher(self._fetch_quotes)
+        
+        # Shared with every other Yahoo caller in the process (StockRobust, ...)
+        self.breaker = breaker_for('yahoo')
+        self.limiter = limiter_for('yahoo')
         
         # Set a realistic User-Agent
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
     
-    def _needs_new_crumb(self) -> bool:
-        """Check if we need to fetch a new crumb."""
+    def _crumb_expired(self) -> bool:
         if not self.crumb or not self.last_crumb_time:
             return True
         
         time_since_crumb = datetime.now() - self.last_crumb_time
         return time_since_crumb > timedelta(hours=self.crumb_expires_hours)
     
+    def _needs_new_crumb(self) -> bool:
+        """Check if we need to fetch a new crumb (a stored one counts as valid)."""
+        if not self._crumb_expired():
+            return False
+        return not self._adopt_stored_session()
+    
+    def _adopt_stored_session(self, stale: Optional[str] = None) -> bool:
+        """Use the crumb and cookies persisted by any process, unless it is the stale crumb."""
+        if self.session_store is None:
+            return False
+        data = self.session_store.load()
+        if not data or data['crumb'] == stale:
+            return False
+        
+        cookies_from_list(self.session.cookies, data.get('cookies', []))
+        self.crumb = data['crumb']
+        self.last_crumb_time = datetime.fromtimestamp(data['fetched_at'])
+        return True
+    
     def _fetch_crumb(self) -> bool:
         """Fetch a fresh crumb and session cookies from Yahoo Finance."""
+        stale, stale_time = self.crumb, self.last_crumb_time
+        with self._crumb_lock:
+            # Another thread refreshed the crumb while we waited for the lock
+            if self.crumb and self.last_crumb_time != stale_time:
+                return True
+            if self.session_store is None:
+                return self._fetch_crumb_locked()
+            
+            with self.session_store.lock():
+                # Another process refreshed it while we waited for the file lock
+                if self._adopt_stored_session(stale=stale):
+                    logger.info("Using crumb refreshed by another process")
+                    return True
+                if not self._fetch_crumb_locked():
+                    return False
+                try:
+                    self.session_store.save(self.crumb, cookies_to_list(self.session.cookies),
+                                            self.crumb_expires_hours * 3600)
+                except OSError as e:
+                    logger.warning(f"Could not persist Yahoo session: {e}")
+                return True
+    
+    def _fetch_crumb_locked(self) -> bool:
         try:
             logger.info("Fetching new crumb from Yahoo Finance...")
             
@@ -66,6 +216,15 @@ class YahooFinanceClient:
             logger.error(f"Error fetching crumb: {str(e)}")
             return False
     
+    def _throttle(self):
+        """Wait only as long as needed to keep min_interval between requests."""
+        with self._throttle_lock:
+            slot = max(time.monotonic(), self._last_request_time + self.min_interval)
+            self._last_request_time = slot
+        wait = slot - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+    
     def _make_request(self, url: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
         """Make a request with retry logic and rate limiting."""
         if params is None:
@@ -79,16 +238,37 @@ class YahooFinanceClient:
             try:
                 # Add exponential backoff with jitter
                 if attempt > 0:
+                    if self.breaker.is_open():
+                        logger.warning("Yahoo circuit open, not retrying")
+                        return None
                     delay = self.base_delay * (2 ** attempt) + random.uniform(0, 1)
                     logger.info(f"Retrying in {delay:.2f} seconds (attempt {attempt + 1}/{self.max_retries})...")
                     time.sleep(delay)
                 
+                # Fail fast while Yahoo is throttling us; callers fall back to cache
+                if not self.breaker.allow():
+                    logger.warning(f"Yahoo circuit open, skipping request "
+                                   f"(retry in {self.breaker.retry_in():.0f}s)")
+                    return None
+                
                 # Make the request
-                response = self.session.get(url, params=params, timeout=10)
+                self._throttle()
+                with self.limiter.slot() as report:
+                    try:
+                        response = self.session.get(url, params=params, timeout=10)
+                    except requests.exceptions.RequestException as e:
+                        self.breaker.record(classify_exception(e))
+                        raise
+                    outcome = _status_outcome(response.status_code)
+                    report(outcome)
+                self.breaker.record(outcome, retry_after=_retry_after(response))
                 
                 # Handle rate limiting
                 if response.status_code == 429:
                     logger.warning("Rate limited by Yahoo Finance")
+                    if self.breaker.is_open():
+                        logger.error("Yahoo circuit opened, giving up instead of backing off")
+                        return None
                     if attempt < self.max_retries - 1:
                         time.sleep(self.base_delay * (2 ** (attempt + 1)))
                         continue
@@ -125,8 +305,6 @@ class YahooFinanceClient:
                     logger.error(f"Yahoo Finance API error: {error_code} - {error_desc}")
                     return None
                 
-                # Add a small delay to be respectful
-                time.sleep(self.base_delay)
                 return data
                 
             except requests.exceptions.RequestException as e:
@@ -142,48 +320,88 @@ class YahooFinanceClient:
         
         return None
     
-    def get_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """Get current quote data for a symbol."""
-        # Ensure we have a valid crumb
+    def _ensure_crumb(self, purpose: str) -> bool:
+        """Make sure a valid crumb is available before an API request."""
+        if self.breaker.is_open():
+            logger.warning(f"Yahoo circuit open, skipping {purpose} request")
+            return False
         if self._needs_new_crumb():
             if not self._fetch_crumb():
-                logger.error("Failed to fetch crumb for quote request")
-                return None
+                logger.error(f"Failed to fetch crumb for {purpose} request")
+                return False
+        return True
+    
+    def _cached_request(self, endpoint: str, url: str, params: Dict[str, Any],
+                        ttl: float) -> Optional[Dict[str, Any]]:
+        """Serve a request from the cache, or make it once for all concurrent callers."""
+        key = (endpoint, url, tuple(sorted(params.items())))
+        return self.cache.get_or_compute(key, lambda: self._make_request(url, dict(params)), ttl)
+    
+    def _fetch_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """One multi-symbol quote request; caches and returns quotes by symbol."""
+        if not self._ensure_crumb('quote'):
+            return {}
         
-        url = 'https://query1.finance.yahoo.com/v7/finance/quote'
-        params = {
-            'symbols': symbol,
-            'formatted': 'false'
-        }
+        data = self._make_request(QUOTE_URL, {'symbols': ','.join(symbols), 'formatted': 'false'})
+        if not data:
+            return {}
         
-        return self._make_request(url, params)
+        requested = {symbol.upper(): symbol for symbol in symbols}
+        quotes = {}
+        for quote in (data.get('quoteResponse') or {}).get('result') or []:
+            symbol = requested.get(str(quote.get('symbol', '')).upper())
+            if symbol is not None:
+                quotes[symbol] = quote
+                self.cache.set(('quote', symbol), quote, self.ttls['quote'])
+        return quotes
+    
+    def get_quotes(self, symbols: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get current quotes for several symbols.
+        
+        Cached quotes are reused; the rest are fetched through the
+        multi-symbol quote endpoint together with any concurrent callers.
+        
+        Returns:
+            Dictionary of symbol -> quote (None for unknown symbols)
+        """
+        quotes = {}
+        missing = []
+        for symbol in dict.fromkeys(symbols):
+            cached = self.cache.get(('quote', symbol))
+            if cached is None:
+                missing.append(symbol)
+            else:
+                quotes[symbol] = cached
+        if missing:
+            quotes.update(self.quote_batcher.get_many(missing))
+        return {symbol: quotes.get(symbol) for symbol in symbols}
+    
+    def get_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get current quote data for a symbol."""
+        quote = self.get_quotes([symbol])[symbol]
+        if quote is None:
+            return None
+        return {'quoteResponse': {'result': [quote], 'error': None}}
     
     def get_quote_summary(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get comprehensive quote summary data for a symbol."""
-        # Ensure we have a valid crumb
-        if self._needs_new_crumb():
-            if not self._fetch_crumb():
-                logger.error("Failed to fetch crumb for quote summary request")
-                return None
+        if not self._ensure_crumb('quote summary'):
+            return None
         
-        url = 'https://query2.finance.yahoo.com/v10/finance/quoteSummary/' + symbol
         params = {
             'modules': 'financialData,quoteType,defaultKeyStatistics,assetProfile,summaryDetail',
             'corsDomain': 'finance.yahoo.com',
             'formatted': 'false'
         }
         
-        return self._make_request(url, params)
+        return self._cached_request('summary', SUMMARY_URL + symbol, params, self.ttls['summary'])
     
     def get_historical_data(self, symbol: str, period1: int, period2: int, interval: str = '1d') -> Optional[Dict[str, Any]]:
         """Get historical data for a symbol."""
-        # Ensure we have a valid crumb
-        if self._needs_new_crumb():
-            if not self._fetch_crumb():
-                logger.error("Failed to fetch crumb for historical data request")
-                return None
+        if not self._ensure_crumb('historical data'):
+            return None
         
-        url = 'https://query1.finance.yahoo.com/v7/finance/download/' + symbol
         params = {
             'period1': period1,
             'period2': period2,
@@ -192,7 +410,14 @@ class YahooFinanceClient:
             'includeAdjustedClose': 'true'
         }
         
-        return self._make_request(url, params)
+        # A range that ended over a day ago will not change any more
+        closed = period2 < time.time() - 86400
+        ttl = self.ttls['history_closed' if closed else 'history_open']
+        return self._cached_request('history', HISTORY_URL + symbol, params, ttl)
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters of the response cache."""
+        return self.cache.stats()
 
 
 # Global instance